@@ -0,0 +1,47 @@
+import time
+
+from lite_dist2.suggest_strategies import SequentialSuggestStrategy
+from lite_dist2.suggest_strategies.base_suggest_strategy import SuggestStrategyParam
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+
+REPEAT = 100
+MAX_NUMS = (1_000, 100_000, 10_000_000)
+SPACES: dict[str, tuple[int | None, ...]] = {
+    "1D infinite": (None,),
+    "2D infinite": (None, 10),
+    "3D finite": (1000, 1000, 1000),
+    "3D infinite": (None, 1000, 1000),
+}
+
+
+def create_parameter_space(sizes: tuple[int | None, ...]) -> ParameterAlignedSpace:
+    return ParameterAlignedSpace(
+        axes=[
+            LineSegment(name=f"x{i}", type_="int", size=size, step=1, start=0, ambient_index=0, ambient_size=size)
+            for i, size in enumerate(sizes)
+        ],
+        check_lower_filling=True,
+    )
+
+
+def measure(strategy: SequentialSuggestStrategy, start: int, max_num: int) -> float:
+    # suggest のうち、切り出す範囲を決めて slice する部分 (_aligned_suggest) のみを計測する
+    begin = time.perf_counter()
+    for _ in range(REPEAT):
+        strategy._aligned_suggest(start, max_num)  # noqa: SLF001
+    return (time.perf_counter() - begin) / REPEAT
+
+
+def main() -> None:
+    print(f"{'space':>12} {'start':>12} {'max_num':>12} {'suggest mean [us]':>18}")
+    for name, sizes in SPACES.items():
+        strategy = SequentialSuggestStrategy(SuggestStrategyParam(strict_aligned=True), create_parameter_space(sizes))
+        for start in (0, 1_234_000):
+            for max_num in MAX_NUMS:
+                elapsed = measure(strategy, start, max_num)
+                print(f"{name:>12} {start:>12} {max_num:>12} {elapsed * 1e6:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import time
+from collections.abc import Callable
+
+from lite_dist2.common import numerize
+from lite_dist2.curriculum_models.mapping import Mapping, split_mappings
+from lite_dist2.curriculum_models.trial import Trial, TrialStatus
+from lite_dist2.type_definitions import PrimitiveValueType, RawParamType, RawResultType
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+from lite_dist2.value_models.point import ScalarValue
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+POINT_NUMS = (10_000, 100_000)
+REPEAT = 3
+
+
+def create_trial(size: int) -> Trial:
+    parameter_space = ParameterAlignedSpace(
+        axes=[
+            LineSegment(name="x", type_="int", size=size, step=1, start=0, ambient_index=0, ambient_size=size),
+            LineSegment(name="y", type_="float", size=1, step=0.5, start=0.0, ambient_index=0, ambient_size=1),
+        ],
+        check_lower_filling=True,
+    )
+    return Trial(
+        study_id="bench",
+        trial_id="t01",
+        reserved_timestamp=None,
+        trial_status=TrialStatus.running,
+        const_param=None,
+        parameter_space=parameter_space,
+        result_type="scalar",
+        result_value_type="float",
+        worker_node_name=None,
+        worker_node_id="w01",
+    )
+
+
+def encode_per_point(trial: Trial, raw_mappings: list[tuple[RawParamType, RawResultType]]) -> list[Mapping]:
+    # 一括変換を入れる前の、点ごとに model を生成する変換
+    return [
+        Mapping(
+            params=trial.parameter_space.value_tuple_to_param_type(raw_param),
+            result=ScalarValue.create_from_numeric(raw_result, trial.result_value_type),
+        )
+        for raw_param, raw_result in raw_mappings
+    ]
+
+
+def decode_per_point(mappings: list[Mapping]) -> list[list[PrimitiveValueType]]:
+    columns: list[list[PrimitiveValueType]] = [[] for _ in range(3)]
+    for mapping in mappings:
+        for i, param in enumerate(mapping.params):
+            columns[i].append(numerize(param.value_type, param.value))
+        columns[2].append(numerize(mapping.result.value_type, mapping.result.value))
+    return columns
+
+
+def measure(func: Callable[[], object]) -> float:
+    # REPEAT 回のうち最速の時間 [s]
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    print(f"{'points':>10} {'direction':>10} {'method':>12} {'points/sec':>14}")
+    for n in POINT_NUMS:
+        trial = create_trial(n)
+        raw_mappings = [((x, 0.0), x * 0.25) for x in range(n)]
+        mappings = trial.convert_mappings_from(raw_mappings)
+
+        cases: list[tuple[str, str, Callable[[], object]]] = [
+            ("encode", "per point", lambda: encode_per_point(trial, raw_mappings)),  # noqa: B023
+            ("encode", "bulk", lambda: trial.convert_mappings_from(raw_mappings)),  # noqa: B023
+        ]
+        if np is not None:
+            param_columns = [np.arange(n, dtype=np.int64), np.zeros(n, dtype=np.float64)]
+            results = np.arange(n, dtype=np.float64) * 0.25
+            cases.append(
+                ("encode", "bulk array", lambda: trial.convert_mappings_from_arrays(param_columns, results)),  # noqa: B023
+            )
+        cases.extend(
+            [
+                ("decode", "per point", lambda: decode_per_point(mappings)),  # noqa: B023
+                ("decode", "bulk", lambda: split_mappings(mappings)),  # noqa: B023
+            ],
+        )
+        for direction, method, func in cases:
+            print(f"{n:>10} {direction:>10} {method:>12} {n / measure(func):>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import time
+from collections import deque
+
+from lite_dist2.common import publish_timestamp
+from lite_dist2.curriculum_models.trial import Trial, TrialStatus
+from lite_dist2.curriculum_models.trial_table import TrialTable
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+
+TRIAL_SIZE = 10
+MAX_TRIAL_NUM = 100_000
+IN_FLIGHT_TRIAL_NUM = 1_000
+CHECKPOINTS = (1_000, 10_000, 100_000)
+WORKER_ID = "w01"
+
+
+def create_parameter_space() -> ParameterAlignedSpace:
+    size = TRIAL_SIZE * MAX_TRIAL_NUM
+    return ParameterAlignedSpace(
+        axes=[LineSegment(name="x", type_="int", size=size, step=1, start=0, ambient_index=0, ambient_size=size)],
+        check_lower_filling=True,
+    )
+
+
+def reserve(parameter_space: ParameterAlignedSpace, trial_table: TrialTable, trial_id: str) -> Trial | None:
+    # Table 側の予約処理 (find_least_division -> slice -> register) のみを計測する
+    least_seg = trial_table.find_least_division(parameter_space.total)
+    if least_seg.size == 0:
+        return None
+    trial = Trial(
+        study_id="bench",
+        trial_id=trial_id,
+        reserved_timestamp=publish_timestamp(),
+        trial_status=TrialStatus.running,
+        const_param=None,
+        parameter_space=parameter_space.slice([(least_seg.start, TRIAL_SIZE)]),
+        result_type="scalar",
+        result_value_type="int",
+        worker_node_name=None,
+        worker_node_id=WORKER_ID,
+    )
+    trial_table.register(trial)
+    if trial_table.is_not_defined_aps():
+        trial_table.init_aps(trial)
+    return trial
+
+
+def main() -> None:
+    parameter_space = create_parameter_space()
+    trial_table = TrialTable(trials=[], aggregated_parameter_space=None)
+    in_flight: deque[str] = deque()
+
+    print(f"{'trials':>10} {'reserve mean [us]':>18}")
+    window_elapsed = 0.0
+    window_count = 0
+    for i in range(MAX_TRIAL_NUM):
+        start = time.perf_counter()
+        trial = reserve(parameter_space, trial_table, f"t{i:x}")
+        window_elapsed += time.perf_counter() - start
+        window_count += 1
+        if trial is None:
+            break
+
+        # 一定数の trial を実行中のまま残しておく
+        in_flight.append(trial.trial_id)
+        if len(in_flight) > IN_FLIGHT_TRIAL_NUM:
+            trial_table.receipt_trial_result(in_flight.popleft(), WORKER_ID)
+            trial_table.simplify_aps()
+
+        if i + 1 in CHECKPOINTS:
+            print(f"{i + 1:>10} {window_elapsed / window_count * 1e6:>18.1f}")
+            window_elapsed = 0.0
+            window_count = 0
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import os
+import tempfile
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import TYPE_CHECKING, Literal, assert_never
 
 import aiofiles
 
 if TYPE_CHECKING:
-    from pathlib import Path
+    from collections.abc import Iterable
 
     from lite_dist2.type_definitions import PortableValueType, PrimitiveValueType
 
@@ -51,8 +54,43 @@ def portablize(type_name: Literal["bool", "int", "float"], value: PrimitiveValue
             assert_never(unreachable)
 
 
+def numerize_column(
+    type_name: Literal["bool", "int", "float"],
+    values: Iterable[PortableValueType],
+) -> list[PrimitiveValueType]:
+    # 列単位でまとめて変換する版の `numerize`
+    match type_name:
+        case "bool":
+            return [bool(v) for v in values]
+        case "int":
+            return [int(str(v), base=16) for v in values]
+        case "float":
+            return [float.fromhex(str(v)) for v in values]
+        case _ as unreachable:
+            assert_never(unreachable)
+
+
+def portablize_column(
+    type_name: Literal["bool", "int", "float"],
+    values: Iterable[PrimitiveValueType],
+) -> list[PortableValueType]:
+    # 列単位でまとめて変換する版の `portablize`
+    match type_name:
+        case "bool":
+            return [bool(v) for v in values]
+        case "int":
+            return [hex(int(v)) for v in values]
+        case "float":
+            return [float(v).hex() for v in values]
+        case _ as unreachable:
+            assert_never(unreachable)
+
+
+JST = timezone(timedelta(hours=+9), "JST")
+
+
 def publish_timestamp() -> datetime:
-    return datetime.now(tz=timezone(timedelta(hours=+9), "JST"))
+    return datetime.now(tz=JST)
 
 
 async def async_read_file(path: Path) -> bytes:
@@ -63,3 +101,18 @@ async def async_read_file(path: Path) -> bytes:
 async def async_write_file(path: Path, data: bytes) -> None:
     async with aiofiles.open(path, mode="wb") as f:
         await f.write(data)
+
+
+def write_file_atomically(path: Path, data: bytes) -> None:
+    # 同じディレクトリの一時ファイルに書いてから置き換えるので、書き込み途中で落ちても元のファイルは壊れない
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
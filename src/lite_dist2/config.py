@@ -3,6 +3,7 @@ from __future__ import annotations
 import json
 import logging
 from pathlib import Path
+from typing import Literal
 
 from pydantic import BaseModel, Field
 
@@ -40,6 +41,21 @@ class TableConfig(BaseModel):
         description="Interval of time to save curriculum json file",
         ge=1,
     )
+    compression_minimum_size: int = Field(
+        default=1024,
+        description="Response bodies smaller than this (in bytes) are not compressed.",
+        ge=0,
+    )
+    max_decompressed_size: int = Field(
+        default=1 << 28,
+        description="Compressed request bodies that expand beyond this (in bytes) are rejected with 413.",
+        ge=1,
+    )
+    use_journal: bool = Field(
+        default=True,
+        description="Record every change of the curriculum in a journal next to the curriculum json file and replay "
+        "it at startup, so that changes after the last save are not lost",
+    )
 
     @staticmethod
     def load_from_file(path: Path | None) -> TableConfig:
@@ -67,10 +83,26 @@ class WorkerConfig(BaseModel):
         default=1,
         description="The size of the chunks to be passed to each process.",
     )
+    vector_chunk_size: int | None = Field(
+        default=None,
+        description=(
+            "The number of grid points passed at once to `VectorizedTrialRunner.batch_array_func`. "
+            "If `None`, pass the whole trial at once."
+        ),
+        ge=1,
+    )
     max_size: int = Field(
         default=1,
         description="The maximum size of a trial.",
     )
+    target_trial_duration_seconds: float | None = Field(
+        default=None,
+        description=(
+            "If set, the table node sizes each trial so that it takes about this time on this worker node, "
+            "based on the measured velocity. `max_size` is still the upper limit."
+        ),
+        gt=0,
+    )
     disable_function_progress_bar: bool = Field(
         default=False,
         description="Whether to disable progress bar.",
@@ -89,6 +121,59 @@ class WorkerConfig(BaseModel):
         description="Timeout for requests to table nodes.",
         ge=1,
     )
+    pipelined: bool = Field(
+        default=False,
+        description=(
+            "Whether to reserve the next trials and register the results in the background "
+            "while computing a trial in another thread."
+        ),
+    )
+    prefetch_trial_num: int = Field(
+        default=1,
+        description="The maximum number of trials reserved ahead on `pipelined` mode.",
+        ge=0,
+    )
+    trial_timeout_seconds: int | None = Field(
+        default=None,
+        description=(
+            "`TableConfig.trial_timeout_seconds` of the table node. On `pipelined` mode, "
+            "prefetching is limited so that the reserved trials are not timed out."
+        ),
+        ge=1,
+    )
+    table_node_connection_pool_size: int = Field(
+        default=4,
+        description="The maximum number of connections kept to the table node.",
+        ge=1,
+    )
+    table_node_keepalive_expiry_seconds: float = Field(
+        default=30,
+        description="Time to keep an idle connection to the table node alive.",
+        ge=0,
+    )
+    use_http2: bool = Field(
+        default=False,
+        description="Whether to use HTTP/2 for requests to the table node. Requires `pip install lite-dist2[http2]`.",
+    )
+    request_compression: Literal["gzip", "zstd"] | None = Field(
+        default="gzip",
+        description=(
+            "Encoding to compress request bodies to the table node. Used only when the table node accepts it. "
+            '`"zstd"` requires `pip install lite-dist2[zstd]`. If `None`, request bodies are not compressed.'
+        ),
+    )
+    request_compression_minimum_size: int = Field(
+        default=1024,
+        description="Request bodies smaller than this (in bytes) are not compressed.",
+        ge=0,
+    )
+    wire_format: Literal["json", "msgpack"] = Field(
+        default="json",
+        description=(
+            'Format of request and response bodies between the table node. `"msgpack"` sends the result columns '
+            "as binary and requires `pip install lite-dist2[msgpack]` on both nodes."
+        ),
+    )
 
 
 class TableConfigProvider:
@@ -1,19 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import logging
-import threading
 import time
 from datetime import timedelta
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, NamedTuple, assert_never
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
-from lite_dist2.common import async_read_file, async_write_file, publish_timestamp
+from lite_dist2.common import async_read_file, publish_timestamp, write_file_atomically
 from lite_dist2.config import TableConfigProvider
+from lite_dist2.curriculum_models.curriculum_journal import (
+    CurriculumJournal,
+    StudyCancelledEvent,
+    StudyDoneEvent,
+    StudyRegisteredEvent,
+    TrialRegisteredEvent,
+    TrialReservedEvent,
+    TrialsTimedOutEvent,
+    list_segments,
+    read_entries,
+    wait_committed,
+)
 from lite_dist2.curriculum_models.progress_summary import ReportMaterial, report_study_progress
+from lite_dist2.curriculum_models.read_write_lock import AsyncReadWriteLock
 from lite_dist2.curriculum_models.study import Study
 from lite_dist2.curriculum_models.study_portables import StudyModel, StudyStorage, StudySummary
+from lite_dist2.curriculum_models.study_scheduler import StudyScheduler
 from lite_dist2.curriculum_models.study_status import StudyStatus
 from lite_dist2.expections import LD2ParameterError
 from lite_dist2.table_node_api.table_response import ProgressSummaryResponse
@@ -21,6 +36,9 @@ from lite_dist2.table_node_api.table_response import ProgressSummaryResponse
 if TYPE_CHECKING:
     import pathlib
 
+    from lite_dist2.curriculum_models.curriculum_journal import JournalEvent
+    from lite_dist2.curriculum_models.trial import Trial
+
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,63 +48,170 @@ class CurriculumModel(BaseModel):
     studies: list[StudyModel]
     storages: list[StudyStorage]
     trial_file_dir: Path
+    # この snapshot に含まれている journal の最後の seq
+    journal_seq: int = 0
+
+
+class _StudySnapshot(NamedTuple):
+    study_id: str
+    revision: int
+    # None のときは前回保存した json を使い回す
+    model: StudyModel | None
+
+
+class _CurriculumSnapshot(NamedTuple):
+    studies: list[_StudySnapshot]
+    storages: list[StudyStorage]
+    trial_file_dir: Path
+    journal_seq: int
+    # 保存後に消してよい journal の segment はこれより前
+    journal_segment_index: int | None
+
+
+_PATH_ADAPTER = TypeAdapter(Path)
 
 
 class Curriculum:
-    def __init__(self, studies: list[Study], storages: list[StudyStorage], trial_file_dir: Path) -> None:
+    """
+    `studies` and `storages` are guarded by a read-write lock, and the trial table of each study by its own lock,
+    so that trials of different studies are reserved and registered concurrently.
+    Neither lock is held while reading or writing files.
+    If `journal` is set, every change is recorded in it before the method returns.
+    Trials are reserved from the studies in the order given by `StudyScheduler`.
+    """
+
+    def __init__(
+        self,
+        studies: list[Study],
+        storages: list[StudyStorage],
+        trial_file_dir: Path,
+        journal: CurriculumJournal | None = None,
+    ) -> None:
         self.studies = studies
         self.storages = storages
         self.trial_file_dir = trial_file_dir
-        self._lock = threading.Lock()
-
-    def get_available_study(self, retaining_capacity: set[str]) -> Study | None:
-        with self._lock:
-            for study in self.studies:
-                if study.status == StudyStatus.running and study.required_capacity.issubset(retaining_capacity):
-                    return study
-            for study in self.studies:
-                if study.status == StudyStatus.wait and study.required_capacity.issubset(retaining_capacity):
-                    return study
-        return None
-
-    def find_study_by_id(self, study_id: str) -> Study | None:
-        with self._lock:
+        self.journal: CurriculumJournal | None = None
+        self._attach_journal(journal)
+        # 同期的にしか触らないので、studies の lock の外で更新してよい
+        self._scheduler = StudyScheduler(studies)
+        self._lock = AsyncReadWriteLock()
+        # 保存同士は順番に行い、古い snapshot で新しいファイルを上書きしないようにする
+        self._save_lock = asyncio.Lock()
+        # study_id -> (revision, json)
+        self._study_json_cache: dict[str, tuple[int, bytes]] = {}
+
+    async def get_available_study(self, retaining_capacity: set[str]) -> Study | None:
+        async with self._lock.read():
+            selected = self._scheduler.select(retaining_capacity)
+        return None if selected is None else selected[0]
+
+    async def get_available_studies(self, retaining_capacity: set[str]) -> list[Study]:
+        # 次に選ばれる順に並べる。優先度と予約の少なさが同じなら running の study、登録順の順
+        async with self._lock.read():
+            return self._scheduler.ordered(retaining_capacity)
+
+    async def reserve_trials(
+        self,
+        retaining_capacity: set[str],
+        trial_num: int,
+        max_size: int,
+        *,
+        worker_node_name: str | None,
+        worker_node_id: str,
+        target_duration_seconds: float | None = None,
+    ) -> list[Trial]:
+        # 同じ優先度の study が他にあれば、その番になるまでの数だけ予約して選び直す
+        trials: list[Trial] = []
+        while len(trials) < trial_num:
+            async with self._lock.read():
+                selected = self._scheduler.select(retaining_capacity)
+            if selected is None:
+                break
+            study, share = selected
+            remaining = trial_num - len(trials)
+            reserved = await study.suggest_next_trials(
+                remaining if share is None else min(share, remaining),
+                max_size,
+                worker_node_name,
+                worker_node_id,
+                target_duration_seconds,
+            )
+            if not reserved:
+                # 払い出せる範囲が残っていない。タイムアウトで範囲が戻るまでは選ばない
+                self._scheduler.park(study.study_id)
+                continue
+            self._scheduler.charge(study.study_id, len(reserved))
+            trials.extend(reserved)
+        return trials
+
+    async def find_study_by_id(self, study_id: str) -> Study | None:
+        async with self._lock.read():
             for study in self.studies:
                 if study.study_id == study_id:
                     return study
         return None
 
-    def try_insert_study(self, study: Study) -> bool:
-        with self._lock:
+    async def find_study(self, study_id: str | None, name: str | None) -> Study | None:
+        if study_id is not None:
+            return await self.find_study_by_id(study_id)
+
+        if name is not None:
+            async with self._lock.read():
+                for study in self.studies:
+                    if study.name == name:
+                        return study
+            return None
+        p = "study_id, name"
+        e = "Both are None"
+        raise LD2ParameterError(p, e)
+
+    async def try_insert_study(self, study: Study) -> bool:
+        async with self._lock.write():
             study_names = {st.name for st in self.studies if st.name is not None}
             storage_names = {st.name for st in self.storages if st.name is not None}
             if study.name is not None and (study.name in study_names or study.name in storage_names):
                 return False
 
             self.studies.append(study)
+            self._scheduler.add(study)
+            study.journal = self.journal
+            committed = self._record(StudyRegisteredEvent(study=study.to_model()))
+        await wait_committed(committed)
         return True
 
     async def to_storage_if_done(self) -> None:
-        updated = False
-        with self._lock:
-            studies = []
-            for study in self.studies:
-                if not await self._move_to_storage_if_done(study):
-                    studies.append(study)
-                    updated = True
-
-            self.studies = studies
-            if updated:
-                await self.save()
-
-    async def _move_to_storage_if_done(self, study: Study) -> bool:
-        await study.update_status()
-        if await study.is_done():
-            self.storages.append(await study.to_storage())
-            return True
-        return False
-
-    def pop_storage(self, study_id: str | None, name: str | None) -> StudyStorage | None:
+        async with self._lock.read():
+            studies = list(self.studies)
+
+        # 結果の書き出しは lock の外で行う
+        new_storages = [storage for study in studies if (storage := await study.finish_if_done()) is not None]
+        if not new_storages:
+            return
+
+        done_ids = {storage.study_id for storage in new_storages}
+        async with self._lock.write():
+            self.studies = [study for study in self.studies if study.study_id not in done_ids]
+            for study_id in done_ids:
+                self._scheduler.remove(study_id)
+            self.storages.extend(new_storages)
+            committed = [self._record(StudyDoneEvent(storage=storage)) for storage in new_storages]
+        await wait_committed(*committed)
+        await self.save()
+
+    async def pop_storage(self, study_id: str | None, name: str | None) -> StudyStorage | None:
+        async with self._lock.write():
+            storage = self._pop_storage(study_id, name)
+            committed = None if storage is None else self._record(StudyCancelledEvent(study_id=storage.study_id))
+        await wait_committed(committed)
+        if storage is None:
+            return None
+
+        # curriculum から外すと誰もファイルを消さなくなるので、結果を読み込んでから消す
+        await storage.load_results()
+        await storage.delete_files()
+        return storage
+
+    def _pop_storage(self, study_id: str | None, name: str | None) -> StudyStorage | None:
         storages = []
         target = None
         if study_id is not None:
@@ -110,7 +235,11 @@ class Curriculum:
         e = "Both are None"
         raise LD2ParameterError(p, e)
 
-    def get_storage(self, study_id: str | None, name: str | None) -> StudyStorage | None:
+    async def get_storage(self, study_id: str | None, name: str | None) -> StudyStorage | None:
+        async with self._lock.read():
+            return self._get_storage(study_id, name)
+
+    def _get_storage(self, study_id: str | None, name: str | None) -> StudyStorage | None:
         if study_id is not None:
             for storage in self.storages:
                 if storage.study_id == study_id:
@@ -126,22 +255,24 @@ class Curriculum:
         e = "Both are None"
         raise LD2ParameterError(p, e)
 
-    def get_study_status(self, study_id: str | None, name: str | None) -> StudyStatus:
+    async def get_study_status(self, study_id: str | None, name: str | None) -> StudyStatus:
         if study_id is not None:
-            return self._get_study_status_by_id(study_id)
+            async with self._lock.read():
+                return self._get_study_status_by_id(study_id)
 
         if name is not None:
-            return self._get_study_status_by_name(name)
+            async with self._lock.read():
+                return self._get_study_status_by_name(name)
 
         p = "study_id, name"
         e = "Both are None"
         raise LD2ParameterError(p, e)
 
-    def report_progress(self, cutoff_sec: int) -> ProgressSummaryResponse:
+    async def report_progress(self, cutoff_sec: int) -> ProgressSummaryResponse:
         now = publish_timestamp()
         cutoff_datetime = now - timedelta(seconds=cutoff_sec)
 
-        with self._lock:
+        async with self._lock.read():
             report_materials = [
                 ReportMaterial(
                     study_id=study.study_id,
@@ -176,11 +307,17 @@ class Curriculum:
                 return StudyStatus.done
         return StudyStatus.not_found
 
-    def check_timeout_trial(self) -> None:
+    async def check_timeout_trial(self) -> None:
         removed_ids = []
         timeout_seconds = TableConfigProvider.get().trial_timeout_seconds
-        for study in self.studies:
-            removed_ids.extend(study.check_timeout_trial(publish_timestamp(), timeout_seconds))
+        async with self._lock.read():
+            studies = list(self.studies)
+        for study in studies:
+            outdated_ids = await study.check_timeout_trial(publish_timestamp(), timeout_seconds)
+            if outdated_ids:
+                # 戻ってきた範囲をまた払い出せる
+                self._scheduler.unpark(study.study_id)
+            removed_ids.extend(outdated_ids)
         if len(removed_ids) > 0:
             logger.info("Outdated trials: %s", ", ".join(removed_ids))
         else:
@@ -193,8 +330,9 @@ class Curriculum:
             trial_file_dir=self.trial_file_dir,
         )
 
-    def to_summaries(self) -> list[StudySummary]:
-        return [storage.to_summary() for storage in self.storages] + [study.to_summary() for study in self.studies]
+    async def to_summaries(self) -> list[StudySummary]:
+        async with self._lock.read():
+            return [storage.to_summary() for storage in self.storages] + [study.to_summary() for study in self.studies]
 
     @staticmethod
     def from_model(model: CurriculumModel) -> Curriculum:
@@ -209,52 +347,166 @@ class Curriculum:
         if curr_json_path is None:
             curr_json_path = TableConfigProvider.get().curriculum_path
 
-        model = self.to_model()
-        await async_write_file(curr_json_path, model.model_dump_json().encode("utf-8"))
+        async with self._save_lock:
+            # lock の中では変更のあった study の model を作るだけにして、json への変換と書き込みは別スレッドで行う
+            async with self._lock.read(), contextlib.AsyncExitStack() as stack:
+                # done でも結果の保存が終わっていない trial を含めると、落ちたときにその範囲が計算されないまま失われる
+                for study in self.studies:
+                    await stack.enter_async_context(study.settled())
+                snapshot = self._take_snapshot(curr_json_path)
+            data = await asyncio.to_thread(self._dump_snapshot, snapshot)
+            await asyncio.to_thread(write_file_atomically, curr_json_path, data)
+            if self.journal is not None and snapshot.journal_segment_index is not None:
+                await self.journal.remove_segments_before(snapshot.journal_segment_index)
         save_end_time = time.perf_counter()
-        logger.info("Saved curriculum in %.3f msec", (save_end_time - save_start_time) * 1000)
+        logger.info(
+            "Saved curriculum in %.3f msec (%d of %d studies serialized)",
+            (save_end_time - save_start_time) * 1000,
+            sum(study.model is not None for study in snapshot.studies),
+            len(snapshot.studies),
+        )
+
+    def _take_snapshot(self, curr_json_path: pathlib.Path) -> _CurriculumSnapshot:
+        journal_seq = 0
+        journal_segment_index = None
+        if self.journal is not None and self.journal.curriculum_path == curr_json_path:
+            # 以降の event は新しい segment に書かれ、この snapshot の後に再生される
+            journal_seq = self.journal.last_seq
+            journal_segment_index = self.journal.rotate()
 
-    async def cancel_study(self, study_id: str | None, name: str | None) -> bool:
         studies = []
-        found = False
-        if study_id is not None:
-            with self._lock:
-                for study in self.studies:
-                    if study.study_id == study_id:
-                        found = True
-                        await study.delete_trial_jsons()
-                        continue
-                    studies.append(study)
-                self.studies = studies
-            return found
+        for study in self.studies:
+            cached = self._study_json_cache.get(study.study_id)
+            is_unchanged = cached is not None and cached[0] == study.revision
+            studies.append(_StudySnapshot(study.study_id, study.revision, None if is_unchanged else study.to_model()))
+        return _CurriculumSnapshot(
+            studies,
+            list(self.storages),
+            self.trial_file_dir,
+            journal_seq,
+            journal_segment_index,
+        )
 
-        if name is not None:
-            with self._lock:
+    def _dump_snapshot(self, snapshot: _CurriculumSnapshot) -> bytes:
+        # `CurriculumModel.model_dump_json()` と同じ内容を study ごとの json から組み立てる
+        cache = {}
+        study_jsons = []
+        for study in snapshot.studies:
+            if study.model is None:
+                study_json = self._study_json_cache[study.study_id][1]
+            else:
+                study_json = study.model.model_dump_json().encode("utf-8")
+            cache[study.study_id] = (study.revision, study_json)
+            study_jsons.append(study_json)
+        self._study_json_cache = cache
+
+        storage_jsons = [storage.model_dump_json().encode("utf-8") for storage in snapshot.storages]
+        return b"".join(
+            (
+                b'{"studies":[',
+                b",".join(study_jsons),
+                b'],"storages":[',
+                b",".join(storage_jsons),
+                b'],"trial_file_dir":',
+                _PATH_ADAPTER.dump_json(snapshot.trial_file_dir),
+                b',"journal_seq":',
+                str(snapshot.journal_seq).encode("utf-8"),
+                b"}",
+            ),
+        )
+
+    async def cancel_study(self, study_id: str | None, name: str | None) -> bool:
+        if study_id is None and name is None:
+            p = "study_id, name"
+            e = "Both are None"
+            raise LD2ParameterError(p, e)
+
+        async with self._lock.write():
+            if study_id is not None:
+                cancelled = [study for study in self.studies if study.study_id == study_id]
+                dropped = [storage for storage in self.storages if storage.study_id == study_id]
+                self.storages = [storage for storage in self.storages if storage.study_id != study_id]
+            else:
+                cancelled = [study for study in self.studies if study.name == name]
+                dropped = [storage for storage in self.storages if storage.name == name]
+                self.storages = [storage for storage in self.storages if storage.name != name]
+            self.studies = [study for study in self.studies if study not in cancelled]
+            for study in cancelled:
+                self._scheduler.remove(study.study_id)
+            cancelled_ids = [study.study_id for study in cancelled] + [storage.study_id for storage in dropped]
+            committed = [self._record(StudyCancelledEvent(study_id=cancelled_id)) for cancelled_id in cancelled_ids]
+        await wait_committed(*committed)
+
+        # 一覧から外した後なので、削除中の study に trial が払い出されることはない
+        for study in cancelled:
+            await study.delete_trial_jsons()
+        # 終わった study は結果のファイルも消す
+        for storage in dropped:
+            await storage.delete_files()
+        return len(cancelled_ids) > 0
+
+    def _attach_journal(self, journal: CurriculumJournal | None) -> None:
+        self.journal = journal
+        for study in self.studies:
+            study.journal = journal
+
+    def _record(self, event: JournalEvent) -> asyncio.Future[None] | None:
+        return None if self.journal is None else self.journal.record(event)
+
+    def _replay(self, event: JournalEvent) -> None:
+        match event:
+            case StudyRegisteredEvent():
+                study = Study.from_model(event.study)
+                self.studies.append(study)
+                self._scheduler.add(study)
+            case TrialReservedEvent() | TrialRegisteredEvent() | TrialsTimedOutEvent():
                 for study in self.studies:
-                    if study.name == name:
-                        found = True
-                        await study.delete_trial_jsons()
-                        continue
-                    studies.append(study)
-                self.studies = studies
-            return found
-        p = "study_id, name"
-        e = "Both are None"
-        raise LD2ParameterError(p, e)
+                    if study.study_id == event.study_id:
+                        study.replay(event)
+                        return
+                logger.warning("Skipped journal event of unknown study: %s", event.study_id)
+            case StudyDoneEvent():
+                self.studies = [study for study in self.studies if study.study_id != event.storage.study_id]
+                self._scheduler.remove(event.storage.study_id)
+                if all(storage.study_id != event.storage.study_id for storage in self.storages):
+                    self.storages.append(event.storage)
+            case StudyCancelledEvent():
+                # 終わった study が取り消されたときは結果を外す
+                self.studies = [study for study in self.studies if study.study_id != event.study_id]
+                self.storages = [storage for storage in self.storages if storage.study_id != event.study_id]
+                self._scheduler.remove(event.study_id)
+            case _ as unreachable:
+                assert_never(unreachable)
 
     @staticmethod
-    async def load_or_create(curr_json_path: pathlib.Path | None = None) -> Curriculum:
+    async def load_or_create(curr_json_path: pathlib.Path | None = None, use_journal: bool = False) -> Curriculum:
         load_start_time = time.perf_counter()
         if curr_json_path is None:
             curr_json_path = TableConfigProvider.get().curriculum_path
 
+        journal_seq = 0
         if curr_json_path.exists():
             curr_bin = await async_read_file(curr_json_path)
             model = CurriculumModel.model_validate_json(curr_bin)
-            return Curriculum.from_model(model)
+            curriculum = Curriculum.from_model(model)
+            journal_seq = model.journal_seq
+        else:
+            curriculum = Curriculum([], [], TableConfigProvider.get().trial_file_dir)
+
+        if use_journal:
+            # snapshot より後の event を再生してから journal を付ける
+            replayed_num = 0
+            for entry in read_entries(curr_json_path, journal_seq):
+                curriculum._replay(entry.event)
+                journal_seq = entry.seq
+                replayed_num += 1
+            segments = list_segments(curr_json_path)
+            next_segment_index = segments[-1][0] + 1 if segments else 0
+            curriculum._attach_journal(CurriculumJournal(curr_json_path, journal_seq, next_segment_index))
+            logger.info("Replayed %d journal events", replayed_num)
         load_end_time = time.perf_counter()
         logger.info("Loaded curriculum in %.3f msec", (load_end_time - load_start_time) * 1000)
-        return Curriculum([], [], TableConfigProvider.get().trial_file_dir)
+        return curriculum
 
 
 class CurriculumProvider:
@@ -264,7 +516,7 @@ class CurriculumProvider:
     async def get(cls) -> Curriculum:
         if cls._CURR is not None:
             return cls._CURR
-        cls._CURR = await Curriculum.load_or_create()
+        cls._CURR = await Curriculum.load_or_create(use_journal=TableConfigProvider.get().use_journal)
         return cls._CURR
 
     @classmethod
@@ -274,7 +526,7 @@ class CurriculumProvider:
         await cls._CURR.save()
 
     @classmethod
-    def check_timeout(cls) -> None:
+    async def check_timeout(cls) -> None:
         if cls._CURR is None:
             return
-        cls._CURR.check_timeout_trial()
+        await cls._CURR.check_timeout_trial()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime
+from typing import TYPE_CHECKING, Annotated, Literal
+
+from pydantic import BaseModel, Field, ValidationError
+
+from lite_dist2.curriculum_models.study_portables import StudyModel, StudyStorage
+from lite_dist2.curriculum_models.trial import TrialModel
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StudyRegisteredEvent(BaseModel):
+    type: Literal["study_registered"] = "study_registered"
+    study: StudyModel
+
+
+class TrialReservedEvent(BaseModel):
+    type: Literal["trial_reserved"] = "trial_reserved"
+    study_id: str
+    trial: TrialModel
+
+
+class TrialRegisteredEvent(BaseModel):
+    type: Literal["trial_registered"] = "trial_registered"
+    study_id: str
+    trial_id: str
+    worker_node_id: str
+    registered_timestamp: datetime
+
+
+class TrialsTimedOutEvent(BaseModel):
+    type: Literal["trials_timed_out"] = "trials_timed_out"
+    study_id: str
+    trial_ids: list[str]
+
+
+class StudyDoneEvent(BaseModel):
+    type: Literal["study_done"] = "study_done"
+    storage: StudyStorage
+
+
+class StudyCancelledEvent(BaseModel):
+    type: Literal["study_cancelled"] = "study_cancelled"
+    study_id: str
+
+
+type JournalEvent = Annotated[
+    StudyRegisteredEvent
+    | TrialReservedEvent
+    | TrialRegisteredEvent
+    | TrialsTimedOutEvent
+    | StudyDoneEvent
+    | StudyCancelledEvent,
+    Field(discriminator="type"),
+]
+
+
+class JournalEntry(BaseModel):
+    seq: int
+    event: JournalEvent
+
+
+class CurriculumJournal:
+    """
+    Append-only journal of the curriculum events written next to the curriculum json.
+    Events recorded while the previous batch is being written are written and fsynced together as the next batch.
+    Each snapshot of the curriculum starts a new segment, and the segments covered by the saved snapshot are removed.
+    """
+
+    def __init__(self, curriculum_path: Path, last_seq: int = 0, segment_index: int = 0) -> None:
+        self.curriculum_path = curriculum_path
+        self.last_seq = last_seq
+        self._segment_index = segment_index
+        self._pending: list[tuple[int, bytes, asyncio.Future[None]]] = []
+        self._flusher: asyncio.Task[None] | None = None
+
+    def record(self, event: JournalEvent) -> asyncio.Future[None]:
+        # 状態を変えたのと同じ同期処理の中で呼び、順番を保つ。返り値はディスクに書かれると完了する
+        self.last_seq += 1
+        line = JournalEntry(seq=self.last_seq, event=event).model_dump_json().encode("utf-8") + b"\n"
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((self._segment_index, line, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+        return future
+
+    def rotate(self) -> int:
+        # 以降の event は新しい segment に書く。返り値の segment より前は snapshot を保存すれば不要になる
+        self._segment_index += 1
+        return self._segment_index
+
+    async def flush(self) -> None:
+        while self._flusher is not None and not self._flusher.done():
+            await asyncio.shield(self._flusher)
+
+    async def remove_segments_before(self, segment_index: int) -> None:
+        # 書き込み中の event があると segment が作り直されるので、先に書き終える
+        await self.flush()
+        for index, path in list_segments(self.curriculum_path):
+            if index < segment_index:
+                await asyncio.to_thread(path.unlink, missing_ok=True)
+
+    async def _flush_loop(self) -> None:
+        while self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except OSError as e:
+                logger.exception("Failed to write the curriculum journal")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    def _write_batch(self, batch: list[tuple[int, bytes, asyncio.Future[None]]]) -> None:
+        lines_by_segment: dict[int, list[bytes]] = {}
+        for segment_index, line, _ in batch:
+            lines_by_segment.setdefault(segment_index, []).append(line)
+        for segment_index, lines in lines_by_segment.items():
+            with segment_path(self.curriculum_path, segment_index).open("ab") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def segment_path(curriculum_path: Path, segment_index: int) -> Path:
+    return curriculum_path.with_name(f"{curriculum_path.stem}.journal.{segment_index:08d}.jsonl")
+
+
+def list_segments(curriculum_path: Path) -> list[tuple[int, Path]]:
+    pattern = re.compile(rf"{re.escape(curriculum_path.stem)}\.journal\.(\d+)\.jsonl")
+    paths = curriculum_path.parent.glob(f"{curriculum_path.stem}.journal.*.jsonl")
+    matches = [(pattern.fullmatch(path.name), path) for path in paths]
+    return sorted((int(matched.group(1)), path) for matched, path in matches if matched is not None)
+
+
+def read_entries(curriculum_path: Path, after_seq: int) -> Iterator[JournalEntry]:
+    for _, path in list_segments(curriculum_path):
+        with path.open("rb") as f:
+            for line in f:
+                try:
+                    entry = JournalEntry.model_validate_json(line)
+                except ValidationError:
+                    # 書き込み途中で落ちた行。同じ segment の以降の行は信用しない
+                    logger.warning("Skipped broken journal entries in %s", path)
+                    break
+                if entry.seq > after_seq:
+                    yield entry
+
+
+async def wait_committed(*futures: asyncio.Future[None] | None) -> None:
+    await asyncio.gather(*(future for future in futures if future is not None))
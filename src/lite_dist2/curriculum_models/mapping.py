@@ -1,15 +1,28 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import json
+import os
+from typing import TYPE_CHECKING, Any, Self, assert_never
 
+import aiofiles
+import aiofiles.os
 from pydantic import BaseModel
 
+from lite_dist2.common import numerize_column
+from lite_dist2.expections import LD2ParameterError
 from lite_dist2.type_definitions import PortableValueType
-from lite_dist2.value_models.point import ParamType, ResultType
+from lite_dist2.value_models.point import ParamType, ResultType, ScalarValue, VectorValue
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Iterable, Sequence
+    from pathlib import Path
+    from types import TracebackType
     from typing import Literal
 
+    from aiofiles.threadpool.binary import AsyncBufferedIOBase, AsyncBufferedReader
+
+    from lite_dist2.type_definitions import PrimitiveValueType
+
 
 class Mapping(BaseModel):
     params: ParamType
@@ -21,6 +34,73 @@ class Mapping(BaseModel):
         return tuple(values)
 
 
+def build_mappings(
+    param_columns: Sequence[tuple[str | None, Literal["bool", "int", "float"], Sequence[PortableValueType]]],
+    result_type: Literal["scalar", "vector"],
+    result_value_type: Literal["bool", "int", "float"],
+    result_name: str | None,
+    results: Sequence[PortableValueType] | Sequence[Sequence[PortableValueType]],
+) -> list[Mapping]:
+    """
+    Build mappings from columns of portable values in one pass.
+    `param_columns` is a list of (name, value_type, values) per axis, and `results` has one value
+    (scalar) or one list of values (vector) per row. The values must already be portable, as they are not validated.
+    """
+    # 列は portablize 済みの値なので、点ごとに validate せず model_construct で組み立てる
+    param_values = [
+        [ScalarValue.model_construct(type="scalar", value_type=value_type, value=v, name=name) for v in values]
+        for name, value_type, values in param_columns
+    ]
+    match result_type:
+        case "scalar":
+            result_values: list[ResultType] = [
+                ScalarValue.model_construct(type="scalar", value_type=result_value_type, value=v, name=result_name)
+                for v in results
+            ]
+        case "vector":
+            result_values = [
+                VectorValue.model_construct(
+                    type="vector",
+                    value_type=result_value_type,
+                    values=list(v),
+                    name=result_name,
+                )
+                for v in results
+            ]
+        case _ as unreachable:
+            assert_never(unreachable)
+    return [
+        Mapping.model_construct(params=tuple(params), result=result)
+        for *params, result in zip(*param_values, result_values, strict=True)
+    ]
+
+
+def split_mappings(
+    mappings: Sequence[Mapping],
+) -> tuple[list[list[PrimitiveValueType]], list[list[PrimitiveValueType]]]:
+    """
+    Inverse of `build_mappings`. Return the numerized values as (param columns, result columns).
+    A scalar result gives one result column, and a vector result gives one column per element.
+    """
+    if not mappings:
+        return [], []
+    first = mappings[0]
+    param_size = len(first.params)
+    result_size = first.result.get_value_size()
+
+    param_rows = [mapping.params for mapping in mappings]
+    result_rows = [mapping.result.get_value_list() for mapping in mappings]
+    if any(len(row) != param_size for row in param_rows) or any(len(row) != result_size for row in result_rows):
+        p = "mappings"
+        t = "All mappings must have the same number of params and result values"
+        raise LD2ParameterError(p, t)
+    param_columns = [
+        numerize_column(param.value_type, [row[i].value for row in param_rows]) for i, param in enumerate(first.params)
+    ]
+    result_columns = [numerize_column(first.result.value_type, values) for values in zip(*result_rows, strict=True)]
+    return param_columns, result_columns
+
+
 class MappingsStorage(BaseModel):
     params_info: ParamType
     result_info: ResultType
@@ -40,3 +120,123 @@ class MappingsStorage(BaseModel):
         types: list[Literal["bool", "int", "float"]] = [param.value_type for param in self.params_info]
         types.extend(self.result_info.get_value_types())
         return tuple(types)
+
+
+class MappingsStorageWriter:
+    """
+    Write a `MappingsStorage` json file row by row, so that `values` is never held in memory as a whole.
+    The written file can be read by `MappingsStorage.model_validate_json`.
+    """
+
+    def __init__(self, path: Path, params_info: ParamType, result_info: ResultType, buffer_size: int = 4096) -> None:
+        self.path = path
+        self.params_info = params_info
+        self.result_info = result_info
+        self.buffer_size = buffer_size
+        self._buffer: list[str] = []
+        self._row_count = 0
+        self._file: AsyncBufferedIOBase | None = None
+
+    async def __aenter__(self) -> Self:
+        self._file = await aiofiles.open(self.path, mode="wb")
+        await self._file.write(self._header())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        if self._file is None:
+            return
+        if exc_type is None:
+            await self._flush()
+            await self._file.write(b"]}")
+        await self._file.close()
+        self._file = None
+        if exc_type is not None:
+            # 書きかけのファイルは壊れた json なので残さない
+            await aiofiles.os.remove(self.path)
+
+    async def write(self, values: Iterable[tuple[PortableValueType, ...]]) -> None:
+        for row in values:
+            self._buffer.append(json.dumps(row, separators=(",", ":")))
+            if len(self._buffer) >= self.buffer_size:
+                await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._buffer or self._file is None:
+            return
+        chunk = ",".join(self._buffer)
+        if self._row_count > 0:
+            chunk = "," + chunk
+        await self._file.write(chunk.encode("utf-8"))
+        self._row_count += len(self._buffer)
+        self._buffer = []
+
+    def _header(self) -> bytes:
+        # `values` を空にした json の末尾 `]}` を外し、そこに行を書き足していく
+        empty = MappingsStorage(params_info=self.params_info, result_info=self.result_info, values=[])
+        return empty.model_dump_json().encode("utf-8").removesuffix(b"]}")
+
+
+class MappingsStorageReader:
+    """
+    Read a json file written by `MappingsStorageWriter` rows at a time, so that `values` is never held in memory as a
+    whole.
+    """
+
+    # params_info と result_info の dict は入れ子にならないので、この並びは `values` の直前で初めて現れる
+    _VALUES_PREFIX = b'},"values":['
+    _SUFFIX = b"]}"
+
+    def __init__(self, path: Path, chunk_size: int = 1 << 20) -> None:
+        self.path = path
+        self.chunk_size = chunk_size
+
+    async def read_info(self) -> tuple[list[Any], dict[str, Any], int]:
+        """
+        Return `params_info` and `result_info` as json data, and the number of rows.
+        """
+        async with aiofiles.open(self.path, mode="rb") as f:
+            info, start, end = await self._read_header(f)
+            # 行の中に配列は現れないので、`[` の数が行数になる
+            row_num = 0
+            async for chunk in self._iter_body(f, start, end):
+                row_num += chunk.count(b"[")
+        return info["params_info"], info["result_info"], row_num
+
+    async def iter_rows(self) -> AsyncGenerator[list[list[PortableValueType]]]:
+        async with aiofiles.open(self.path, mode="rb") as f:
+            _, start, end = await self._read_header(f)
+            rest = b""
+            async for chunk in self._iter_body(f, start, end):
+                data = rest + chunk
+                # 最後の `]` までが完結した行の並び
+                last = data.rfind(b"]")
+                if last < 0:
+                    rest = data
+                    continue
+                yield json.loads(b"[" + data[: last + 1].lstrip(b",") + b"]")
+                rest = data[last + 1 :]
+
+    async def _read_header(self, f: AsyncBufferedReader) -> tuple[dict[str, Any], int, int]:
+        data = b""
+        while (index := data.find(self._VALUES_PREFIX)) < 0:
+            chunk = await f.read(self.chunk_size)
+            if not chunk:
+                p = "path"
+                t = f"{self.path} is not written by MappingsStorageWriter"
+                raise LD2ParameterError(p, t)
+            data += chunk
+        info = json.loads(data[: index + 1] + b"}")
+        end = await f.seek(0, os.SEEK_END) - len(self._SUFFIX)
+        return info, index + len(self._VALUES_PREFIX), end
+
+    async def _iter_body(self, f: AsyncBufferedReader, start: int, end: int) -> AsyncGenerator[bytes]:
+        await f.seek(start)
+        remaining = end - start
+        while remaining > 0 and (chunk := await f.read(min(self.chunk_size, remaining))):
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+
+class AsyncReadWriteLock:
+    """
+    Lock shared by readers and held exclusively by a writer. A waiting writer goes ahead of new readers.
+    Like `asyncio.Lock`, it must be used in a single event loop.
+    """
+
+    def __init__(self) -> None:
+        self._condition = asyncio.Condition()
+        self._reader_num = 0
+        self._waiting_writer_num = 0
+        self._is_writing = False
+
+    @contextlib.asynccontextmanager
+    async def read(self) -> AsyncIterator[None]:
+        async with self._condition:
+            await self._condition.wait_for(self._can_read)
+            self._reader_num += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._reader_num -= 1
+                self._condition.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def write(self) -> AsyncIterator[None]:
+        async with self._condition:
+            self._waiting_writer_num += 1
+            try:
+                await self._condition.wait_for(self._can_write)
+            finally:
+                self._waiting_writer_num -= 1
+                # キャンセルされた writer を待っている reader を起こす
+                self._condition.notify_all()
+            self._is_writing = True
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._is_writing = False
+                self._condition.notify_all()
+
+    def _can_read(self) -> bool:
+        return not self._is_writing and self._waiting_writer_num == 0
+
+    def _can_write(self) -> bool:
+        return not self._is_writing and self._reader_num == 0
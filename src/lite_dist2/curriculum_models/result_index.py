@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from lite_dist2.curriculum_models.mapping import Mapping
+    from lite_dist2.type_definitions import PortableValueType
+    from lite_dist2.value_models.point import ResultType
+
+
+class ResultIndex:
+    """
+    Hash index from result values to their locations, i.e. `(trial_id, index of the mapping in the trial results)`.
+    """
+
+    def __init__(self) -> None:
+        self._locations: dict[tuple[PortableValueType, ...], list[tuple[str, int]]] = {}
+        self._trial_ids: set[str] = set()
+
+    def __len__(self) -> int:
+        return sum(len(locations) for locations in self._locations.values())
+
+    def has_trial(self, trial_id: str) -> bool:
+        return trial_id in self._trial_ids
+
+    def add(self, trial_id: str, mappings: Sequence[Mapping]) -> None:
+        # 同じ trial を 2 度登録しても重複させない
+        if trial_id in self._trial_ids:
+            return
+        self._trial_ids.add(trial_id)
+        for i, mapping in enumerate(mappings):
+            self._locations.setdefault(mapping.result.to_hash_key(), []).append((trial_id, i))
+
+    def lookup(self, value: ResultType) -> list[tuple[str, int]]:
+        return list(self._locations.get(value.to_hash_key(), []))
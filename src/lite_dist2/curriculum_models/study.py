@@ -1,25 +1,44 @@
 from __future__ import annotations
 
-import threading
+import asyncio
+import contextlib
+import copy
 from typing import TYPE_CHECKING, Literal, assert_never
 
-from lite_dist2.common import int2hex, publish_timestamp
+from lite_dist2.common import hex2int, int2hex, numerize, portablize, publish_timestamp
+from lite_dist2.curriculum_models.curriculum_journal import (
+    TrialRegisteredEvent,
+    TrialReservedEvent,
+    TrialsTimedOutEvent,
+    wait_committed,
+)
+from lite_dist2.curriculum_models.result_index import ResultIndex
 from lite_dist2.curriculum_models.study_portables import StudyModel, StudyStorage, StudySummary
 from lite_dist2.curriculum_models.study_status import StudyStatus
 from lite_dist2.curriculum_models.trial import Trial, TrialStatus
 from lite_dist2.curriculum_models.trial_table import TrialTable
+from lite_dist2.curriculum_models.worker_velocity import WorkerVelocityTracker
+from lite_dist2.expections import LD2ParameterError
 from lite_dist2.study_strategies.study_strategy_factory import create_study_strategy
-from lite_dist2.suggest_strategies import SequentialSuggestStrategy
+from lite_dist2.suggest_strategies import RandomSuggestStrategy, SequentialSuggestStrategy
 from lite_dist2.trial_repositories.trial_repository_factory import create_trial_repository
 from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.point import ScalarValue, VectorValue
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Iterable, Sequence
     from datetime import datetime
 
+    from lite_dist2.curriculum_models.curriculum_journal import CurriculumJournal, JournalEvent
+    from lite_dist2.curriculum_models.mapping import Mapping
+    from lite_dist2.curriculum_models.trial import TrialModel
+    from lite_dist2.curriculum_models.trial_result import TrialResultModel
     from lite_dist2.study_strategies import BaseStudyStrategy
     from lite_dist2.suggest_strategies import BaseSuggestStrategy, SuggestStrategyModel
     from lite_dist2.trial_repositories.base_trial_repository import BaseTrialRepository
+    from lite_dist2.type_definitions import PortableValueType
     from lite_dist2.value_models.const_param import ConstParam
+    from lite_dist2.value_models.point import ResultType
 
 
 class Study:
@@ -38,6 +57,9 @@ class Study:
         result_value_type: Literal["bool", "int", "float"],
         trial_table: TrialTable,
         trial_repository: BaseTrialRepository,
+        use_result_index: bool = False,
+        priority: int = 0,
+        weight: float = 1.0,
     ) -> None:
         self.study_id = study_id
         self.name = name or self.study_id
@@ -51,64 +73,345 @@ class Study:
         self.result_type = result_type
         self.result_value_type = result_value_type
         self.trial_table = trial_table
+        self.priority = priority
+        self.weight = weight
 
-        self._table_lock = threading.Lock()
+        # trial table の更新だけを守り、I/O の間は持たない
+        self._table_lock = asyncio.Lock()
+        # テーブルでは done だが、まだ保存中の trial の数
+        self._storing_trial_num = 0
+        # 保存中の trial が無いときに set されている
+        self._stored = asyncio.Event()
+        self._stored.set()
+        self._is_finished = False
+        # 保存する内容が変わるたびに増やす。curriculum の保存で変更の無い study の json を使い回すのに使う
+        self._revision = 0
+        # curriculum に登録されると設定される
+        self.journal: CurriculumJournal | None = None
+        self._next_trial_index = max(
+            self.trial_table.count_trial(),
+            self._find_next_trial_index(self.trial_table.iter_trial_ids()),
+        )
         self.trial_repo = trial_repository
 
+        self.result_index = ResultIndex() if use_result_index else None
+        # ディスクから復元した study は、保存済みの trial がまだ index に入っていない
+        # trial を 1 つも払い出していない新しい study には、読み込むものが無い
+        self._is_result_index_caught_up = self.trial_table.count_trial() == 0
+        self.worker_velocities = WorkerVelocityTracker()
+
+    @property
+    def revision(self) -> int:
+        return self._revision
+
     async def update_status(self) -> None:
         if await self.is_done():
             self.status = StudyStatus.done
+            self._revision += 1
             return
 
+    async def finish_if_done(self) -> StudyStorage | None:
+        # 同時に呼ばれても storage を作るのは 1 回だけ。I/O の間は lock を持たない
+        if self._is_finished or not await self.is_done():
+            return None
+        async with self._table_lock:
+            if self._is_finished:
+                return None
+            self._is_finished = True
+            self.status = StudyStatus.done
+            self._revision += 1
+        try:
+            return await self.to_storage()
+        except BaseException:
+            self._is_finished = False
+            raise
+
     async def is_done(self) -> bool:
+        if self._storing_trial_num > 0:
+            # 保存中の trial は結果の書き出しから漏れるので、保存が終わるまで done にしない
+            return False
         return await self.study_strategy.is_done(self.trial_table, self.parameter_space, self.trial_repo)
 
-    def suggest_next_trial(
+    async def suggest_next_trial(
         self,
         num: int,
         worker_node_name: str | None,
         worker_node_id: str,
+        target_duration_seconds: float | None = None,
     ) -> Trial | None:
-        with self._table_lock:
+        trials = await self.suggest_next_trials(1, num, worker_node_name, worker_node_id, target_duration_seconds)
+        return trials[0] if trials else None
+
+    async def suggest_next_trials(
+        self,
+        trial_num: int,
+        num: int,
+        worker_node_name: str | None,
+        worker_node_id: str,
+        target_duration_seconds: float | None = None,
+    ) -> list[Trial]:
+        if target_duration_seconds is not None:
+            num = self.worker_velocities.calc_trial_size(worker_node_id, target_duration_seconds, num)
+        trials = []
+        committed = []
+        async with self._table_lock:
             self.status = StudyStatus.running
+            self._revision += 1
+            for _ in range(trial_num):
+                parameter_sub_space = self.suggest_strategy.suggest(self.trial_table, num)
+                if parameter_sub_space is None:
+                    break
 
-            parameter_sub_space = self.suggest_strategy.suggest(self.trial_table, num)
-            if parameter_sub_space is None:
-                return None
+                trial = Trial(
+                    study_id=self.study_id,
+                    trial_id=self._publish_trial_id(),
+                    reserved_timestamp=publish_timestamp(),
+                    trial_status=TrialStatus.running,
+                    const_param=self.const_param,
+                    parameter_space=parameter_sub_space,
+                    result_type=self.result_type,
+                    result_value_type=self.result_value_type,
+                    worker_node_name=worker_node_name,
+                    worker_node_id=worker_node_id,
+                )
+                self.trial_table.register(trial)
+                # 同じ lock の中で続けて suggest するので、ここで初期化しておく
+                if self.trial_table.is_not_defined_aps():
+                    self.trial_table.init_aps(trial)
+                trials.append(trial)
+                committed.append(self._record(TrialReservedEvent(study_id=self.study_id, trial=trial.to_model())))
+        # journal に書かれるまで返さない
+        await wait_committed(*committed)
+        return trials
 
-            trial = Trial(
-                study_id=self.study_id,
-                trial_id=self._publish_trial_id(),
-                reserved_timestamp=publish_timestamp(),
-                trial_status=TrialStatus.running,
-                const_param=self.const_param,
-                parameter_space=parameter_sub_space,
-                result_type=self.result_type,
-                result_value_type=self.result_value_type,
-                worker_node_name=worker_node_name,
-                worker_node_id=worker_node_id,
-            )
-            self.trial_table.register(trial)
-        if self.trial_table.is_not_defined_aps():
-            self.trial_table.init_aps(trial)
+    async def receipt_trial(self, trial: Trial) -> None:
+        async with self._table_lock:
+            registered_timestamp = self.trial_table.receipt_trial_result(trial.trial_id, trial.worker_node_id)
+            self.trial_table.simplify_aps()
+            self._begin_storing(1)
+            self._revision += 1
+        try:
+            await self._store_receipted_trial(trial)
+            committed = self._record_registered(trial, registered_timestamp)
+        finally:
+            self._end_storing(1)
+            # study strategy も保存後に更新される
+            self._revision += 1
+        await wait_committed(committed)
+
+    async def receipt_result(self, result: TrialResultModel) -> None:
+        # パラメータはテーブルにある予約済みの trial から復元する
+        async with self._table_lock:
+            reserved_trial = self.trial_table.find_trial(result.trial_id)
+        await self.receipt_trial(self._create_done_trial(reserved_trial, result))
+
+    async def receipt_results(self, results: Sequence[TrialResultModel]) -> list[bool]:
+        # `receipt_result` の一括版。予約済みの trial が無いか、パラメータを復元できなかった結果は False を返す
+        reserved_trials: list[Trial | None] = []
+        async with self._table_lock:
+            for result in results:
+                try:
+                    reserved_trials.append(self.trial_table.find_trial(result.trial_id))
+                except LD2ParameterError:
+                    reserved_trials.append(None)
+
+        trials: list[Trial | None] = []
+        for reserved_trial, result in zip(reserved_trials, results, strict=True):
+            try:
+                trials.append(None if reserved_trial is None else self._create_done_trial(reserved_trial, result))
+            except LD2ParameterError:
+                trials.append(None)
+        accepted = iter(await self.receipt_trials([trial for trial in trials if trial is not None]))
+        return [trial is not None and next(accepted) for trial in trials]
+
+    @staticmethod
+    def _create_done_trial(reserved_trial: Trial, result: TrialResultModel) -> Trial:
+        # テーブルの trial は書き換えず、parameter_space は共有する
+        trial = copy.copy(reserved_trial)
+        trial.worker_node_id = result.worker_node_id
+        trial.compute_seconds = result.compute_seconds
+        trial.set_result(result.to_mappings(trial))
         return trial
 
-    async def receipt_trial(self, trial: Trial) -> None:
-        with self._table_lock:
-            self.trial_table.receipt_trial_result(trial.trial_id, trial.worker_node_id)
+    async def receipt_trials(self, trials: Sequence[Trial]) -> list[bool]:
+        # lock の取得と simplify_aps は study ごとに 1 回だけ行う。受け付けられなかった trial は False を返す
+        accepted = []
+        registered_timestamps: list[datetime | None] = []
+        async with self._table_lock:
+            for trial in trials:
+                try:
+                    registered_timestamp = self.trial_table.receipt_trial_result(trial.trial_id, trial.worker_node_id)
+                except LD2ParameterError:
+                    accepted.append(False)
+                    registered_timestamps.append(None)
+                    continue
+                accepted.append(True)
+                registered_timestamps.append(registered_timestamp)
             self.trial_table.simplify_aps()
+            self._begin_storing(sum(accepted))
+            self._revision += 1
+
+        storing_num = sum(accepted)
+        committed = []
+        try:
+            for trial, registered_timestamp in zip(trials, registered_timestamps, strict=True):
+                if registered_timestamp is None:
+                    continue
+                await self._store_receipted_trial(trial)
+                committed.append(self._record_registered(trial, registered_timestamp))
+                storing_num -= 1
+                self._end_storing(1)
+        finally:
+            # 保存に失敗した trial の分も数え終える
+            self._end_storing(storing_num)
+            self._revision += 1
+        await wait_committed(*committed)
+        return accepted
+
+    @contextlib.asynccontextmanager
+    async def settled(self) -> AsyncGenerator[None]:
+        """
+        Hold the trial table once no receipted trial is being stored.
+        Inside it, the results of every done trial in the table are in the trial repository.
+        """
+        async with self._table_lock:
+            # 新しく受け取る trial は lock を待つので、保存中の trial が終われば増えない
+            await self._stored.wait()
+            yield
+
+    def _begin_storing(self, trial_num: int) -> None:
+        self._storing_trial_num += trial_num
+        if self._storing_trial_num > 0:
+            self._stored.clear()
+
+    def _end_storing(self, trial_num: int) -> None:
+        self._storing_trial_num -= trial_num
+        if self._storing_trial_num == 0:
+            self._stored.set()
 
+    async def _store_receipted_trial(self, trial: Trial) -> None:
         trial.trial_status = TrialStatus.done
         trial.set_registered_timestamp()
-        await self.trial_repo.save(trial.to_model())
+        self.worker_velocities.add(trial.to_done_record())
+        trial_model = trial.to_model()
+        results_to_store = self.study_strategy.select_results_to_store(trial)
+        if results_to_store is not None:
+            trial_model.results = results_to_store
+        await self.trial_repo.save(trial_model)
+        self.study_strategy.receipt_trial(trial)
+        # index の位置は保存した結果の中での位置
+        if self.result_index is not None and trial_model.results is not None:
+            self.result_index.add(trial.trial_id, trial_model.results)
+
+    async def lookup_results(self, value: ResultType) -> list[Mapping]:
+        if self.result_index is None:
+            p = "use_result_index"
+            t = "Result index is not enabled for this study"
+            raise LD2ParameterError(p, t)
+        if not self._is_result_index_caught_up:
+            async for trial_model in self.trial_repo.iter_all():
+                if trial_model.results is not None:
+                    self.result_index.add(trial_model.trial_id, trial_model.results)
+            self._is_result_index_caught_up = True
+
+        # 見つかった mapping を含む trial だけを読み込む
+        trials: dict[str, TrialModel] = {}
+        mappings = []
+        for trial_id, index in self.result_index.lookup(value):
+            if trial_id not in trials:
+                trials[trial_id] = await self.trial_repo.load(trial_id)
+            mappings.extend((trials[trial_id].results or [])[index : index + 1])
+        return mappings
+
+    def create_result_value(self, values: Sequence[str]) -> ResultType:
+        portables = [self._normalize_portable(value) for value in values]
+        match self.result_type:
+            case "scalar":
+                if len(portables) != 1:
+                    p = "value"
+                    t = f"Scalar result requires exactly one value but got {len(portables)}"
+                    raise LD2ParameterError(p, t)
+                return ScalarValue(type="scalar", value_type=self.result_value_type, value=portables[0])
+            case "vector":
+                return VectorValue(type="vector", value_type=self.result_value_type, values=portables)
+            case _ as unreachable:
+                assert_never(unreachable)
 
-    def check_timeout_trial(self, now: datetime, timeout_seconds: int) -> list[str]:
-        return self.trial_table.check_timeout_trial(now, timeout_seconds)
+    def _normalize_portable(self, value: str) -> PortableValueType:
+        if self.result_value_type == "bool":
+            if value.lower() not in {"true", "false"}:
+                p = "value"
+                t = f"Cannot parse as bool: {value}"
+                raise LD2ParameterError(p, t)
+            return value.lower() == "true"
+        try:
+            # 0x0a と 0xa のような表記揺れを揃える
+            return portablize(self.result_value_type, numerize(self.result_value_type, value))
+        except ValueError as e:
+            p = "value"
+            t = f"Cannot parse as {self.result_value_type} in hex: {value}"
+            raise LD2ParameterError(p, t) from e
+
+    async def check_timeout_trial(self, now: datetime, timeout_seconds: int) -> list[str]:
+        async with self._table_lock:
+            removed_ids = self.trial_table.check_timeout_trial(now, timeout_seconds)
+            if not removed_ids:
+                return removed_ids
+            self._revision += 1
+            committed = self._record(TrialsTimedOutEvent(study_id=self.study_id, trial_ids=removed_ids))
+        await wait_committed(committed)
+        return removed_ids
+
+    def replay(self, event: TrialReservedEvent | TrialRegisteredEvent | TrialsTimedOutEvent) -> None:
+        # journal から状態を復元する。snapshot に含まれていた event は無視する
+        match event:
+            case TrialReservedEvent():
+                trial = Trial.from_model(event.trial)
+                self.status = StudyStatus.running
+                self.trial_table.register(trial)
+                self._next_trial_index = max(self._next_trial_index, self._find_next_trial_index([trial.trial_id]))
+                if self.trial_table.is_not_defined_aps():
+                    self.trial_table.init_aps(trial)
+            case TrialRegisteredEvent():
+                try:
+                    self.trial_table.receipt_trial_result(
+                        event.trial_id,
+                        event.worker_node_id,
+                        event.registered_timestamp,
+                    )
+                except LD2ParameterError:
+                    return
+                self.trial_table.simplify_aps()
+            case TrialsTimedOutEvent():
+                self.trial_table.remove_running_trials(set(event.trial_ids))
+            case _ as unreachable:
+                assert_never(unreachable)
+        self._revision += 1
+
+    def _record(self, event: JournalEvent) -> asyncio.Future[None] | None:
+        return None if self.journal is None else self.journal.record(event)
+
+    def _record_registered(self, trial: Trial, registered_timestamp: datetime) -> asyncio.Future[None] | None:
+        # trial の保存が終わってから記録するので、journal にあるのに保存されていない trial は無い
+        if self.journal is None:
+            return None
+        return self.journal.record(
+            TrialRegisteredEvent(
+                study_id=self.study_id,
+                trial_id=trial.trial_id,
+                worker_node_id=trial.worker_node_id,
+                registered_timestamp=registered_timestamp,
+            ),
+        )
 
     async def delete_trial_jsons(self) -> None:
         await self.trial_repo.delete_save_dir()
 
     async def to_storage(self) -> StudyStorage:
+        # 結果は curriculum の json に含めず、trial の保存先と同じ階層に書き出す
+        save_dir = self.trial_repo.to_model().save_dir
+        results_path = save_dir.with_name(f"{save_dir.name}_results.json")
+        await self.study_strategy.dump_mappings(self.trial_repo, results_path)
         return StudyStorage(
             study_id=self.study_id,
             name=self.name,
@@ -121,13 +424,16 @@ class Study:
             done_timestamp=publish_timestamp(),
             result_type=self.result_type,
             result_value_type=self.result_value_type,
-            results=await self.study_strategy.extract_mappings(self.trial_repo),
+            priority=self.priority,
+            weight=self.weight,
+            results_path=results_path,
             done_grids=self.trial_table.count_grid(),
             trial_repository=self.trial_repo.to_model(),
         )
 
     def to_summary(self) -> StudySummary:
-        done_grids = sum(trial.parameter_space.total or 0 for trial in self.trial_table.trials)
+        # 予約中の trial の grid も含める
+        done_grids = self.trial_table.count_grid() + self.trial_table.count_running_grid()
         return StudySummary(
             name=self.name,
             study_id=self.study_id,
@@ -140,6 +446,8 @@ class Study:
             parameter_space=self.parameter_space.to_model(),
             result_type=self.result_type,
             result_value_type=self.result_value_type,
+            priority=self.priority,
+            weight=self.weight,
             total_grids=self.parameter_space.total,
             done_grids=done_grids,
         )
@@ -157,12 +465,30 @@ class Study:
             parameter_space=self.parameter_space.to_model(),
             result_type=self.result_type,
             result_value_type=self.result_value_type,
+            priority=self.priority,
+            weight=self.weight,
             trial_table=self.trial_table.to_model(),
             trial_repository=self.trial_repo.to_model(),
+            use_result_index=self.result_index is not None,
         )
 
     def _publish_trial_id(self) -> str:
-        return f"{self.study_id}-{int2hex(self.trial_table.count_trial())}"
+        trial_id = f"{self.study_id}-{int2hex(self._next_trial_index)}"
+        self._next_trial_index += 1
+        return trial_id
+
+    def _find_next_trial_index(self, trial_ids: Iterable[str]) -> int:
+        # タイムアウトした trial はテーブルから消えるので、trial の数から作ると id が重複する
+        next_index = 0
+        for trial_id in trial_ids:
+            prefix, _, index = trial_id.rpartition("-")
+            if prefix != self.study_id:
+                continue
+            try:
+                next_index = max(next_index, hex2int(index) + 1)
+            except ValueError:
+                continue
+        return next_index
 
     @staticmethod
     def _create_suggest_strategy(model: SuggestStrategyModel, space: ParameterAlignedSpace) -> BaseSuggestStrategy:
@@ -170,7 +496,7 @@ class Study:
             case "sequential":
                 return SequentialSuggestStrategy(model.suggest_strategy_param, space)
             case "random":
-                raise NotImplementedError
+                return RandomSuggestStrategy(model.suggest_strategy_param, space)
             case "designated":
                 raise NotImplementedError
             case _ as unreachable:
@@ -193,4 +519,7 @@ class Study:
             result_value_type=study_model.result_value_type,
             trial_table=TrialTable.from_model(study_model.trial_table),
             trial_repository=create_trial_repository(study_model.trial_repository),
+            use_result_index=study_model.use_result_index,
+            priority=study_model.priority,
+            weight=study_model.weight,
         )
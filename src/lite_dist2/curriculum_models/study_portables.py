@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import uuid
 from datetime import datetime
-from typing import TYPE_CHECKING, Literal
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal, assert_never
 
+import aiofiles
 from pydantic import BaseModel, Field
 
 from lite_dist2.common import publish_timestamp
@@ -21,7 +24,7 @@ from lite_dist2.value_models.aligned_space_registry import ParameterAlignedSpace
 from lite_dist2.value_models.const_param import ConstParam
 
 if TYPE_CHECKING:
-    from pathlib import Path
+    from collections.abc import AsyncGenerator
 
 
 class _StudyCommonModel(BaseModel):
@@ -32,6 +35,9 @@ class _StudyCommonModel(BaseModel):
     const_param: ConstParam | None
     result_type: Literal["scalar", "vector"]
     result_value_type: Literal["bool", "int", "float"]
+    # 優先度の高い study から trial を払い出し、同じ優先度の study 同士では weight に比例して払い出す
+    priority: int = 0
+    weight: float = Field(default=1.0, gt=0)
 
 
 class StudyModel(_StudyCommonModel):
@@ -45,6 +51,7 @@ class StudyModel(_StudyCommonModel):
     parameter_space: ParameterAlignedSpacePortableModel
     trial_table: TrialTableModel = Field(default_factory=TrialTableModel.create_empty)
     trial_repository: TrialRepositoryModel
+    use_result_index: bool = False
 
 
 class StudyRegistry(_StudyCommonModel):
@@ -54,10 +61,25 @@ class StudyRegistry(_StudyCommonModel):
 
     parameter_space: ParameterAlignedSpaceRegistry
     trial_repository_type: TrialRepositoryType = "normal"
+    use_result_index: bool = False
 
     def is_valid(self) -> bool:
         is_infinite = any(axis.size is None for axis in self.parameter_space.axes)
-        return not (is_infinite and self.study_strategy.type == "all_calculation")
+        if self.suggest_strategy.type == "random" and is_infinite:
+            # ランダムな順番は有限の空間でしか作れない
+            return False
+        match self.study_strategy.type:
+            case "all_calculation":
+                return not is_infinite
+            case "find_exact":
+                return True
+            case "minimize":
+                # 無限の空間では target_value に達するまでしか計算できない
+                param = self.study_strategy.study_strategy_param
+                has_threshold = param is not None and param.target_value is not None
+                return self.result_type == "scalar" and (has_threshold or not is_infinite)
+            case _ as unreachable:
+                assert_never(unreachable)
 
     def to_study_model(self, trial_file_dir: Path) -> StudyModel:
         study_id = self._publish_study_id()
@@ -73,10 +95,13 @@ class StudyRegistry(_StudyCommonModel):
             parameter_space=self.parameter_space.to_parameter_aligned_space_model(),
             result_type=self.result_type,
             result_value_type=self.result_value_type,
+            priority=self.priority,
+            weight=self.weight,
             trial_repository=TrialRepositoryModel(
                 type=self.trial_repository_type,
                 save_dir=trial_file_dir / study_id,
             ),
+            use_result_index=self.use_result_index,
         )
 
     def _publish_study_id(self) -> str:
@@ -109,16 +134,55 @@ class StudyStorage(_StudyCommonModel):
     registered_timestamp: datetime
     parameter_space: ParameterAlignedSpacePortableModel
     done_timestamp: datetime
-    results: MappingsStorage
+    results: MappingsStorage | None = Field(
+        None,
+        description="Results of the study. `None` while the results are kept in `results_path` on the table node.",
+    )
+    results_path: Path | None = Field(None, description="Json file of `MappingsStorage` written on the table node.")
     done_grids: int
     trial_repository: TrialRepositoryModel
 
     async def consume_trial(self) -> None:
         repo = create_trial_repository(self.trial_repository)
-        study_strategy = create_study_strategy(self.study_strategy)
-        self.results = await study_strategy.extract_mappings(repo)
+        if self.results_path is None:
+            study_strategy = create_study_strategy(self.study_strategy)
+            self.results = await study_strategy.extract_mappings(repo)
         await repo.delete_save_dir()
 
+    async def load_results(self) -> None:
+        # 結果をメモリに読み込み、以降は `results_path` を使わない
+        if self.results_path is None:
+            return
+        async with aiofiles.open(self.results_path, mode="rb") as f:
+            self.results = MappingsStorage.model_validate_json(await f.read())
+        results_path, self.results_path = self.results_path, None
+        await asyncio.to_thread(results_path.unlink, missing_ok=True)
+
+    async def delete_files(self) -> None:
+        """
+        Delete the trial files and the results file of this study on the table node.
+        """
+        repo = create_trial_repository(self.trial_repository)
+        await repo.delete_save_dir()
+        if self.results_path is not None:
+            await asyncio.to_thread(self.results_path.unlink, missing_ok=True)
+
+    async def iter_json(self, chunk_size: int = 1 << 20) -> AsyncGenerator[bytes]:
+        """
+        Yield the same json as `model_dump_json()` with `results` loaded, reading `results_path` chunk by chunk.
+        `results_path` itself is not included.
+        """
+        if self.results_path is None:
+            yield self.model_dump_json(exclude={"results_path"}).encode("utf-8")
+            return
+
+        body = self.model_dump_json(exclude={"results", "results_path"}).encode("utf-8")
+        yield body.removesuffix(b"}") + b',"results":'
+        async with aiofiles.open(self.results_path, mode="rb") as f:
+            while chunk := await f.read(chunk_size):
+                yield chunk
+        yield b"}"
+
     def to_summary(self) -> StudySummary:
         return StudySummary(
             name=self.name,
@@ -132,6 +196,8 @@ class StudyStorage(_StudyCommonModel):
             parameter_space=self.parameter_space,
             result_type=self.result_type,
             result_value_type=self.result_value_type,
+            priority=self.priority,
+            weight=self.weight,
             total_grids=self.parameter_space.total,
             done_grids=self.done_grids,
         )
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+from typing import TYPE_CHECKING, NamedTuple
+
+from lite_dist2.curriculum_models.study_status import StudyStatus
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from lite_dist2.curriculum_models.study import Study
+
+
+class _Entry(NamedTuple):
+    # 小さいほど先に選ぶ。優先度が同じなら予約の少ない(pass の小さい) study から
+    neg_priority: int
+    pass_value: float
+    is_waiting: bool
+    seq: int
+    study_id: str
+
+
+class StudyScheduler:
+    """
+    Chooses the study to reserve trials from.
+    Studies of higher `priority` are always chosen first. Among the same priority, reservations are split in
+    proportion to `weight` by stride scheduling: each reservation advances the pass of the study by `1 / weight`,
+    and the study with the smallest pass is chosen.
+    Studies are kept in a heap per required capacity, so a choice costs O(G log N) for G kinds of capacity.
+    A study that had no trial to suggest is parked until `unpark` is called.
+    """
+
+    def __init__(self, studies: Iterable[Study] = ()) -> None:
+        self._studies: dict[str, Study] = {}
+        self._passes: dict[str, float] = {}
+        self._seqs: dict[str, int] = {}
+        # 各 study の最新の entry。heap に残っている古い entry は取り出すときに捨てる
+        self._entries: dict[str, _Entry] = {}
+        self._heaps: dict[frozenset[str], list[_Entry]] = {}
+        self._counter = itertools.count()
+        # 最後に予約した study の pass。新しく加わる study はここから始め、溜まった分をまとめて取らないようにする
+        self._virtual_time = 0.0
+        for study in studies:
+            self.add(study)
+
+    def add(self, study: Study) -> None:
+        if study.study_id in self._studies:
+            return
+        self._studies[study.study_id] = study
+        self._seqs[study.study_id] = next(self._counter)
+        self._passes[study.study_id] = self._virtual_time
+        self._push(study)
+
+    def remove(self, study_id: str) -> None:
+        self._studies.pop(study_id, None)
+        self._passes.pop(study_id, None)
+        self._seqs.pop(study_id, None)
+        self._entries.pop(study_id, None)
+
+    def park(self, study_id: str) -> None:
+        self._entries.pop(study_id, None)
+
+    def unpark(self, study_id: str) -> None:
+        study = self._studies.get(study_id)
+        if study is None or study_id in self._entries:
+            return
+        self._passes[study_id] = max(self._passes[study_id], self._virtual_time)
+        self._push(study)
+
+    def charge(self, study_id: str, reserved_num: int) -> None:
+        entry = self._entries.get(study_id)
+        if entry is None:
+            # 予約している間に外された
+            return
+        study = self._studies[study_id]
+        self._virtual_time = max(self._virtual_time, entry.pass_value)
+        self._passes[study_id] = entry.pass_value + reserved_num / study.weight
+        self._push(study)
+
+    def select(self, retaining_capacity: set[str]) -> tuple[Study, int | None] | None:
+        """
+        The study to reserve trials from next, and how many trials it may take before the runner-up's turn.
+        The number is None if no other study of the same priority is waiting.
+        """
+        tops = [(heap[0], capacity) for capacity, heap in self._iter_heaps(retaining_capacity)]
+        if not tops:
+            return None
+        best, best_capacity = min(tops, key=lambda top: top[0])
+        # 次点は他の capacity の先頭か、同じ heap で先頭の次に小さいもの
+        # heap には古い entry が残っているので、先頭の子だけを見ると次点を見落とす
+        best_heap = self._heaps[best_capacity]
+        candidates = [top for top, capacity in tops if capacity != best_capacity]
+        candidates += heapq.nsmallest(2, (entry for entry in best_heap if self._is_valid(entry)))[1:]
+        runner_up = min(candidates, default=None)
+
+        study = self._studies[best.study_id]
+        if runner_up is None or runner_up.neg_priority != best.neg_priority:
+            return study, None
+        return study, max(1, math.ceil((runner_up.pass_value - best.pass_value) * study.weight))
+
+    def ordered(self, retaining_capacity: set[str]) -> list[Study]:
+        # 選ばれる順に全て並べる。park された study は最後に登録順で並べる
+        entries = sorted(
+            entry for _, heap in self._iter_heaps(retaining_capacity) for entry in heap if self._is_valid(entry)
+        )
+        parked = sorted(
+            (
+                (seq, study_id)
+                for study_id, seq in self._seqs.items()
+                if study_id not in self._entries and self._studies[study_id].required_capacity <= retaining_capacity
+            ),
+        )
+        return [self._studies[entry.study_id] for entry in entries] + [self._studies[i] for _, i in parked]
+
+    def _push(self, study: Study) -> None:
+        entry = _Entry(
+            neg_priority=-study.priority,
+            pass_value=self._passes[study.study_id],
+            is_waiting=study.status == StudyStatus.wait,
+            seq=self._seqs[study.study_id],
+            study_id=study.study_id,
+        )
+        self._entries[study.study_id] = entry
+        heapq.heappush(self._heaps.setdefault(frozenset(study.required_capacity), []), entry)
+
+    def _is_valid(self, entry: _Entry) -> bool:
+        return self._entries.get(entry.study_id) is entry
+
+    def _iter_heaps(self, retaining_capacity: set[str]) -> Iterable[tuple[frozenset[str], list[_Entry]]]:
+        for capacity, heap in list(self._heaps.items()):
+            if not capacity <= retaining_capacity:
+                continue
+            while heap and not self._is_valid(heap[0]):
+                heapq.heappop(heap)
+            if not heap:
+                del self._heaps[capacity]
+                continue
+            yield capacity, heap
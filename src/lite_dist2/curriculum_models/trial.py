@@ -2,24 +2,27 @@ from __future__ import annotations
 
 from datetime import datetime
 from enum import StrEnum, auto
-from typing import TYPE_CHECKING, Literal
+from typing import TYPE_CHECKING, Literal, assert_never
 
 from pydantic import BaseModel
 
-from lite_dist2.common import publish_timestamp
-from lite_dist2.curriculum_models.mapping import Mapping
+from lite_dist2.common import portablize_column, publish_timestamp
+from lite_dist2.curriculum_models.mapping import Mapping, build_mappings
 from lite_dist2.expections import LD2InvalidSpaceError, LD2ModelTypeError, LD2NotDoneError, LD2UndefinedError
 from lite_dist2.value_models.aligned_space import ParameterAlignedSpace, ParameterAlignedSpacePortableModel
 from lite_dist2.value_models.const_param import ConstParam
 from lite_dist2.value_models.jagged_space import ParameterJaggedSpace, ParameterJaggedSpacePortableModel
-from lite_dist2.value_models.point import ResultType, ScalarValue, VectorValue
 from lite_dist2.value_models.space_model import SpacePortableModelType
 
 if TYPE_CHECKING:
     from collections.abc import Sequence
 
-    from lite_dist2.type_definitions import RawParamType, RawResultType
+    from numpy.typing import NDArray
+
+    from lite_dist2.type_definitions import PortableValueType, PrimitiveValueType, RawParamType, RawResultType
     from lite_dist2.value_models.base_space import FlattenSegment
+    from lite_dist2.value_models.line_segment import DummyLineSegment, LineSegment
+    from lite_dist2.value_models.point import ResultType
     from lite_dist2.value_models.space_type import ParameterSpaceType
 
 
@@ -35,13 +38,21 @@ class TrialDoneRecord(BaseModel):
     worker_node_id: str
     registered_timestamp: datetime
     grid_size: int
+    # ワーカーノードが計算にかかった時間。報告されていなければ None
+    compute_seconds: float | None = None
 
     def calc_duration_sec(self) -> float:
         dt = self.registered_timestamp - self.reserved_timestamp
         return dt.total_seconds()
 
+    def calc_compute_sec(self) -> float:
+        # 予約から登録までの時間には、ワーカーノードの待ち時間や通信の時間も含まれる
+        if self.compute_seconds is not None:
+            return self.compute_seconds
+        return self.calc_duration_sec()
+
     def calc_grid_per_sec(self) -> float:
-        return self.grid_size / self.calc_duration_sec()
+        return self.grid_size / self.calc_compute_sec()
 
 
 class TrialModel(BaseModel):
@@ -57,6 +68,7 @@ class TrialModel(BaseModel):
     worker_node_id: str
     results: list[Mapping] | None = None
     registered_timestamp: datetime | None = None
+    compute_seconds: float | None = None
 
 
 class Trial:
@@ -74,6 +86,7 @@ class Trial:
         worker_node_id: str,
         results: list[Mapping] | None = None,
         registered_timestamp: datetime | None = None,
+        compute_seconds: float | None = None,
     ) -> None:
         self.study_id = study_id
         self.trial_id = trial_id
@@ -87,14 +100,36 @@ class Trial:
         self.worker_node_id = worker_node_id
         self.result = results
         self.registered_timestamp = registered_timestamp
+        self.compute_seconds = compute_seconds
 
     def convert_mappings_from(self, raw_mappings: Sequence[tuple[RawParamType, RawResultType]]) -> list[Mapping]:
-        mappings = []
-        for raw_param, raw_res in raw_mappings:
-            param = self.parameter_space.value_tuple_to_param_type(raw_param)
-            result = self._create_result_value(raw_res)
-            mappings.append(Mapping(params=param, result=result))
-        return mappings
+        if not raw_mappings:
+            return []
+        raw_params, raw_results = zip(*raw_mappings, strict=True)
+        return self.convert_mappings_from_columns(list(zip(*raw_params, strict=True)), raw_results)
+
+    def convert_mappings_from_arrays(self, param_columns: Sequence[NDArray], results: NDArray) -> list[Mapping]:
+        # param_columns は軸ごとの 1 次元配列、results は (n,) または (n, 結果の次元) の配列
+        return self.convert_mappings_from_columns([column.tolist() for column in param_columns], results.tolist())
+
+    def convert_mappings_from_columns(
+        self,
+        param_columns: Sequence[Sequence[PrimitiveValueType]],
+        raw_results: Sequence[RawResultType],
+    ) -> list[Mapping]:
+        # 点ごとに ScalarValue を生成せず、列ごとに portable な値へ変換してから一括で組み立てる
+        axes = self._get_axes_info()
+        portable_columns = [
+            (axis.name, axis.type, portablize_column(axis.type, values))
+            for axis, values in zip(axes, param_columns, strict=True)
+        ]
+        return build_mappings(
+            portable_columns,
+            self.result_type,
+            self.result_value_type,
+            None,
+            self._portablize_results(raw_results),
+        )
 
     def set_result(self, mappings: Sequence[Mapping]) -> None:
         self.result = list(mappings)
@@ -107,12 +142,30 @@ class Trial:
             return self.parameter_space.get_flatten_ambient_start_and_size_list()
         return []
 
-    def _create_result_value(self, raw_result: RawResultType) -> ResultType:
-        if self.result_type == "scalar" and isinstance(raw_result, (bool, int, float)):
-            return ScalarValue.create_from_numeric(raw_result, self.result_value_type)
-        if self.result_type == "vector" and isinstance(raw_result, list):
-            return VectorValue.create_from_numeric(raw_result, self.result_value_type)
-        raise LD2ModelTypeError(self.result_type)
+    def _get_axes_info(self) -> Sequence[LineSegment | DummyLineSegment]:
+        match self.parameter_space:
+            case ParameterAlignedSpace():
+                return self.parameter_space.axes
+            case ParameterJaggedSpace():
+                return self.parameter_space.axes_info
+            case _:
+                raise LD2UndefinedError(type(self.parameter_space).__name__)
+
+    def _portablize_results(
+        self,
+        raw_results: Sequence[RawResultType],
+    ) -> list[PortableValueType] | list[list[PortableValueType]]:
+        match self.result_type:
+            case "scalar":
+                if not all(isinstance(raw_result, (bool, int, float)) for raw_result in raw_results):
+                    raise LD2ModelTypeError(self.result_type)
+                return portablize_column(self.result_value_type, raw_results)
+            case "vector":
+                if not all(isinstance(raw_result, list) for raw_result in raw_results):
+                    raise LD2ModelTypeError(self.result_type)
+                return [portablize_column(self.result_value_type, raw_result) for raw_result in raw_results]
+            case _ as unreachable:
+                assert_never(unreachable)
 
     def measure_seconds_from_registered(self, now: datetime) -> int:
         delta = now - self.reserved_timestamp
@@ -125,8 +178,9 @@ class Trial:
         if self.trial_status != TrialStatus.done:
             return None
 
+        target_key = target_value.to_hash_key()
         for mapping in self.result:
-            if mapping.result.equal_to(target_value):
+            if mapping.result.to_hash_key() == target_key:
                 return mapping
         return None
 
@@ -145,6 +199,7 @@ class Trial:
             worker_node_id=self.worker_node_id,
             registered_timestamp=self.registered_timestamp,
             grid_size=grid_size,
+            compute_seconds=self.compute_seconds,
         )
 
     def done_in_after(self, cutoff_datetime: datetime) -> bool:
@@ -166,6 +221,7 @@ class Trial:
             worker_node_id=self.worker_node_id,
             results=self.result,
             registered_timestamp=self.registered_timestamp,
+            compute_seconds=self.compute_seconds,
         )
 
     @staticmethod
@@ -190,4 +246,5 @@ class Trial:
             worker_node_id=model.worker_node_id,
             results=model.results,
             registered_timestamp=model.registered_timestamp,
+            compute_seconds=model.compute_seconds,
         )
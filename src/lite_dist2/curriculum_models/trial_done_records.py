@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel, Field
+
+from lite_dist2.common import JST
+from lite_dist2.curriculum_models.trial import TrialDoneRecord
+from lite_dist2.expections import LD2ParameterError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_MICROSECOND = timedelta(microseconds=1)
+# 登録時刻の分からない古い trial
+_UNKNOWN_TIMESTAMP = -(1 << 63)
+
+
+class TrialDoneRecordsModel(BaseModel):
+    # 列ごとに持つ。時刻は UNIX 時間のマイクロ秒
+    trial_ids: list[str] = Field(default_factory=list)
+    reserved_timestamps: list[int] = Field(default_factory=list)
+    worker_node_names: list[str | None] = Field(default_factory=list)
+    worker_node_ids: list[str] = Field(default_factory=list)
+    registered_timestamps: list[int] = Field(default_factory=list)
+    grid_sizes: list[int] = Field(default_factory=list)
+
+
+class TrialDoneRecords:
+    """
+    Done trials of a trial table, kept only as the columns of `TrialDoneRecord`.
+    The parameter spaces of done trials are already merged into the aggregated parameter space, so they are not kept.
+    """
+
+    def __init__(self) -> None:
+        self._trial_ids: list[str] = []
+        # trial_id から行番号を引く。同じ id が複数あるときは最後の行
+        self._rows: dict[str, int] = {}
+        self._reserved_timestamps = array("q")
+        self._worker_node_names: list[str | None] = []
+        self._worker_node_ids: list[str] = []
+        self._registered_timestamps = array("q")
+        self._grid_sizes = array("q")
+        self._grid_num = 0
+
+    def __len__(self) -> int:
+        return len(self._trial_ids)
+
+    def __contains__(self, trial_id: str) -> bool:
+        return trial_id in self._rows
+
+    def append(
+        self,
+        trial_id: str,
+        *,
+        reserved_timestamp: datetime,
+        worker_node_name: str | None,
+        worker_node_id: str,
+        registered_timestamp: datetime | None,
+        grid_size: int,
+    ) -> None:
+        self._rows[trial_id] = len(self._trial_ids)
+        self._trial_ids.append(trial_id)
+        self._reserved_timestamps.append(_to_micros(reserved_timestamp))
+        # ワーカーの名前と id は何度も現れるので同じ文字列を使い回す
+        self._worker_node_names.append(None if worker_node_name is None else sys.intern(worker_node_name))
+        self._worker_node_ids.append(sys.intern(worker_node_id))
+        self._registered_timestamps.append(
+            _UNKNOWN_TIMESTAMP if registered_timestamp is None else _to_micros(registered_timestamp),
+        )
+        self._grid_sizes.append(grid_size)
+        self._grid_num += grid_size
+
+    def count_grid(self) -> int:
+        return self._grid_num
+
+    def iter_trial_ids(self) -> Iterator[str]:
+        return iter(self._trial_ids)
+
+    def find(self, trial_id: str) -> TrialDoneRecord:
+        i = self._rows.get(trial_id)
+        record = None if i is None else self._to_record(i)
+        if record is not None:
+            return record
+        p = "trial_id"
+        t = f"Not found done record of trial that id={trial_id}"
+        raise LD2ParameterError(p, t)
+
+    def gen_record_list(self, cutoff_datetime: datetime) -> list[TrialDoneRecord]:
+        cutoff = _to_micros(cutoff_datetime)
+        records = []
+        for i, registered in enumerate(self._registered_timestamps):
+            if registered <= cutoff:
+                continue
+            record = self._to_record(i)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def _to_record(self, i: int) -> TrialDoneRecord | None:
+        registered = self._registered_timestamps[i]
+        if registered == _UNKNOWN_TIMESTAMP:
+            return None
+        return TrialDoneRecord(
+            trial_id=self._trial_ids[i],
+            reserved_timestamp=_from_micros(self._reserved_timestamps[i]),
+            worker_node_name=self._worker_node_names[i],
+            worker_node_id=self._worker_node_ids[i],
+            registered_timestamp=_from_micros(registered),
+            grid_size=self._grid_sizes[i],
+        )
+
+    def to_model(self) -> TrialDoneRecordsModel:
+        return TrialDoneRecordsModel(
+            trial_ids=list(self._trial_ids),
+            reserved_timestamps=self._reserved_timestamps.tolist(),
+            worker_node_names=list(self._worker_node_names),
+            worker_node_ids=list(self._worker_node_ids),
+            registered_timestamps=self._registered_timestamps.tolist(),
+            grid_sizes=self._grid_sizes.tolist(),
+        )
+
+    @staticmethod
+    def from_model(model: TrialDoneRecordsModel) -> TrialDoneRecords:
+        columns = (
+            model.reserved_timestamps,
+            model.worker_node_names,
+            model.worker_node_ids,
+            model.registered_timestamps,
+            model.grid_sizes,
+        )
+        if any(len(column) != len(model.trial_ids) for column in columns):
+            p = "done_records"
+            t = "All columns of done records must have the same length"
+            raise LD2ParameterError(p, t)
+        records = TrialDoneRecords()
+        records._trial_ids = list(model.trial_ids)
+        records._rows = {trial_id: i for i, trial_id in enumerate(records._trial_ids)}
+        records._reserved_timestamps = array("q", model.reserved_timestamps)
+        records._worker_node_names = [None if name is None else sys.intern(name) for name in model.worker_node_names]
+        records._worker_node_ids = [sys.intern(worker_node_id) for worker_node_id in model.worker_node_ids]
+        records._registered_timestamps = array("q", model.registered_timestamps)
+        records._grid_sizes = array("q", model.grid_sizes)
+        records._grid_num = sum(model.grid_sizes)
+        return records
+
+
+def _to_micros(timestamp: datetime) -> int:
+    # タイムゾーンの無い時刻はローカル時刻とみなす
+    return (timestamp.astimezone(UTC) - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(micros: int) -> datetime:
+    return (_EPOCH + micros * _MICROSECOND).astimezone(JST)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import operator
+from typing import TYPE_CHECKING, Self, assert_never
+
+from pydantic import BaseModel, ConfigDict, SerializationInfo, SerializerFunctionWrapHandler, model_serializer
+
+from lite_dist2.curriculum_models.mapping import split_mappings
+from lite_dist2.expections import LD2ParameterError
+from lite_dist2.trial_repositories.columnar_trial_codec import ColumnEncoding, decode_column, encode_column
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from lite_dist2.curriculum_models.mapping import Mapping
+    from lite_dist2.curriculum_models.trial import Trial
+    from lite_dist2.type_definitions import PrimitiveValueType, RawResultType
+
+
+# python モードの dump でこの context を渡すと、ResultColumn を dict にせずそのまま残す
+KEEP_RESULT_COLUMNS = "keep_result_columns"
+
+
+class ResultColumn(BaseModel):
+    """
+    One column of results packed by `encode_column`. The data is base64 in json.
+    Dumped in python mode with the context `{KEEP_RESULT_COLUMNS: True}`, the column itself is kept,
+    so that a binary wire format can pack it as it is.
+    """
+
+    model_config = ConfigDict(ser_json_bytes="base64", val_json_bytes="base64")
+
+    encoding: ColumnEncoding
+    data: bytes
+
+    # 戻り値の型を書くと json schema がそれに置き換わるので書かない
+    @model_serializer(mode="wrap")
+    def _keep_column(self, handler: SerializerFunctionWrapHandler, info: SerializationInfo):  # noqa: ANN202
+        if info.mode_is_json() or not (info.context or {}).get(KEEP_RESULT_COLUMNS):
+            return handler(self)
+        return self
+
+
+class TrialResultModel(BaseModel):
+    """
+    Results of a done trial in the grid order of its parameter space, packed column by column.
+    The parameters are not included since the table node rebuilds them from the reserved trial.
+    """
+
+    study_id: str
+    trial_id: str
+    worker_node_id: str
+    row_num: int
+    columns: list[ResultColumn]
+    compute_seconds: float | None = None
+
+    @classmethod
+    def from_trial(cls, trial: Trial) -> Self:
+        if trial.result is None:
+            p = "trial"
+            t = f"Result of trial(id={trial.trial_id}) is not set"
+            raise LD2ParameterError(p, t)
+
+        result_columns = _sort_in_grid_order(trial, trial.result)
+        value_type = trial.result_value_type
+        columns = []
+        for values in result_columns:
+            encoding, data = encode_column(value_type, values)
+            columns.append(ResultColumn(encoding=encoding, data=data))
+        return cls(
+            study_id=trial.study_id,
+            trial_id=trial.trial_id,
+            worker_node_id=trial.worker_node_id,
+            row_num=len(trial.result),
+            columns=columns,
+            compute_seconds=trial.compute_seconds,
+        )
+
+    def to_mappings(self, trial: Trial) -> list[Mapping]:
+        # trial はテーブルノードが予約時に払い出したもの
+        if self.row_num != trial.parameter_space.total:
+            p = "row_num"
+            t = f"Expected {trial.parameter_space.total} results but got {self.row_num}"
+            raise LD2ParameterError(p, t)
+
+        result_columns = [decode_column(column.encoding, column.data, self.row_num) for column in self.columns]
+        if any(len(values) != self.row_num for values in result_columns):
+            p = "columns"
+            t = f"Each column must have {self.row_num} values"
+            raise LD2ParameterError(p, t)
+
+        raw_results: Sequence[RawResultType]
+        match trial.result_type:
+            case "scalar":
+                if len(result_columns) != 1:
+                    p = "columns"
+                    t = f"Scalar result must have exactly 1 column but got {len(result_columns)}"
+                    raise LD2ParameterError(p, t)
+                raw_results = result_columns[0]
+            case "vector":
+                raw_results = [list(values) for values in zip(*result_columns, strict=True)]
+            case _ as unreachable:
+                assert_never(unreachable)
+
+        param_columns = trial.parameter_space.grid_value_columns()
+        return trial.convert_mappings_from_columns(param_columns, raw_results)
+
+
+def _sort_in_grid_order(trial: Trial, mappings: Sequence[Mapping]) -> list[list[PrimitiveValueType]]:
+    param_columns, result_columns = split_mappings(mappings)
+    if len(mappings) != trial.parameter_space.total:
+        p = "result"
+        t = f"Results of trial(id={trial.trial_id}) do not match its parameter space"
+        raise LD2ParameterError(p, t)
+    # グリッドは list にせず、生成しながら比べる
+    if all(map(operator.eq, zip(*param_columns, strict=True), trial.parameter_space.grid())):
+        return result_columns
+
+    # マルチプロセスで計算すると結果の順番が入れ替わるので、グリッドの順に並べ直す
+    positions = {row: i for i, row in enumerate(zip(*param_columns, strict=True))}
+    if len(positions) != len(mappings):
+        p = "result"
+        t = f"Results of trial(id={trial.trial_id}) do not match its parameter space"
+        raise LD2ParameterError(p, t)
+    try:
+        order = [positions[row] for row in trial.parameter_space.grid()]
+    except KeyError as e:
+        p = "result"
+        t = f"Results of trial(id={trial.trial_id}) do not match its parameter space"
+        raise LD2ParameterError(p, t) from e
+    return [[values[i] for i in order] for values in result_columns]
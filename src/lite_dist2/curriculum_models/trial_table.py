@@ -3,24 +3,26 @@ from __future__ import annotations
 import itertools
 from typing import TYPE_CHECKING
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from lite_dist2.curriculum_models.trial import Trial, TrialDoneRecord, TrialModel, TrialStatus
+from lite_dist2.curriculum_models.trial_done_records import TrialDoneRecords, TrialDoneRecordsModel
 from lite_dist2.expections import LD2InvalidSpaceError, LD2ParameterError
 from lite_dist2.value_models.aligned_space import ParameterAlignedSpace, ParameterAlignedSpacePortableModel
 from lite_dist2.value_models.base_space import FlattenSegment
+from lite_dist2.value_models.flatten_segment_index import FlattenSegmentIndex
 from lite_dist2.value_models.parameter_aligned_space_helper import remap_space, simplify
 
 if TYPE_CHECKING:
+    from collections.abc import Collection, Iterator
     from datetime import datetime
 
-    from lite_dist2.curriculum_models.mapping import Mapping
-    from lite_dist2.value_models.point import ResultType
-
 
 class TrialTableModel(BaseModel):
+    # 実行中の trial だけ。done の trial を含む古い形式も読み込める
     trials: list[TrialModel]
     aggregated_parameter_space: dict[int, list[ParameterAlignedSpacePortableModel]] | None
+    done_records: TrialDoneRecordsModel = Field(default_factory=TrialDoneRecordsModel)
 
     @staticmethod
     def create_empty() -> TrialTableModel:
@@ -31,55 +33,125 @@ class TrialTableModel(BaseModel):
 
 
 class TrialTable:
+    """
+    Running trials and the records of done trials of a study.
+    Done trials are covered by `aggregated_parameter_space`, so only their `TrialDoneRecord` columns are kept.
+    """
+
     def __init__(
         self,
         trials: list[Trial],
         aggregated_parameter_space: dict[int, list[ParameterAlignedSpace]] | None,
+        done_records: TrialDoneRecords | None = None,
     ) -> None:
-        self.trials = trials
+        self.done_records = TrialDoneRecords() if done_records is None else done_records
+        self.trials = []
+        for trial in trials:
+            if trial.trial_status == TrialStatus.done:
+                self._append_done_record(trial)
+            else:
+                self.trials.append(trial)
         self.aggregated_parameter_space = aggregated_parameter_space
+        self._segment_index = self._build_segment_index()
+
+    def _build_segment_index(self) -> FlattenSegmentIndex:
+        aps_segments = []
+        if self.aggregated_parameter_space is not None:
+            aps_segments = [
+                space.get_flatten_ambient_start_and_size()
+                for spaces in self.aggregated_parameter_space.values()
+                for space in spaces
+            ]
+        running_segments = [segment for trial in self.trials for segment in trial.get_running_segments()]
+        return FlattenSegmentIndex(aps_segments + running_segments)
 
     def is_not_defined_aps(self) -> bool:
         return self.aggregated_parameter_space is None
 
     def is_empty(self) -> bool:
-        return self.is_not_defined_aps() or len(self.trials) == 0
+        return self.is_not_defined_aps() or self.count_trial() == 0
 
     def register(self, trial: Trial) -> None:
         self.trials.append(trial)
+        self._segment_index.add_all(trial.get_running_segments())
 
-    def receipt_trial_result(self, receipted_trial_id: str, worker_node_id: str) -> None:
+    def find_trial(self, trial_id: str) -> Trial:
+        # 実行中の trial だけを探す。done の trial は `done_records` にしか残っていない
         for trial in reversed(self.trials):
+            if trial.trial_id == trial_id:
+                return trial
+        if trial_id in self.done_records:
+            p = "trial_id"
+            t = f"Trial(id={trial_id}) is already done"
+            raise LD2ParameterError(p, t)
+        p = "trial_id"
+        t = f"Not found trial that id={trial_id}"
+        raise LD2ParameterError(p, t)
+
+    def receipt_trial_result(
+        self,
+        receipted_trial_id: str,
+        worker_node_id: str,
+        registered_timestamp: datetime | None = None,
+    ) -> datetime:
+        # 受け付けた trial はテーブルから外して done の記録だけを残す。登録時刻を返す
+        for i in reversed(range(len(self.trials))):
+            trial = self.trials[i]
             if trial.trial_id != receipted_trial_id:
                 continue
             if trial.worker_node_id != worker_node_id:
                 p = "worker_node_id"
                 t = "This trial is reserved by other worker"
                 raise LD2ParameterError(p, t)
-            if trial.trial_status == TrialStatus.done:
-                p = "receipted_trial_id"
-                t = f"Cannot override result of done trial(id={receipted_trial_id})"
-                raise LD2ParameterError(p, t)
             if self.aggregated_parameter_space is None:
                 msg = "aggregated_parameter_space is not defined"
                 raise LD2InvalidSpaceError(msg)
             # Normal
             trial.trial_status = TrialStatus.done
-            trial.set_registered_timestamp()
-            self.aggregated_parameter_space[self.trials[0].parameter_space.dim - 1].extend(
-                trial.parameter_space.to_aligned_list(),
-            )
-            return
-
+            if registered_timestamp is None:
+                trial.set_registered_timestamp()
+            else:
+                trial.registered_timestamp = registered_timestamp
+            # 占有範囲の次元は suggest の仕方による(random なら 1 次元の順番の空間)
+            for space in trial.parameter_space.to_aligned_list():
+                self.aggregated_parameter_space[space.dim - 1].append(space)
+            # running から done に移るだけなので占有範囲は変わらないが、念のため追加しておく(冪等)
+            self._segment_index.add_all(trial.parameter_space.get_flatten_ambient_start_and_size_list())
+            del self.trials[i]
+            self._append_done_record(trial)
+            return trial.registered_timestamp
+
+        if receipted_trial_id in self.done_records:
+            p = "receipted_trial_id"
+            t = f"Cannot override result of done trial(id={receipted_trial_id})"
+            raise LD2ParameterError(p, t)
         p = "receipted_trial_id"
         t = f"Not found trial that id={receipted_trial_id}"
         raise LD2ParameterError(p, t)
 
+    def _append_done_record(self, trial: Trial) -> None:
+        self.done_records.append(
+            trial_id=trial.trial_id,
+            reserved_timestamp=trial.reserved_timestamp,
+            worker_node_name=trial.worker_node_name,
+            worker_node_id=trial.worker_node_id,
+            registered_timestamp=trial.registered_timestamp,
+            grid_size=trial.parameter_space.total or 0,
+        )
+
     def count_grid(self) -> int:
-        return sum(trial.parameter_space.total or 0 for trial in self.trials if trial.trial_status == TrialStatus.done)
+        return self.done_records.count_grid()
+
+    def count_running_grid(self) -> int:
+        return sum(trial.parameter_space.total or 0 for trial in self.trials)
 
     def count_trial(self) -> int:
-        return len(self.trials)
+        return len(self.trials) + len(self.done_records)
+
+    def iter_trial_ids(self) -> Iterator[str]:
+        yield from self.done_records.iter_trial_ids()
+        for trial in self.trials:
+            yield trial.trial_id
 
     def simplify_aps(self) -> None:
         if self.aggregated_parameter_space is None:
@@ -99,58 +171,37 @@ class TrialTable:
     def find_least_division(self, total_num: int | None) -> FlattenSegment:
         if self.aggregated_parameter_space is None:
             return FlattenSegment(0, None)
-
-        aps_segments = [
-            space.get_flatten_ambient_start_and_size()
-            for spaces in self.aggregated_parameter_space.values()
-            for space in spaces
-        ]
-
-        running_segments = simplify([segment for trial in self.trials for segment in trial.get_running_segments()])
-
-        merged = simplify(aps_segments + running_segments)
-        match len(merged):
-            case 0:
-                return FlattenSegment(0, None)
-            case 1:
-                start_index = merged[0].next_start_index()
-                if total_num is None or start_index < total_num:
-                    return FlattenSegment(start_index, None)
-                return FlattenSegment(start_index, 0)
-            case _:
-                start = merged[0].next_start_index()
-                return FlattenSegment(start, merged[1].get_start_index() - start)
+        return self._segment_index.find_first_gap(total_num)
 
     def init_aps(self, trial: Trial) -> None:
-        self.aggregated_parameter_space = {i: [] for i in range(-1, trial.parameter_space.dim)}
-
-    def find_target_value(self, target_value: ResultType) -> Mapping | None:
-        # find_exact 用
-        # NOTE: 並列処理してもよい
-        for trial in self.trials:
-            finding = trial.find_target_value(target_value)
-            if finding:
-                return finding
-        return None
+        dim = trial.parameter_space.to_aligned_list()[0].dim
+        self.aggregated_parameter_space = {i: [] for i in range(-1, dim)}
 
     def check_timeout_trial(self, now: datetime, timeout_seconds: int) -> list[str]:
         new_trials = []
         outdated_ids = []
         for trial in self.trials:
-            if trial.trial_status != TrialStatus.running:
-                new_trials.append(trial)
-                continue
             delta_sec = trial.measure_seconds_from_registered(now)
             if delta_sec < timeout_seconds:
                 # まだ期限内
                 new_trials.append(trial)
             else:
                 outdated_ids.append(trial.trial_id)
+                self._segment_index.remove_all(trial.get_running_segments())
         self.trials = new_trials
         return outdated_ids
 
+    def remove_running_trials(self, trial_ids: Collection[str]) -> None:
+        new_trials = []
+        for trial in self.trials:
+            if trial.trial_id in trial_ids:
+                self._segment_index.remove_all(trial.get_running_segments())
+                continue
+            new_trials.append(trial)
+        self.trials = new_trials
+
     def gen_done_record_list(self, cutoff_datetime: datetime) -> list[TrialDoneRecord]:
-        return [trial.to_done_record() for trial in self.trials if trial.done_in_after(cutoff_datetime)]
+        return self.done_records.gen_record_list(cutoff_datetime)
 
     def to_model(self) -> TrialTableModel:
         if self.aggregated_parameter_space is None:
@@ -160,6 +211,7 @@ class TrialTable:
         return TrialTableModel(
             trials=[trial.to_model() for trial in self.trials],
             aggregated_parameter_space=aps,
+            done_records=self.done_records.to_model(),
         )
 
     @staticmethod
@@ -174,4 +226,5 @@ class TrialTable:
         return TrialTable(
             trials=[Trial.from_model(trial) for trial in model.trials],
             aggregated_parameter_space=aps,
+            done_records=TrialDoneRecords.from_model(model.done_records),
         )
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from lite_dist2.curriculum_models.trial import TrialDoneRecord
+
+
+class WorkerVelocityTracker:
+    """
+    Recent grid velocity (grids per second) of each worker node, smoothed by exponential moving average.
+    The velocity is measured from the compute time reported by the worker node if any.
+    Used to size a trial so that it takes about the target duration on the worker node.
+    """
+
+    SMOOTHING = 0.5
+    INITIAL_SIZE = 1
+
+    def __init__(self) -> None:
+        self._velocities: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._velocities)
+
+    def add(self, record: TrialDoneRecord) -> None:
+        duration = record.calc_compute_sec()
+        if duration <= 0:
+            return
+        velocity = record.calc_grid_per_sec()
+        previous = self._velocities.get(record.worker_node_id)
+        if previous is None:
+            self._velocities[record.worker_node_id] = velocity
+            return
+        self._velocities[record.worker_node_id] = self.SMOOTHING * velocity + (1 - self.SMOOTHING) * previous
+
+    def get(self, worker_node_id: str) -> float | None:
+        return self._velocities.get(worker_node_id)
+
+    def calc_trial_size(self, worker_node_id: str, target_duration_seconds: float, max_size: int) -> int:
+        velocity = self._velocities.get(worker_node_id)
+        if velocity is None:
+            # 速度が分からないうちは小さな trial で計測する
+            return min(max_size, self.INITIAL_SIZE)
+        return max(1, min(max_size, int(velocity * target_duration_seconds)))
@@ -31,5 +31,10 @@ class LD2NotDoneError(LD2Error):
     pass
 
 
+class LD2PayloadTooLargeError(LD2Error):
+    def __init__(self, max_size: int) -> None:
+        super().__init__(f"Payload too large: larger than {max_size} bytes")
+
+
 class LD2TableNodeServerError(LD2Error):
     pass
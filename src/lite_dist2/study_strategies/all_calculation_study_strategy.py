@@ -2,11 +2,14 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, override
 
-from lite_dist2.curriculum_models.mapping import MappingsStorage
+from lite_dist2.curriculum_models.mapping import MappingsStorage, MappingsStorageWriter
 from lite_dist2.expections import LD2NotDoneError
 from lite_dist2.study_strategies import BaseStudyStrategy, StudyStrategyModel
 
 if TYPE_CHECKING:
+    from pathlib import Path
+
+    from lite_dist2.curriculum_models.mapping import Mapping
     from lite_dist2.curriculum_models.trial_table import TrialTable
     from lite_dist2.study_strategies.base_study_strategy import StudyStrategyParam
     from lite_dist2.trial_repositories.base_trial_repository import BaseTrialRepository
@@ -28,24 +31,34 @@ class AllCalculationStudyStrategy(BaseStudyStrategy):
 
     @override
     async def extract_mappings(self, trial_repository: BaseTrialRepository) -> MappingsStorage:
-        trials = await trial_repository.load_all()
-        if not trials:
-            raise LD2NotDoneError
-
-        mappings = trials[0].results
-        if mappings is None:
-            raise LD2NotDoneError
-        first = mappings[0]
+        first = await self._first_mapping(trial_repository)
+        return MappingsStorage(
+            params_info=tuple(param.to_dummy() for param in first.params),
+            result_info=first.result.to_dummy(),
+            values=[row async for row in trial_repository.iter_mapping_values()],
+        )
 
+    @override
+    async def dump_mappings(self, trial_repository: BaseTrialRepository, path: Path) -> None:
+        first = await self._first_mapping(trial_repository)
         params = tuple(param.to_dummy() for param in first.params)
         result = first.result.to_dummy()
+        async with MappingsStorageWriter(path, params, result) as writer:
+            # trial を 1 つずつ読むので、全 trial を同時にメモリに載せることはない
+            async for row in trial_repository.iter_mapping_values():
+                await writer.write((row,))
 
-        values = []
-        for trial in trials:
-            if trial.results is None:
-                raise LD2NotDoneError
-            values.extend(mapping.to_tuple() for mapping in trial.results)
-        return MappingsStorage(params_info=params, result_info=result, values=values)
+    @staticmethod
+    async def _first_mapping(trial_repository: BaseTrialRepository) -> Mapping:
+        # 列の名前と型を知るために、最初の trial だけは model として読む
+        trials = trial_repository.iter_all()
+        try:
+            trial = await anext(trials, None)
+        finally:
+            await trials.aclose()
+        if trial is None or not trial.results:
+            raise LD2NotDoneError
+        return trial.results[0]
 
     @override
     def to_model(self) -> StudyStrategyModel:
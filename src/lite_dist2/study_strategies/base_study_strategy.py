@@ -3,19 +3,26 @@ from __future__ import annotations
 import abc
 from typing import TYPE_CHECKING, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from lite_dist2.common import async_write_file
 from lite_dist2.value_models.point import ResultType
 
 if TYPE_CHECKING:
-    from lite_dist2.curriculum_models.mapping import MappingsStorage
+    from pathlib import Path
+
+    from lite_dist2.curriculum_models.mapping import Mapping, MappingsStorage
+    from lite_dist2.curriculum_models.trial import Trial
     from lite_dist2.curriculum_models.trial_table import TrialTable
     from lite_dist2.trial_repositories.base_trial_repository import BaseTrialRepository
     from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
 
 
 class StudyStrategyParam(BaseModel):
-    target_value: ResultType
+    # find_exact では探す値。minimize ではこの値以下の結果が見つかったら終了する
+    target_value: ResultType | None = None
+    # minimize で残す結果の数
+    top_k: int = Field(default=1, ge=1)
 
 
 class StudyStrategyModel(BaseModel):
@@ -33,10 +40,23 @@ class BaseStudyStrategy(abc.ABC):
     ) -> bool:
         pass
 
+    def receipt_trial(self, trial: Trial) -> None:  # noqa: B027
+        # 登録された trial の結果を逐次確認したい strategy は override する
+        pass
+
+    def select_results_to_store(self, trial: Trial) -> list[Mapping] | None:  # noqa: ARG002
+        # 一部の結果だけを保存すればよい strategy は override する。None なら全ての結果を保存する
+        return None
+
     @abc.abstractmethod
     async def extract_mappings(self, trial_repository: BaseTrialRepository) -> MappingsStorage:
         pass
 
+    async def dump_mappings(self, trial_repository: BaseTrialRepository, path: Path) -> None:
+        # 結果が大きくなりうる strategy は、全体をメモリに載せずに書き出すよう override する
+        mappings = await self.extract_mappings(trial_repository)
+        await async_write_file(path, mappings.model_dump_json().encode("utf-8"))
+
     @abc.abstractmethod
     def to_model(self) -> StudyStrategyModel:
         pass
@@ -19,6 +19,13 @@ class FindExactStudyStrategy(BaseStudyStrategy):
     def __init__(self, study_strategy_param: StudyStrategyParam) -> None:
         self.found_mapping: Mapping | None = None
         self.study_strategy_param = study_strategy_param
+        # 復元直後は、それまでに保存された trial をまだ確認していない
+        self._is_caught_up = False
+
+    @override
+    def receipt_trial(self, trial: Trial) -> None:
+        if self.found_mapping is None:
+            self.found_mapping = trial.find_target_value(self.study_strategy_param.target_value)
 
     @override
     async def is_done(
@@ -29,12 +36,14 @@ class FindExactStudyStrategy(BaseStudyStrategy):
     ) -> bool:
         if self.found_mapping:
             return True
-        self.found_mapping = await self._find(trial_repository)
+        if not self._is_caught_up:
+            # 以降の trial は `receipt_trial` で確認するので、保存済みの trial を走査するのは 1 度だけ
+            self.found_mapping = await self._find(trial_repository)
+            self._is_caught_up = True
         return bool(self.found_mapping)
 
     async def _find(self, trial_repository: BaseTrialRepository) -> Mapping | None:
-        trials = await trial_repository.load_all()
-        for trial in trials:
+        async for trial in trial_repository.iter_all():
             finding = Trial.from_model(trial).find_target_value(self.study_strategy_param.target_value)
             if finding:
                 return finding
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+from typing import TYPE_CHECKING, override
+
+from lite_dist2.curriculum_models.mapping import MappingsStorage
+from lite_dist2.expections import LD2ModelTypeError, LD2NotDoneError
+from lite_dist2.study_strategies import BaseStudyStrategy, StudyStrategyModel
+from lite_dist2.value_models.point import ScalarValue
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from lite_dist2.curriculum_models.mapping import Mapping
+    from lite_dist2.curriculum_models.trial import Trial
+    from lite_dist2.curriculum_models.trial_table import TrialTable
+    from lite_dist2.study_strategies.base_study_strategy import StudyStrategyParam
+    from lite_dist2.trial_repositories.base_trial_repository import BaseTrialRepository
+    from lite_dist2.type_definitions import PortableValueType, PrimitiveValueType
+    from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+    from lite_dist2.value_models.point import ResultType
+
+# heap の要素。値の符号を反転して、先頭が k 個の中で最も悪い mapping になるようにする
+type _HeapEntry = tuple[PrimitiveValueType, int, Mapping]
+
+
+class MinimizeStudyStrategy(BaseStudyStrategy):
+    """
+    Keeps the `top_k` mappings with the smallest scalar results in a bounded heap, updated as each trial is registered.
+    Of each trial, only the mappings that can enter the top-k are stored in the trial repository.
+    The study is done when the whole space is calculated, or when the best result reaches `target_value` if given.
+    """
+
+    def __init__(self, study_strategy_param: StudyStrategyParam) -> None:
+        self.study_strategy_param = study_strategy_param
+        self.top_k = study_strategy_param.top_k
+        self.threshold = (
+            None if study_strategy_param.target_value is None else _numerize(study_strategy_param.target_value)
+        )
+        self._heap: list[_HeapEntry] = []
+        # 同じ点が 2 回入らないように、heap にある点のパラメータを持っておく
+        self._keys: set[tuple[PortableValueType, ...]] = set()
+        self._counter = itertools.count()
+        # 復元直後は、それまでに保存された trial をまだ確認していない
+        self._is_caught_up = False
+
+    @override
+    def select_results_to_store(self, trial: Trial) -> list[Mapping] | None:
+        if trial.result is None:
+            return None
+        candidates = heapq.nsmallest(self.top_k, trial.result, key=lambda mapping: _numerize(mapping.result))
+        return [mapping for mapping in candidates if self._can_enter(_numerize(mapping.result))]
+
+    @override
+    def receipt_trial(self, trial: Trial) -> None:
+        if trial.result is not None:
+            self._push_all(trial.result)
+
+    @override
+    async def is_done(
+        self,
+        trial_table: TrialTable,
+        parameter_space: ParameterAlignedSpace,
+        trial_repository: BaseTrialRepository,
+    ) -> bool:
+        await self._catch_up(trial_repository)
+        if self.threshold is not None and self._heap and self._best_value() <= self.threshold:
+            return True
+        return trial_table.count_grid() == parameter_space.total
+
+    @override
+    async def extract_mappings(self, trial_repository: BaseTrialRepository) -> MappingsStorage:
+        await self._catch_up(trial_repository)
+        if not self._heap:
+            raise LD2NotDoneError
+
+        mappings = [mapping for _, _, mapping in sorted(self._heap, key=lambda entry: (-entry[0], -entry[1]))]
+        return MappingsStorage(
+            params_info=tuple(param.to_dummy() for param in mappings[0].params),
+            result_info=mappings[0].result.to_dummy(),
+            values=[mapping.to_tuple() for mapping in mappings],
+        )
+
+    @override
+    def to_model(self) -> StudyStrategyModel:
+        return StudyStrategyModel(
+            type="minimize",
+            study_strategy_param=self.study_strategy_param,
+        )
+
+    async def _catch_up(self, trial_repository: BaseTrialRepository) -> None:
+        # 以降の trial は `receipt_trial` で受け取るので、保存済みの trial を走査するのは 1 度だけ
+        if self._is_caught_up:
+            return
+        async for trial in trial_repository.iter_all():
+            if trial.results is not None:
+                self._push_all(trial.results)
+        self._is_caught_up = True
+
+    def _push_all(self, mappings: Iterable[Mapping]) -> None:
+        for mapping in mappings:
+            value = _numerize(mapping.result)
+            key = tuple(param.value for param in mapping.params)
+            if key in self._keys or not self._can_enter(value):
+                continue
+            entry = (-value, -next(self._counter), mapping)
+            if len(self._heap) < self.top_k:
+                heapq.heappush(self._heap, entry)
+            else:
+                _, _, popped = heapq.heappushpop(self._heap, entry)
+                self._keys.discard(tuple(param.value for param in popped.params))
+            self._keys.add(key)
+
+    def _can_enter(self, value: PrimitiveValueType) -> bool:
+        return len(self._heap) < self.top_k or value < -self._heap[0][0]
+
+    def _best_value(self) -> PrimitiveValueType:
+        return -max(self._heap)[0]
+
+
+def _numerize(value: ResultType) -> PrimitiveValueType:
+    # 大小を比べられるのはスカラーの結果だけ
+    if not isinstance(value, ScalarValue):
+        raise LD2ModelTypeError(value.type)
+    return value.numerize()
@@ -5,6 +5,7 @@ from typing import TYPE_CHECKING, assert_never
 from lite_dist2.expections import LD2ParameterError
 from lite_dist2.study_strategies.all_calculation_study_strategy import AllCalculationStudyStrategy
 from lite_dist2.study_strategies.find_exact_study_strategy import FindExactStudyStrategy
+from lite_dist2.study_strategies.minimize_study_strategy import MinimizeStudyStrategy
 
 if TYPE_CHECKING:
     from lite_dist2.study_strategies import BaseStudyStrategy, StudyStrategyModel
@@ -16,12 +17,16 @@ def create_study_strategy(model: StudyStrategyModel) -> BaseStudyStrategy:
         case "all_calculation":
             return AllCalculationStudyStrategy(param)
         case "find_exact":
-            if param is None:
+            if param is None or param.target_value is None:
                 p = "study_strategy_param"
                 et = "missing"
                 raise LD2ParameterError(p, et)
             return FindExactStudyStrategy(param)
         case "minimize":
-            raise NotImplementedError
+            if param is None:
+                p = "study_strategy_param"
+                et = "missing"
+                raise LD2ParameterError(p, et)
+            return MinimizeStudyStrategy(param)
         case _ as unreachable:
             assert_never(unreachable)
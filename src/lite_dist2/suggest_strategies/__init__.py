@@ -1,2 +1,3 @@
 from .base_suggest_strategy import BaseSuggestStrategy, SuggestStrategyModel
+from .random_suggest_strategy import RandomSuggestStrategy
 from .sequential_suggest_strategy import SequentialSuggestStrategy
@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 
 class SuggestStrategyParam(BaseModel):
     strict_aligned: bool
+    # random でのみ使う。None なら suggest strategy の生成時に決める
+    seed: int | None = None
 
 
 class SuggestStrategyModel(BaseModel):
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import math
+import secrets
+from typing import TYPE_CHECKING, override
+
+from lite_dist2.expections import LD2InvalidSpaceError
+from lite_dist2.suggest_strategies import BaseSuggestStrategy
+from lite_dist2.suggest_strategies.base_suggest_strategy import SuggestStrategyModel
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.jagged_space import ParameterJaggedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+
+if TYPE_CHECKING:
+    from lite_dist2.curriculum_models.trial_table import TrialTable
+    from lite_dist2.suggest_strategies.base_suggest_strategy import SuggestStrategyParam
+    from lite_dist2.value_models.space_type import ParameterSpaceType
+
+_SEED_BITS = 63
+
+
+class RandomSuggestStrategy(BaseSuggestStrategy):
+    """
+    Suggests the points of the parameter space without replacement, in a seeded quasi-random order.
+    The v-th point of the order is the flatten index `(offset + v * step) % total`, a randomly shifted rank-1 lattice
+    whose step is close to `total` divided by the golden ratio. Since the order is a bijection of `[0, total)`,
+    the trial table tracks the coverage as ranges of the order, not as the visited points.
+    """
+
+    def __init__(
+        self,
+        suggest_parameter: SuggestStrategyParam,
+        parameter_space: ParameterAlignedSpace,
+    ) -> None:
+        total = parameter_space.total
+        if total is None:
+            msg = "Random suggest strategy requires a finite parameter space"
+            raise LD2InvalidSpaceError(msg)
+        if suggest_parameter.seed is None:
+            # to_model で保存して、再開しても同じ順番で suggest する
+            suggest_parameter = suggest_parameter.model_copy(update={"seed": secrets.randbits(_SEED_BITS)})
+        self.suggest_parameter = suggest_parameter
+        self.parameter_space = parameter_space
+        self.total = total
+        self.offset = suggest_parameter.seed % total
+        self.step = self._find_golden_step(total)
+        self.order_space = ParameterAlignedSpace(
+            axes=[
+                LineSegment(name=None, type_="int", size=total, start=0, step=1, ambient_index=0, ambient_size=total),
+            ],
+            check_lower_filling=True,
+        )
+
+    @override
+    def to_model(self) -> SuggestStrategyModel:
+        return SuggestStrategyModel(type="random", suggest_strategy_param=self.suggest_parameter)
+
+    @override
+    def suggest(self, trial_table: TrialTable, max_num: int) -> ParameterSpaceType | None:
+        least_seg = trial_table.find_least_division(self.total)
+        if least_seg.size == 0:
+            return None
+        start = least_seg.start
+        size = min(max_num, self.total - start if least_seg.size is None else least_seg.size)
+        if size <= 0:
+            return None
+
+        parameters = []
+        ambient_indices = []
+        for v in range(start, start + size):
+            ai_param = self.parameter_space.indexed_point(self.flatten_index_at(v))
+            ambient_indices.append(tuple(aip[0] for aip in ai_param))
+            parameters.append(tuple(aip[1] for aip in ai_param))
+        return ParameterJaggedSpace(
+            parameters,
+            ambient_indices,
+            self.parameter_space.dummy_info,
+            source_space=self.order_space.slice([(start, size)]),
+        )
+
+    def flatten_index_at(self, order: int) -> int:
+        # 順番 order 番目に suggest する点の flatten index
+        return (self.offset + order * self.step) % self.total
+
+    @staticmethod
+    def _find_golden_step(total: int) -> int:
+        # total / 黄金比 に最も近く total と互いに素な整数。互いに素なら順番は [0, total) の全単射になる
+        golden = (math.isqrt(5 * total * total) - total) // 2
+        for distance in range(total):
+            for candidate in (golden - distance, golden + distance):
+                if 0 < candidate < total and math.gcd(candidate, total) == 1:
+                    return candidate
+        return 1
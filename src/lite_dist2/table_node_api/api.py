@@ -1,22 +1,38 @@
 from __future__ import annotations
 
 import logging
+from collections import defaultdict
 from typing import Annotated
 
-from fastapi import Body, FastAPI, HTTPException, Query, Response, status
+from fastapi import Body, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
 from lite_dist2.curriculum_models.curriculum import CurriculumProvider
 from lite_dist2.curriculum_models.study import Study
 from lite_dist2.curriculum_models.study_status import StudyStatus
 from lite_dist2.curriculum_models.trial import Trial
 from lite_dist2.expections import LD2ParameterError
-from lite_dist2.table_node_api.table_param import StudyRegisterParam, TrialRegisterParam, TrialReserveParam
+from lite_dist2.table_node_api.http_compression import CompressionMiddleware
+from lite_dist2.table_node_api.msgpack_codec import MSGPACK_MEDIA_TYPE, accepts_msgpack
+from lite_dist2.table_node_api.msgpack_route import MsgpackRoute, NegotiatedResponse
+from lite_dist2.table_node_api.table_param import (
+    StudyRegisterParam,
+    TrialRegisterBatchParam,
+    TrialRegisterParam,
+    TrialReserveBatchParam,
+    TrialReserveParam,
+    TrialResultRegisterBatchParam,
+    TrialResultRegisterParam,
+)
 from lite_dist2.table_node_api.table_response import (
     CurriculumSummaryResponse,
     OkResponse,
     ProgressSummaryResponse,
+    StudyLookupResponse,
     StudyRegisteredResponse,
     StudyResponse,
+    TrialRegisterBatchResponse,
+    TrialReserveBatchResponse,
     TrialReserveResponse,
 )
 
@@ -25,7 +41,11 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(
     version="0.6.7",
+    default_response_class=NegotiatedResponse,
 )
+# route を定義する前に設定する
+app.router.route_class = MsgpackRoute
+app.add_middleware(CompressionMiddleware)
 
 
 @app.get("/ping")
@@ -43,7 +63,7 @@ async def handle_save() -> OkResponse:
 @app.get("/status")
 async def handle_status() -> CurriculumSummaryResponse:
     curr = await CurriculumProvider.get()
-    return CurriculumSummaryResponse(summaries=curr.to_summaries())
+    return CurriculumSummaryResponse(summaries=await curr.to_summaries())
 
 
 @app.get("/status/progress")
@@ -51,7 +71,7 @@ async def handle_status_progress(
     cutoff_sec: Annotated[int, Query(description="Time range of Trial used for ETA estimation.")] = 600,
 ) -> ProgressSummaryResponse:
     curr = await CurriculumProvider.get()
-    return curr.report_progress(cutoff_sec)
+    return await curr.report_progress(cutoff_sec)
 
 
 @app.post("/study/register")
@@ -59,12 +79,15 @@ async def handle_study_register(
     study_registry: Annotated[StudyRegisterParam, Body(description="Registry of processing study")],
 ) -> StudyRegisteredResponse:
     if not study_registry.study.is_valid():
-        raise HTTPException(status_code=400, detail="Cannot use together infinite space and all_calculation strategy.")
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot use the study strategy or the suggest strategy with this parameter space or result type.",
+        )
 
     curr = await CurriculumProvider.get()
     new_study = Study.from_model(study_registry.study.to_study_model(curr.trial_file_dir))
 
-    if curr.try_insert_study(new_study):
+    if await curr.try_insert_study(new_study):
         await new_study.trial_repo.clean_save_dir()
         return StudyRegisteredResponse(study_id=new_study.study_id)
     raise HTTPException(status_code=400, detail=f'The name("{new_study.name}") of study is already registered.')
@@ -76,16 +99,37 @@ async def handle_trial_reserve(
     response: Response,
 ) -> TrialReserveResponse:
     curr = await CurriculumProvider.get()
-    study = curr.get_available_study(param.retaining_capacity)
-    if study is None:
+    trials = await curr.reserve_trials(
+        param.retaining_capacity,
+        1,
+        param.max_size,
+        worker_node_name=param.worker_node_name,
+        worker_node_id=param.worker_node_id,
+        target_duration_seconds=param.target_duration_seconds,
+    )
+    if not trials:
         response.status_code = status.HTTP_202_ACCEPTED
         return TrialReserveResponse(trial=None)
+    return TrialReserveResponse(trial=trials[0].to_model())
 
-    trial = study.suggest_next_trial(param.max_size, param.worker_node_name, param.worker_node_id)
-    if trial is None:
+
+@app.post("/trial/reserve_batch")
+async def handle_trial_reserve_batch(
+    param: Annotated[TrialReserveBatchParam, Body(description="Reserved trials parameter")],
+    response: Response,
+) -> TrialReserveBatchResponse:
+    curr = await CurriculumProvider.get()
+    trials = await curr.reserve_trials(
+        param.retaining_capacity,
+        param.trial_num,
+        param.max_size,
+        worker_node_name=param.worker_node_name,
+        worker_node_id=param.worker_node_id,
+        target_duration_seconds=param.target_duration_seconds,
+    )
+    if not trials:
         response.status_code = status.HTTP_202_ACCEPTED
-        return TrialReserveResponse(trial=None)
-    return TrialReserveResponse(trial=trial.to_model())
+    return TrialReserveBatchResponse(trials=[trial.to_model() for trial in trials])
 
 
 @app.post("/trial/register")
@@ -94,7 +138,7 @@ async def handle_trial_register(
 ) -> OkResponse:
     curr = await CurriculumProvider.get()
     trial = param.trial
-    study = curr.find_study_by_id(trial.study_id)
+    study = await curr.find_study_by_id(trial.study_id)
     if study is None:
         raise HTTPException(status_code=404, detail=f"Study not found: study_id={trial.study_id}")
 
@@ -108,25 +152,97 @@ async def handle_trial_register(
     return OkResponse(ok=True)
 
 
-@app.get("/study")
+@app.post("/trial/register_result")
+async def handle_trial_register_result(
+    param: Annotated[TrialResultRegisterParam, Body(description="Registering results of the trial")],
+) -> OkResponse:
+    curr = await CurriculumProvider.get()
+    result = param.result
+    study = await curr.find_study_by_id(result.study_id)
+    if study is None:
+        raise HTTPException(status_code=404, detail=f"Study not found: study_id={result.study_id}")
+
+    try:
+        await study.receipt_result(result)
+    except LD2ParameterError as e:
+        raise HTTPException(
+            status_code=409, detail="Invalid trial. Maybe the trial is not reserved or already registered."
+        ) from e
+    await curr.to_storage_if_done()
+    return OkResponse(ok=True)
+
+
+@app.post("/trial/register_batch")
+async def handle_trial_register_batch(
+    param: Annotated[TrialRegisterBatchParam, Body(description="Registering trials")],
+) -> TrialRegisterBatchResponse:
+    curr = await CurriculumProvider.get()
+    trials_by_study = defaultdict(list)
+    for trial in param.trials:
+        trials_by_study[trial.study_id].append(Trial.from_model(trial))
+
+    rejected_trial_ids = []
+    for study_id, trials in trials_by_study.items():
+        study = await curr.find_study_by_id(study_id)
+        if study is None:
+            rejected_trial_ids.extend(trial.trial_id for trial in trials)
+            continue
+        accepted = await study.receipt_trials(trials)
+        rejected_trial_ids.extend(
+            trial.trial_id for trial, is_accepted in zip(trials, accepted, strict=True) if not is_accepted
+        )
+    await curr.to_storage_if_done()
+    return TrialRegisterBatchResponse(rejected_trial_ids=rejected_trial_ids)
+
+
+@app.post("/trial/register_result_batch")
+async def handle_trial_register_result_batch(
+    param: Annotated[TrialResultRegisterBatchParam, Body(description="Registering results of the trials")],
+) -> TrialRegisterBatchResponse:
+    curr = await CurriculumProvider.get()
+    results_by_study = defaultdict(list)
+    for result in param.results:
+        results_by_study[result.study_id].append(result)
+
+    rejected_trial_ids = []
+    for study_id, results in results_by_study.items():
+        study = await curr.find_study_by_id(study_id)
+        if study is None:
+            rejected_trial_ids.extend(result.trial_id for result in results)
+            continue
+        accepted = await study.receipt_results(results)
+        rejected_trial_ids.extend(
+            result.trial_id for result, is_accepted in zip(results, accepted, strict=True) if not is_accepted
+        )
+    await curr.to_storage_if_done()
+    return TrialRegisterBatchResponse(rejected_trial_ids=rejected_trial_ids)
+
+
+@app.get("/study", response_model=StudyResponse)
 async def handle_study(
+    request: Request,
     response: Response,
     study_id: Annotated[str | None, Query(description="`study_id` of the target study")] = None,
     name: Annotated[str | None, Query(description="`name` of the target study")] = None,
-) -> StudyResponse:
+) -> StudyResponse | StreamingResponse:
     if study_id is None and name is None:
         raise HTTPException(status_code=400, detail="One of study_id or name should be set.")
     if study_id is not None and name is not None:
         raise HTTPException(status_code=400, detail="Only one of study_id or name should be set.")
 
     curr = await CurriculumProvider.get()
-    storage = curr.get_storage(study_id, name)
+    storage = await curr.get_storage(study_id, name)
     if storage is not None:
         await storage.consume_trial()
+        if storage.results_path is not None:
+            # 結果全体をメモリに載せないよう、ファイルから読みながら返す
+            if accepts_msgpack(request.headers.get("accept")):
+                return StreamingResponse(StudyResponse.iter_done_msgpack(storage), media_type=MSGPACK_MEDIA_TYPE)
+            return StreamingResponse(StudyResponse.iter_done_json(storage), media_type="application/json")
         return StudyResponse(status=StudyStatus.done, result=storage)
 
     # 見つからなかったか、終わってない
-    study_status = curr.get_study_status(study_id, name)
+    study_status = await curr.get_study_status(study_id, name)
     resp = StudyResponse(status=study_status, result=None)
     if study_status == StudyStatus.not_found:
         raise HTTPException(status_code=404, detail="Study not found.")
@@ -135,6 +251,32 @@ async def handle_study(
     return resp
 
 
+@app.get("/study/lookup")
+async def handle_study_lookup(
+    value: Annotated[
+        list[str],
+        Query(description="Result value to look up in hex (or true/false). Repeat it for each element of vector."),
+    ],
+    study_id: Annotated[str | None, Query(description="`study_id` of the target study")] = None,
+    name: Annotated[str | None, Query(description="`name` of the target study")] = None,
+) -> StudyLookupResponse:
+    if study_id is None and name is None:
+        raise HTTPException(status_code=400, detail="One of study_id or name should be set.")
+    if study_id is not None and name is not None:
+        raise HTTPException(status_code=400, detail="Only one of study_id or name should be set.")
+
+    curr = await CurriculumProvider.get()
+    study = await curr.find_study(study_id, name)
+    if study is None:
+        raise HTTPException(status_code=404, detail="Running study not found.")
+
+    try:
+        mappings = await study.lookup_results(study.create_result_value(value))
+    except LD2ParameterError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return StudyLookupResponse(mappings=mappings)
+
+
 @app.delete("/study")
 async def handle_study_cancel(
     study_id: Annotated[str | None, Query(description="`study_id` of the target study")] = None,
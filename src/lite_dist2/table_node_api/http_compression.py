@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import asyncio
+import zlib
+from typing import TYPE_CHECKING, Literal, Protocol, assert_never
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+
+from lite_dist2.config import TableConfigProvider
+from lite_dist2.expections import LD2ParameterError, LD2PayloadTooLargeError
+
+try:
+    import zstandard
+except ImportError:  # zstandard は optional dependency
+    zstandard = None
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+type ContentEncoding = Literal["gzip", "zstd"]
+
+# これより大きい本文は、イベントループを止めないよう別スレッドで圧縮・展開する
+THREAD_COMPRESSION_SIZE = 1 << 20
+
+
+class _Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+def get_supported_encodings() -> list[ContentEncoding]:
+    # 優先度の高い順
+    if zstandard is None:
+        return ["gzip"]
+    return ["zstd", "gzip"]
+
+
+def compress(data: bytes, encoding: ContentEncoding) -> bytes:
+    compressor = _create_compressor(encoding)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(data: bytes, encoding: str, max_size: int | None = None) -> bytes:
+    """
+    Decompress `data`. Raise `LD2PayloadTooLargeError` as soon as the output exceeds `max_size`, so that a small
+    compressed body cannot expand without limit in memory.
+    """
+    errors: tuple[type[Exception], ...] = (zlib.error,) if zstandard is None else (zlib.error, zstandard.ZstdError)
+    # 上限を 1 バイト超えるところまで展開して、超えたかどうかを判定する
+    max_length = -1 if max_size is None else max_size + 1
+    try:
+        match encoding:
+            case "gzip":
+                decompressor = zlib.decompressobj(wbits=31)
+                body = decompressor.decompress(data, max(max_length, 0))
+                if not decompressor.eof and len(body) != max_length:
+                    p = "body"
+                    t = "Truncated gzip data"
+                    raise LD2ParameterError(p, t)
+            case "zstd" if zstandard is not None:
+                # frame に書かれた展開後のサイズは信用せず、読んだ分だけ数える
+                with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+                    body = reader.read(max_length)
+            case _:
+                p = "Content-Encoding"
+                t = f"Unsupported encoding: {encoding}"
+                raise LD2ParameterError(p, t)
+    except errors as e:
+        p = "body"
+        t = f"Broken {encoding} data"
+        raise LD2ParameterError(p, t) from e
+    if max_size is not None and len(body) > max_size:
+        raise LD2PayloadTooLargeError(max_size)
+    return body
+
+
+def parse_encodings(header_value: str | None) -> list[str]:
+    # "gzip;q=1.0, zstd, br;q=0" -> ["gzip", "zstd"]
+    if not header_value:
+        return []
+    encodings = []
+    for item in header_value.split(","):
+        name, *params = (part.strip() for part in item.split(";"))
+        if not name or any(_is_zero_quality(param) for param in params):
+            continue
+        encodings.append(name.lower())
+    return encodings
+
+
+def _is_zero_quality(param: str) -> bool:
+    key, _, value = param.partition("=")
+    if key.strip().lower() != "q":
+        return False
+    try:
+        return float(value) == 0
+    except ValueError:
+        return False
+
+
+def choose_encoding(accept_encoding: str | None) -> ContentEncoding | None:
+    accepted = set(parse_encodings(accept_encoding))
+    for encoding in get_supported_encodings():
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def _create_compressor(encoding: ContentEncoding) -> _Compressor:
+    match encoding:
+        case "gzip":
+            return zlib.compressobj(wbits=31)
+        case "zstd":
+            if zstandard is None:
+                msg = "zstandard is required for zstd. Install it with `pip install lite-dist2[zstd]`."
+                raise ImportError(msg)
+            return zstandard.ZstdCompressor().compressobj()
+        case _ as unreachable:
+            assert_never(unreachable)
+
+
+class CompressionMiddleware:
+    """
+    Decompress request bodies according to `Content-Encoding` and compress response bodies according to
+    `Accept-Encoding`. Responses smaller than `TableConfig.compression_minimum_size` are sent as they are.
+    Request bodies that expand beyond `TableConfig.max_decompressed_size` are rejected with 413. Request and response
+    bodies of `thread_size` bytes or more are decompressed and compressed in another thread.
+    Every response advertises the encodings accepted for request bodies in its `Accept-Encoding` header.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int | None = None,
+        max_decompressed_size: int | None = None,
+        thread_size: int = THREAD_COMPRESSION_SIZE,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.max_decompressed_size = max_decompressed_size
+        self.thread_size = thread_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_encoding = headers.get("content-encoding")
+        if content_encoding is not None and content_encoding.lower() != "identity":
+            body = await _read_body(receive)
+            max_decompressed_size = self.max_decompressed_size
+            if max_decompressed_size is None:
+                max_decompressed_size = TableConfigProvider.get().max_decompressed_size
+            try:
+                body = await self._decompress(body, content_encoding.lower(), max_decompressed_size)
+            except LD2PayloadTooLargeError as e:
+                response = PlainTextResponse(str(e), status_code=413)
+                await response(scope, receive, send)
+                return
+            except LD2ParameterError:
+                status_code = 415 if content_encoding.lower() not in get_supported_encodings() else 400
+                response = PlainTextResponse(
+                    f"Cannot decode request body (Content-Encoding: {content_encoding})",
+                    status_code=status_code,
+                    headers={"Accept-Encoding": ", ".join(get_supported_encodings())},
+                )
+                await response(scope, receive, send)
+                return
+            scope = _replace_body_headers(scope, len(body))
+            receive = _replay(body, receive)
+
+        minimum_size = self.minimum_size
+        if minimum_size is None:
+            minimum_size = TableConfigProvider.get().compression_minimum_size
+        encoding = choose_encoding(headers.get("accept-encoding"))
+        sender = _CompressingSender(send, encoding, minimum_size, self.thread_size)
+        await self.app(scope, receive, sender.send)
+
+    async def _decompress(self, body: bytes, encoding: str, max_size: int) -> bytes:
+        if len(body) < self.thread_size:
+            return decompress(body, encoding, max_size)
+        # 圧縮と同じく展開中も GIL が解放されるので、その間も他のリクエストを処理できる
+        return await asyncio.to_thread(decompress, body, encoding, max_size)
+
+
+class _CompressingSender:
+    def __init__(self, send: Send, encoding: ContentEncoding | None, minimum_size: int, thread_size: int) -> None:
+        self._send = send
+        self._encoding = encoding
+        self._minimum_size = minimum_size
+        self._thread_size = thread_size
+        self._start_message: Message | None = None
+        self._compressor: _Compressor | None = None
+
+    async def send(self, message: Message) -> None:
+        match message["type"]:
+            case "http.response.start":
+                # 本文の最初の塊を見るまで圧縮するかどうか決められないので保留する
+                self._start_message = message
+                MutableHeaders(scope=message).append("Accept-Encoding", ", ".join(get_supported_encodings()))
+            case "http.response.body" if self._start_message is not None:
+                await self._send_first_body(self._start_message, message)
+                self._start_message = None
+            case "http.response.body" if self._compressor is not None:
+                await self._send_compressed(self._compressor, message)
+            case _:
+                await self._send(message)
+
+    async def _send_first_body(self, start_message: Message, message: Message) -> None:
+        headers = MutableHeaders(scope=start_message)
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if (
+            self._encoding is None
+            or "content-encoding" in headers
+            or (not more_body and len(body) < self._minimum_size)
+        ):
+            await self._send(start_message)
+            await self._send(message)
+            return
+
+        self._compressor = _create_compressor(self._encoding)
+        headers["Content-Encoding"] = self._encoding
+        headers.add_vary_header("Accept-Encoding")
+        if more_body:
+            del headers["Content-Length"]
+            await self._send(start_message)
+            await self._send_compressed(self._compressor, message)
+            return
+        compressed = await self._compress(self._compressor, body, flush=True)
+        headers["Content-Length"] = str(len(compressed))
+        await self._send(start_message)
+        await self._send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+    async def _send_compressed(self, compressor: _Compressor, message: Message) -> None:
+        more_body = message.get("more_body", False)
+        body = await self._compress(compressor, message.get("body", b""), flush=not more_body)
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    async def _compress(self, compressor: _Compressor, body: bytes, flush: bool) -> bytes:
+        if len(body) < self._thread_size:
+            return _compress_chunk(compressor, body, flush)
+        # zlib と zstandard は圧縮中に GIL を解放するので、その間も他のリクエストを処理できる
+        return await asyncio.to_thread(_compress_chunk, compressor, body, flush)
+
+
+def _compress_chunk(compressor: _Compressor, body: bytes, flush: bool) -> bytes:
+    compressed = compressor.compress(body)
+    if flush:
+        compressed += compressor.flush()
+    return compressed
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _replace_body_headers(scope: Scope, content_length: int) -> Scope:
+    headers = MutableHeaders(raw=list(scope["headers"]))
+    del headers["Content-Encoding"]
+    headers["Content-Length"] = str(content_length)
+    return {**scope, "headers": headers.raw}
+
+
+def _replay(body: bytes, receive: Receive) -> Receive:
+    # 展開した本文を一度だけ返し、その後は切断の検知などのために元の receive に任せる
+    is_sent = False
+
+    async def replayed_receive() -> Message:
+        nonlocal is_sent
+        if is_sent:
+            return await receive()
+        is_sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return replayed_receive
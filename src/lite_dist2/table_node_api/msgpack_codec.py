@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from pydantic_core import to_jsonable_python
+
+from lite_dist2.curriculum_models.trial_result import KEEP_RESULT_COLUMNS, ResultColumn
+
+try:
+    import msgpack
+except ImportError:  # msgpack は optional dependency
+    msgpack = None
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from pydantic import BaseModel
+
+    from lite_dist2.trial_repositories.columnar_trial_codec import ColumnEncoding
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# ResultColumn は列の符号化ごとの拡張型として詰める。bigint の列は 64 bit を超える整数の拡張型になる
+_COLUMN_EXT_CODES: dict[ColumnEncoding, int] = {"bool": 1, "int64": 2, "float64": 3, "bigint": 4}
+_COLUMN_ENCODINGS: dict[int, ColumnEncoding] = {code: encoding for encoding, code in _COLUMN_EXT_CODES.items()}
+
+
+def is_available() -> bool:
+    return msgpack is not None
+
+
+def pack_model(model: BaseModel) -> bytes:
+    """
+    Pack the model into msgpack.
+    Portable hex strings are packed as they are, so that they come back byte-identical without any number conversion.
+    Each `ResultColumn` is packed as the extension type of its encoding, whose data `decode_column` reads directly as
+    native numbers.
+    """
+    return packb(model.model_dump(context={KEEP_RESULT_COLUMNS: True}))
+
+
+def packb(data: Any) -> bytes:  # noqa: ANN401
+    """
+    Pack the data dumped from models (`BaseModel.model_dump`, in json or python mode) into msgpack.
+    """
+    _require_msgpack()
+    return msgpack.packb(data, default=_default)
+
+
+def unpackb(data: bytes) -> Any:  # noqa: ANN401
+    """
+    Inverse of `packb`. The returned data can be validated by the same pydantic models as the json.
+    """
+    _require_msgpack()
+    return msgpack.unpackb(data, ext_hook=_ext_hook)
+
+
+def pack_map_prefix(json_data: Mapping[str, Any], last_key: str) -> bytes:
+    """
+    Pack the head of a map that has the items of `json_data` followed by `last_key`.
+    The packed value of `last_key` must follow, which lets a large value be streamed in pieces.
+    """
+    _require_msgpack()
+    packer = msgpack.Packer()
+    chunks = [packer.pack_map_header(len(json_data) + 1)]
+    for key, value in json_data.items():
+        chunks.extend((packer.pack(key), packb(value)))
+    chunks.append(packer.pack(last_key))
+    return b"".join(chunks)
+
+
+def pack_array_header(size: int) -> bytes:
+    _require_msgpack()
+    return msgpack.Packer().pack_array_header(size)
+
+
+def is_msgpack(content_type: str | None) -> bool:
+    return content_type is not None and content_type.split(";")[0].strip().lower() == MSGPACK_MEDIA_TYPE
+
+
+def accepts_msgpack(accept: str | None) -> bool:
+    # msgpack が無ければ json で返す
+    if accept is None or not is_available():
+        return False
+    return any(is_msgpack(media_range) for media_range in accept.split(","))
+
+
+def _default(obj: Any) -> Any:  # noqa: ANN401
+    if isinstance(obj, ResultColumn):
+        return msgpack.ExtType(_COLUMN_EXT_CODES[obj.encoding], obj.data)
+    # python モードで dump した時刻や集合などは json と同じ形にする
+    return to_jsonable_python(obj)
+
+
+def _ext_hook(code: int, data: bytes) -> Any:  # noqa: ANN401
+    encoding = _COLUMN_ENCODINGS.get(code)
+    if encoding is None:
+        return msgpack.ExtType(code, data)
+    return {"encoding": encoding, "data": data}
+
+
+def _require_msgpack() -> None:
+    if msgpack is None:
+        msg = "msgpack is required for the msgpack wire format. Install it with `pip install lite-dist2[msgpack]`."
+        raise ImportError(msg)
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, override
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+
+from lite_dist2.table_node_api.msgpack_codec import (
+    MSGPACK_MEDIA_TYPE,
+    accepts_msgpack,
+    is_available,
+    is_msgpack,
+    packb,
+    unpackb,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from starlette.responses import Response
+
+# 処理中のリクエストが msgpack のレスポンスを受け付けるかどうか
+_accepts_msgpack: ContextVar[bool] = ContextVar("accepts_msgpack", default=False)
+
+
+class MsgpackRequest(Request):
+    """
+    Request whose msgpack body is read by FastAPI as if it were json.
+    """
+
+    @override
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = unpackb(await self.body())
+        return self._json
+
+
+class MsgpackRoute(APIRoute):
+    """
+    Route that accepts `application/msgpack` request bodies in addition to json, and lets `NegotiatedResponse`
+    answer in msgpack when the request accepts it.
+    Without msgpack installed, msgpack request bodies are answered with 415 and responses are json.
+    """
+
+    @override
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        original_handler = super().get_route_handler()
+
+        async def handler(request: Request) -> Response:
+            if is_msgpack(request.headers.get("content-type")):
+                if not is_available():
+                    return JSONResponse(
+                        {"detail": "msgpack is not installed on the table node."},
+                        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    )
+                # FastAPI は json の Content-Type のときだけ request.json() で本文を読む
+                scope = dict(request.scope)
+                headers = MutableHeaders(raw=list(scope["headers"]))
+                headers["content-type"] = "application/json"
+                scope["headers"] = headers.raw
+                request = MsgpackRequest(scope, request.receive)
+            token = _accepts_msgpack.set(accepts_msgpack(request.headers.get("accept")))
+            try:
+                return await original_handler(request)
+            finally:
+                _accepts_msgpack.reset(token)
+
+        return handler
+
+
+class NegotiatedResponse(JSONResponse):
+    """
+    Json response that is rendered in msgpack when the request routed by `MsgpackRoute` accepts it.
+    """
+
+    @override
+    def render(self, content: Any) -> bytes:
+        if _accepts_msgpack.get():
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return packb(content)
+        return super().render(content)
@@ -34,20 +34,24 @@ async def _periodic_save() -> None:
         await CurriculumProvider.save_async()
 
 
-def _run_periodic_save() -> None:
-    asyncio.run(_periodic_save())
-
-
 async def _periodic_timeout_check() -> None:
     interval = TableConfigProvider.get().timeout_check_interval_seconds
     while True:
         await asyncio.sleep(interval)
         logger.info("Performing periodic timeout check of trials")
-        CurriculumProvider.check_timeout()
+        await CurriculumProvider.check_timeout()
 
 
-def _run_periodic_timeout_check() -> None:
-    asyncio.run(_periodic_timeout_check())
+async def _serve(port: int) -> None:
+    # curriculum の lock は event loop に紐づくので、定期処理も API と同じ loop で動かす
+    server = uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=port))  # noqa: S104
+    periodic_tasks = [asyncio.create_task(_periodic_save()), asyncio.create_task(_periodic_timeout_check())]
+    try:
+        await server.serve()
+    finally:
+        for task in periodic_tasks:
+            task.cancel()
+        await asyncio.gather(*periodic_tasks, return_exceptions=True)
 
 
 def start() -> None:
@@ -58,17 +62,7 @@ def start() -> None:
 
     logger.info("Table Node IP: %s", _get_local_ip())
     table_config = TableConfigProvider.get(table_config_path)
-
-    # save thread
-    save_thread = Thread(target=_run_periodic_save, daemon=True)
-    save_thread.start()
-
-    # timeout check thread
-    timeout_thread = Thread(target=_run_periodic_timeout_check, daemon=True)
-    timeout_thread.start()
-
-    port = table_config.port
-    uvicorn.run(app, host="0.0.0.0", port=port)  # noqa: S104
+    asyncio.run(_serve(table_config.port))
 
 
 class StoppableThread(Thread):
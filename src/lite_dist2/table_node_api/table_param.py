@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field
 
 from lite_dist2.curriculum_models.study_portables import StudyRegistry
 from lite_dist2.curriculum_models.trial import TrialModel
+from lite_dist2.curriculum_models.trial_result import TrialResultModel
 
 
 class BaseParam(BaseModel):
@@ -17,9 +18,33 @@ class StudyRegisterParam(BaseParam):
 class TrialReserveParam(BaseParam):
     retaining_capacity: set[str] = Field(description="List of capabilities that the worker node has.")
     max_size: int = Field(description="The maximum size of parameter space reserving.")
+    target_duration_seconds: float | None = Field(
+        default=None,
+        description=(
+            "If set, the size of the trial is decided from the recent grid velocity of the worker node "
+            "so that the trial takes about this time. `max_size` is the upper limit."
+        ),
+        gt=0,
+    )
     worker_node_name: str | None = Field(default=None, description="Name of the worker node. ")
     worker_node_id: str = Field(description="ID of the worker node")
 
 
+class TrialReserveBatchParam(TrialReserveParam):
+    trial_num: int = Field(description="The maximum number of trials reserving at once.", ge=1)
+
+
 class TrialRegisterParam(BaseModel):
     trial: TrialModel = Field(description="Registering trial to the table node.")
+
+
+class TrialResultRegisterParam(BaseModel):
+    result: TrialResultModel = Field(description="Registering results of the trial in the grid order.")
+
+
+class TrialRegisterBatchParam(BaseModel):
+    trials: list[TrialModel] = Field(description="Registering trials to the table node.")
+
+
+class TrialResultRegisterBatchParam(BaseModel):
+    results: list[TrialResultModel] = Field(description="Registering results of the trials in the grid order.")
@@ -1,13 +1,20 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import TYPE_CHECKING
 
 from pydantic import BaseModel, Field
 
+from lite_dist2.curriculum_models.mapping import Mapping, MappingsStorageReader
 from lite_dist2.curriculum_models.progress_summary import StudyProgressSummary
 from lite_dist2.curriculum_models.study_portables import StudyStorage, StudySummary
 from lite_dist2.curriculum_models.study_status import StudyStatus
 from lite_dist2.curriculum_models.trial import TrialModel
+from lite_dist2.expections import LD2ParameterError
+from lite_dist2.table_node_api import msgpack_codec
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
 
 
 class BaseTableResponse(BaseModel):
@@ -27,6 +34,21 @@ class TrialReserveResponse(BaseTableResponse):
     )
 
 
+class TrialReserveBatchResponse(BaseTableResponse):
+    trials: list[TrialModel] = Field(
+        description=(
+            "Reserved trials for the worker node. They may belong to different studies. "
+            "Empty if no trial can be processed by the worker node's capabilities."
+        ),
+    )
+
+
+class TrialRegisterBatchResponse(BaseTableResponse):
+    rejected_trial_ids: list[str] = Field(
+        description="`trial_id` of the trials not registered, e.g. timed out trials or trials of a cancelled study.",
+    )
+
+
 class StudyRegisteredResponse(BaseTableResponse):
     study_id: str = Field(description="Published `study_id` of registered study.")
 
@@ -38,6 +60,39 @@ class StudyResponse(BaseTableResponse):
         description="Results of completed study. If the study is not completed or not found, then `None`.",
     )
 
+    @staticmethod
+    async def iter_done_json(storage: StudyStorage) -> AsyncGenerator[bytes]:
+        # `StudyResponse(status=done, result=storage)` と同じ json を、結果を読み込みながら少しずつ返す
+        head = StudyResponse(status=StudyStatus.done).model_dump_json(exclude={"result"}).encode("utf-8")
+        yield head.removesuffix(b"}") + b',"result":'
+        async for chunk in storage.iter_json():
+            yield chunk
+        yield b"}"
+
+    @staticmethod
+    async def iter_done_msgpack(storage: StudyStorage) -> AsyncGenerator[bytes]:
+        # `iter_done_json` と同じ内容の msgpack。配列の長さが先に要るので、行数を数えてから行を詰める
+        if storage.results_path is None:
+            p = "storage"
+            t = "results_path is not set"
+            raise LD2ParameterError(p, t)
+        reader = MappingsStorageReader(storage.results_path)
+        params_info, result_info, row_num = await reader.read_info()
+        head = StudyResponse(status=StudyStatus.done).model_dump(mode="json", exclude={"result"})
+        body = storage.model_dump(mode="json", exclude={"results", "results_path"})
+        yield (
+            msgpack_codec.pack_map_prefix(head, "result")
+            + msgpack_codec.pack_map_prefix(body, "results")
+            + msgpack_codec.pack_map_prefix({"params_info": params_info, "result_info": result_info}, "values")
+            + msgpack_codec.pack_array_header(row_num)
+        )
+        async for rows in reader.iter_rows():
+            yield b"".join(msgpack_codec.packb(row) for row in rows)
+
+
+class StudyLookupResponse(BaseTableResponse):
+    mappings: list[Mapping] = Field(description="Mappings whose result is equal to the queried value.")
+
 
 class CurriculumSummaryResponse(BaseTableResponse):
     summaries: list[StudySummary] = Field(description="The list of study (containing storage) summary.")
@@ -1,8 +1,16 @@
+from __future__ import annotations
+
 import abc
+from typing import TYPE_CHECKING
+
+from lite_dist2.expections import LD2NotDoneError
 
-from lite_dist2.curriculum_models.trial import TrialModel
-from lite_dist2.trial_repositories.trial_repository_model import TrialRepositoryModel
-from lite_dist2.type_definitions import TrialRepositoryType
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+
+    from lite_dist2.curriculum_models.trial import TrialModel
+    from lite_dist2.trial_repositories.trial_repository_model import TrialRepositoryModel
+    from lite_dist2.type_definitions import PortableValueType, TrialRepositoryType
 
 
 class BaseTrialRepository(abc.ABC):
@@ -27,6 +35,24 @@ class BaseTrialRepository(abc.ABC):
     async def load_all(self) -> list[TrialModel]:
         pass
 
+    async def iter_all(self) -> AsyncGenerator[TrialModel]:
+        """
+        Yield saved trials one by one. Override this to keep only one trial in memory at a time.
+        """
+        for trial in await self.load_all():
+            yield trial
+
+    async def iter_mapping_values(self) -> AsyncGenerator[tuple[PortableValueType, ...]]:
+        """
+        Yield the results of saved trials as rows of `Mapping.to_tuple`, raising `LD2NotDoneError` at a trial without
+        results. Override this to read the rows without building `TrialModel`.
+        """
+        async for trial in self.iter_all():
+            if trial.results is None:
+                raise LD2NotDoneError
+            for mapping in trial.results:
+                yield mapping.to_tuple()
+
     @abc.abstractmethod
     async def delete_save_dir(self) -> None:
         pass
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from typing import TYPE_CHECKING, Literal, assert_never
+
+from pydantic import BaseModel
+
+from lite_dist2.common import portablize_column
+from lite_dist2.curriculum_models.mapping import build_mappings, split_mappings
+from lite_dist2.curriculum_models.trial import TrialModel
+from lite_dist2.expections import LD2NotDoneError, LD2ParameterError
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Sequence
+
+    from lite_dist2.type_definitions import PortableValueType, PrimitiveValueType
+
+# file layout: MAGIC | VERSION(u8) | header size(u32, little) | header json | column 0 | column 1 | ...
+MAGIC = b"LD2C"
+VERSION = 1
+_PREFIX = struct.Struct("<4sBI")
+
+type ColumnEncoding = Literal["bool", "int64", "float64", "bigint"]
+
+
+class ColumnHeader(BaseModel):
+    name: str | None
+    is_result: bool
+    value_type: Literal["bool", "int", "float"]
+    encoding: ColumnEncoding
+    byte_size: int
+
+
+class ColumnarTrialHeader(BaseModel):
+    trial: TrialModel
+    has_results: bool
+    row_num: int
+    result_name: str | None
+    columns: list[ColumnHeader]
+
+
+def encode_trial(trial: TrialModel) -> bytes:
+    header_trial = trial.model_copy(update={"results": None})
+    if trial.results is None:
+        header = ColumnarTrialHeader(trial=header_trial, has_results=False, row_num=0, result_name=None, columns=[])
+        return _pack(header, [])
+
+    column_infos, column_values = _split_columns(trial)
+    headers = []
+    bodies = []
+    for (name, is_result, value_type), values in zip(column_infos, column_values, strict=True):
+        encoding, body = encode_column(value_type, values)
+        headers.append(
+            ColumnHeader(
+                name=name, is_result=is_result, value_type=value_type, encoding=encoding, byte_size=len(body)
+            ),
+        )
+        bodies.append(body)
+
+    result_name = trial.results[0].result.name if trial.results else None
+    header = ColumnarTrialHeader(
+        trial=header_trial,
+        has_results=True,
+        row_num=len(trial.results),
+        result_name=result_name,
+        columns=headers,
+    )
+    return _pack(header, bodies)
+
+
+def decode_header(data: bytes) -> tuple[ColumnarTrialHeader, int]:
+    magic, version, header_size = _PREFIX.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        p = "data"
+        t = f"Not a columnar trial file (magic={magic!r}, version={version})"
+        raise LD2ParameterError(p, t)
+    body_offset = _PREFIX.size + header_size
+    header = ColumnarTrialHeader.model_validate_json(data[_PREFIX.size : body_offset])
+    return header, body_offset
+
+
+def decode_columns(data: bytes) -> tuple[ColumnarTrialHeader, list[list[PrimitiveValueType]]]:
+    header, offset = decode_header(data)
+    columns = []
+    for column in header.columns:
+        body = data[offset : offset + column.byte_size]
+        columns.append(decode_column(column.encoding, body, header.row_num))
+        offset += column.byte_size
+    return header, columns
+
+
+def iter_portable_rows(data: bytes) -> Generator[tuple[PortableValueType, ...]]:
+    # `Mapping.to_tuple` と同じ並び (params..., results...) で 1 行ずつ返す
+    header, columns = decode_columns(data)
+    if not header.has_results:
+        raise LD2NotDoneError
+    portable_columns = [
+        portablize_column(column.value_type, values) for column, values in zip(header.columns, columns, strict=True)
+    ]
+    yield from zip(*portable_columns, strict=True)
+
+
+def decode_trial(data: bytes) -> TrialModel:
+    header, columns = decode_columns(data)
+    if not header.has_results:
+        return header.trial
+
+    param_columns = [
+        (column.name, column.value_type, portablize_column(column.value_type, values))
+        for column, values in zip(header.columns, columns, strict=True)
+        if not column.is_result
+    ]
+    result_columns = [
+        (column.value_type, portablize_column(column.value_type, values))
+        for column, values in zip(header.columns, columns, strict=True)
+        if column.is_result
+    ]
+    result_value_type = result_columns[0][0] if result_columns else header.trial.result_value_type
+    match header.trial.result_type:
+        case "scalar":
+            results = result_columns[0][1] if result_columns else []
+        case "vector":
+            results = list(zip(*(values for _, values in result_columns), strict=True))
+        case _ as unreachable:
+            assert_never(unreachable)
+    mappings = build_mappings(param_columns, header.trial.result_type, result_value_type, header.result_name, results)
+    return header.trial.model_copy(update={"results": mappings})
+
+
+def _pack(header: ColumnarTrialHeader, bodies: Sequence[bytes]) -> bytes:
+    header_bytes = header.model_dump_json().encode("utf-8")
+    return b"".join([_PREFIX.pack(MAGIC, VERSION, len(header_bytes)), header_bytes, *bodies])
+
+
+def _split_columns(
+    trial: TrialModel,
+) -> tuple[list[tuple[str | None, bool, Literal["bool", "int", "float"]]], list[list[PrimitiveValueType]]]:
+    results = trial.results or []
+    if not results:
+        return [], []
+
+    first = results[0]
+    infos: list[tuple[str | None, bool, Literal["bool", "int", "float"]]] = [
+        (param.name, False, param.value_type) for param in first.params
+    ]
+    infos.extend((first.result.name, True, value_type) for value_type in first.result.get_value_types())
+    param_columns, result_columns = split_mappings(results)
+    return infos, param_columns + result_columns
+
+
+def encode_column(
+    value_type: Literal["bool", "int", "float"],
+    values: Sequence[PrimitiveValueType],
+) -> tuple[ColumnEncoding, bytes]:
+    match value_type:
+        case "bool":
+            return "bool", bytes(bool(v) for v in values)
+        case "int":
+            try:
+                return "int64", _to_little_endian(array("q", values))
+            except OverflowError:
+                return "bigint", _encode_bigint(values)
+        case "float":
+            return "float64", _to_little_endian(array("d", values))
+        case _ as unreachable:
+            assert_never(unreachable)
+
+
+def decode_column(encoding: ColumnEncoding, body: bytes, row_num: int) -> list[PrimitiveValueType]:
+    match encoding:
+        case "bool":
+            return [b != 0 for b in body]
+        case "int64" | "float64":
+            arr = array("q" if encoding == "int64" else "d")
+            arr.frombytes(body)
+            if sys.byteorder == "big":
+                arr.byteswap()
+            return arr.tolist()
+        case "bigint":
+            return _decode_bigint(body, row_num)
+        case _ as unreachable:
+            assert_never(unreachable)
+
+
+def _encode_bigint(values: Sequence[PrimitiveValueType]) -> bytes:
+    # 各値のバイト長 (u32 配列) の後ろに、符号付きリトルエンディアンの値を連結する
+    chunks = []
+    for v in values:
+        iv = int(v)
+        chunks.append(iv.to_bytes((iv.bit_length() + 8) // 8, "little", signed=True))
+    lengths = array("I", [len(chunk) for chunk in chunks])
+    return _to_little_endian(lengths) + b"".join(chunks)
+
+
+def _decode_bigint(body: bytes, row_num: int) -> list[PrimitiveValueType]:
+    lengths = array("I")
+    lengths.frombytes(body[: row_num * lengths.itemsize])
+    if sys.byteorder == "big":
+        lengths.byteswap()
+    offset = row_num * lengths.itemsize
+    values: list[PrimitiveValueType] = []
+    for length in lengths:
+        values.append(int.from_bytes(body[offset : offset + length], "little", signed=True))
+        offset += length
+    return values
+
+
+def _to_little_endian(arr: array) -> bytes:
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, override
+
+from lite_dist2.common import async_read_file, async_write_file
+from lite_dist2.trial_repositories.columnar_trial_codec import decode_trial, encode_trial, iter_portable_rows
+from lite_dist2.trial_repositories.normal_trial_repository import NormalTrialRepository
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+
+    from lite_dist2.curriculum_models.trial import TrialModel
+    from lite_dist2.trial_repositories.trial_repository_model import TrialRepositoryModel
+    from lite_dist2.type_definitions import PortableValueType, TrialRepositoryType
+
+
+class ColumnarTrialRepository(NormalTrialRepository):
+    """
+    Stores each trial as typed binary columns (see `columnar_trial_codec`) instead of pydantic JSON.
+    """
+
+    SUFFIX = ".ld2c"
+
+    @override
+    @staticmethod
+    def get_repository_type() -> TrialRepositoryType:
+        return "columnar"
+
+    @override
+    async def save(self, trial: TrialModel) -> None:
+        await async_write_file(self._trial_path(trial.trial_id), encode_trial(trial))
+
+    @override
+    async def load(self, trial_id: str) -> TrialModel:
+        return decode_trial(await async_read_file(self._trial_path(trial_id)))
+
+    @override
+    async def iter_mapping_values(self) -> AsyncGenerator[tuple[PortableValueType, ...]]:
+        # 1 trial ずつ読み込み、pydantic model を経由せずに `Mapping.to_tuple` 相当の行を返す
+        for path in self._trial_paths():
+            for row in iter_portable_rows(await async_read_file(path)):
+                yield row
+
+    @override
+    @staticmethod
+    def from_model(model: TrialRepositoryModel) -> ColumnarTrialRepository:
+        return ColumnarTrialRepository(model.save_dir)
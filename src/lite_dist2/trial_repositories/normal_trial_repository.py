@@ -11,12 +11,15 @@ from lite_dist2.trial_repositories.base_trial_repository import BaseTrialReposit
 from lite_dist2.trial_repositories.trial_repository_model import TrialRepositoryModel
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
     from pathlib import Path
 
     from lite_dist2.type_definitions import TrialRepositoryType
 
 
 class NormalTrialRepository(BaseTrialRepository):
+    SUFFIX = ".json"
+
     def __init__(self, save_dir: Path) -> None:
         self.save_dir = save_dir
 
@@ -40,25 +43,22 @@ class NormalTrialRepository(BaseTrialRepository):
 
     @override
     async def save(self, trial: TrialModel) -> None:
-        path = self.save_dir / f"{trial.trial_id}.json"
-        await async_write_file(path, trial.model_dump_json().encode("utf-8"))
+        await async_write_file(self._trial_path(trial.trial_id), trial.model_dump_json().encode("utf-8"))
 
     @override
     async def load(self, trial_id: str) -> TrialModel:
-        path = self.save_dir / f"{trial_id}.json"
-        content = await async_read_file(path)
+        content = await async_read_file(self._trial_path(trial_id))
         return TrialModel.model_validate_json(content)
 
     @override
     async def load_all(self) -> list[TrialModel]:
-        trials = []
-        if not self.save_dir.exists() or not self.save_dir.is_dir():
-            raise FileNotFoundError(self.save_dir)
+        return [trial async for trial in self.iter_all()]
 
-        for json_path in self.save_dir.glob("*.json"):
-            content = await async_read_file(json_path)
-            trials.append(TrialModel.model_validate_json(content))
-        return trials
+    @override
+    async def iter_all(self) -> AsyncGenerator[TrialModel]:
+        # 1 ファイルずつ読み込むので、メモリに載るのは常に 1 trial 分だけ
+        for path in self._trial_paths():
+            yield await self.load(path.name.removesuffix(self.SUFFIX))
 
     @override
     async def delete_save_dir(self) -> None:
@@ -70,6 +70,14 @@ class NormalTrialRepository(BaseTrialRepository):
             # ディレクトリ自体を削除
             await aiofiles.os.rmdir(self.save_dir)
 
+    def _trial_path(self, trial_id: str) -> Path:
+        return self.save_dir / f"{trial_id}{self.SUFFIX}"
+
+    def _trial_paths(self) -> list[Path]:
+        if not self.save_dir.exists() or not self.save_dir.is_dir():
+            raise FileNotFoundError(self.save_dir)
+        return sorted(self.save_dir.glob(f"*{self.SUFFIX}"))
+
     @override
     def to_model(self) -> TrialRepositoryModel:
         return TrialRepositoryModel(type=self.get_repository_type(), save_dir=self.save_dir)
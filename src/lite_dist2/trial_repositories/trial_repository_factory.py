@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, assert_never
 
+from lite_dist2.trial_repositories.columnar_trial_repository import ColumnarTrialRepository
 from lite_dist2.trial_repositories.normal_trial_repository import NormalTrialRepository
 
 if TYPE_CHECKING:
@@ -13,5 +14,7 @@ def create_trial_repository(model: TrialRepositoryModel) -> BaseTrialRepository:
     match model.type:
         case "normal":
             return NormalTrialRepository.from_model(model)
+        case "columnar":
+            return ColumnarTrialRepository.from_model(model)
         case _ as unreachable:
             assert_never(unreachable)
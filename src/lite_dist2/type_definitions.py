@@ -6,4 +6,4 @@ type PortableValueType = bool | str
 type RawParamType = tuple[PrimitiveValueType, ...]
 type RawResultType = Iterable[PrimitiveValueType] | PrimitiveValueType
 type ConstParamType = int | float | bool | str
-type TrialRepositoryType = Literal["normal"]
+type TrialRepositoryType = Literal["normal", "columnar"]
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import functools
+import itertools
 from typing import TYPE_CHECKING, Self, override
 
 from lite_dist2.expections import LD2InvalidSpaceError, LD2ParameterError
+from lite_dist2.value_models import grid_array
 from lite_dist2.value_models.base_space import BaseSpace, FlattenSegment
 from lite_dist2.value_models.line_segment import DummyLineSegment, LineSegment, LineSegmentPortableModel
 from lite_dist2.value_models.parameter_aligned_space_helper import infinite_product
@@ -11,7 +13,9 @@ from lite_dist2.value_models.point import ParamType, ScalarValue
 from lite_dist2.value_models.space_model import ParameterAlignedSpacePortableModel
 
 if TYPE_CHECKING:
-    from collections.abc import Generator, Sequence
+    from collections.abc import Generator, Hashable, Sequence
+
+    from numpy.typing import NDArray
 
     from lite_dist2.type_definitions import PrimitiveValueType
 
@@ -91,6 +95,95 @@ class ParameterAlignedSpace(BaseSpace):
     def indexed_grid(self) -> Generator[tuple[tuple[int, PrimitiveValueType], ...]]:
         yield from infinite_product(*(axis.indexed_grid() for axis in self.axes))
 
+    def indexed_grid_range(self, start: int, num: int) -> Generator[tuple[tuple[int, PrimitiveValueType], ...]]:
+        """
+        Points `[start, start + num)` of `indexed_grid()`, generated from `start` without walking the points before it.
+        Fewer points are generated if the range exceeds the space.
+        """
+        if start < 0 or num < 0:
+            p = "start, num"
+            t = f"Must be non-negative: {start=}, {num=}"
+            raise LD2ParameterError(p, t)
+
+        indices = self._unravel(start)
+        if indices is None:
+            return
+
+        values = [axis.value_at(i) for axis, i in zip(self.axes, indices, strict=True)]
+        for _ in range(num):
+            yield tuple(
+                (axis.ambient_index + i, value) for axis, i, value in zip(self.axes, indices, values, strict=True)
+            )
+            # 下位の次元から繰り上げる
+            for d in reversed(range(self.dim)):
+                indices[d] += 1
+                size = self.axes[d].size
+                if size is None or indices[d] < size:
+                    values[d] = self.axes[d].value_at(indices[d])
+                    break
+                if d == 0:
+                    return
+                indices[d] = 0
+                values[d] = self.axes[d].value_at(0)
+
+    def indexed_point(self, index: int) -> tuple[tuple[int, PrimitiveValueType], ...]:
+        # indexed_grid() の index 番目の点
+        indices = self._unravel(index) if index >= 0 else None
+        if indices is None:
+            p = "index"
+            t = f"Out of the space: {index}"
+            raise LD2ParameterError(p, t)
+        return tuple((axis.ambient_index + i, axis.value_at(i)) for axis, i in zip(self.axes, indices, strict=True))
+
+    def _unravel(self, index: int) -> list[int] | None:
+        # grid() の index 番目の点を各次元の index に分解する。空間の外なら None
+        # 上限の無い次元は先頭にしか無い
+        indices = [0] * self.dim
+        residual = index
+        for d in reversed(range(self.dim)):
+            size = self.axes[d].size
+            if size is None:
+                indices[d], residual = residual, 0
+            else:
+                residual, indices[d] = divmod(residual, size)
+        if residual > 0:
+            return None
+        return indices
+
+    def grid_columns(self, start: int = 0, stop: int | None = None) -> list[NDArray]:
+        # numpy が必要
+        return grid_array.grid_columns(self, start, stop)
+
+    def grid_value_columns(self) -> list[list[PrimitiveValueType]]:
+        """
+        The same points as `grid()` as one list per axis, built without numpy and without building rows.
+        Each value of an axis is repeated for the points of the lower axes, and the column for the upper axes.
+        """
+        total = self.total
+        if total is None:
+            msg = "Cannot make columns of infinite parameter space"
+            raise LD2InvalidSpaceError(msg)
+        if total == 0:
+            return [[] for _ in self.axes]
+
+        columns = []
+        upper_num = 1
+        for axis in self.axes:
+            axis_values = list(axis.grid())
+            lower_num = total // (upper_num * len(axis_values))
+            column = list(itertools.chain.from_iterable(itertools.repeat(v, lower_num) for v in axis_values))
+            columns.append(column * upper_num)
+            upper_num *= len(axis_values)
+        return columns
+
+    def grid_array(self) -> NDArray:
+        # numpy が必要
+        return grid_array.grid_array(self)
+
+    def grid_chunks(self, chunk_size: int) -> Generator[NDArray]:
+        # numpy が必要
+        yield from grid_array.grid_chunks(self, chunk_size)
+
     @override
     def value_tuple_to_param_type(self, values: tuple[PrimitiveValueType, ...]) -> ParamType:
         # TODO: type="vector" にも対応させる
@@ -203,6 +296,18 @@ class ParameterAlignedSpace(BaseSpace):
             raise LD2ParameterError(msg, f"must be in [0, {self.dim})")
         return target_dim
 
+    def get_merge_key(self, *args: object) -> Hashable | None:
+        # can_merge が True になり得るのは、この key が一致する組だけ
+        target_dim = self._get_target_dim_from_args(*args)
+        if self.filling_dim[target_dim] or not all(self.filling_dim[target_dim + 1 :]):
+            return None
+        ambient_key = tuple((axis.name, axis.type, axis.get_step(), axis.ambient_size) for axis in self.axes)
+        upper_key = tuple(
+            (axis.name, axis.type, axis.size, axis.start, axis.step, axis.ambient_index, axis.ambient_size)
+            for axis in self.axes[:target_dim]
+        )
+        return ambient_key, tuple(self.filling_dim), upper_key
+
     def can_merge(self, other: Self, *args: object) -> bool:
         target_dim = self._get_target_dim_from_args(*args)
         if not self.derived_by_same_ambient_space_with(other):
@@ -7,7 +7,7 @@ from typing import TYPE_CHECKING, Self
 from lite_dist2.expections import LD2InvalidSpaceError
 
 if TYPE_CHECKING:
-    from collections.abc import Generator, Sequence
+    from collections.abc import Generator, Hashable, Sequence
 
     from lite_dist2.type_definitions import PrimitiveValueType
     from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
@@ -89,6 +89,10 @@ class FlattenSegment:
     def get_start_index(self, *_: object) -> int:
         return self.start
 
+    def get_merge_key(self, *_: object) -> Hashable | None:
+        # 全て同じ 1 次元上の区間
+        return 0
+
     def can_merge(self, other: Self, *_: object) -> bool:
         if self.start < other.start:
             smaller = self
@@ -109,8 +113,10 @@ class FlattenSegment:
         else:
             smaller = other
             larger = self
-        merged_size = None if smaller.size is None or larger.size is None else larger.start + larger.size
-        return self.__class__(smaller.start, merged_size)
+        if smaller.size is None or larger.size is None:
+            return self.__class__(smaller.start, None)
+        merged_end = max(smaller.start + smaller.size, larger.start + larger.size)
+        return self.__class__(smaller.start, merged_end - smaller.start)
 
     def next_start_index(self) -> int:
         if self.size is None:
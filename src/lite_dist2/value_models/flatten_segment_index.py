@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import bisect
+from typing import TYPE_CHECKING
+
+from lite_dist2.value_models.base_space import FlattenSegment
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+
+class FlattenSegmentIndex:
+    """
+    Sorted disjoint runs of occupied (done or running) flatten indices.
+    Each run is a half-open range [start, end). `end=None` means the run continues infinitely.
+    """
+
+    def __init__(self, segments: Iterable[FlattenSegment] = ()) -> None:
+        self._starts: list[int] = []
+        self._ends: list[int | None] = []
+        for segment in sorted(segments, key=lambda seg: seg.start):
+            self._append_sorted(segment)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _append_sorted(self, segment: FlattenSegment) -> None:
+        end = self._end_of(segment)
+        if self._starts and self._touches(self._ends[-1], segment.start):
+            self._ends[-1] = self._max_end(self._ends[-1], end)
+            return
+        self._starts.append(segment.start)
+        self._ends.append(end)
+
+    def add(self, segment: FlattenSegment) -> None:
+        if segment.size == 0:
+            return
+        start = segment.start
+        end = self._end_of(segment)
+
+        # 左隣の run が接していれば併合対象に含める
+        lo = bisect.bisect_right(self._starts, start) - 1
+        if lo < 0 or not self._touches(self._ends[lo], start):
+            lo += 1
+        # start が end 以下の run はすべて接しているか重なっている
+        hi = len(self._starts) if end is None else bisect.bisect_right(self._starts, end)
+
+        new_start = start
+        new_end = end
+        if lo < hi:
+            new_start = min(start, self._starts[lo])
+            new_end = self._max_end(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [new_start]
+        self._ends[lo:hi] = [new_end]
+
+    def remove(self, segment: FlattenSegment) -> None:
+        if segment.size == 0:
+            return
+        start = segment.start
+        end = self._end_of(segment)
+
+        lo = bisect.bisect_right(self._starts, start) - 1
+        if lo < 0 or not self._overlaps(self._ends[lo], start):
+            lo += 1
+        hi = len(self._starts) if end is None else bisect.bisect_left(self._starts, end)
+        if lo >= hi:
+            return
+
+        new_starts: list[int] = []
+        new_ends: list[int | None] = []
+        if self._starts[lo] < start:
+            new_starts.append(self._starts[lo])
+            new_ends.append(start)
+        last_end = self._ends[hi - 1]
+        if end is not None and (last_end is None or last_end > end):
+            new_starts.append(end)
+            new_ends.append(last_end)
+        self._starts[lo:hi] = new_starts
+        self._ends[lo:hi] = new_ends
+
+    def add_all(self, segments: Iterable[FlattenSegment]) -> None:
+        for segment in segments:
+            self.add(segment)
+
+    def remove_all(self, segments: Iterable[FlattenSegment]) -> None:
+        for segment in segments:
+            self.remove(segment)
+
+    def find_first_gap(self, total_num: int | None) -> FlattenSegment:
+        if not self._starts:
+            return FlattenSegment(0, None)
+        if self._starts[0] > 0:
+            return FlattenSegment(0, self._starts[0])
+
+        first_end = self._ends[0]
+        if first_end is None:
+            return FlattenSegment(self._starts[0], 0)
+        if len(self._starts) > 1:
+            return FlattenSegment(first_end, self._starts[1] - first_end)
+        if total_num is None or first_end < total_num:
+            return FlattenSegment(first_end, None)
+        return FlattenSegment(first_end, 0)
+
+    def to_segments(self) -> list[FlattenSegment]:
+        return [
+            FlattenSegment(start, None if end is None else end - start)
+            for start, end in zip(self._starts, self._ends, strict=True)
+        ]
+
+    @staticmethod
+    def _end_of(segment: FlattenSegment) -> int | None:
+        return None if segment.size is None else segment.start + segment.size
+
+    @staticmethod
+    def _touches(end: int | None, start: int) -> bool:
+        return end is None or end >= start
+
+    @staticmethod
+    def _overlaps(end: int | None, start: int) -> bool:
+        return end is None or end > start
+
+    @staticmethod
+    def _max_end(a: int | None, b: int | None) -> int | None:
+        if a is None or b is None:
+            return None
+        return max(a, b)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from lite_dist2.expections import LD2InvalidSpaceError, LD2ParameterError
+
+try:
+    import numpy as np
+except ImportError:  # numpy は optional dependency
+    np = None
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+    from numpy.typing import NDArray
+
+    from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+    from lite_dist2.value_models.jagged_space import ParameterJaggedSpace
+    from lite_dist2.value_models.line_segment import LineSegment
+
+# float で誤差なく表せる整数の上限
+_EXACT_FLOAT_INT = 1 << 53
+
+
+def grid_columns(space: ParameterAlignedSpace, start: int = 0, stop: int | None = None) -> list[NDArray]:
+    """
+    Return the grid points `[start, stop)` of `space` (in the same order as `space.grid()`) as one 1-D array per axis.
+    Each array has the dtype of the axis (bool, int64 or float64). Int values beyond int64 are kept in object arrays.
+    """
+    _require_numpy()
+    if stop is None:
+        stop = space.total
+    if stop is None:
+        msg = "stop is required for an infinite space"
+        raise LD2InvalidSpaceError(msg)
+    if not 0 <= start <= stop:
+        p = "start, stop"
+        t = f"Invalid range: [{start}, {stop})"
+        raise LD2ParameterError(p, t)
+    if space.total is not None and stop > space.total:
+        p = "stop"
+        t = f"Larger than total ({space.total})"
+        raise LD2ParameterError(p, t)
+
+    flat = np.arange(start, stop, dtype=np.int64)
+    columns = []
+    lower_num = 1
+    # 下位の次元から順に、flatten index を各次元の index に分解する
+    for axis in reversed(space.axes):
+        index = flat // lower_num
+        if axis.size is not None:
+            index %= axis.size
+            lower_num *= axis.size
+        columns.append(_axis_values(axis, index))
+    return columns[::-1]
+
+
+def grid_array(space: ParameterAlignedSpace) -> NDArray:
+    """
+    Return all grid points of a finite `space` as an array of shape (total, dim).
+    The dtype is promoted over the axes (e.g. int and float axes give float64).
+    """
+    return np.stack(grid_columns(space), axis=1)
+
+
+def grid_chunks(space: ParameterAlignedSpace, chunk_size: int) -> Generator[NDArray]:
+    """
+    Yield the grid points of `space` as arrays of shape (<= chunk_size, dim).
+    Infinite spaces yield chunks endlessly.
+    """
+    if chunk_size <= 0:
+        p = "chunk_size"
+        t = "Must be positive"
+        raise LD2ParameterError(p, t)
+    total = space.total
+    start = 0
+    while total is None or start < total:
+        stop = start + chunk_size if total is None else min(start + chunk_size, total)
+        yield np.stack(grid_columns(space, start, stop), axis=1)
+        start = stop
+
+
+def jagged_grid_columns(space: ParameterJaggedSpace, start: int = 0, stop: int | None = None) -> list[NDArray]:
+    """
+    Same as `grid_columns` for `ParameterJaggedSpace`.
+    """
+    _require_numpy()
+    rows = space.parameters[start:stop]
+    dtypes = {"bool": np.bool_, "int": np.int64, "float": np.float64}
+    return [np.array([row[d] for row in rows], dtype=dtypes[axis.type]) for d, axis in enumerate(space.axes_info)]
+
+
+def _axis_values(axis: LineSegment, index: NDArray) -> NDArray:
+    value_type = type(axis.start)
+    if value_type is int:
+        return _int_axis_values(axis, index)
+    # `LineSegment.grid()` と同じく float で計算してから軸の型に変換する
+    values = float(axis.start) + index * float(axis.step)
+    if value_type is bool:
+        return values != 0
+    return values
+
+
+def _int_axis_values(axis: LineSegment, index: NDArray) -> NDArray:
+    if len(index) == 0:
+        return np.empty(0, dtype=np.int64)
+    start = int(axis.start)
+    step = int(axis.step)
+    # 値は index について単調なので、両端と途中の積が範囲に収まれば int64 で計算しても溢れない
+    # 2^53 未満なら float で計算する `LineSegment.grid()` とも一致する
+    terms = (start, step * int(index.min()), step * int(index.max()))
+    bounds = (*terms, start + terms[1], start + terms[2])
+    if all(abs(v) < _EXACT_FLOAT_INT for v in bounds):
+        return start + step * index
+    values = [axis.value_at(i) for i in index.tolist()]
+    try:
+        return np.array(values, dtype=np.int64)
+    except OverflowError:
+        return np.array(values, dtype=object)
+
+
+def _require_numpy() -> None:
+    if np is None:
+        msg = "numpy is required for array grid. Install it with `pip install lite-dist2[numpy]`."
+        raise ImportError(msg)
@@ -6,6 +6,7 @@ from typing import TYPE_CHECKING, assert_never, override
 
 from lite_dist2.common import float2hex, hex2float, hex2int, int2hex, portablize
 from lite_dist2.expections import LD2ParameterError, LD2UndefinedError
+from lite_dist2.value_models import grid_array
 from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
 from lite_dist2.value_models.base_space import BaseSpace, FlattenSegment
 from lite_dist2.value_models.line_segment import DummyLineSegment, LineSegment, LineSegmentPortableModel
@@ -15,6 +16,8 @@ from lite_dist2.value_models.space_model import ParameterJaggedSpacePortableMode
 if TYPE_CHECKING:
     from collections.abc import Generator
 
+    from numpy.typing import NDArray
+
     from lite_dist2.type_definitions import PortableValueType, PrimitiveValueType
 
 
@@ -24,10 +27,13 @@ class ParameterJaggedSpace(BaseSpace):
         parameters: list[tuple[PrimitiveValueType, ...]],
         ambient_indices: list[tuple[int, ...]],
         axes_info: list[DummyLineSegment],
+        source_space: ParameterAlignedSpace | None = None,
     ) -> None:
         self.parameters = parameters
         self.ambient_indices = ambient_indices
         self.axes_info = axes_info
+        # 点が別の添字空間の部分空間から写されたものなら、占有範囲は点ではなくその部分空間で管理する
+        self.source_space = source_space
 
     @override
     def __eq__(self, other: object) -> bool:
@@ -54,6 +60,16 @@ class ParameterJaggedSpace(BaseSpace):
     def grid(self) -> Generator[tuple[PrimitiveValueType, ...]]:
         yield from self.parameters
 
+    def grid_columns(self, start: int = 0, stop: int | None = None) -> list[NDArray]:
+        # numpy が必要
+        return grid_array.jagged_grid_columns(self, start, stop)
+
+    def grid_value_columns(self) -> list[list[PrimitiveValueType]]:
+        # `ParameterAlignedSpace.grid_value_columns` と同じく、軸ごとの list で返す
+        if not self.parameters:
+            return [[] for _ in self.axes_info]
+        return [list(column) for column in zip(*self.parameters, strict=True)]
+
     @override
     def value_tuple_to_param_type(self, values: tuple[PrimitiveValueType, ...]) -> ParamType:
         return tuple(
@@ -65,6 +81,8 @@ class ParameterJaggedSpace(BaseSpace):
 
     @override
     def to_aligned_list(self) -> list[ParameterAlignedSpace]:
+        if self.source_space is not None:
+            return [self.source_space]
         space_by_line = defaultdict(list)
         for ambient_index, param in zip(self.ambient_indices, self.parameters, strict=True):
             space_by_line[ambient_index[1:]].append(
@@ -101,6 +119,8 @@ class ParameterJaggedSpace(BaseSpace):
 
     @override
     def get_flatten_ambient_start_and_size_list(self) -> list[FlattenSegment]:
+        if self.source_space is not None:
+            return self.source_space.get_flatten_ambient_start_and_size_list()
         lower_element_num_by_dim = self.lower_element_num_by_dim
         flatten_segments = []
         for amb_idx in self.ambient_indices:
@@ -114,6 +134,7 @@ class ParameterJaggedSpace(BaseSpace):
             parameters=[tuple(self._primitive_to_portable(p) for p in primitive) for primitive in self.parameters],
             ambient_indices=[tuple(int2hex(idx) for idx in amb_idx) for amb_idx in self.ambient_indices],
             axes_info=[LineSegmentPortableModel.from_line_segment(axis) for axis in self.axes_info],
+            source_space=None if self.source_space is None else self.source_space.to_model(),
         )
 
     @staticmethod
@@ -137,6 +158,7 @@ class ParameterJaggedSpace(BaseSpace):
             ],
             ambient_indices=[tuple(hex2int(idx) for idx in amb_idx) for amb_idx in model.ambient_indices],
             axes_info=axes_info,
+            source_space=None if model.source_space is None else ParameterAlignedSpace.from_model(model.source_space),
         )
 
     @staticmethod
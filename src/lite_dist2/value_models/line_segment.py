@@ -54,6 +54,10 @@ class LineSegment[T: PrimitiveValueType]:
             yield i + self.ambient_index, self._dtype(fstart + i * fstep)
             i += 1
 
+    def value_at(self, index: int) -> T:
+        # grid() の index 番目の値
+        return self._dtype(float(self.start) + index * float(self.step))
+
     def slice(self, start_index: int, size: int) -> LineSegment[T]:
         if self.size is not None and size > self.size - start_index:
             msg = f"{size=}"
@@ -79,7 +83,7 @@ class LineSegment[T: PrimitiveValueType]:
 
     def merge(self, other: LineSegment, *_: object) -> LineSegment:
         smaller, larger = (self, other) if self.ambient_index < other.ambient_index else (other, self)
-        size = larger.end_index() - smaller.ambient_index + 1
+        size = max(smaller.end_index(), larger.end_index()) - smaller.ambient_index + 1
         return LineSegment[T](
             name=self.name,
             type_=self.type,
@@ -1,13 +1,12 @@
 from __future__ import annotations
 
 import itertools
-from functools import reduce
 from typing import TYPE_CHECKING
 
 from lite_dist2.value_models.protocols import Mergeable
 
 if TYPE_CHECKING:
-    from collections.abc import Generator, Iterable, Sequence
+    from collections.abc import Generator, Hashable, Iterable, Sequence
 
     from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
 
@@ -16,41 +15,26 @@ if TYPE_CHECKING:
 
 
 def simplify[T: Mergeable](mergeables: Sequence[T], *args: object) -> list[T]:
-    new_aps = []
-    mergeables_duplicated_group: dict[int, set[int]] = {}
-    sub_space_num = len(mergeables)
-    mergeables = sorted(mergeables, key=lambda spc: spc.get_start_index(*args))
-
-    for i in range(sub_space_num):
-        for j in range(i + 1, sub_space_num):
-            if mergeables[i].can_merge(mergeables[j], *args):
-                if i in mergeables_duplicated_group:
-                    mergeables_duplicated_group[i].add(j)
-                else:
-                    mergeables_duplicated_group[i] = {j}
-
-    mergeable_group: list[set[int]] = []
-    for i, mergeable_to_i in mergeables_duplicated_group.items():
-        grouplet = mergeable_to_i.union({i})
-        for g in range(len(mergeable_group)):
-            intersection = mergeable_group[g].intersection(grouplet)
-            if len(intersection) > 0:
-                mergeable_group[g] = mergeable_group[g].union(grouplet)
-                break
-        else:
-            mergeable_group.append(grouplet)
-
-    not_mergeables = set(range(sub_space_num)) - reduce(lambda x, y: x.union(y), mergeable_group, set())
-    new_aps.extend([mergeables[i] for i in not_mergeables])
-
-    for group_index_set in mergeable_group:
-        group_space_list: list[T] = sorted(
-            [mergeables[i] for i in group_index_set], key=lambda spc: spc.get_start_index(*args)
-        )
-        merged = group_space_list[0]
-        for space in group_space_list[1:]:
-            merged = merged.merge(space, *args)
-        new_aps.append(merged)
+    # 開始位置でソートした後、同じグループ内で隣接するものを 1 回の走査でまとめる: O(n log n)
+    ordered = sorted(mergeables, key=lambda spc: spc.get_start_index(*args))
+
+    # グループごとに現在まとめている最中の要素の出力位置
+    merging_position: dict[Hashable, int] = {}
+    new_aps: list[T] = []
+    for mergeable in ordered:
+        key = mergeable.get_merge_key(*args)
+        if key is None:
+            # どれともまとめられない
+            new_aps.append(mergeable)
+            continue
+
+        position = merging_position.get(key)
+        if position is not None and new_aps[position].can_merge(mergeable, *args):
+            new_aps[position] = new_aps[position].merge(mergeable, *args)
+            continue
+
+        merging_position[key] = len(new_aps)
+        new_aps.append(mergeable)
 
     return sorted(new_aps, key=lambda spc: spc.get_start_index(*args))
 
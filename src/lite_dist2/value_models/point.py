@@ -39,6 +39,10 @@ class ScalarValue(BaseModel):
             return False
         return self.value_type == other.value_type and self.value == other.value
 
+    def to_hash_key(self) -> tuple[PortableValueType, ...]:
+        # `equal_to` が真になる値同士は同じ key になる
+        return self.type, self.value_type, self.value
+
     def get_value_size(self) -> int:
         return 1
 
@@ -80,6 +84,10 @@ class VectorValue(BaseModel):
             return False
         return self.value_type == other.value_type and self.values == other.values
 
+    def to_hash_key(self) -> tuple[PortableValueType, ...]:
+        # `equal_to` が真になる値同士は同じ key になる
+        return self.type, self.value_type, *self.values
+
     def get_value_size(self) -> int:
         return len(self.values)
 
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
-from typing import Protocol, Self, runtime_checkable
+from typing import TYPE_CHECKING, Protocol, Self, runtime_checkable
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
 
 
 @runtime_checkable
 class Mergeable(Protocol):
+    def get_start_index(self, *args: object) -> int: ...
+    def get_merge_key(self, *args: object) -> Hashable | None: ...
     def can_merge(self, other: Self, *args: object) -> bool: ...
     def merge(self, other: Self, *args: object) -> Self: ...
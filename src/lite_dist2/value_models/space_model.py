@@ -30,6 +30,7 @@ class ParameterJaggedSpacePortableModel(BaseModel):
     parameters: list[tuple[PortableValueType, ...]]
     ambient_indices: list[tuple[str, ...]]
     axes_info: list[LineSegmentPortableModel]
+    source_space: ParameterAlignedSpacePortableModel | None = None
 
 
 type SpacePortableModelType = ParameterAlignedSpacePortableModel | ParameterJaggedSpacePortableModel
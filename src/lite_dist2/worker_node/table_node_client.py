@@ -1,36 +1,106 @@
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal, assert_never
 
 import httpx
 
 from lite_dist2.curriculum_models.study_status import StudyStatus
 from lite_dist2.curriculum_models.trial import Trial
-from lite_dist2.expections import LD2TableNodeServerError
-from lite_dist2.table_node_api.table_param import StudyRegisterParam, TrialRegisterParam, TrialReserveParam
+from lite_dist2.curriculum_models.trial_result import TrialResultModel
+from lite_dist2.expections import LD2ParameterError, LD2TableNodeServerError
+from lite_dist2.table_node_api import msgpack_codec
+from lite_dist2.table_node_api.http_compression import compress, parse_encodings
+from lite_dist2.table_node_api.table_param import (
+    StudyRegisterParam,
+    TrialRegisterBatchParam,
+    TrialRegisterParam,
+    TrialReserveBatchParam,
+    TrialReserveParam,
+    TrialResultRegisterBatchParam,
+    TrialResultRegisterParam,
+)
 from lite_dist2.table_node_api.table_response import (
     OkResponse,
     StudyRegisteredResponse,
     StudyResponse,
+    TrialRegisterBatchResponse,
+    TrialReserveBatchResponse,
     TrialReserveResponse,
 )
 
 if TYPE_CHECKING:
-    from typing import Any, ClassVar
+    from collections.abc import Sequence
+    from types import TracebackType
+    from typing import Any, ClassVar, Self
 
     from pydantic import BaseModel
 
+    from lite_dist2.table_node_api.http_compression import ContentEncoding
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class TableNodeClient:
+    """
+    Client of the table node API.
+    Inside `async with client:` all requests share one `httpx.AsyncClient`, so that the connections are kept alive.
+    Outside of it, a client is created for each request.
+    Request bodies are compressed with `compression` once the table node has advertised that it accepts it.
+    With `wire_format="msgpack"`, request and response bodies are msgpack instead of json.
+    """
+
     INSTANT_API_TIMEOUT_SECONDS = 10
     HEADERS: ClassVar[dict[str, str]] = {"Content-Type": "application/json; charset=utf-8"}
 
-    def __init__(self, ip: str, port: int | str) -> None:
+    def __init__(
+        self,
+        ip: str,
+        port: int | str,
+        *,
+        timeout_seconds: float = 30,
+        pool_size: int = 4,
+        keepalive_expiry_seconds: float = 30,
+        http2: bool = False,
+        compression: ContentEncoding | None = None,
+        compression_minimum_size: int = 1024,
+        wire_format: Literal["json", "msgpack"] = "json",
+    ) -> None:
         self.domain = f"http://{ip}:{port}"
+        self.timeout_seconds = timeout_seconds
+        self.pool_size = pool_size
+        self.keepalive_expiry_seconds = keepalive_expiry_seconds
+        self.http2 = http2
+        self.compression = compression
+        self.compression_minimum_size = compression_minimum_size
+        self.wire_format = wire_format
+        self._client: httpx.AsyncClient | None = None
+        # テーブルノードが受け付ける圧縮形式。レスポンスの Accept-Encoding を見るまでは分からない
+        self._accepted_encodings: set[str] | None = None
+        # `/trial/register_result` の無い古いテーブルノードには、以降 trial ごと送る
+        self._supports_register_result = True
+        # 一括登録の無い古いテーブルノードには、以降 1 つずつ登録する
+        self._supports_register_batch = True
+
+    async def __aenter__(self) -> Self:
+        if self._client is None:
+            self._client = self._create_client()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
 
     async def ping(self) -> bool:
         try:
@@ -55,11 +125,14 @@ class TableNodeClient:
         worker_name: str | None,
         max_size: int,
         retaining_capacity: set[str],
+        *,
         timeout_seconds: int,
+        target_duration_seconds: float | None = None,
     ) -> Trial | None:
         param = TrialReserveParam(
             retaining_capacity=retaining_capacity,
             max_size=max_size,
+            target_duration_seconds=target_duration_seconds,
             worker_node_name=worker_name,
             worker_node_id=worker_id,
         )
@@ -74,13 +147,125 @@ class TableNodeClient:
         logger.info("Reserved trial (size=%d)", trial.parameter_space.total)
         return trial
 
-    async def register_trial(self, trial: Trial, timeout_seconds: int) -> None:
-        param = TrialRegisterParam(trial=trial.to_model())
-        status_code, _ = await self._post("/trial/register", timeout_seconds, param)
-        if status_code == 409:
+    async def register_trial(self, trial: Trial, timeout_seconds: int) -> bool:
+        """
+        Register the done trial, and return whether the table node accepted it.
+        """
+        try:
+            status_code = await self._register_result(trial, timeout_seconds)
+            if status_code is None:
+                status_code, _ = await self._post(
+                    "/trial/register", timeout_seconds, TrialRegisterParam(trial=trial.to_model())
+                )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code not in {httpx.codes.NOT_FOUND, httpx.codes.CONFLICT}:
+                raise
+            status_code = e.response.status_code
+        if status_code in {httpx.codes.NOT_FOUND, httpx.codes.CONFLICT}:
             logger.warning("Failed to register trial. This trial might be timed out or study might be cancelled.")
-        elif status_code != 200:
+            return False
+        if status_code != 200:
             logger.warning("Failed to register trial.")
+            return False
+        return True
+
+    async def _register_result(self, trial: Trial, timeout_seconds: int) -> int | None:
+        # パラメータはテーブルノードが知っているので、結果だけを列ごとに詰めて送る。送れなければ None
+        if not self._supports_register_result:
+            return None
+        try:
+            param = TrialResultRegisterParam(result=TrialResultModel.from_trial(trial))
+        except LD2ParameterError:
+            logger.warning("Results do not match the parameter space. Register the whole trial instead.")
+            return None
+        try:
+            status_code, _ = await self._post("/trial/register_result", timeout_seconds, param)
+        except httpx.HTTPStatusError as e:
+            if not _is_unsupported_route(e.response):
+                raise
+            logger.warning("Table node does not support /trial/register_result. Register the whole trial instead.")
+            self._supports_register_result = False
+            return None
+        return status_code
+
+    async def reserve_trials(
+        self,
+        worker_id: str,
+        worker_name: str | None,
+        max_size: int,
+        retaining_capacity: set[str],
+        *,
+        trial_num: int,
+        timeout_seconds: int,
+        target_duration_seconds: float | None = None,
+    ) -> list[Trial]:
+        param = TrialReserveBatchParam(
+            retaining_capacity=retaining_capacity,
+            max_size=max_size,
+            target_duration_seconds=target_duration_seconds,
+            worker_node_name=worker_name,
+            worker_node_id=worker_id,
+            trial_num=trial_num,
+        )
+        _, d = await self._post("/trial/reserve_batch", timeout_seconds, param)
+
+        resp = TrialReserveBatchResponse.model_validate(d)
+        if not resp.trials:
+            logger.info("Cannot reserve trial")
+            return []
+
+        trials = [Trial.from_model(trial) for trial in resp.trials]
+        logger.info("Reserved %d trials", len(trials))
+        return trials
+
+    async def register_trials(self, trials: Sequence[Trial], timeout_seconds: int) -> list[str]:
+        """
+        Register the done trials at once, and return the ids of the trials that the table node rejected.
+        Only the results are sent like `register_trial`.
+        Without the batch endpoints, the trials are registered one by one.
+        """
+        rejected_trial_ids = []
+        if self._supports_register_batch:
+            try:
+                rejected_trial_ids = await self._register_batch(trials, timeout_seconds)
+            except httpx.HTTPStatusError as e:
+                if not _is_unsupported_route(e.response):
+                    raise
+                logger.warning("Table node does not support batch registration. Register trials one by one instead.")
+                self._supports_register_batch = False
+        if not self._supports_register_batch:
+            rejected_trial_ids = [
+                trial.trial_id for trial in trials if not await self.register_trial(trial, timeout_seconds)
+            ]
+
+        if rejected_trial_ids:
+            logger.warning(
+                "Failed to register trials: %s. These trials might be timed out or studies might be cancelled.",
+                ", ".join(rejected_trial_ids),
+            )
+        return rejected_trial_ids
+
+    async def _register_batch(self, trials: Sequence[Trial], timeout_seconds: int) -> list[str]:
+        # 結果だけを送れない trial は trial ごと送る
+        results = []
+        whole_trials = []
+        for trial in trials:
+            try:
+                results.append(TrialResultModel.from_trial(trial))
+            except LD2ParameterError:
+                whole_trials.append(trial.to_model())
+
+        rejected_trial_ids = []
+        if results:
+            param = TrialResultRegisterBatchParam(results=results)
+            _, d = await self._post("/trial/register_result_batch", timeout_seconds, param)
+            rejected_trial_ids.extend(TrialRegisterBatchResponse.model_validate(d).rejected_trial_ids)
+        if whole_trials:
+            _, d = await self._post(
+                "/trial/register_batch", timeout_seconds, TrialRegisterBatchParam(trials=whole_trials)
+            )
+            rejected_trial_ids.extend(TrialRegisterBatchResponse.model_validate(d).rejected_trial_ids)
+        return rejected_trial_ids
 
     async def study(self, study_id: str | None = None, name: str | None = None) -> StudyResponse | None:
         _, resp = await self._get("/study", self.INSTANT_API_TIMEOUT_SECONDS, {"study_id": study_id, "name": name})
@@ -100,25 +285,120 @@ class TableNodeClient:
         timeout_seconds: int,
         query: dict[str, str | None] | None = None,
     ) -> tuple[int, dict[str, Any]]:
-        url = f"{self.domain}{path}"
         _query = None if query is None else {k: v for k, v in query.items() if v is not None}
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url,
-                headers=self.HEADERS,
-                params=_query,
-                timeout=timeout_seconds,
-            )
-        return response.status_code, response.json()
+        response = await self._request("GET", path, timeout_seconds, query=_query)
+        return response.status_code, self._decode(response)
 
     async def _post(self, path: str, timeout_seconds: int, body: BaseModel) -> tuple[int, dict[str, Any]]:
-        url = f"{self.domain}{path}"
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                headers=self.HEADERS,
-                json=body.model_dump(mode="json"),
-                timeout=timeout_seconds,
-            )
+        response = await self._request("POST", path, timeout_seconds, content=self._encode(body))
         response.raise_for_status()
-        return response.status_code, response.json()
+        return response.status_code, self._decode(response)
+
+    def _encode(self, body: BaseModel) -> bytes:
+        match self.wire_format:
+            case "json":
+                return body.model_dump_json().encode("utf-8")
+            case "msgpack":
+                return msgpack_codec.pack_model(body)
+            case _ as unreachable:
+                assert_never(unreachable)
+
+    @staticmethod
+    def _decode(response: httpx.Response) -> dict[str, Any]:
+        # エラーのレスポンスは msgpack を指定していても json で返ってくる
+        if msgpack_codec.is_msgpack(response.headers.get("Content-Type")):
+            return msgpack_codec.unpackb(response.content)
+        return response.json()
+
+    async def _request(
+        self,
+        method: Literal["GET", "POST"],
+        path: str,
+        timeout_seconds: int,
+        query: dict[str, str] | None = None,
+        content: bytes | None = None,
+    ) -> httpx.Response:
+        encoding = self._choose_request_encoding(content)
+        if content is None or encoding is None:
+            return await self._send(method, path, timeout_seconds, query=query, content=content, headers={})
+
+        compressed = compress(content, encoding)
+        response = await self._send(
+            method,
+            path,
+            timeout_seconds,
+            query=query,
+            content=compressed,
+            headers={"Content-Encoding": encoding},
+        )
+        if response.status_code == httpx.codes.UNSUPPORTED_MEDIA_TYPE:
+            # 受け付けられない圧縮形式だったので、圧縮せずに送り直す
+            return await self._send(method, path, timeout_seconds, query=query, content=content, headers={})
+        return response
+
+    async def _send(
+        self,
+        method: Literal["GET", "POST"],
+        path: str,
+        timeout_seconds: int,
+        *,
+        query: dict[str, str] | None,
+        content: bytes | None,
+        headers: dict[str, str],
+    ) -> httpx.Response:
+        if self.wire_format == "msgpack":
+            media_types = f"{msgpack_codec.MSGPACK_MEDIA_TYPE}, application/json"
+            headers = {"Content-Type": msgpack_codec.MSGPACK_MEDIA_TYPE, "Accept": media_types} | headers
+        if self._client is not None:
+            response = await self._client.request(
+                method, path, params=query, content=content, headers=headers, timeout=timeout_seconds
+            )
+        else:
+            # context manager の外では従来どおりリクエストごとに client を作る
+            async with self._create_client() as client:
+                response = await client.request(
+                    method, path, params=query, content=content, headers=headers, timeout=timeout_seconds
+                )
+        accept_encoding = response.headers.get("Accept-Encoding")
+        if accept_encoding is not None:
+            self._accepted_encodings = set(parse_encodings(accept_encoding))
+        return response
+
+    def _choose_request_encoding(self, content: bytes | None) -> ContentEncoding | None:
+        if (
+            content is None
+            or self.compression is None
+            or len(content) < self.compression_minimum_size
+            or self._accepted_encodings is None
+            or self.compression not in self._accepted_encodings
+        ):
+            return None
+        return self.compression
+
+    def _create_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=self.keepalive_expiry_seconds,
+        )
+        return httpx.AsyncClient(
+            base_url=self.domain,
+            headers=self.HEADERS,
+            timeout=self.timeout_seconds,
+            limits=limits,
+            http2=self.http2,
+        )
+
+
+def _is_unsupported_route(response: httpx.Response) -> bool:
+    # study が無いときの 404 と区別する。route が無いときの 404 は FastAPI の既定の detail で返ってくる
+    if response.status_code == httpx.codes.METHOD_NOT_ALLOWED:
+        return True
+    if response.status_code != httpx.codes.NOT_FOUND:
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    detail = body.get("detail") if isinstance(body, dict) else None
+    return not (isinstance(detail, str) and detail.startswith("Study not found"))
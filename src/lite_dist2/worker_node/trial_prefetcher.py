@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from types import TracebackType
+    from typing import Self
+
+    from lite_dist2.config import WorkerConfig
+    from lite_dist2.curriculum_models.trial import Trial
+    from lite_dist2.worker_node.table_node_client import TableNodeClient
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TrialPrefetcher:
+    """
+    Reserve trials in the background so that the next trial is ready as soon as the current one is computed.
+    The free slots of the queue are filled with one `/trial/reserve_batch` request.
+    At most `WorkerConfig.prefetch_trial_num` trials wait in the queue. If `WorkerConfig.trial_timeout_seconds` is set,
+    the number is also limited to the trials that can be computed before they time out, and a trial that has waited
+    longer than the timeout is dropped.
+    """
+
+    def __init__(
+        self,
+        client: TableNodeClient,
+        worker_id: str,
+        config: WorkerConfig,
+        stop_at_no_trial: bool = False,
+    ) -> None:
+        self.client = client
+        self.worker_id = worker_id
+        self.config = config
+        self.stop_at_no_trial = stop_at_no_trial
+        self._queue: asyncio.Queue[tuple[Trial, float] | None] = asyncio.Queue()
+        self._condition = asyncio.Condition()
+        self._is_busy = False
+        self._last_run_seconds: float | None = None
+        self._reserver: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> Self:
+        self._reserver = asyncio.create_task(self._reserve_loop())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        if self._reserver is None:
+            return
+        reserver = self._reserver
+        self._reserver = None
+        if reserver.done():
+            # 予約中のエラーは `get` で送出済み
+            if not reserver.cancelled():
+                reserver.exception()
+            return
+        reserver.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await reserver
+
+    async def get(self) -> Trial | None:
+        # None は `stop_at_no_trial` で trial が無くなったことを表す
+        while True:
+            item = await self._next_item()
+            if item is None:
+                return None
+            trial, reserved_at = item
+            expired = self._is_expired(reserved_at)
+            async with self._condition:
+                self._is_busy = not expired
+                self._condition.notify_all()
+            if not expired:
+                return trial
+            logger.warning("Dropped prefetched trial %s since it might be timed out.", trial.trial_id)
+
+    async def finish(self, run_seconds: float) -> None:
+        async with self._condition:
+            self._is_busy = False
+            self._last_run_seconds = run_seconds
+            self._condition.notify_all()
+
+    def get_prefetch_limit(self) -> int:
+        limit = self.config.prefetch_trial_num
+        timeout = self.config.trial_timeout_seconds
+        if timeout is None or not self._last_run_seconds:
+            return limit
+        # 待機中の k 番目の trial は (k + 1) 回分の計算を終えるまでにタイムアウトしてはならない
+        return max(0, min(limit, int(timeout // self._last_run_seconds) - 1))
+
+    def _count_room(self) -> int:
+        # 計算中の trial が無ければ、先読みしない設定 (limit = 0) でも 1 つは予約する
+        waiting = self._queue.qsize() + int(self._is_busy)
+        return max(0, self.get_prefetch_limit() + 1 - waiting)
+
+    def _has_room(self) -> bool:
+        return self._count_room() > 0
+
+    def _is_expired(self, reserved_at: float) -> bool:
+        timeout = self.config.trial_timeout_seconds
+        return timeout is not None and time.monotonic() - reserved_at > timeout
+
+    async def _next_item(self) -> tuple[Trial, float] | None:
+        if self._reserver is None:
+            msg = "TrialPrefetcher must be used as an async context manager"
+            raise RuntimeError(msg)
+        getter = asyncio.create_task(self._queue.get())
+        done, _ = await asyncio.wait({getter, self._reserver}, return_when=asyncio.FIRST_COMPLETED)
+        # 予約済みの trial があれば、予約中のエラーより先に返す
+        if getter not in done and (error := self._reserver.exception()) is not None:
+            getter.cancel()
+            raise error
+        return await getter
+
+    async def _reserve_loop(self) -> None:
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(self._has_room)
+                room = self._count_room()
+            trials = await self.client.reserve_trials(
+                self.worker_id,
+                self.config.name,
+                self.config.max_size,
+                self.config.retaining_capacity,
+                trial_num=room,
+                timeout_seconds=self.config.table_node_request_timeout_seconds,
+                target_duration_seconds=self.config.target_trial_duration_seconds,
+            )
+            if trials:
+                reserved_at = time.monotonic()
+                for trial in trials:
+                    self._queue.put_nowait((trial, reserved_at))
+                continue
+            if self.stop_at_no_trial:
+                self._queue.put_nowait(None)
+                return
+            logger.info("No trial. Waiting %d seconds...", self.config.wait_seconds_on_no_trial)
+            await asyncio.sleep(self.config.wait_seconds_on_no_trial)
@@ -9,11 +9,13 @@ from typing import TYPE_CHECKING, Any, assert_never, override
 
 import tqdm
 
-from lite_dist2.expections import LD2TypeError
+from lite_dist2.expections import LD2InvalidSpaceError, LD2ParameterError, LD2TypeError
 from lite_dist2.type_definitions import ConstParamType, PrimitiveValueType
 
 if TYPE_CHECKING:
-    from collections.abc import Iterator, Mapping
+    from collections.abc import Generator, Iterator, Mapping
+
+    from numpy.typing import NDArray
 
     from lite_dist2.config import WorkerConfig
     from lite_dist2.curriculum_models.trial import Trial
@@ -198,3 +200,81 @@ class ManualMPTrialRunner(BaseTrialRunner, abc.ABC):
         **kwargs: object,
     ) -> list[tuple[RawParamType, RawResultType]]:
         return self.batch_func(parameter_space.grid(), config, *args, **kwargs)
+
+
+class VectorizedTrialRunner(BaseTrialRunner, abc.ABC):
+    """
+    Passes the parameters to `batch_array_func` as one NumPy array per axis, so that the whole block of grid
+    points can be processed by vectorized kernels. NumPy is required.
+    """
+
+    @override
+    def func(self, parameters: RawParamType, *args: object, **kwargs: object) -> RawResultType:
+        return 0
+
+    @abc.abstractmethod
+    def batch_array_func(
+        self,
+        param_columns: list[NDArray],
+        config: WorkerConfig,
+        *args: object,
+        **kwargs: object,
+    ) -> NDArray:
+        """
+        `param_columns` has one 1-D array of length n for each axis.
+        Return an array of shape (n,) for scalar results or (n, result size) for vector results.
+        """
+
+    def iter_array_chunks(
+        self,
+        parameter_space: ParameterSpaceType,
+        config: WorkerConfig,
+        *args: object,
+        **kwargs: object,
+    ) -> Generator[tuple[list[NDArray], NDArray]]:
+        total = parameter_space.total
+        if total is None:
+            msg = "Cannot run infinite parameter space"
+            raise LD2InvalidSpaceError(msg)
+        chunk_size = config.vector_chunk_size or max(total, 1)
+        with tqdm.tqdm(total=total, disable=config.disable_function_progress_bar) as p_bar:
+            for start in range(0, total, chunk_size):
+                stop = min(start + chunk_size, total)
+                param_columns = parameter_space.grid_columns(start, stop)
+                results = self.batch_array_func(param_columns, config, *args, **kwargs)
+                if len(results) != stop - start:
+                    p = "results"
+                    t = f"Expected {stop - start} results but got {len(results)}"
+                    raise LD2ParameterError(p, t)
+                yield param_columns, results
+                p_bar.update(stop - start)
+
+    @override
+    def wrap_func(
+        self,
+        parameter_space: ParameterSpaceType,
+        config: WorkerConfig,
+        pool: Pool | ProcessPoolExecutor | None = None,
+        *args: object,
+        **kwargs: object,
+    ) -> list[tuple[RawParamType, RawResultType]]:
+        raw_mappings: list[tuple[RawParamType, RawResultType]] = []
+        for param_columns, results in self.iter_array_chunks(parameter_space, config, *args, **kwargs):
+            params = zip(*(column.tolist() for column in param_columns), strict=True)
+            raw_mappings.extend(zip(params, results.tolist(), strict=True))
+        return raw_mappings
+
+    @override
+    def run(
+        self,
+        trial: Trial,
+        config: WorkerConfig,
+        pool: Pool | ProcessPoolExecutor | None = None,
+        *args: object,
+        **kwargs: object,
+    ) -> Trial:
+        mappings = []
+        for param_columns, results in self.iter_array_chunks(trial.parameter_space, config, *args, **kwargs):
+            mappings.extend(trial.convert_mappings_from_arrays(param_columns, results))
+        trial.set_result(mappings)
+        return trial
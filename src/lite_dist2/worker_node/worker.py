@@ -2,17 +2,20 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 import uuid
 from typing import TYPE_CHECKING, Annotated
 
 from lite_dist2.expections import LD2TableNodeServerError
 from lite_dist2.worker_node.table_node_client import TableNodeClient
+from lite_dist2.worker_node.trial_prefetcher import TrialPrefetcher
 
 if TYPE_CHECKING:
     from concurrent.futures import ProcessPoolExecutor
     from multiprocessing.pool import Pool
 
     from lite_dist2.config import WorkerConfig
+    from lite_dist2.curriculum_models.trial import Trial
     from lite_dist2.worker_node.trial_runner import BaseTrialRunner
 
 
@@ -33,19 +36,42 @@ class Worker:
         ] = None,
     ) -> None:
         self.trial_runner = trial_runner
-        self.client = TableNodeClient(ip, port)
+        self.client = TableNodeClient(
+            ip,
+            port,
+            timeout_seconds=config.table_node_request_timeout_seconds,
+            pool_size=config.table_node_connection_pool_size,
+            keepalive_expiry_seconds=config.table_node_keepalive_expiry_seconds,
+            http2=config.use_http2,
+            compression=config.request_compression,
+            compression_minimum_size=config.request_compression_minimum_size,
+            wire_format=config.wire_format,
+        )
         self.pool = pool
         self.config = config
         self.id = str(uuid.uuid1())
+        # テーブルノードに登録を断られた trial の id。タイムアウトしたか、study が取り消された
+        self.rejected_trial_ids: list[str] = []
 
     def start(self, stop_at_no_trial: bool = False, *args: object, **kwargs: object) -> None:
         asyncio.run(self.start_async(stop_at_no_trial, *args, **kwargs))
 
     async def start_async(self, stop_at_no_trial: bool = False, *args: object, **kwargs: object) -> None:
+        # 接続を使い回すため、worker が動いている間は同じ client を使う
+        async with self.client:
+            await self._loop(stop_at_no_trial, *args, **kwargs)
+
+    async def _loop(self, stop_at_no_trial: bool, *args: object, **kwargs: object) -> None:
         if not await self.client.ping():
             msg = "Table node server not responding"
             raise LD2TableNodeServerError(msg)
 
+        if self.config.pipelined:
+            await self._pipelined_loop(stop_at_no_trial, *args, **kwargs)
+            logger.info("No trial. Stop worker after saving.")
+            await self.client.save()
+            return
+
         while True:
             has_next = await self._step(*args, **kwargs)
             if (not has_next) and stop_at_no_trial:
@@ -62,12 +88,59 @@ class Worker:
             self.config.name,
             self.config.max_size,
             self.config.retaining_capacity,
-            self.config.table_node_request_timeout_seconds,
+            timeout_seconds=self.config.table_node_request_timeout_seconds,
+            target_duration_seconds=self.config.target_trial_duration_seconds,
         )
         if trial is None:
             return False
 
         kwargs |= trial.const_param.to_dict() if trial.const_param is not None else {}
+        start = time.monotonic()
         done_trial = self.trial_runner.run(trial, self.config, self.pool, *args, **kwargs)
-        await self.client.register_trial(done_trial, self.config.table_node_request_timeout_seconds)
+        # テーブルノードは計算にかかった時間からこのワーカーノードの速度を見積もる
+        done_trial.compute_seconds = time.monotonic() - start
+        if not await self.client.register_trial(done_trial, self.config.table_node_request_timeout_seconds):
+            self.rejected_trial_ids.append(done_trial.trial_id)
         return True
+
+    async def _pipelined_loop(self, stop_at_no_trial: bool, *args: object, **kwargs: object) -> None:
+        # 予約は TrialPrefetcher が裏で行い、計算は別スレッド、登録はバックグラウンドで行う
+        # 登録中に計算が終わった trial は溜めておき、次の一括登録でまとめて送る
+        upload: asyncio.Task[None] | None = None
+        done_trials: list[Trial] = []
+        max_upload_num = max(1, self.config.prefetch_trial_num)
+        try:
+            async with TrialPrefetcher(self.client, self.id, self.config, stop_at_no_trial) as prefetcher:
+                while (trial := await prefetcher.get()) is not None:
+                    run_kwargs = kwargs | (trial.const_param.to_dict() if trial.const_param is not None else {})
+                    start = time.monotonic()
+                    done_trial = await asyncio.to_thread(
+                        self.trial_runner.run,
+                        trial,
+                        self.config,
+                        self.pool,
+                        *args,
+                        **run_kwargs,
+                    )
+                    done_trial.compute_seconds = time.monotonic() - start
+                    await prefetcher.finish(done_trial.compute_seconds)
+                    done_trials.append(done_trial)
+
+                    if upload is not None and (upload.done() or len(done_trials) >= max_upload_num):
+                        await upload
+                        upload = None
+                    if upload is None:
+                        upload = asyncio.create_task(self._register_trials(done_trials))
+                        done_trials = []
+            if upload is not None:
+                await upload
+                upload = None
+            if done_trials:
+                await self._register_trials(done_trials)
+        finally:
+            if upload is not None:
+                upload.cancel()
+
+    async def _register_trials(self, trials: list[Trial]) -> None:
+        rejected_trial_ids = await self.client.register_trials(trials, self.config.table_node_request_timeout_seconds)
+        self.rejected_trial_ids.extend(rejected_trial_ids)
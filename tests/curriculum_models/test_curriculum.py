@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import timedelta
 from pathlib import Path
 from typing import TYPE_CHECKING, override
 
 import pytest
 
+from lite_dist2.common import publish_timestamp
 from lite_dist2.config import TableConfig, TableConfigProvider
 from lite_dist2.curriculum_models.curriculum import Curriculum, CurriculumModel
 from lite_dist2.curriculum_models.mapping import Mapping, MappingsStorage
@@ -28,6 +34,8 @@ if TYPE_CHECKING:
     from lite_dist2.trial_repositories.base_trial_repository import BaseTrialRepository
     from lite_dist2.value_models.space_type import ParameterSpaceType
 
+logger = logging.getLogger(__name__)
+
 _DUMMY_TRIAL_PATH_DIR = Path(__file__).parent
 
 _DUMMY_PARAMETER_SPACE = ParameterAlignedSpace(
@@ -219,6 +227,22 @@ async def test_curriculum_to_storage_if_done(
     assert curriculum.storages[0].study_id == "done_study"
 
 
+@pytest.mark.asyncio
+async def test_curriculum_to_storage_if_done_concurrently(
+    done_study_fixture: MockStudy,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    mock_table_config = TableConfig(curriculum_path=tmp_path / "curriculum.json")
+    monkeypatch.setattr(TableConfigProvider, "get", lambda: mock_table_config)
+
+    curriculum = Curriculum(studies=[done_study_fixture], storages=[], trial_file_dir=_DUMMY_TRIAL_PATH_DIR)
+    await asyncio.gather(*(curriculum.to_storage_if_done() for _ in range(10)))
+
+    assert curriculum.studies == []
+    assert [storage.study_id for storage in curriculum.storages] == ["done_study"]
+
+
 @pytest.fixture
 def sample_curriculum_fixture() -> Curriculum:
     studies = [
@@ -338,6 +362,65 @@ async def test_curriculum_save_and_load(tmp_path: str, sample_curriculum_fixture
     assert loaded_curriculum.storages[0].name == sample_curriculum_fixture.storages[0].name
 
 
+@pytest.mark.asyncio
+async def test_curriculum_save_reuses_unchanged_studies(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    studies = [_create_stress_study(f"s{i:02d}", tmp_path) for i in range(3)]
+    curriculum = Curriculum(studies=studies, storages=[], trial_file_dir=tmp_path)
+    json_path = tmp_path / "curriculum.json"
+    await curriculum.save(json_path)
+
+    serialized_ids = []
+    original_to_model = Study.to_model
+
+    def spy_to_model(self: Study) -> StudyModel:
+        serialized_ids.append(self.study_id)
+        return original_to_model(self)
+
+    monkeypatch.setattr(Study, "to_model", spy_to_model)
+    await studies[1].suggest_next_trial(5, "w01", "w01")
+    await curriculum.save(json_path)
+
+    # 変更のあった study だけを作り直し、保存結果は全体を保存したものと一致する
+    assert serialized_ids == ["s01"]
+    assert CurriculumModel.model_validate_json(json_path.read_bytes()) == curriculum.to_model()
+    assert [path.name for path in tmp_path.iterdir() if path.is_file()] == ["curriculum.json"]
+
+
+@pytest.mark.asyncio
+async def test_curriculum_save_waits_for_storing_trials(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    study = _create_stress_study("s01", tmp_path)
+    await study.trial_repo.clean_save_dir()
+    curriculum = Curriculum(studies=[study], storages=[], trial_file_dir=tmp_path)
+    json_path = tmp_path / "curriculum.json"
+    trial = await study.suggest_next_trial(5, "w01", "w01")
+    assert trial is not None
+    trial.set_result(trial.convert_mappings_from([(param, sum(param)) for param in trial.parameter_space.grid()]))
+
+    gate = asyncio.Event()
+    original_save = study.trial_repo.save
+
+    async def slow_save(trial_model: TrialModel) -> None:
+        await gate.wait()
+        await original_save(trial_model)
+
+    monkeypatch.setattr(study.trial_repo, "save", slow_save)
+    receipt = asyncio.create_task(study.receipt_trial(trial))
+    await asyncio.sleep(0)
+    assert study.trial_table.count_grid() == 5
+
+    # テーブルでは done だが結果はまだ保存中なので、snapshot を取らずに待つ
+    save = asyncio.create_task(curriculum.save(json_path))
+    await asyncio.sleep(0.05)
+    assert not save.done()
+    assert not json_path.exists()
+
+    gate.set()
+    await asyncio.gather(receipt, save)
+    saved = CurriculumModel.model_validate_json(json_path.read_bytes())
+    assert TrialTable.from_model(saved.studies[0].trial_table).count_grid() == 5
+    assert (await study.trial_repo.load(trial.trial_id)).results is not None
+
+
 @pytest.mark.asyncio
 async def test_curriculum_load_or_create_empty(tmp_path: str) -> None:
     json_path = Path(f"{tmp_path}/non_existent.json")
@@ -348,27 +431,35 @@ async def test_curriculum_load_or_create_empty(tmp_path: str) -> None:
     assert len(curriculum.storages) == 0
 
 
+@pytest.mark.asyncio
 @pytest.mark.parametrize(
-    ("retaining_capacity", "expected_study_id"),
+    ("retaining_capacity", "expected_study_id", "expected_study_ids"),
     [
         pytest.param(
             {"hash", "preimage"},
             "hash_2",
+            ["hash_2", "hash_1", "hash_3"],
             id="obtain running",
         ),
         pytest.param(
             {"hash"},
             "hash_1",
+            ["hash_1"],
             id="obtain low required wait",
         ),
         pytest.param(
             {"mandelbrot"},
             None,
+            [],
             id="obtain nothing",
         ),
     ],
 )
-def test_curriculum_get_available_study(retaining_capacity: set[str], expected_study_id: str | None) -> None:
+async def test_curriculum_get_available_study(
+    retaining_capacity: set[str],
+    expected_study_id: str | None,
+    expected_study_ids: list[str],
+) -> None:
     curriculum = Curriculum(
         studies=[
             Study(
@@ -430,10 +521,13 @@ def test_curriculum_get_available_study(retaining_capacity: set[str], expected_s
         trial_file_dir=_DUMMY_TRIAL_PATH_DIR,
     )
 
-    study = curriculum.get_available_study(retaining_capacity)
+    study = await curriculum.get_available_study(retaining_capacity)
     assert (study.study_id if study is not None else None) == expected_study_id
+    studies = await curriculum.get_available_studies(retaining_capacity)
+    assert [study.study_id for study in studies] == expected_study_ids
 
 
+@pytest.mark.asyncio
 @pytest.mark.parametrize(
     ("study_id", "name", "expected_id", "expected_storages"),
     [
@@ -551,7 +645,7 @@ def test_curriculum_get_available_study(retaining_capacity: set[str], expected_s
         ),
     ],
 )
-def test_curriculum_pop_storage(
+async def test_curriculum_pop_storage(
     study_id: str | None,
     name: str | None,
     expected_id: str | None,
@@ -596,7 +690,7 @@ def test_curriculum_pop_storage(
         trial_file_dir=_DUMMY_TRIAL_PATH_DIR,
     )
 
-    popped = curr.pop_storage(study_id, name)
+    popped = await curr.pop_storage(study_id, name)
     if expected_id is None:
         assert popped is None
     else:
@@ -605,10 +699,11 @@ def test_curriculum_pop_storage(
     assert curr.storages == expected_storages
 
 
-def test_curriculum_pop_storage_raises() -> None:
+@pytest.mark.asyncio
+async def test_curriculum_pop_storage_raises() -> None:
     curr = Curriculum(studies=[], storages=[], trial_file_dir=_DUMMY_TRIAL_PATH_DIR)
     with pytest.raises(LD2ParameterError):
-        _ = curr.pop_storage(None, None)
+        _ = await curr.pop_storage(None, None)
 
 
 @pytest.mark.asyncio
@@ -663,7 +758,7 @@ async def test_curriculum_get_storage(
         trial_file_dir=_DUMMY_TRIAL_PATH_DIR,
     )
 
-    actual_storage = curr.get_storage(study_id, name)
+    actual_storage = await curr.get_storage(study_id, name)
     assert actual_storage is not None
     assert actual_storage.study_id == expected_id
 
@@ -719,14 +814,15 @@ async def test_curriculum_get_storage_not_found(
         trial_file_dir=_DUMMY_TRIAL_PATH_DIR,
     )
 
-    actual_storage = curr.get_storage(study_id, name)
+    actual_storage = await curr.get_storage(study_id, name)
     assert actual_storage is None
 
 
-def test_curriculum_get_storage_raises() -> None:
+@pytest.mark.asyncio
+async def test_curriculum_get_storage_raises() -> None:
     curr = Curriculum(studies=[], storages=[], trial_file_dir=_DUMMY_TRIAL_PATH_DIR)
     with pytest.raises(LD2ParameterError):
-        _ = curr.get_storage(None, None)
+        _ = await curr.get_storage(None, None)
 
 
 @pytest.mark.asyncio
@@ -895,6 +991,56 @@ async def test_curriculum_cancel_study_raises() -> None:
         _ = await curr.cancel_study(None, None)
 
 
+def _create_written_storage(save_dir: Path) -> StudyStorage:
+    # 結果と trial のファイルを書き出した、終わった study
+    results_path = save_dir / "s01_results.json"
+    results_path.write_text(_DUMMY_MAPPINGS_STORAGE.model_dump_json())
+    trial_dir = save_dir / "s01"
+    trial_dir.mkdir()
+    (trial_dir / "t01.json").write_text("{}")
+    return StudyStorage(
+        study_id="s01",
+        name="n01",
+        required_capacity=set(),
+        registered_timestamp=DT,
+        study_strategy=_DUMMY_STUDY_STRATEGY_MODEL,
+        suggest_strategy=_DUMMY_SUGGEST_STRATEGY_MODEL,
+        const_param=None,
+        parameter_space=_DUMMY_PARAMETER_SPACE.to_model(),
+        done_timestamp=DT,
+        result_type="scalar",
+        result_value_type="int",
+        results_path=results_path,
+        done_grids=4,
+        trial_repository=NormalTrialRepository(save_dir=trial_dir).to_model(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_curriculum_cancel_study_deletes_storage_files(tmp_path: Path) -> None:
+    curr = Curriculum(studies=[], storages=[_create_written_storage(tmp_path)], trial_file_dir=tmp_path)
+
+    assert await curr.cancel_study(None, "n01")
+    assert curr.storages == []
+    assert not (tmp_path / "s01_results.json").exists()
+    assert not (tmp_path / "s01").exists()
+
+
+@pytest.mark.asyncio
+async def test_curriculum_pop_storage_deletes_files(tmp_path: Path) -> None:
+    curr = Curriculum(studies=[], storages=[_create_written_storage(tmp_path)], trial_file_dir=tmp_path)
+
+    popped = await curr.pop_storage("s01", None)
+    assert popped is not None
+    # 取り出した storage は結果をメモリに持つ
+    assert popped.results == _DUMMY_MAPPINGS_STORAGE
+    assert popped.results_path is None
+    assert curr.storages == []
+    assert not (tmp_path / "s01_results.json").exists()
+    assert not (tmp_path / "s01").exists()
+
+
+@pytest.mark.asyncio
 @pytest.mark.parametrize(
     ("study_id", "name", "expected"),
     [
@@ -907,7 +1053,7 @@ async def test_curriculum_cancel_study_raises() -> None:
         pytest.param("s03", "n02", StudyStatus.wait, id="prior id"),
     ],
 )
-def test_curriculum_get_study_status(study_id: str | None, name: str | None, expected: StudyStatus) -> None:
+async def test_curriculum_get_study_status(study_id: str | None, name: str | None, expected: StudyStatus) -> None:
     curr = Curriculum(
         studies=[
             Study(
@@ -986,16 +1132,18 @@ def test_curriculum_get_study_status(study_id: str | None, name: str | None, exp
         trial_file_dir=_DUMMY_TRIAL_PATH_DIR,
     )
 
-    actual = curr.get_study_status(study_id, name)
+    actual = await curr.get_study_status(study_id, name)
     assert actual == expected
 
 
-def test_curriculum_get_study_status_raises() -> None:
+@pytest.mark.asyncio
+async def test_curriculum_get_study_status_raises() -> None:
     curr = Curriculum(studies=[], storages=[], trial_file_dir=_DUMMY_TRIAL_PATH_DIR)
     with pytest.raises(LD2ParameterError):
-        _ = curr.get_study_status(None, None)
+        _ = await curr.get_study_status(None, None)
 
 
+@pytest.mark.asyncio
 @pytest.mark.parametrize(
     ("name", "expected"),
     [
@@ -1007,7 +1155,7 @@ def test_curriculum_get_study_status_raises() -> None:
         pytest.param(None, True, id="None: True"),
     ],
 )
-def test_curriculum_try_insert_study(name: str | None, expected: bool) -> None:
+async def test_curriculum_try_insert_study(name: str | None, expected: bool) -> None:
     curr = Curriculum(
         studies=[
             Study(
@@ -1137,5 +1285,109 @@ def test_curriculum_try_insert_study(name: str | None, expected: bool) -> None:
         trial_table=TrialTable.from_model(TrialTableModel.create_empty()),
         trial_repository=NormalTrialRepository(save_dir=Path("test/s01")),
     )
-    actual = curr.try_insert_study(new_study)
+    actual = await curr.try_insert_study(new_study)
     assert actual == expected
+
+
+def _create_stress_study(study_id: str, save_dir: Path) -> Study:
+    parameter_space = ParameterAlignedSpace(
+        axes=[
+            LineSegment(name="x", type_="int", size=20, step=1, start=0, ambient_index=0, ambient_size=20),
+            LineSegment(name="y", type_="int", size=20, step=1, start=0, ambient_index=0, ambient_size=20),
+        ],
+        check_lower_filling=True,
+    )
+    return Study(
+        study_id=study_id,
+        name=study_id,
+        required_capacity={study_id},
+        status=StudyStatus.wait,
+        registered_timestamp=DT,
+        study_strategy=AllCalculationStudyStrategy(None),
+        suggest_strategy=SequentialSuggestStrategy(SuggestStrategyParam(strict_aligned=True), parameter_space),
+        const_param=None,
+        parameter_space=parameter_space,
+        result_type="scalar",
+        result_value_type="int",
+        trial_table=TrialTable.from_model(TrialTableModel.create_empty()),
+        trial_repository=NormalTrialRepository(save_dir=save_dir / study_id),
+    )
+
+
+@pytest.mark.asyncio
+async def test_curriculum_concurrent_reserve_stress(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    mock_table_config = TableConfig(curriculum_path=tmp_path / "curriculum.json")
+    monkeypatch.setattr(TableConfigProvider, "get", lambda: mock_table_config)
+
+    study_ids = [f"s{i:02d}" for i in range(4)]
+    studies = [_create_stress_study(study_id, tmp_path) for study_id in study_ids]
+    for study in studies:
+        await study.trial_repo.clean_save_dir()
+    curriculum = Curriculum(studies=studies, storages=[], trial_file_dir=tmp_path)
+    reserved_grids: dict[str, list[tuple[int, ...]]] = {study_id: [] for study_id in study_ids}
+
+    async def work(worker_id: str, capacity: str) -> int:
+        reserved_num = 0
+        while (study := await curriculum.get_available_study({capacity})) is not None:
+            trial = await study.suggest_next_trial(7, worker_id, worker_id)
+            if trial is None:
+                # 他の worker が登録を終えるのを待つ
+                await asyncio.sleep(0)
+                await curriculum.to_storage_if_done()
+                continue
+            reserved_num += 1
+            grid = list(trial.parameter_space.grid())
+            reserved_grids[study.study_id].extend(grid)
+            trial.set_result(trial.convert_mappings_from([(param, sum(param)) for param in grid]))
+            await study.receipt_trial(trial)
+            await curriculum.to_storage_if_done()
+        return reserved_num
+
+    worker_num = 32
+    start = time.perf_counter()
+    reserved_nums = await asyncio.wait_for(
+        asyncio.gather(*(work(f"w{i:02d}", study_ids[i % len(study_ids)]) for i in range(worker_num))),
+        timeout=60,
+    )
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Reserved %d trials in %.3f sec (%.1f trials/sec)", sum(reserved_nums), elapsed, sum(reserved_nums) / elapsed
+    )
+
+    # 全ての study がちょうど 1 回ずつ storage に移り、どの grid も重複なく 1 度だけ払い出されている
+    assert curriculum.studies == []
+    assert sorted(storage.study_id for storage in curriculum.storages) == study_ids
+    for study in studies:
+        grids = reserved_grids[study.study_id]
+        assert len(grids) == len(set(grids)) == study.parameter_space.total
+        assert study.trial_table.count_grid() == study.parameter_space.total
+    assert sum(reserved_nums) == sum(study.trial_table.count_trial() for study in studies)
+
+
+@pytest.mark.asyncio
+async def test_curriculum_reserve_trials_fair_share(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    mock_table_config = TableConfig(curriculum_path=tmp_path / "curriculum.json")
+    monkeypatch.setattr(TableConfigProvider, "get", lambda: mock_table_config)
+
+    big = _create_stress_study("big", tmp_path)
+    big.weight = 3.0
+    small = _create_stress_study("small", tmp_path)
+    curriculum = Curriculum(studies=[big], storages=[], trial_file_dir=tmp_path)
+    _ = await curriculum.reserve_trials({"big", "small"}, 4, 1, worker_node_name="w01", worker_node_id="w01")
+    # 後から登録した study も先に登録した study の後回しにはならず、weight に比例して払い出される
+    assert await curriculum.try_insert_study(small)
+    trials = await curriculum.reserve_trials({"big", "small"}, 40, 1, worker_node_name="w01", worker_node_id="w01")
+    counts = Counter(trial.study_id for trial in trials)
+    # small は big の最後の予約が始まった時点から数え始めるので 1 つ多く取るが、その後は 3:1
+    assert counts == {"big": 29, "small": 11}
+
+    # 払い出せる範囲の無くなった study は、タイムアウトで範囲が戻るまで選ばれない
+    trials = await curriculum.reserve_trials({"small"}, 1000, 1, worker_node_name="w01", worker_node_id="w01")
+    assert len(trials) == small.parameter_space.total - counts["small"]
+    assert await curriculum.reserve_trials({"small"}, 1, 1, worker_node_name="w01", worker_node_id="w01") == []
+    assert [study.study_id for study in await curriculum.get_available_studies({"small"})] == ["small"]
+    later = publish_timestamp() + timedelta(seconds=mock_table_config.trial_timeout_seconds + 1)
+    monkeypatch.setattr("lite_dist2.curriculum_models.curriculum.publish_timestamp", lambda: later)
+    await curriculum.check_timeout_trial()
+    trials = await curriculum.reserve_trials({"small"}, 1, 1, worker_node_name="w01", worker_node_id="w01")
+    assert [trial.study_id for trial in trials] == ["small"]
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+import pytest
+
+from lite_dist2.config import TableConfig, TableConfigProvider
+from lite_dist2.curriculum_models.curriculum import Curriculum
+from lite_dist2.curriculum_models.curriculum_journal import (
+    CurriculumJournal,
+    StudyCancelledEvent,
+    TrialRegisteredEvent,
+    list_segments,
+    read_entries,
+    segment_path,
+)
+from lite_dist2.curriculum_models.study import Study
+from lite_dist2.curriculum_models.study_status import StudyStatus
+from lite_dist2.curriculum_models.trial import Trial
+from lite_dist2.curriculum_models.trial_table import TrialTable, TrialTableModel
+from lite_dist2.study_strategies.all_calculation_study_strategy import AllCalculationStudyStrategy
+from lite_dist2.suggest_strategies import SequentialSuggestStrategy
+from lite_dist2.suggest_strategies.base_suggest_strategy import SuggestStrategyParam
+from lite_dist2.trial_repositories.normal_trial_repository import NormalTrialRepository
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+from tests.const import DT
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _create_study(study_id: str, trial_file_dir: Path) -> Study:
+    parameter_space = ParameterAlignedSpace(
+        axes=[
+            LineSegment(name="x", type_="int", size=4, step=1, start=0, ambient_index=0, ambient_size=4),
+            LineSegment(name="y", type_="int", size=4, step=1, start=0, ambient_index=0, ambient_size=4),
+        ],
+        check_lower_filling=True,
+    )
+    return Study(
+        study_id=study_id,
+        name=study_id,
+        required_capacity=set(),
+        status=StudyStatus.wait,
+        registered_timestamp=DT,
+        study_strategy=AllCalculationStudyStrategy(None),
+        suggest_strategy=SequentialSuggestStrategy(SuggestStrategyParam(strict_aligned=True), parameter_space),
+        const_param=None,
+        parameter_space=parameter_space,
+        result_type="scalar",
+        result_value_type="int",
+        trial_table=TrialTable.from_model(TrialTableModel.create_empty()),
+        trial_repository=NormalTrialRepository(save_dir=trial_file_dir / study_id),
+    )
+
+
+@pytest.fixture
+def table_config(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> TableConfig:
+    config = TableConfig(curriculum_path=tmp_path / "curriculum.json", trial_file_dir=tmp_path / "trials")
+    config.trial_file_dir.mkdir()
+    monkeypatch.setattr(TableConfigProvider, "get", lambda: config)
+    return config
+
+
+async def _register(curriculum: Curriculum, study_id: str) -> Study:
+    study = _create_study(study_id, curriculum.trial_file_dir)
+    assert await curriculum.try_insert_study(study)
+    await study.trial_repo.clean_save_dir()
+    return study
+
+
+async def _reserve_and_register(study: Study, num: int) -> None:
+    reserved = await study.suggest_next_trial(num, "w01", "w01")
+    assert reserved is not None
+    # ワーカーは受け取った trial の複製に結果を書く
+    trial = Trial.from_model(reserved.to_model())
+    trial.set_result(trial.convert_mappings_from([(param, sum(param)) for param in trial.parameter_space.grid()]))
+    await study.receipt_trial(trial)
+
+
+@pytest.mark.asyncio
+async def test_curriculum_journal_batches_records(tmp_path: Path) -> None:
+    journal = CurriculumJournal(tmp_path / "curriculum.json")
+    events = [StudyCancelledEvent(study_id=f"s{i:02d}") for i in range(10)]
+    await asyncio.gather(*(journal.record(event) for event in events))
+
+    assert [path.name for _, path in list_segments(journal.curriculum_path)] == ["curriculum.journal.00000000.jsonl"]
+    entries = list(read_entries(journal.curriculum_path, after_seq=0))
+    assert [entry.seq for entry in entries] == list(range(1, 11))
+    assert [entry.event for entry in entries] == events
+    assert [entry.seq for entry in read_entries(journal.curriculum_path, after_seq=7)] == [8, 9, 10]
+
+
+@pytest.mark.asyncio
+async def test_curriculum_journal_skips_broken_tail(tmp_path: Path) -> None:
+    journal = CurriculumJournal(tmp_path / "curriculum.json")
+    await journal.record(StudyCancelledEvent(study_id="s01"))
+    with segment_path(journal.curriculum_path, 0).open("ab") as f:
+        # 書き込み途中で落ちた行
+        f.write(b'{"seq":2,"event":{"type":"study_canc')
+
+    entries = list(read_entries(journal.curriculum_path, after_seq=0))
+    assert [entry.event for entry in entries] == [StudyCancelledEvent(study_id="s01")]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("table_config")
+async def test_curriculum_replays_journal_after_crash(table_config: TableConfig) -> None:
+    curriculum = await Curriculum.load_or_create(use_journal=True)
+    running = await _register(curriculum, "s01")
+    cancelled = await _register(curriculum, "s02")
+    done = await _register(curriculum, "s03")
+    await _reserve_and_register(running, 4)
+    await _reserve_and_register(running, 4)
+    timed_out = await running.suggest_next_trial(4, "w02", "w02")
+    assert timed_out is not None
+    reserved = await running.suggest_next_trial(4, "w01", "w01")
+    assert reserved is not None
+    await running.check_timeout_trial(timed_out.reserved_timestamp + timedelta(seconds=10), 10)
+    assert await curriculum.cancel_study(cancelled.study_id, None)
+    for _ in range(4):
+        await _reserve_and_register(done, 4)
+    await curriculum.to_storage_if_done()
+
+    # to_storage_if_done で保存された後の変更は journal にだけ残る
+    await _reserve_and_register(running, 4)
+    assert table_config.curriculum_path.exists()
+
+    restored = await Curriculum.load_or_create(use_journal=True)
+    assert restored.to_model() == curriculum.to_model()
+    assert [study.study_id for study in restored.studies] == ["s01"]
+    assert [storage.study_id for storage in restored.storages] == ["s03"]
+    assert restored.studies[0].trial_table.find_trial(reserved.trial_id).worker_node_id == "w01"
+
+    # 復元した curriculum も続きを記録する
+    trial = Trial.from_model(reserved.to_model())
+    trial.set_result(trial.convert_mappings_from([(param, sum(param)) for param in trial.parameter_space.grid()]))
+    await restored.studies[0].receipt_trial(trial)
+    restored_again = await Curriculum.load_or_create(use_journal=True)
+    assert restored_again.to_model() == restored.to_model()
+
+    # 終わった study の取り消しも記録される
+    assert await restored_again.cancel_study(done.study_id, None)
+    restored_after_drop = await Curriculum.load_or_create(use_journal=True)
+    assert restored_after_drop.storages == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("table_config")
+async def test_curriculum_save_compacts_journal(table_config: TableConfig) -> None:
+    curriculum = await Curriculum.load_or_create(use_journal=True)
+    study = await _register(curriculum, "s01")
+    await _reserve_and_register(study, 4)
+    assert len(list_segments(table_config.curriculum_path)) == 1
+
+    await curriculum.save()
+    # snapshot に含まれた segment は消える
+    assert list_segments(table_config.curriculum_path) == []
+
+    await _reserve_and_register(study, 4)
+    entries = list(read_entries(table_config.curriculum_path, after_seq=0))
+    assert [type(entry.event) for entry in entries][-1] is TrialRegisteredEvent
+
+    restored = await Curriculum.load_or_create(use_journal=True)
+    assert restored.to_model() == curriculum.to_model()
+    assert restored.journal is not None
+    assert restored.journal.last_seq == curriculum.journal.last_seq
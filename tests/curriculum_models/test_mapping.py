@@ -1,7 +1,18 @@
+from pathlib import Path
+from typing import Literal
+
 import pytest
 
-from lite_dist2.curriculum_models.mapping import Mapping
-from lite_dist2.type_definitions import PortableValueType
+from lite_dist2.curriculum_models.mapping import (
+    Mapping,
+    MappingsStorage,
+    MappingsStorageReader,
+    MappingsStorageWriter,
+    build_mappings,
+    split_mappings,
+)
+from lite_dist2.expections import LD2ParameterError
+from lite_dist2.type_definitions import PortableValueType, PrimitiveValueType
 from lite_dist2.value_models.point import ScalarValue, VectorValue
 
 
@@ -35,3 +46,171 @@ from lite_dist2.value_models.point import ScalarValue, VectorValue
 def test_mapping_to_tuple(mapping: Mapping, expected: tuple[PortableValueType]) -> None:
     actual = mapping.to_tuple()
     assert actual == expected
+
+
+@pytest.mark.parametrize(
+    ("chunks", "buffer_size"),
+    [
+        pytest.param([], 2, id="empty"),
+        pytest.param([[("0x0", True, "0x1.0p+0")]], 2, id="single"),
+        pytest.param(
+            [[("0x0", True, "0x1.0p+0"), ("0x1", False, "0x0.0p+0")], [], [("0x2", True, "-0x1.0p+0")] * 3],
+            2,
+            id="flush several times",
+        ),
+        pytest.param([[("0x0", True, "0x1.0p+0")] * 5], 100, id="flush on exit"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_mappings_storage_writer(
+    tmp_path: str,
+    chunks: list[list[tuple[PortableValueType, ...]]],
+    buffer_size: int,
+) -> None:
+    path = Path(tmp_path) / "results.json"
+    params_info = (
+        ScalarValue(type="scalar", value_type="int", value="0x0", name="x"),
+        ScalarValue(type="scalar", value_type="bool", value=False, name="y"),
+    )
+    result_info = ScalarValue(type="scalar", value_type="float", value="0x0.0p+0", name="z")
+
+    async with MappingsStorageWriter(path, params_info, result_info, buffer_size=buffer_size) as writer:
+        for chunk in chunks:
+            await writer.write(chunk)
+
+    expected = MappingsStorage(
+        params_info=params_info,
+        result_info=result_info,
+        values=[row for chunk in chunks for row in chunk],
+    )
+    with path.open("rb") as f:
+        actual = MappingsStorage.model_validate_json(f.read())
+    assert actual == expected
+
+
+@pytest.mark.parametrize("row_num", [0, 1, 100])
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+@pytest.mark.asyncio
+async def test_mappings_storage_reader(tmp_path: str, row_num: int, chunk_size: int) -> None:
+    path = Path(tmp_path) / "results.json"
+    params_info = (ScalarValue(type="scalar", value_type="bool", value=False, name="x"),)
+    # result_info の中の "values" を行の始まりと取り違えない
+    result_info = VectorValue(type="vector", value_type="int", values=["0x0", "0x0"], name="r")
+    rows = [(i % 2 == 0, hex(i), hex(-i)) for i in range(row_num)]
+    async with MappingsStorageWriter(path, params_info, result_info, buffer_size=3) as writer:
+        await writer.write(rows)
+
+    reader = MappingsStorageReader(path, chunk_size=chunk_size)
+    actual_params_info, actual_result_info, actual_row_num = await reader.read_info()
+    assert actual_params_info == [param.model_dump(mode="json") for param in params_info]
+    assert actual_result_info == result_info.model_dump(mode="json")
+    assert actual_row_num == row_num
+    assert [tuple(row) async for chunk in reader.iter_rows() for row in chunk] == rows
+
+
+@pytest.mark.asyncio
+async def test_mappings_storage_writer_remove_file_on_error(tmp_path: str) -> None:
+    path = Path(tmp_path) / "results.json"
+    info = ScalarValue(type="scalar", value_type="int", value="0x0")
+
+    async def write_and_fail() -> None:
+        async with MappingsStorageWriter(path, (info,), info, buffer_size=1) as writer:
+            await writer.write([("0x0", "0x1")])
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        await write_and_fail()
+    assert not path.exists()
+
+
+_SCALAR_MAPPINGS = [
+    Mapping(
+        params=(
+            ScalarValue(type="scalar", value_type="int", value=hex(i), name="x"),
+            ScalarValue(type="scalar", value_type="bool", value=i % 2 == 0, name="y"),
+        ),
+        result=ScalarValue(type="scalar", value_type="float", value=(i / 4).hex(), name="r"),
+    )
+    for i in range(3)
+]
+
+_VECTOR_MAPPINGS = [
+    Mapping(
+        params=(ScalarValue(type="scalar", value_type="float", value=(i * 0.5).hex(), name=None),),
+        result=VectorValue(type="vector", value_type="int", values=[hex(i), hex(-i)], name=None),
+    )
+    for i in range(3)
+]
+
+
+@pytest.mark.parametrize(
+    ("param_columns", "result_type", "result_value_type", "result_name", "results", "expected"),
+    [
+        pytest.param(
+            [("x", "int", ["0x0", "0x1", "0x2"]), ("y", "bool", [True, False, True])],
+            "scalar",
+            "float",
+            "r",
+            [(i / 4).hex() for i in range(3)],
+            _SCALAR_MAPPINGS,
+            id="scalar",
+        ),
+        pytest.param(
+            [(None, "float", [(i * 0.5).hex() for i in range(3)])],
+            "vector",
+            "int",
+            None,
+            [(hex(i), hex(-i)) for i in range(3)],
+            _VECTOR_MAPPINGS,
+            id="vector",
+        ),
+        pytest.param([("x", "int", [])], "scalar", "int", None, [], [], id="empty"),
+    ],
+)
+def test_build_mappings(
+    *,
+    param_columns: list[tuple[str | None, Literal["bool", "int", "float"], list[PortableValueType]]],
+    result_type: Literal["scalar", "vector"],
+    result_value_type: Literal["bool", "int", "float"],
+    result_name: str | None,
+    results: list[PortableValueType] | list[tuple[PortableValueType, ...]],
+    expected: list[Mapping],
+) -> None:
+    actual = build_mappings(param_columns, result_type, result_value_type, result_name, results)
+    assert actual == expected
+    assert [Mapping.model_validate(mapping.model_dump()) for mapping in actual] == expected
+
+
+def test_build_mappings_raises_on_length_mismatch() -> None:
+    with pytest.raises(ValueError, match="zip"):
+        build_mappings([("x", "int", ["0x0", "0x1"])], "scalar", "int", None, ["0x0"])
+
+
+@pytest.mark.parametrize(
+    ("mappings", "expected_params", "expected_results"),
+    [
+        pytest.param(_SCALAR_MAPPINGS, [[0, 1, 2], [True, False, True]], [[0.0, 0.25, 0.5]], id="scalar"),
+        pytest.param(_VECTOR_MAPPINGS, [[0.0, 0.5, 1.0]], [[0, 1, 2], [0, -1, -2]], id="vector"),
+        pytest.param([], [], [], id="empty"),
+    ],
+)
+def test_split_mappings(
+    mappings: list[Mapping],
+    expected_params: list[list[PrimitiveValueType]],
+    expected_results: list[list[PrimitiveValueType]],
+) -> None:
+    actual_params, actual_results = split_mappings(mappings)
+    assert actual_params == expected_params
+    assert actual_results == expected_results
+
+
+def test_split_mappings_raises_on_different_result_size() -> None:
+    mappings = [
+        *_VECTOR_MAPPINGS,
+        Mapping(
+            params=(ScalarValue(type="scalar", value_type="float", value="0x0.0p+0", name=None),),
+            result=VectorValue(type="vector", value_type="int", values=["0x0"], name=None),
+        ),
+    ]
+    with pytest.raises(LD2ParameterError):
+        split_mappings(mappings)
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from lite_dist2.curriculum_models.read_write_lock import AsyncReadWriteLock
+
+
+@pytest.mark.asyncio
+async def test_async_read_write_lock_shares_read() -> None:
+    lock = AsyncReadWriteLock()
+    inside = 0
+    max_inside = 0
+
+    async def read() -> None:
+        nonlocal inside, max_inside
+        async with lock.read():
+            inside += 1
+            max_inside = max(max_inside, inside)
+            await asyncio.sleep(0.01)
+            inside -= 1
+
+    await asyncio.gather(*(read() for _ in range(5)))
+    assert max_inside == 5
+
+
+@pytest.mark.asyncio
+async def test_async_read_write_lock_write_is_exclusive() -> None:
+    lock = AsyncReadWriteLock()
+    events: list[str] = []
+
+    async def read(name: str) -> None:
+        async with lock.read():
+            events.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            events.append(f"{name} end")
+
+    async def write(name: str) -> None:
+        async with lock.write():
+            events.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            events.append(f"{name} end")
+
+    first_read = asyncio.create_task(read("r1"))
+    await asyncio.sleep(0)
+    # 待っている writer は後から来た reader より先に入る
+    writer = asyncio.create_task(write("w"))
+    await asyncio.sleep(0)
+    second_read = asyncio.create_task(read("r2"))
+    await asyncio.gather(first_read, writer, second_read)
+
+    assert events == ["r1 start", "r1 end", "w start", "w end", "r2 start", "r2 end"]
+
+
+@pytest.mark.asyncio
+async def test_async_read_write_lock_cancelled_writer_releases_readers() -> None:
+    lock = AsyncReadWriteLock()
+    release = asyncio.Event()
+
+    async def hold_read() -> None:
+        async with lock.read():
+            await release.wait()
+
+    holder = asyncio.create_task(hold_read())
+    await asyncio.sleep(0)
+
+    async def write() -> None:
+        async with lock.write():
+            pass
+
+    writer = asyncio.create_task(write())
+    await asyncio.sleep(0)
+
+    async def read() -> bool:
+        async with lock.read():
+            return True
+
+    reader = asyncio.create_task(read())
+    await asyncio.sleep(0)
+    assert not reader.done()
+
+    writer.cancel()
+    assert await asyncio.wait_for(reader, timeout=1)
+    release.set()
+    await holder
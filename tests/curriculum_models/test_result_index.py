@@ -0,0 +1,76 @@
+import pytest
+
+from lite_dist2.curriculum_models.mapping import Mapping
+from lite_dist2.curriculum_models.result_index import ResultIndex
+from lite_dist2.value_models.point import ResultType, ScalarValue, VectorValue
+
+
+def _scalar_mapping(x: int, result: str) -> Mapping:
+    return Mapping(
+        params=(ScalarValue(type="scalar", value_type="int", value=hex(x), name="x"),),
+        result=ScalarValue(type="scalar", value_type="int", value=result),
+    )
+
+
+def _vector_mapping(x: int, results: list[str]) -> Mapping:
+    return Mapping(
+        params=(ScalarValue(type="scalar", value_type="int", value=hex(x), name="x"),),
+        result=VectorValue(type="vector", value_type="int", values=results),
+    )
+
+
+@pytest.mark.parametrize(
+    ("trials", "target", "expected"),
+    [
+        pytest.param({}, ScalarValue(type="scalar", value_type="int", value="0x1"), [], id="empty"),
+        pytest.param(
+            {"t01": [_scalar_mapping(0, "0x0"), _scalar_mapping(1, "0x1")], "t02": [_scalar_mapping(2, "0x1")]},
+            ScalarValue(type="scalar", value_type="int", value="0x1"),
+            [("t01", 1), ("t02", 0)],
+            id="scalar multiple hits",
+        ),
+        pytest.param(
+            {"t01": [_scalar_mapping(0, "0x0"), _scalar_mapping(1, "0x1")]},
+            ScalarValue(type="scalar", value_type="int", value="0x2"),
+            [],
+            id="scalar not found",
+        ),
+        pytest.param(
+            {"t01": [_scalar_mapping(0, "0x1")]},
+            ScalarValue(type="scalar", value_type="float", value="0x1"),
+            [],
+            id="different value type",
+        ),
+        pytest.param(
+            {"t01": [_vector_mapping(0, ["0x1", "0x2"]), _vector_mapping(1, ["0x2", "0x1"])]},
+            VectorValue(type="vector", value_type="int", values=["0x2", "0x1"]),
+            [("t01", 1)],
+            id="vector",
+        ),
+        pytest.param(
+            {"t01": [_scalar_mapping(0, "0x1")]},
+            VectorValue(type="vector", value_type="int", values=["0x1"]),
+            [],
+            id="scalar and vector",
+        ),
+    ],
+)
+def test_result_index_lookup(
+    trials: dict[str, list[Mapping]], target: ResultType, expected: list[tuple[str, int]]
+) -> None:
+    index = ResultIndex()
+    for trial_id, mappings in trials.items():
+        index.add(trial_id, mappings)
+    assert index.lookup(target) == expected
+
+
+def test_result_index_add_same_trial_twice() -> None:
+    index = ResultIndex()
+    mappings = [_scalar_mapping(0, "0x1"), _scalar_mapping(1, "0x1")]
+    index.add("t01", mappings)
+    index.add("t01", mappings)
+
+    assert len(index) == 2
+    assert index.has_trial("t01")
+    assert not index.has_trial("t02")
+    assert index.lookup(ScalarValue(type="scalar", value_type="int", value="0x1")) == [("t01", 0), ("t01", 1)]
@@ -1,20 +1,28 @@
 import asyncio
+from datetime import timedelta
 from pathlib import Path
-from typing import override
+from typing import Literal, NoReturn, override
 
 import pytest
 
-from lite_dist2.curriculum_models.mapping import Mapping
+from lite_dist2.common import publish_timestamp
 from lite_dist2.curriculum_models.study import Study
 from lite_dist2.curriculum_models.study_portables import StudyModel
 from lite_dist2.curriculum_models.study_status import StudyStatus
-from lite_dist2.curriculum_models.trial import TrialModel, TrialStatus
+from lite_dist2.curriculum_models.trial import Trial, TrialModel, TrialStatus
+from lite_dist2.curriculum_models.trial_done_records import TrialDoneRecordsModel
+from lite_dist2.curriculum_models.trial_result import TrialResultModel
 from lite_dist2.curriculum_models.trial_table import TrialTable, TrialTableModel
+from lite_dist2.curriculum_models.worker_velocity import WorkerVelocityTracker
+from lite_dist2.expections import LD2ParameterError
 from lite_dist2.study_strategies import StudyStrategyModel
 from lite_dist2.study_strategies.all_calculation_study_strategy import AllCalculationStudyStrategy
+from lite_dist2.study_strategies.base_study_strategy import StudyStrategyParam
+from lite_dist2.study_strategies.study_strategy_factory import create_study_strategy
 from lite_dist2.suggest_strategies import SequentialSuggestStrategy
 from lite_dist2.suggest_strategies.base_suggest_strategy import SuggestStrategyModel, SuggestStrategyParam
 from lite_dist2.trial_repositories.base_trial_repository import BaseTrialRepository
+from lite_dist2.trial_repositories.normal_trial_repository import NormalTrialRepository
 from lite_dist2.trial_repositories.trial_repository_model import TrialRepositoryModel
 from lite_dist2.type_definitions import TrialRepositoryType
 from lite_dist2.value_models.aligned_space import ParameterAlignedSpace, ParameterAlignedSpacePortableModel
@@ -22,7 +30,7 @@ from lite_dist2.value_models.line_segment import (
     LineSegment,
     LineSegmentPortableModel,
 )
-from lite_dist2.value_models.point import ScalarValue
+from lite_dist2.value_models.point import ResultType, ScalarValue, VectorValue
 from tests.const import DT
 
 
@@ -70,65 +78,6 @@ from tests.const import DT
                 result_value_type="int",
                 trial_table=TrialTableModel(
                     trials=[
-                        TrialModel(
-                            study_id="01",
-                            trial_id="01",
-                            reserved_timestamp=DT,
-                            trial_status=TrialStatus.done,
-                            const_param=None,
-                            parameter_space=ParameterAlignedSpacePortableModel(
-                                type="aligned",
-                                axes=[
-                                    LineSegmentPortableModel(
-                                        name="x",
-                                        type="int",
-                                        size="0x1",
-                                        step="0x1",
-                                        start="0x0",
-                                        ambient_size="0x64",
-                                        ambient_index="0x0",
-                                    ),
-                                    LineSegmentPortableModel(
-                                        name="y",
-                                        type="int",
-                                        size="0x2",
-                                        step="0x1",
-                                        start="0x0",
-                                        ambient_size="0x64",
-                                        ambient_index="0x0",
-                                    ),
-                                ],
-                                check_lower_filling=True,
-                            ),
-                            result_type="scalar",
-                            result_value_type="float",
-                            worker_node_name="w01",
-                            worker_node_id="w01",
-                            results=[
-                                Mapping(
-                                    params=(
-                                        ScalarValue(type="scalar", value_type="int", value="0x0", name="x"),
-                                        ScalarValue(type="scalar", value_type="int", value="0x0", name="y"),
-                                    ),
-                                    result=ScalarValue(
-                                        type="scalar",
-                                        value_type="float",
-                                        value="0x1.0000000000000p-1",
-                                    ),
-                                ),
-                                Mapping(
-                                    params=(
-                                        ScalarValue(type="scalar", value_type="int", value="0x0", name="x"),
-                                        ScalarValue(type="scalar", value_type="int", value="0x1", name="y"),
-                                    ),
-                                    result=ScalarValue(
-                                        type="scalar",
-                                        value_type="float",
-                                        value="0x1.0000000000000p-2",
-                                    ),
-                                ),
-                            ],
-                        ),
                         TrialModel(
                             study_id="01",
                             trial_id="01",
@@ -194,6 +143,14 @@ from tests.const import DT
                             ),
                         ],
                     },
+                    done_records=TrialDoneRecordsModel(
+                        trial_ids=["01-0x0"],
+                        reserved_timestamps=[1745753770000000],
+                        worker_node_names=["w01"],
+                        worker_node_ids=["w01"],
+                        registered_timestamps=[1745753771000000],
+                        grid_sizes=[2],
+                    ),
                 ),
                 trial_repository=TrialRepositoryModel(
                     type="normal",
@@ -292,7 +249,7 @@ async def test_study_suggest_receipt_single_thread() -> None:
 
     async def contract_and_submit() -> None:
         # trial 取得
-        trial = study.suggest_next_trial(num=5, worker_node_name="w01", worker_node_id="w01")
+        trial = await study.suggest_next_trial(num=5, worker_node_name="w01", worker_node_id="w01")
         if trial is None:
             return
 
@@ -313,6 +270,46 @@ async def test_study_suggest_receipt_single_thread() -> None:
     assert study.trial_table.count_trial() == expected_trial_num
 
 
+@pytest.mark.asyncio
+async def test_study_suggest_receipt_random() -> None:
+    _parameter_space = ParameterAlignedSpace(
+        axes=[
+            LineSegment(name="x", type_="int", size=7, step=1, start=0, ambient_index=0, ambient_size=7),
+            LineSegment(name="y", type_="int", size=9, step=1, start=0, ambient_index=0, ambient_size=9),
+        ],
+        check_lower_filling=True,
+    )
+    study = Study(
+        study_id="s01",
+        name="random_test",
+        required_capacity=set(),
+        status=StudyStatus.running,
+        registered_timestamp=DT,
+        study_strategy=AllCalculationStudyStrategy(study_strategy_param=None),
+        suggest_strategy=Study._create_suggest_strategy(
+            SuggestStrategyModel(type="random", suggest_strategy_param=SuggestStrategyParam(strict_aligned=False)),
+            _parameter_space,
+        ),
+        const_param=None,
+        parameter_space=_parameter_space,
+        result_type="scalar",
+        result_value_type="int",
+        trial_table=TrialTable(trials=[], aggregated_parameter_space=None),
+        trial_repository=MockTrialRepository(),
+    )
+
+    suggested = []
+    while not await study.is_done():
+        trial = await study.suggest_next_trial(num=10, worker_node_name="w01", worker_node_id="w01")
+        assert trial is not None
+        suggested.extend(trial.parameter_space.grid())
+        trial.set_result(trial.convert_mappings_from([(param, sum(param)) for param in trial.parameter_space.grid()]))
+        await study.receipt_trial(trial)
+
+    assert sorted(suggested) == sorted(_parameter_space.grid())
+    assert study.trial_table.count_trial() == 7
+
+
 @pytest.mark.asyncio
 async def test_study_suggest_receipt_multi_threads_synchronous() -> None:
     _parameter_space = ParameterAlignedSpace(
@@ -358,7 +355,7 @@ async def test_study_suggest_receipt_multi_threads_synchronous() -> None:
     )
 
     async def contract_and_submit() -> None:
-        trial = study.suggest_next_trial(num=5, worker_node_name="w01", worker_node_id="w01")
+        trial = await study.suggest_next_trial(num=5, worker_node_name="w01", worker_node_id="w01")
         if trial is None:
             return
         raw_mappings = []
@@ -375,3 +372,281 @@ async def test_study_suggest_receipt_multi_threads_synchronous() -> None:
 
     expected_trial_num = 80  # 20*20/5
     assert study.trial_table.count_trial() == expected_trial_num
+
+
+def _create_indexed_study(
+    save_dir: Path,
+    result_type: Literal["scalar", "vector"] = "scalar",
+    use_result_index: bool = True,
+) -> Study:
+    _parameter_space = ParameterAlignedSpace(
+        axes=[
+            LineSegment(name="x", type_="int", size=6, step=1, start=0, ambient_index=0, ambient_size=6),
+            LineSegment(name="y", type_="int", size=6, step=1, start=0, ambient_index=0, ambient_size=6),
+        ],
+        check_lower_filling=True,
+    )
+    return Study(
+        study_id="s01",
+        name="indexed",
+        required_capacity=set(),
+        status=StudyStatus.running,
+        registered_timestamp=DT,
+        study_strategy=AllCalculationStudyStrategy(study_strategy_param=None),
+        suggest_strategy=SequentialSuggestStrategy(
+            suggest_parameter=SuggestStrategyParam(strict_aligned=True),
+            parameter_space=_parameter_space,
+        ),
+        const_param=None,
+        parameter_space=_parameter_space,
+        result_type=result_type,
+        result_value_type="int",
+        trial_table=TrialTable(trials=[], aggregated_parameter_space=None),
+        trial_repository=NormalTrialRepository(save_dir),
+        use_result_index=use_result_index,
+    )
+
+
+@pytest.mark.asyncio
+async def test_study_lookup_results(tmp_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    study = _create_indexed_study(Path(tmp_path) / "s01")
+    await study.trial_repo.clean_save_dir()
+
+    # 新しい study は受け付けた trial を index に入れていくので、保存済みの trial を読み直さない
+    def fail_iter_all() -> NoReturn:
+        pytest.fail("New study must not reload the saved trials")
+
+    monkeypatch.setattr(study.trial_repo, "iter_all", fail_iter_all)
+    while not await study.is_done():
+        trial = await study.suggest_next_trial(num=5, worker_node_name="w01", worker_node_id="w01")
+        assert trial is not None
+        trial.set_result(trial.convert_mappings_from([((x, y), x * y) for x, y in trial.parameter_space.grid()]))
+        await study.receipt_trial(trial)
+
+    target = study.create_result_value(["0x6"])
+    actual = await study.lookup_results(target)
+    assert sorted(mapping.to_tuple() for mapping in actual) == [("0x2", "0x3", "0x6"), ("0x3", "0x2", "0x6")]
+
+    # 復元した study は保存済みの trial から index を作り直す
+    restored = Study.from_model(study.to_model())
+    assert restored.result_index is not None
+    assert len(restored.result_index) == 0
+    restored_actual = await restored.lookup_results(target)
+    assert sorted(m.to_tuple() for m in restored_actual) == sorted(m.to_tuple() for m in actual)
+    assert len(restored.result_index) == 36
+
+
+@pytest.mark.asyncio
+async def test_study_suggest_next_trial_adaptive_size(tmp_path: str) -> None:
+    study = _create_indexed_study(Path(tmp_path) / "s01", use_result_index=False)
+    await study.trial_repo.clean_save_dir()
+
+    # 速度が分からないうちは小さな trial を返す
+    first = await study.suggest_next_trial(5, "w01", "w01", target_duration_seconds=3.5)
+    assert first is not None
+    assert first.parameter_space.total == WorkerVelocityTracker.INITIAL_SIZE
+
+    # 1 grid を約 1 秒で計算した worker には約 3.5 秒分の trial を返す
+    first.reserved_timestamp = publish_timestamp() - timedelta(seconds=1)
+    first.set_result(first.convert_mappings_from([((x, y), x * y) for x, y in first.parameter_space.grid()]))
+    await study.receipt_trial(first)
+    second = await study.suggest_next_trial(5, "w01", "w01", target_duration_seconds=3.5)
+    assert second is not None
+    assert second.parameter_space.total == 3
+
+    # 計測していない worker には影響しない
+    other = await study.suggest_next_trial(5, "w02", "w02", target_duration_seconds=3.5)
+    assert other is not None
+    assert other.parameter_space.total == WorkerVelocityTracker.INITIAL_SIZE
+
+
+@pytest.mark.asyncio
+async def test_study_suggest_next_trials_and_receipt_trials(tmp_path: str) -> None:
+    study = _create_indexed_study(Path(tmp_path) / "s01", use_result_index=False)
+    await study.trial_repo.clean_save_dir()
+
+    trials = await study.suggest_next_trials(4, 6, "w01", "w01")
+    assert len(trials) == 4
+    assert len({trial.trial_id for trial in trials}) == 4
+    starts = [trial.parameter_space.get_flatten_ambient_start_and_size_list()[0].start for trial in trials]
+    assert starts == [0, 6, 12, 18]
+
+    # worker から送られてくるのと同じく、model を経由した別のインスタンスを登録する
+    done_trials = [Trial.from_model(trial.to_model()) for trial in trials]
+    for trial in done_trials:
+        trial.set_result(trial.convert_mappings_from([((x, y), x * y) for x, y in trial.parameter_space.grid()]))
+    # 他の worker の trial と登録済みの trial は受け付けない
+    done_trials[1].worker_node_id = "w02"
+    accepted = await study.receipt_trials([done_trials[0], done_trials[1], done_trials[2], done_trials[0]])
+    assert accepted == [True, False, True, False]
+    assert study.trial_table.count_grid() == 12
+    assert sorted(trial.trial_id for trial in await study.trial_repo.load_all()) == sorted(
+        [trials[0].trial_id, trials[2].trial_id],
+    )
+
+    # 残りを取り切ると空になる
+    rest = await study.suggest_next_trials(10, 6, "w01", "w01")
+    assert len(rest) == 2
+    assert await study.suggest_next_trials(10, 6, "w01", "w01") == []
+
+
+@pytest.mark.asyncio
+async def test_study_minimize_stores_only_top_k(tmp_path: str) -> None:
+    study = _create_indexed_study(Path(tmp_path) / "s01", use_result_index=False)
+    study.study_strategy = create_study_strategy(
+        StudyStrategyModel(type="minimize", study_strategy_param=StudyStrategyParam(top_k=3)),
+    )
+    await study.trial_repo.clean_save_dir()
+    while not await study.is_done():
+        trial = await study.suggest_next_trial(num=6, worker_node_name="w01", worker_node_id="w01")
+        assert trial is not None
+        trial.set_result(
+            trial.convert_mappings_from([((x, y), (x - 3) ** 2 * 10 + y) for x, y in trial.parameter_space.grid()])
+        )
+        await study.receipt_trial(trial)
+
+    saved = await study.trial_repo.load_all()
+    assert sum(len(trial.results or []) for trial in saved) < 36
+    actual = await study.study_strategy.extract_mappings(study.trial_repo)
+    assert actual.values == [("0x3", "0x0", "0x0"), ("0x3", "0x1", "0x1"), ("0x3", "0x2", "0x2")]
+
+
+@pytest.mark.asyncio
+async def test_study_minimize_lookup_results(tmp_path: str) -> None:
+    study = _create_indexed_study(Path(tmp_path) / "s01")
+    study.study_strategy = create_study_strategy(
+        StudyStrategyModel(type="minimize", study_strategy_param=StudyStrategyParam(top_k=3)),
+    )
+    await study.trial_repo.clean_save_dir()
+    while not await study.is_done():
+        trial = await study.suggest_next_trial(num=6, worker_node_name="w01", worker_node_id="w01")
+        assert trial is not None
+        trial.set_result(
+            trial.convert_mappings_from(
+                [((x, y), (x - 3) ** 2 * 10 + (5 - y)) for x, y in trial.parameter_space.grid()]
+            ),
+        )
+        await study.receipt_trial(trial)
+
+    # 保存されなかった結果は見つからず、保存された結果は正しい mapping を返す
+    for value, expected in [("0x0", [("0x3", "0x5", "0x0")]), ("0x2", [("0x3", "0x3", "0x2")]), ("0x5", [])]:
+        actual = await study.lookup_results(study.create_result_value([value]))
+        assert [mapping.to_tuple() for mapping in actual] == expected
+
+
+@pytest.mark.asyncio
+async def test_study_receipt_result(tmp_path: str) -> None:
+    study = _create_indexed_study(Path(tmp_path) / "s01", use_result_index=False)
+    await study.trial_repo.clean_save_dir()
+    trial = await study.suggest_next_trial(6, "w01", "w01")
+    assert trial is not None
+
+    # worker 側では model を経由した別のインスタンスで計算する
+    worker_trial = Trial.from_model(trial.to_model())
+    worker_trial.set_result(
+        worker_trial.convert_mappings_from([((x, y), x * y) for x, y in worker_trial.parameter_space.grid()]),
+    )
+    worker_trial.compute_seconds = 2.0
+    result = TrialResultModel.from_trial(worker_trial)
+
+    other_worker_result = result.model_copy(update={"worker_node_id": "w02"})
+    with pytest.raises(LD2ParameterError):
+        await study.receipt_result(other_worker_result)
+
+    await study.receipt_result(result)
+    assert study.trial_table.count_grid() == 6
+    saved = await study.trial_repo.load(trial.trial_id)
+    assert saved.trial_status == TrialStatus.done
+    assert saved.results == worker_trial.result
+    # done の trial はテーブルに記録だけを残す
+    assert study.trial_table.trials == []
+    assert study.trial_table.done_records.find(trial.trial_id).grid_size == 6
+    # 速度は worker が報告した計算時間から測る
+    assert study.worker_velocities.get("w01") == 3.0
+
+    with pytest.raises(LD2ParameterError):
+        await study.receipt_result(result)
+
+
+@pytest.mark.asyncio
+async def test_study_receipt_results(tmp_path: str) -> None:
+    study = _create_indexed_study(Path(tmp_path) / "s01", use_result_index=False)
+    await study.trial_repo.clean_save_dir()
+    trials = await study.suggest_next_trials(3, 6, "w01", "w01")
+    assert len(trials) == 3
+
+    results = []
+    for trial in trials:
+        worker_trial = Trial.from_model(trial.to_model())
+        worker_trial.set_result(
+            worker_trial.convert_mappings_from([((x, y), x * y) for x, y in worker_trial.parameter_space.grid()]),
+        )
+        results.append(TrialResultModel.from_trial(worker_trial))
+    # 行数の合わない結果、他の worker の結果、登録済みの結果は受け付けない
+    broken = results[1].model_copy(update={"row_num": 5})
+    other_worker = results[2].model_copy(update={"worker_node_id": "w02"})
+    accepted = await study.receipt_results([results[0], broken, other_worker, results[0]])
+    assert accepted == [True, False, False, False]
+    assert study.trial_table.count_grid() == 6
+
+    assert await study.receipt_results([results[1], results[2]]) == [True, True]
+    assert study.trial_table.count_grid() == 18
+    assert len(await study.trial_repo.load_all()) == 3
+
+
+@pytest.mark.asyncio
+async def test_study_lookup_results_disabled() -> None:
+    study = _create_indexed_study(Path("test/s01"), use_result_index=False)
+    with pytest.raises(LD2ParameterError):
+        await study.lookup_results(ScalarValue(type="scalar", value_type="int", value="0x0"))
+
+
+@pytest.mark.asyncio
+async def test_study_does_not_reuse_timed_out_trial_id() -> None:
+    study = _create_indexed_study(Path("test/s01"))
+    first = await study.suggest_next_trial(num=6, worker_node_name="w01", worker_node_id="w01")
+    second = await study.suggest_next_trial(num=6, worker_node_name="w02", worker_node_id="w02")
+    assert first is not None
+    assert second is not None
+    removed = await study.check_timeout_trial(first.reserved_timestamp + timedelta(seconds=10), 10)
+    assert removed == [first.trial_id]
+
+    third = await study.suggest_next_trial(num=6, worker_node_name="w01", worker_node_id="w01")
+    assert third is not None
+    assert third.trial_id not in {first.trial_id, second.trial_id}
+
+
+@pytest.mark.parametrize(
+    ("result_type", "values", "expected"),
+    [
+        pytest.param("scalar", ["0x0a"], ScalarValue(type="scalar", value_type="int", value="0xa"), id="scalar"),
+        pytest.param("scalar", ["-0x1"], ScalarValue(type="scalar", value_type="int", value="-0x1"), id="negative"),
+        pytest.param(
+            "vector",
+            ["0x1", "0x02"],
+            VectorValue(type="vector", value_type="int", values=["0x1", "0x2"]),
+            id="vector",
+        ),
+    ],
+)
+def test_study_create_result_value(
+    result_type: Literal["scalar", "vector"],
+    values: list[str],
+    expected: ResultType,
+) -> None:
+    study = _create_indexed_study(Path("test/s01"), result_type)
+    assert study.create_result_value(values) == expected
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        pytest.param([], id="empty"),
+        pytest.param(["0x1", "0x2"], id="too many"),
+        pytest.param(["xyz"], id="not hex"),
+    ],
+)
+def test_study_create_result_value_raises(values: list[str]) -> None:
+    study = _create_indexed_study(Path("test/s01"))
+    with pytest.raises(LD2ParameterError):
+        study.create_result_value(values)
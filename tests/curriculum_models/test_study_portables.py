@@ -13,6 +13,8 @@ from lite_dist2.study_strategies import StudyStrategyModel
 from lite_dist2.study_strategies.base_study_strategy import StudyStrategyParam
 from lite_dist2.suggest_strategies import SuggestStrategyModel
 from lite_dist2.suggest_strategies.base_suggest_strategy import SuggestStrategyParam
+from lite_dist2.table_node_api.msgpack_codec import unpackb
+from lite_dist2.table_node_api.table_response import StudyResponse
 from lite_dist2.trial_repositories.trial_repository_model import TrialRepositoryModel
 from lite_dist2.value_models.aligned_space import ParameterAlignedSpacePortableModel
 from lite_dist2.value_models.aligned_space_registry import LineSegmentRegistry, ParameterAlignedSpaceRegistry
@@ -244,6 +246,162 @@ def test_study_registry_to_study_model(registry: StudyRegistry, expected: StudyM
             False,
             id="all_calculation, infinite: False",
         ),
+        pytest.param(
+            StudyRegistry(
+                name="test_registry",
+                required_capacity={"test"},
+                study_strategy=StudyStrategyModel(
+                    type="minimize",
+                    study_strategy_param=StudyStrategyParam(top_k=3),
+                ),
+                suggest_strategy=SuggestStrategyModel(
+                    type="sequential",
+                    suggest_strategy_param=SuggestStrategyParam(strict_aligned=True),
+                ),
+                const_param=None,
+                parameter_space=ParameterAlignedSpaceRegistry(
+                    type="aligned",
+                    axes=[
+                        LineSegmentRegistry(name="x", type="int", size="0x64", step="0x2", start="0x0"),
+                    ],
+                ),
+                result_type="scalar",
+                result_value_type="int",
+            ),
+            True,
+            id="minimize, finite: True",
+        ),
+        pytest.param(
+            StudyRegistry(
+                name="test_registry",
+                required_capacity={"test"},
+                study_strategy=StudyStrategyModel(
+                    type="minimize",
+                    study_strategy_param=StudyStrategyParam(top_k=3),
+                ),
+                suggest_strategy=SuggestStrategyModel(
+                    type="sequential",
+                    suggest_strategy_param=SuggestStrategyParam(strict_aligned=True),
+                ),
+                const_param=None,
+                parameter_space=ParameterAlignedSpaceRegistry(
+                    type="aligned",
+                    axes=[
+                        LineSegmentRegistry(name="x", type="int", size=None, step="0x2", start="0x0"),
+                    ],
+                ),
+                result_type="scalar",
+                result_value_type="int",
+            ),
+            False,
+            id="minimize, infinite without target: False",
+        ),
+        pytest.param(
+            StudyRegistry(
+                name="test_registry",
+                required_capacity={"test"},
+                study_strategy=StudyStrategyModel(
+                    type="minimize",
+                    study_strategy_param=StudyStrategyParam(
+                        target_value=ScalarValue(type="scalar", value_type="int", value="0x0")
+                    ),
+                ),
+                suggest_strategy=SuggestStrategyModel(
+                    type="sequential",
+                    suggest_strategy_param=SuggestStrategyParam(strict_aligned=True),
+                ),
+                const_param=None,
+                parameter_space=ParameterAlignedSpaceRegistry(
+                    type="aligned",
+                    axes=[
+                        LineSegmentRegistry(name="x", type="int", size=None, step="0x2", start="0x0"),
+                    ],
+                ),
+                result_type="scalar",
+                result_value_type="int",
+            ),
+            True,
+            id="minimize, infinite with target: True",
+        ),
+        pytest.param(
+            StudyRegistry(
+                name="test_registry",
+                required_capacity={"test"},
+                study_strategy=StudyStrategyModel(
+                    type="minimize",
+                    study_strategy_param=StudyStrategyParam(top_k=3),
+                ),
+                suggest_strategy=SuggestStrategyModel(
+                    type="sequential",
+                    suggest_strategy_param=SuggestStrategyParam(strict_aligned=True),
+                ),
+                const_param=None,
+                parameter_space=ParameterAlignedSpaceRegistry(
+                    type="aligned",
+                    axes=[
+                        LineSegmentRegistry(name="x", type="int", size="0x64", step="0x2", start="0x0"),
+                    ],
+                ),
+                result_type="vector",
+                result_value_type="int",
+            ),
+            False,
+            id="minimize, vector: False",
+        ),
+        pytest.param(
+            StudyRegistry(
+                name="test_registry",
+                required_capacity={"test"},
+                study_strategy=StudyStrategyModel(
+                    type="find_exact",
+                    study_strategy_param=StudyStrategyParam(
+                        target_value=ScalarValue(type="scalar", value_type="int", value="0x0"),
+                    ),
+                ),
+                suggest_strategy=SuggestStrategyModel(
+                    type="random",
+                    suggest_strategy_param=SuggestStrategyParam(strict_aligned=False),
+                ),
+                const_param=None,
+                parameter_space=ParameterAlignedSpaceRegistry(
+                    type="aligned",
+                    axes=[
+                        LineSegmentRegistry(name="x", type="int", size="0x64", step="0x2", start="0x0"),
+                    ],
+                ),
+                result_type="scalar",
+                result_value_type="int",
+            ),
+            True,
+            id="random, finite: True",
+        ),
+        pytest.param(
+            StudyRegistry(
+                name="test_registry",
+                required_capacity={"test"},
+                study_strategy=StudyStrategyModel(
+                    type="find_exact",
+                    study_strategy_param=StudyStrategyParam(
+                        target_value=ScalarValue(type="scalar", value_type="int", value="0x0"),
+                    ),
+                ),
+                suggest_strategy=SuggestStrategyModel(
+                    type="random",
+                    suggest_strategy_param=SuggestStrategyParam(strict_aligned=False),
+                ),
+                const_param=None,
+                parameter_space=ParameterAlignedSpaceRegistry(
+                    type="aligned",
+                    axes=[
+                        LineSegmentRegistry(name="x", type="int", size=None, step="0x2", start="0x0"),
+                    ],
+                ),
+                result_type="scalar",
+                result_value_type="int",
+            ),
+            False,
+            id="random, infinite: False",
+        ),
     ],
 )
 def test_study_registry_is_valid(study_registry: StudyRegistry, expected: bool) -> None:
@@ -374,3 +532,95 @@ def test_study_registry_is_valid(study_registry: StudyRegistry, expected: bool)
 def test_study_storage_to_summary(storage: StudyStorage, expected: StudySummary) -> None:
     actual = storage.to_summary()
     assert actual == expected
+
+
+def _create_stored_storage(tmp_path: str) -> tuple[StudyStorage, MappingsStorage]:
+    results = MappingsStorage(
+        params_info=(ScalarValue(type="scalar", name="x", value_type="int", value="0x0"),),
+        result_info=ScalarValue(type="scalar", value_type="float", value="0x0.0p+0"),
+        values=[(hex(i), float(i).hex()) for i in range(10)],
+    )
+    results_path = Path(tmp_path) / "results.json"
+    with results_path.open("w") as f:
+        f.write(results.model_dump_json())
+    storage = StudyStorage(
+        study_id="test_1",
+        name="test_name",
+        required_capacity=set(),
+        registered_timestamp=DT,
+        const_param=None,
+        parameter_space=ParameterAlignedSpacePortableModel(
+            type="aligned",
+            axes=[
+                LineSegmentPortableModel(
+                    name="x",
+                    type="int",
+                    size="0xa",
+                    step="0x1",
+                    start="0x0",
+                    ambient_size="0xa",
+                    ambient_index="0x0",
+                ),
+            ],
+            check_lower_filling=True,
+        ),
+        done_timestamp=DT + timedelta(days=1),
+        results_path=results_path,
+        result_type="scalar",
+        result_value_type="float",
+        study_strategy=StudyStrategyModel(type="all_calculation", study_strategy_param=None),
+        suggest_strategy=SuggestStrategyModel(
+            type="sequential",
+            suggest_strategy_param=SuggestStrategyParam(strict_aligned=True),
+        ),
+        done_grids=10,
+        trial_repository=TrialRepositoryModel(type="normal", save_dir=Path(tmp_path) / "test_1"),
+    )
+    return storage, results
+
+
+@pytest.mark.asyncio
+async def test_study_storage_iter_json(tmp_path: str) -> None:
+    storage, results = _create_stored_storage(tmp_path)
+    expected = storage.model_copy(update={"results": results, "results_path": None})
+
+    actual = StudyStorage.model_validate_json(b"".join([chunk async for chunk in storage.iter_json(chunk_size=16)]))
+    assert actual == expected
+
+    response = StudyResponse.model_validate_json(
+        b"".join([chunk async for chunk in StudyResponse.iter_done_json(storage)]),
+    )
+    assert response == StudyResponse(status=StudyStatus.done, result=expected)
+
+    response = StudyResponse.model_validate(
+        unpackb(b"".join([chunk async for chunk in StudyResponse.iter_done_msgpack(storage)])),
+    )
+    assert response == StudyResponse(status=StudyStatus.done, result=expected)
+
+
+@pytest.mark.asyncio
+async def test_study_storage_load_results(tmp_path: str) -> None:
+    storage, results = _create_stored_storage(tmp_path)
+    results_path = storage.results_path
+    assert results_path is not None
+
+    await storage.load_results()
+    assert storage.results == results
+    assert storage.results_path is None
+    assert not results_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_study_storage_delete_files(tmp_path: str) -> None:
+    storage, _ = _create_stored_storage(tmp_path)
+    results_path = storage.results_path
+    assert results_path is not None
+    trial_dir = storage.trial_repository.save_dir
+    trial_dir.mkdir()
+    (trial_dir / "t01.json").write_text("{}")
+
+    await storage.delete_files()
+    assert not results_path.exists()
+    assert not trial_dir.exists()
+    # 消した後にもう一度呼んでも失敗しない
+    await storage.delete_files()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from lite_dist2.curriculum_models.study import Study
+from lite_dist2.curriculum_models.study_scheduler import StudyScheduler
+from lite_dist2.curriculum_models.study_status import StudyStatus
+from lite_dist2.curriculum_models.trial_table import TrialTable
+from lite_dist2.study_strategies.all_calculation_study_strategy import AllCalculationStudyStrategy
+from lite_dist2.suggest_strategies import SequentialSuggestStrategy
+from lite_dist2.suggest_strategies.base_suggest_strategy import SuggestStrategyParam
+from lite_dist2.trial_repositories.normal_trial_repository import NormalTrialRepository
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+from tests.const import DT
+
+_PARAMETER_SPACE = ParameterAlignedSpace(
+    axes=[LineSegment(name="x", type_="int", size=10, step=1, start=0, ambient_size=10, ambient_index=0)],
+    check_lower_filling=True,
+)
+
+
+def _create_study(
+    study_id: str,
+    priority: int = 0,
+    weight: float = 1.0,
+    required_capacity: set[str] | None = None,
+    status: StudyStatus = StudyStatus.wait,
+) -> Study:
+    return Study(
+        study_id=study_id,
+        name=study_id,
+        required_capacity=required_capacity or set(),
+        status=status,
+        registered_timestamp=DT,
+        study_strategy=AllCalculationStudyStrategy(None),
+        suggest_strategy=SequentialSuggestStrategy(SuggestStrategyParam(strict_aligned=True), _PARAMETER_SPACE),
+        const_param=None,
+        parameter_space=_PARAMETER_SPACE,
+        result_type="scalar",
+        result_value_type="int",
+        trial_table=TrialTable(trials=[], aggregated_parameter_space=None),
+        trial_repository=NormalTrialRepository(save_dir=Path("test") / study_id),
+        priority=priority,
+        weight=weight,
+    )
+
+
+def _reserve(scheduler: StudyScheduler, retaining_capacity: set[str], num: int) -> Counter[str]:
+    # 1 回に 1 つずつ予約して、study ごとの予約数を数える
+    counts: Counter[str] = Counter()
+    for _ in range(num):
+        selected = scheduler.select(retaining_capacity)
+        assert selected is not None
+        study, _ = selected
+        scheduler.charge(study.study_id, 1)
+        counts[study.study_id] += 1
+    return counts
+
+
+@pytest.mark.parametrize(
+    ("weights", "expected"),
+    [
+        pytest.param({"s1": 1.0, "s2": 1.0}, {"s1": 50, "s2": 50}, id="equal"),
+        pytest.param({"s1": 3.0, "s2": 1.0}, {"s1": 75, "s2": 25}, id="3:1"),
+        pytest.param({"s1": 1.0, "s2": 2.0, "s3": 2.0}, {"s1": 20, "s2": 40, "s3": 40}, id="1:2:2"),
+    ],
+)
+def test_study_scheduler_splits_by_weight(weights: dict[str, float], expected: dict[str, int]) -> None:
+    scheduler = StudyScheduler(_create_study(study_id, weight=weight) for study_id, weight in weights.items())
+    assert _reserve(scheduler, set(), 100) == expected
+
+
+def test_study_scheduler_prefers_priority() -> None:
+    scheduler = StudyScheduler([_create_study("low", weight=100.0), _create_study("high", priority=1)])
+    assert _reserve(scheduler, set(), 10) == {"high": 10}
+
+    # 優先度の高い study が払い出せなくなると、次の優先度の study に回る
+    scheduler.park("high")
+    assert _reserve(scheduler, set(), 10) == {"low": 10}
+    scheduler.unpark("high")
+    assert _reserve(scheduler, set(), 10) == {"high": 10}
+
+
+def test_study_scheduler_new_study_starts_from_now() -> None:
+    scheduler = StudyScheduler([_create_study("big")])
+    _ = _reserve(scheduler, set(), 1000)
+
+    # 後から登録した study は、それまでの予約数の差をまとめて取り返さない
+    scheduler.add(_create_study("small"))
+    assert _reserve(scheduler, set(), 10) == {"big": 5, "small": 5}
+
+
+def test_study_scheduler_select_share() -> None:
+    scheduler = StudyScheduler([_create_study("s1", weight=4.0), _create_study("s2")])
+    scheduler.charge("s2", 3)
+    selected = scheduler.select(set())
+    assert selected is not None
+    study, share = selected
+    # s2 に並ぶまで s1 は 3 * 4 = 12 個予約できる
+    assert study.study_id == "s1"
+    assert share == 12
+
+    scheduler.remove("s2")
+    assert scheduler.select(set()) == (study, None)
+
+
+def test_study_scheduler_select_share_skips_stale_entries() -> None:
+    scheduler = StudyScheduler([_create_study(study_id) for study_id in ["s1", "s2", "s3", "s4"]])
+    for study_id in ["s2", "s3", "s2", "s3"]:
+        scheduler.charge(study_id, 1)
+    selected = scheduler.select(set())
+    assert selected is not None
+    study, share = selected
+    # 先頭の子は古い entry なので、その奥にある s4 が次点になる
+    assert study.study_id == "s1"
+    assert share == 1
+
+
+def test_study_scheduler_filters_capacity() -> None:
+    scheduler = StudyScheduler(
+        [
+            _create_study("hash", required_capacity={"hash"}),
+            _create_study("both", required_capacity={"hash", "preimage"}),
+            _create_study("free"),
+        ],
+    )
+    assert _reserve(scheduler, {"hash"}, 10) == {"hash": 5, "free": 5}
+    assert scheduler.select({"mandelbrot"}) is not None
+    assert [study.study_id for study in scheduler.ordered({"hash", "preimage"})] == ["both", "hash", "free"]
+
+    scheduler.remove("free")
+    assert scheduler.select({"mandelbrot"}) is None
+
+
+def test_study_scheduler_ordered() -> None:
+    scheduler = StudyScheduler(
+        [
+            _create_study("s1"),
+            _create_study("s2", status=StudyStatus.running),
+            _create_study("s3"),
+            _create_study("s4", priority=-1),
+        ],
+    )
+    # 予約数が同じなら running の study、登録順の順。park された study は最後に並ぶ
+    assert [study.study_id for study in scheduler.ordered(set())] == ["s2", "s1", "s3", "s4"]
+    scheduler.charge("s2", 1)
+    scheduler.park("s1")
+    assert [study.study_id for study in scheduler.ordered(set())] == ["s3", "s2", "s4", "s1"]
@@ -1,10 +1,12 @@
 from datetime import datetime
+from typing import Literal
 
 import pytest
 
 from lite_dist2.curriculum_models.mapping import Mapping
 from lite_dist2.curriculum_models.trial import Trial, TrialDoneRecord, TrialModel, TrialStatus
-from lite_dist2.expections import LD2NotDoneError
+from lite_dist2.expections import LD2ModelTypeError, LD2NotDoneError
+from lite_dist2.type_definitions import RawParamType, RawResultType
 from lite_dist2.value_models.aligned_space import ParameterAlignedSpace, ParameterAlignedSpacePortableModel
 from lite_dist2.value_models.jagged_space import ParameterJaggedSpace, ParameterJaggedSpacePortableModel
 from lite_dist2.value_models.line_segment import DummyLineSegment, LineSegment, LineSegmentPortableModel
@@ -37,7 +39,14 @@ def test_trial_done_record_calc_duration_sec() -> None:
     assert actual == expected
 
 
-def test_trial_done_record_calc_grid_per_sec() -> None:
+@pytest.mark.parametrize(
+    ("compute_seconds", "expected"),
+    [
+        pytest.param(None, 80.0, id="from reserved to registered"),
+        pytest.param(0.5, 240.0, id="reported by worker"),
+    ],
+)
+def test_trial_done_record_calc_grid_per_sec(compute_seconds: float | None, expected: float) -> None:
     rec = TrialDoneRecord(
         trial_id="t01",
         reserved_timestamp=datetime(2025, 4, 27, 20, 36, 10, 0, tzinfo=JST),
@@ -45,9 +54,9 @@ def test_trial_done_record_calc_grid_per_sec() -> None:
         worker_node_id="w01",
         registered_timestamp=datetime(2025, 4, 27, 20, 36, 11, 500_000, tzinfo=JST),
         grid_size=120,
+        compute_seconds=compute_seconds,
     )
     actual = rec.calc_grid_per_sec()
-    expected = 80.0
     assert actual == expected
 
 
@@ -184,6 +193,88 @@ def test_trial_find_target_value(trial: Trial, target: ResultType, expected: Map
     assert actual == expected
 
 
+def _create_running_trial(
+    parameter_space: ParameterAlignedSpace | ParameterJaggedSpace,
+    result_type: Literal["scalar", "vector"],
+) -> Trial:
+    return Trial(
+        study_id="s01",
+        trial_id="t01",
+        reserved_timestamp=DT,
+        trial_status=TrialStatus.running,
+        const_param=None,
+        parameter_space=parameter_space,
+        result_type=result_type,
+        result_value_type="float",
+        worker_node_name="w01",
+        worker_node_id="w01",
+    )
+
+
+@pytest.mark.parametrize(
+    ("trial", "raw_mappings", "expected"),
+    [
+        pytest.param(
+            _create_running_trial(_dummy_aligned_space, "scalar"),
+            [((1,), 0.5), ((2,), 3)],
+            [
+                Mapping(
+                    params=(ScalarValue(type="scalar", value_type="int", value="0x1", name="x"),),
+                    result=ScalarValue(type="scalar", value_type="float", value="0x1.0000000000000p-1"),
+                ),
+                Mapping(
+                    params=(ScalarValue(type="scalar", value_type="int", value="0x2", name="x"),),
+                    result=ScalarValue(type="scalar", value_type="float", value="0x1.8000000000000p+1"),
+                ),
+            ],
+            id="aligned scalar",
+        ),
+        pytest.param(
+            _create_running_trial(_dummy_space, "vector"),
+            [((0,), [0.5, 1.0]), ((1,), [2.0])],
+            [
+                Mapping(
+                    params=(ScalarValue(type="scalar", value_type="int", value="0x0", name="x"),),
+                    result=VectorValue(
+                        type="vector",
+                        value_type="float",
+                        values=["0x1.0000000000000p-1", "0x1.0000000000000p+0"],
+                    ),
+                ),
+                Mapping(
+                    params=(ScalarValue(type="scalar", value_type="int", value="0x1", name="x"),),
+                    result=VectorValue(type="vector", value_type="float", values=["0x1.0000000000000p+1"]),
+                ),
+            ],
+            id="jagged vector",
+        ),
+        pytest.param(_create_running_trial(_dummy_aligned_space, "scalar"), [], [], id="empty"),
+    ],
+)
+def test_trial_convert_mappings_from(
+    trial: Trial,
+    raw_mappings: list[tuple[RawParamType, RawResultType]],
+    expected: list[Mapping],
+) -> None:
+    actual = trial.convert_mappings_from(raw_mappings)
+    assert actual == expected
+
+
+@pytest.mark.parametrize(
+    ("trial", "raw_mappings"),
+    [
+        pytest.param(_create_running_trial(_dummy_aligned_space, "scalar"), [((1,), [0.5])], id="scalar"),
+        pytest.param(_create_running_trial(_dummy_aligned_space, "vector"), [((1,), 0.5)], id="vector"),
+    ],
+)
+def test_trial_convert_mappings_from_raises_on_result_type(
+    trial: Trial,
+    raw_mappings: list[tuple[RawParamType, RawResultType]],
+) -> None:
+    with pytest.raises(LD2ModelTypeError):
+        trial.convert_mappings_from(raw_mappings)
+
+
 def test_to_done_record() -> None:
     trial = Trial(
         study_id="s01",
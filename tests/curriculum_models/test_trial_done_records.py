@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+import pytest
+
+from lite_dist2.curriculum_models.trial import TrialDoneRecord
+from lite_dist2.curriculum_models.trial_done_records import TrialDoneRecords, TrialDoneRecordsModel
+from lite_dist2.expections import LD2ParameterError
+from tests.const import DT
+
+
+def _create_records() -> TrialDoneRecords:
+    records = TrialDoneRecords()
+    records.append(
+        "t01",
+        reserved_timestamp=DT,
+        worker_node_name="w01",
+        worker_node_id="w01",
+        registered_timestamp=DT + timedelta(seconds=10),
+        grid_size=4,
+    )
+    records.append(
+        "t02",
+        reserved_timestamp=DT,
+        worker_node_name=None,
+        worker_node_id="w02",
+        registered_timestamp=DT + timedelta(seconds=20),
+        grid_size=8,
+    )
+    # 登録時刻の無い古い trial
+    records.append(
+        "t03",
+        reserved_timestamp=DT,
+        worker_node_name="w01",
+        worker_node_id="w01",
+        registered_timestamp=None,
+        grid_size=2,
+    )
+    return records
+
+
+def test_trial_done_records_count() -> None:
+    records = _create_records()
+    assert len(records) == 3
+    assert records.count_grid() == 14
+    assert "t02" in records
+    assert "t04" not in records
+    assert list(records.iter_trial_ids()) == ["t01", "t02", "t03"]
+
+
+def test_trial_done_records_find() -> None:
+    records = _create_records()
+    expected = TrialDoneRecord(
+        trial_id="t02",
+        reserved_timestamp=DT,
+        worker_node_name=None,
+        worker_node_id="w02",
+        registered_timestamp=DT + timedelta(seconds=20),
+        grid_size=8,
+    )
+    assert records.find("t02") == expected
+
+
+def test_trial_done_records_find_last_duplicate() -> None:
+    records = _create_records()
+    records.append(
+        "t01",
+        reserved_timestamp=DT,
+        worker_node_name="w02",
+        worker_node_id="w02",
+        registered_timestamp=DT + timedelta(seconds=30),
+        grid_size=4,
+    )
+    # 同じ trial_id が複数あるときは最後の行を返す
+    assert records.find("t01").worker_node_id == "w02"
+    reconstructed = TrialDoneRecords.from_model(records.to_model())
+    assert reconstructed.find("t01").worker_node_id == "w02"
+    assert "t01" in reconstructed
+
+
+@pytest.mark.parametrize("trial_id", ["t03", "t04"])
+def test_trial_done_records_find_raises(trial_id: str) -> None:
+    records = _create_records()
+    with pytest.raises(LD2ParameterError, match=r"Not\sfound\sdone\srecord"):
+        _ = records.find(trial_id)
+
+
+@pytest.mark.parametrize(
+    ("cutoff_seconds", "expected_ids"),
+    [
+        pytest.param(0, ["t01", "t02"], id="all"),
+        pytest.param(10, ["t02"], id="exclusive"),
+        pytest.param(20, [], id="none"),
+    ],
+)
+def test_trial_done_records_gen_record_list(cutoff_seconds: int, expected_ids: list[str]) -> None:
+    records = _create_records()
+    actual = records.gen_record_list(DT + timedelta(seconds=cutoff_seconds))
+    assert [record.trial_id for record in actual] == expected_ids
+
+
+def test_trial_done_records_to_model_from_model() -> None:
+    model = _create_records().to_model()
+    reconstructed = TrialDoneRecords.from_model(model)
+    assert reconstructed.to_model() == model
+    assert reconstructed.count_grid() == 14
+    assert reconstructed.find("t01").registered_timestamp == DT + timedelta(seconds=10)
+
+
+def test_trial_done_records_from_model_raises() -> None:
+    model = TrialDoneRecordsModel(
+        trial_ids=["t01"],
+        reserved_timestamps=[],
+        worker_node_names=["w01"],
+        worker_node_ids=["w01"],
+        registered_timestamps=[0],
+        grid_sizes=[1],
+    )
+    with pytest.raises(LD2ParameterError, match=r"same\slength"):
+        _ = TrialDoneRecords.from_model(model)
@@ -0,0 +1,119 @@
+from typing import Literal
+
+import pytest
+
+from lite_dist2.curriculum_models.trial import Trial, TrialStatus
+from lite_dist2.curriculum_models.trial_result import TrialResultModel
+from lite_dist2.expections import LD2ParameterError
+from lite_dist2.table_node_api.table_param import TrialRegisterParam, TrialResultRegisterParam
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.jagged_space import ParameterJaggedSpace
+from lite_dist2.value_models.line_segment import DummyLineSegment, LineSegment
+from lite_dist2.value_models.space_type import ParameterSpaceType
+from tests.const import DT
+
+
+def _create_trial(
+    parameter_space: ParameterSpaceType,
+    result_type: Literal["scalar", "vector"] = "scalar",
+    result_value_type: Literal["bool", "int", "float"] = "int",
+) -> Trial:
+    return Trial(
+        study_id="s01",
+        trial_id="t01",
+        reserved_timestamp=DT,
+        trial_status=TrialStatus.running,
+        const_param=None,
+        parameter_space=parameter_space,
+        result_type=result_type,
+        result_value_type=result_value_type,
+        worker_node_name="w01",
+        worker_node_id="w01",
+    )
+
+
+def _aligned_space() -> ParameterAlignedSpace:
+    return ParameterAlignedSpace(
+        axes=[
+            LineSegment(name="x", type_="int", size=3, step=1, start=-1, ambient_index=0, ambient_size=3),
+            LineSegment(name="y", type_="float", size=4, step=0.5, start=0.0, ambient_index=0, ambient_size=4),
+        ],
+        check_lower_filling=True,
+    )
+
+
+def _jagged_space() -> ParameterJaggedSpace:
+    return ParameterJaggedSpace(
+        parameters=[(1, 0.5), (3, -2.0), (2**70, 1.25)],
+        ambient_indices=[(0, 0), (1, 2), (2, 1)],
+        axes_info=[
+            DummyLineSegment(type_="int", name="x", ambient_size=3, step=1),
+            DummyLineSegment(type_="float", name="y", ambient_size=3, step=1),
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    ("parameter_space", "result_type", "result_value_type", "func"),
+    [
+        pytest.param(_aligned_space(), "scalar", "int", lambda x, y: x * 10 + int(y * 2), id="aligned scalar int"),
+        pytest.param(_aligned_space(), "scalar", "float", lambda x, y: x / 3 + y, id="aligned scalar float"),
+        pytest.param(_aligned_space(), "scalar", "bool", lambda x, y: x > y, id="aligned scalar bool"),
+        pytest.param(_aligned_space(), "vector", "float", lambda x, y: [x * y, x - y], id="aligned vector"),
+        pytest.param(_jagged_space(), "scalar", "int", lambda x, _: x * 2, id="jagged bigint"),
+    ],
+)
+@pytest.mark.parametrize("shuffle", [False, True], ids=["grid order", "reversed"])
+def test_trial_result_model_round_trip(
+    parameter_space: ParameterSpaceType,
+    result_type: Literal["scalar", "vector"],
+    result_value_type: Literal["bool", "int", "float"],
+    func,  # noqa: ANN001
+    shuffle: bool,
+) -> None:
+    worker_trial = _create_trial(parameter_space, result_type, result_value_type)
+    raw_mappings = [(param, func(*param)) for param in worker_trial.parameter_space.grid()]
+    expected = worker_trial.convert_mappings_from(raw_mappings)
+    # マルチプロセスで計算したときのように順番が入れ替わっていても良い
+    worker_trial.set_result(worker_trial.convert_mappings_from(raw_mappings[::-1] if shuffle else raw_mappings))
+
+    param = TrialResultRegisterParam(result=TrialResultModel.from_trial(worker_trial))
+    received = TrialResultRegisterParam.model_validate_json(param.model_dump_json())
+
+    table_trial = _create_trial(parameter_space, result_type, result_value_type)
+    actual = received.result.to_mappings(table_trial)
+    assert actual == expected
+
+
+def test_trial_result_model_is_smaller_than_trial_model() -> None:
+    trial = _create_trial(_aligned_space())
+    trial.set_result(trial.convert_mappings_from([(param, param[0]) for param in trial.parameter_space.grid()]))
+    lean_size = len(TrialResultRegisterParam(result=TrialResultModel.from_trial(trial)).model_dump_json())
+    full_size = len(TrialRegisterParam(trial=trial.to_model()).model_dump_json())
+    assert lean_size * 3 < full_size
+
+
+@pytest.mark.parametrize(
+    "raw_mappings",
+    [
+        pytest.param([((-1, 0.0), 1)], id="missing"),
+        pytest.param([((9, 0.0), 1)] * 12, id="out of space"),
+        pytest.param([((-1, 0.0), 1)] * 12, id="duplicated"),
+    ],
+)
+def test_trial_result_model_from_trial_raises_unmatched_results(raw_mappings: list) -> None:
+    trial = _create_trial(_aligned_space())
+    trial.set_result(trial.convert_mappings_from(raw_mappings))
+    with pytest.raises(LD2ParameterError):
+        TrialResultModel.from_trial(trial)
+
+
+def test_trial_result_model_to_mappings_raises_row_num() -> None:
+    worker_trial = _create_trial(_aligned_space())
+    worker_trial.set_result(
+        worker_trial.convert_mappings_from([(param, 1) for param in worker_trial.parameter_space.grid()]),
+    )
+    result = TrialResultModel.from_trial(worker_trial)
+    table_trial = _create_trial(_jagged_space())
+    with pytest.raises(LD2ParameterError):
+        result.to_mappings(table_trial)
@@ -1,4 +1,4 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 import pytest
 from pytest_mock import MockFixture
@@ -1118,6 +1118,36 @@ def test_trial_table_to_model_from_model(model: TrialTableModel) -> None:
     assert model == reconstructed_model
 
 
+def test_trial_table_from_model_moves_done_trials_to_records() -> None:
+    # done の trial を trials に持つ古い形式
+    running, done = (
+        TrialModel(
+            study_id="s01",
+            trial_id=trial_id,
+            reserved_timestamp=DT,
+            trial_status=status,
+            const_param=None,
+            parameter_space=_DUMMY_PARAMETER_SPACE.to_model(),
+            result_type="scalar",
+            result_value_type="int",
+            worker_node_name="w01",
+            worker_node_id="w01",
+            registered_timestamp=DT + timedelta(seconds=1) if status == TrialStatus.done else None,
+        )
+        for trial_id, status in (("t02", TrialStatus.running), ("t01", TrialStatus.done))
+    )
+    table = TrialTable.from_model(TrialTableModel(trials=[done, running], aggregated_parameter_space=None))
+
+    assert [trial.trial_id for trial in table.trials] == ["t02"]
+    assert table.count_trial() == 2
+    assert table.count_grid() == 4
+    assert list(table.iter_trial_ids()) == ["t01", "t02"]
+    assert [record.trial_id for record in table.gen_done_record_list(DT)] == ["t01"]
+    assert table.to_model().trials == [running]
+    with pytest.raises(LD2ParameterError, match=r"already\sdone"):
+        _ = table.find_trial("t01")
+
+
 @pytest.mark.parametrize(
     ("trial_table", "trial_id", "worker_node_id", "expected"),
     [
@@ -1759,6 +1789,7 @@ def test_trial_table_receipt_trial_result(
     expected_model = expected.to_model()
     assert actual_model.trials == expected_model.trials
     assert actual_model.aggregated_parameter_space == expected_model.aggregated_parameter_space
+    assert sorted(actual_model.done_records.trial_ids) == sorted(expected_model.done_records.trial_ids)
 
 
 def test_trial_table_receipt_trial_result_raise_override_done_trial() -> None:
@@ -2005,3 +2036,41 @@ def test_trial_table_check_timeout_trial() -> None:
     actual_ids = trial_table.check_timeout_trial(now, timeout_seconds=300)
     assert actual_ids == expected_ids
     assert trial_table.to_model() == expected_trial_table.to_model()
+
+
+def test_trial_table_find_least_division_follows_register_and_timeout() -> None:
+    def _trial(trial_id: str, start: int, reserved_timestamp: datetime) -> Trial:
+        return Trial(
+            study_id="s01",
+            trial_id=trial_id,
+            reserved_timestamp=reserved_timestamp,
+            trial_status=TrialStatus.running,
+            const_param=None,
+            parameter_space=ParameterAlignedSpace(
+                axes=[
+                    LineSegment(
+                        name="x", type_="int", size=10, step=1, start=start, ambient_index=start, ambient_size=100
+                    ),
+                ],
+                check_lower_filling=True,
+            ),
+            result_type="scalar",
+            result_value_type="int",
+            worker_node_name="w01",
+            worker_node_id="w01",
+        )
+
+    now = DT
+    trial_table = TrialTable(trials=[], aggregated_parameter_space=None)
+    first = _trial("t01", 0, now - timedelta(seconds=3000))
+    trial_table.register(first)
+    trial_table.init_aps(first)
+    trial_table.register(_trial("t02", 10, now))
+    assert trial_table.find_least_division(100) == FlattenSegment(20, None)
+
+    trial_table.receipt_trial_result("t02", "w01")
+    trial_table.simplify_aps()
+    assert trial_table.find_least_division(100) == FlattenSegment(20, None)
+
+    assert trial_table.check_timeout_trial(now, timeout_seconds=300) == ["t01"]
+    assert trial_table.find_least_division(100) == FlattenSegment(0, 10)
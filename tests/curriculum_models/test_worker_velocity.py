@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+import pytest
+
+from lite_dist2.curriculum_models.trial import TrialDoneRecord
+from lite_dist2.curriculum_models.worker_velocity import WorkerVelocityTracker
+from tests.const import DT
+
+
+def _create_record(
+    worker_node_id: str,
+    grid_size: int,
+    duration_seconds: float,
+    compute_seconds: float | None = None,
+) -> TrialDoneRecord:
+    return TrialDoneRecord(
+        trial_id="t01",
+        reserved_timestamp=DT,
+        worker_node_name=None,
+        worker_node_id=worker_node_id,
+        registered_timestamp=DT + timedelta(seconds=duration_seconds),
+        grid_size=grid_size,
+        compute_seconds=compute_seconds,
+    )
+
+
+@pytest.mark.parametrize(
+    ("records", "expected"),
+    [
+        pytest.param([], None, id="empty"),
+        pytest.param([_create_record("w01", 100, 10)], 10.0, id="single"),
+        pytest.param([_create_record("w01", 100, 10), _create_record("w01", 300, 10)], 20.0, id="smoothed"),
+        pytest.param([_create_record("w01", 100, 0)], None, id="zero duration"),
+        pytest.param([_create_record("w01", 100, 20, 5)], 20.0, id="compute time"),
+        pytest.param([_create_record("w01", 100, 20, 0)], None, id="zero compute time"),
+        pytest.param([_create_record("w02", 100, 10)], None, id="other worker"),
+    ],
+)
+def test_worker_velocity_tracker_add(records: list[TrialDoneRecord], expected: float | None) -> None:
+    tracker = WorkerVelocityTracker()
+    for record in records:
+        tracker.add(record)
+    assert tracker.get("w01") == expected
+
+
+@pytest.mark.parametrize(
+    ("records", "target_duration_seconds", "max_size", "expected"),
+    [
+        pytest.param([], 30, 100, WorkerVelocityTracker.INITIAL_SIZE, id="unknown"),
+        pytest.param([_create_record("w01", 100, 10)], 3, 100, 30, id="target"),
+        pytest.param([_create_record("w01", 100, 10)], 30, 100, 100, id="capped by max_size"),
+        pytest.param([_create_record("w01", 1, 100)], 3, 100, 1, id="at least 1"),
+    ],
+)
+def test_worker_velocity_tracker_calc_trial_size(
+    records: list[TrialDoneRecord],
+    target_duration_seconds: float,
+    max_size: int,
+    expected: int,
+) -> None:
+    tracker = WorkerVelocityTracker()
+    for record in records:
+        tracker.add(record)
+    assert tracker.calc_trial_size("w01", target_duration_seconds, max_size) == expected
@@ -434,3 +434,104 @@ async def test_all_calculation_study_strategy_extract_mapping_raise(
     strategy = AllCalculationStudyStrategy(None)
     with pytest.raises(LD2NotDoneError):
         _ = await strategy.extract_mappings(repo)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "trial_repository_fixture",
+    [
+        pytest.param(
+            [
+                TrialModel(
+                    trial_id=f"t0{i}",
+                    trial_status=TrialStatus.done,
+                    results=[
+                        Mapping(
+                            params=(
+                                ScalarValue(type="scalar", value_type="int", value=hex(j), name="x"),
+                                ScalarValue(type="scalar", value_type="int", value=hex(i), name="y"),
+                            ),
+                            result=VectorValue(type="vector", value_type="int", values=[hex(i * j), hex(i + j)]),
+                        )
+                        for j in range(2)
+                    ],
+                    study_id="s01",
+                    reserved_timestamp=DT,
+                    const_param=None,
+                    parameter_space=_DUMMY_PARAMETER_SPACE_MODEL,
+                    result_type="vector",
+                    result_value_type="int",
+                    worker_node_name="w01",
+                    worker_node_id="w01",
+                )
+                for i in range(2)
+            ],
+            id="Multi trial, multi map, vector",
+        ),
+    ],
+    indirect=["trial_repository_fixture"],
+)
+async def test_all_calculation_study_strategy_dump_mappings(
+    tmp_path: str,
+    trial_repository_fixture: list[TrialModel],
+) -> None:
+    repo = MockTrialRepository()
+    strategy = AllCalculationStudyStrategy(None)
+    path = Path(tmp_path) / "results.json"
+    await strategy.dump_mappings(repo, path)
+
+    with path.open("rb") as f:
+        actual = MappingsStorage.model_validate_json(f.read())
+    assert actual == await strategy.extract_mappings(repo)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "trial_repository_fixture",
+    [
+        pytest.param([], id="Empty"),
+        pytest.param(
+            [
+                TrialModel(
+                    trial_id=f"t0{i}",
+                    trial_status=TrialStatus.done,
+                    results=results,
+                    study_id="s01",
+                    reserved_timestamp=DT,
+                    const_param=None,
+                    parameter_space=_DUMMY_PARAMETER_SPACE_MODEL,
+                    result_type="scalar",
+                    result_value_type="int",
+                    worker_node_name="w01",
+                    worker_node_id="w01",
+                )
+                for i, results in enumerate(
+                    [
+                        [
+                            Mapping(
+                                params=(
+                                    ScalarValue(type="scalar", value_type="int", value="0x1", name="x"),
+                                    ScalarValue(type="scalar", value_type="int", value="0x1", name="y"),
+                                ),
+                                result=ScalarValue(type="scalar", value_type="int", value="0x67"),
+                            ),
+                        ],
+                        None,
+                    ],
+                )
+            ],
+            id="None",
+        ),
+    ],
+    indirect=["trial_repository_fixture"],
+)
+async def test_all_calculation_study_strategy_dump_mappings_raise(
+    tmp_path: str,
+    trial_repository_fixture: list[TrialModel],
+) -> None:
+    repo = MockTrialRepository()
+    strategy = AllCalculationStudyStrategy(None)
+    path = Path(tmp_path) / "results.json"
+    with pytest.raises(LD2NotDoneError):
+        await strategy.dump_mappings(repo, path)
+    assert not path.exists()
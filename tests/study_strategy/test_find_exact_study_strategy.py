@@ -6,7 +6,7 @@ from typing import TYPE_CHECKING, override
 import pytest
 
 from lite_dist2.curriculum_models.mapping import Mapping, MappingsStorage
-from lite_dist2.curriculum_models.trial import TrialModel, TrialStatus
+from lite_dist2.curriculum_models.trial import Trial, TrialModel, TrialStatus
 from lite_dist2.curriculum_models.trial_table import TrialTable
 from lite_dist2.expections import LD2NotDoneError
 from lite_dist2.study_strategies.base_study_strategy import StudyStrategyParam
@@ -344,3 +344,72 @@ async def test_find_exact_study_strategy_extract_mapping_raise(
     strategy = FindExactStudyStrategy(StudyStrategyParam(target_value=target_value))
     with pytest.raises(LD2NotDoneError):
         _ = await strategy.extract_mappings(repo)
+
+
+def _create_done_trial(trial_id: str, result_value: str) -> TrialModel:
+    return TrialModel(
+        trial_id=trial_id,
+        trial_status=TrialStatus.done,
+        results=[
+            Mapping(
+                params=(
+                    ScalarValue(type="scalar", value_type="int", value="0x0", name="x"),
+                    ScalarValue(type="scalar", value_type="int", value="0x1", name="y"),
+                ),
+                result=ScalarValue(type="scalar", value_type="int", value=result_value),
+            ),
+        ],
+        study_id="s01",
+        reserved_timestamp=DT,
+        const_param=None,
+        parameter_space=_DUMMY_PARAMETER_SPACE_MODEL,
+        result_type="scalar",
+        result_value_type="int",
+        worker_node_name="w01",
+        worker_node_id="w01",
+    )
+
+
+class CountingTrialRepository(MockTrialRepository):
+    def __init__(self, trials: list[TrialModel]) -> None:
+        super().__init__()
+        self.trials = trials
+        self.load_count = 0
+
+    @override
+    async def load_all(self) -> list[TrialModel]:
+        self.load_count += 1
+        return self.trials
+
+
+@pytest.mark.asyncio
+async def test_find_exact_study_strategy_is_done_scans_repository_only_once() -> None:
+    table = TrialTable(trials=[], aggregated_parameter_space=None)
+    target_value = ScalarValue(type="scalar", value_type="int", value="0x64")
+    strategy = FindExactStudyStrategy(StudyStrategyParam(target_value=target_value))
+    repo = CountingTrialRepository([_create_done_trial("t01", "0x65")])
+    parameter_space = ParameterAlignedSpace(
+        axes=[
+            LineSegment(name="x", type_="int", size=2, step=1, start=0, ambient_size=2, ambient_index=0),
+            LineSegment(name="y", type_="int", size=2, step=1, start=0, ambient_size=2, ambient_index=0),
+        ],
+        check_lower_filling=True,
+    )
+
+    assert not await strategy.is_done(table, parameter_space, repo)
+    strategy.receipt_trial(Trial.from_model(_create_done_trial("t02", "0x66")))
+    assert not await strategy.is_done(table, parameter_space, repo)
+    strategy.receipt_trial(Trial.from_model(_create_done_trial("t03", "0x64")))
+    assert await strategy.is_done(table, parameter_space, repo)
+    assert repo.load_count == 1
+
+    expected = MappingsStorage(
+        params_info=(
+            ScalarValue(type="scalar", value_type="int", value="0x0", name="x"),
+            ScalarValue(type="scalar", value_type="int", value="0x0", name="y"),
+        ),
+        result_info=ScalarValue(type="scalar", value_type="int", value="0x0"),
+        values=[("0x0", "0x1", "0x64")],
+    )
+    assert await strategy.extract_mappings(repo) == expected
+    assert repo.load_count == 1
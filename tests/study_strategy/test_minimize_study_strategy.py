@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+from typing import TYPE_CHECKING, override
+
+import pytest
+
+from lite_dist2.curriculum_models.trial import Trial, TrialStatus
+from lite_dist2.curriculum_models.trial_table import TrialTable
+from lite_dist2.expections import LD2ModelTypeError, LD2NotDoneError
+from lite_dist2.study_strategies.base_study_strategy import StudyStrategyParam
+from lite_dist2.study_strategies.minimize_study_strategy import MinimizeStudyStrategy
+from lite_dist2.trial_repositories.base_trial_repository import BaseTrialRepository
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+from lite_dist2.value_models.point import ScalarValue, VectorValue
+from tests.const import DT
+
+if TYPE_CHECKING:
+    from lite_dist2.curriculum_models.trial import TrialModel
+    from lite_dist2.trial_repositories.trial_repository_model import TrialRepositoryModel
+    from lite_dist2.type_definitions import TrialRepositoryType
+
+_PARAMETER_SPACE = ParameterAlignedSpace(
+    axes=[LineSegment(name="x", type_="int", size=40, step=1, start=0, ambient_size=40, ambient_index=0)],
+    check_lower_filling=True,
+)
+
+
+class InMemoryTrialRepository(BaseTrialRepository):
+    def __init__(self) -> None:
+        self.save_dir = Path("test/s01")
+        self.trials: dict[str, TrialModel] = {}
+
+    @override
+    @staticmethod
+    def get_repository_type() -> TrialRepositoryType:
+        return "normal"
+
+    @override
+    async def clean_save_dir(self) -> None:
+        pass
+
+    @override
+    async def save(self, trial: TrialModel) -> None:
+        self.trials[trial.trial_id] = trial
+
+    @override
+    async def load(self, trial_id: str) -> TrialModel:
+        return self.trials[trial_id]
+
+    @override
+    async def load_all(self) -> list[TrialModel]:
+        return list(self.trials.values())
+
+    @override
+    async def delete_save_dir(self) -> None:
+        pass
+
+    @override
+    def to_model(self) -> TrialRepositoryModel:
+        raise NotImplementedError
+
+
+def _create_done_trial(trial_id: str, start: int, values: list[float]) -> Trial:
+    trial = Trial(
+        study_id="s01",
+        trial_id=trial_id,
+        reserved_timestamp=DT,
+        trial_status=TrialStatus.done,
+        const_param=None,
+        parameter_space=_PARAMETER_SPACE.slice([(start, len(values))]),
+        result_type="scalar",
+        result_value_type="float",
+        worker_node_name="w01",
+        worker_node_id="w01",
+    )
+    trial.set_result(trial.convert_mappings_from([((start + i,), v) for i, v in enumerate(values)]))
+    return trial
+
+
+async def _receipt(strategy: MinimizeStudyStrategy, repo: BaseTrialRepository, trial: Trial) -> None:
+    # Study._store_receipted_trial と同じ順番で保存してから受け取る
+    trial_model = trial.to_model()
+    results_to_store = strategy.select_results_to_store(trial)
+    if results_to_store is not None:
+        trial_model.results = results_to_store
+    await repo.save(trial_model)
+    strategy.receipt_trial(trial)
+
+
+def _create_values(seed: int) -> list[float]:
+    rng = random.Random(seed)  # noqa: S311
+    return [rng.uniform(-100, 100) for _ in range(40)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("top_k", [1, 3, 8])
+@pytest.mark.parametrize("seed", range(5))
+async def test_minimize_study_strategy_keeps_top_k(top_k: int, seed: int) -> None:
+    values = _create_values(seed)
+    strategy = MinimizeStudyStrategy(StudyStrategyParam(top_k=top_k))
+    repo = InMemoryTrialRepository()
+    for i in range(8):
+        await _receipt(strategy, repo, _create_done_trial(f"t{i:02d}", i * 5, values[i * 5 : i * 5 + 5]))
+
+    expected = sorted(range(40), key=lambda x: values[x])[:top_k]
+    actual = await strategy.extract_mappings(repo)
+    assert [row[0] for row in actual.values] == [hex(x) for x in expected]
+
+    # 保存されるのは上位に入りうる結果だけだが、そこから同じ結果を復元できる
+    assert sum(len(trial.results or []) for trial in repo.trials.values()) < 40
+    restored = MinimizeStudyStrategy(StudyStrategyParam(top_k=top_k))
+    assert await restored.extract_mappings(repo) == actual
+
+
+@pytest.mark.asyncio
+async def test_minimize_study_strategy_does_not_count_twice_after_restore() -> None:
+    values = _create_values(0)
+    repo = InMemoryTrialRepository()
+    strategy = MinimizeStudyStrategy(StudyStrategyParam(top_k=4))
+    await _receipt(strategy, repo, _create_done_trial("t00", 0, values[:20]))
+
+    # 復元直後に受け取った trial は、保存済みの trial を走査するときにも現れる
+    restored = MinimizeStudyStrategy(StudyStrategyParam(top_k=4))
+    await _receipt(restored, repo, _create_done_trial("t01", 20, values[20:]))
+    actual = await restored.extract_mappings(repo)
+    assert [row[0] for row in actual.values] == [hex(x) for x in sorted(range(40), key=lambda x: values[x])[:4]]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("target_value", "trial_values", "expected"),
+    [
+        pytest.param(None, [[3.0, 2.0]], False, id="no threshold, running"),
+        pytest.param(None, [[3.0, 2.0]] * 20, True, id="no threshold, all done"),
+        pytest.param(1.5, [[3.0, 2.0]], False, id="not reached"),
+        pytest.param(2.0, [[3.0, 2.0]], True, id="reached"),
+    ],
+)
+async def test_minimize_study_strategy_is_done(
+    target_value: float | None,
+    trial_values: list[list[float]],
+    expected: bool,
+) -> None:
+    target = None if target_value is None else ScalarValue.create_from_numeric(target_value, "float")
+    strategy = MinimizeStudyStrategy(StudyStrategyParam(target_value=target, top_k=2))
+    repo = InMemoryTrialRepository()
+    table = TrialTable(trials=[], aggregated_parameter_space=None)
+    for i, values in enumerate(trial_values):
+        trial = _create_done_trial(f"t{i:02d}", i * 2, values)
+        await _receipt(strategy, repo, trial)
+        table.done_records.append(
+            trial.trial_id,
+            reserved_timestamp=DT,
+            worker_node_name="w01",
+            worker_node_id="w01",
+            registered_timestamp=DT,
+            grid_size=len(values),
+        )
+
+    actual = await strategy.is_done(table, _PARAMETER_SPACE, repo)
+    assert actual == expected
+
+
+@pytest.mark.asyncio
+async def test_minimize_study_strategy_extract_mappings_raise_not_done() -> None:
+    strategy = MinimizeStudyStrategy(StudyStrategyParam(top_k=2))
+    with pytest.raises(LD2NotDoneError):
+        _ = await strategy.extract_mappings(InMemoryTrialRepository())
+
+
+def test_minimize_study_strategy_raise_vector() -> None:
+    target = VectorValue.create_from_numeric([1, 2], "int")
+    with pytest.raises(LD2ModelTypeError, match=r"vector"):
+        _ = MinimizeStudyStrategy(StudyStrategyParam(target_value=target))
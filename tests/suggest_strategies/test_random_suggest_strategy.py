@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import itertools
+from datetime import timedelta
+
+import pytest
+
+from lite_dist2.curriculum_models.trial import Trial, TrialStatus
+from lite_dist2.curriculum_models.trial_table import TrialTable
+from lite_dist2.expections import LD2InvalidSpaceError
+from lite_dist2.suggest_strategies.base_suggest_strategy import SuggestStrategyParam
+from lite_dist2.suggest_strategies.random_suggest_strategy import RandomSuggestStrategy
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.base_space import FlattenSegment
+from lite_dist2.value_models.jagged_space import ParameterJaggedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+from tests.const import DT
+
+
+def _create_space(*sizes: int | None) -> ParameterAlignedSpace:
+    return ParameterAlignedSpace(
+        axes=[
+            LineSegment(name=f"x{i}", type_="int", size=size, step=1, start=0, ambient_index=0, ambient_size=size)
+            for i, size in enumerate(sizes)
+        ],
+        check_lower_filling=True,
+    )
+
+
+def _reserve(strategy: RandomSuggestStrategy, table: TrialTable, max_num: int, trial_id: str) -> Trial | None:
+    space = strategy.suggest(table, max_num)
+    if space is None:
+        return None
+    trial = Trial(
+        study_id="s01",
+        trial_id=trial_id,
+        reserved_timestamp=DT,
+        trial_status=TrialStatus.running,
+        const_param=None,
+        parameter_space=space,
+        result_type="scalar",
+        result_value_type="int",
+        worker_node_name="w01",
+        worker_node_id="w01",
+    )
+    table.register(trial)
+    if table.is_not_defined_aps():
+        table.init_aps(trial)
+    return trial
+
+
+@pytest.mark.parametrize(
+    ("sizes", "max_num"),
+    [
+        pytest.param((1,), 1, id="single"),
+        pytest.param((97,), 10, id="1D prime"),
+        pytest.param((12, 10), 7, id="2D"),
+        pytest.param((4, 5, 6), 32, id="3D"),
+    ],
+)
+def test_random_suggest_strategy_covers_all_points_once(sizes: tuple[int, ...], max_num: int) -> None:
+    parameter_space = _create_space(*sizes)
+    strategy = RandomSuggestStrategy(SuggestStrategyParam(strict_aligned=False, seed=42), parameter_space)
+    table = TrialTable(trials=[], aggregated_parameter_space=None)
+
+    suggested = []
+    i = 0
+    while (trial := _reserve(strategy, table, max_num, f"t{i:03d}")) is not None:
+        assert isinstance(trial.parameter_space, ParameterJaggedSpace)
+        assert trial.parameter_space.total <= max_num
+        suggested.extend(trial.parameter_space.grid())
+        table.receipt_trial_result(trial.trial_id, "w01", DT)
+        i += 1
+
+    assert sorted(suggested) == sorted(parameter_space.grid())
+    assert table.count_grid() == parameter_space.total
+    assert table.find_least_division(parameter_space.total) == FlattenSegment(parameter_space.total, 0)
+
+
+def test_random_suggest_strategy_spreads_batch() -> None:
+    parameter_space = _create_space(1000)
+    strategy = RandomSuggestStrategy(SuggestStrategyParam(strict_aligned=False, seed=7), parameter_space)
+    table = TrialTable(trials=[], aggregated_parameter_space=None)
+
+    space = strategy.suggest(table, 20)
+    assert space is not None
+    points = sorted(param[0] for param in space.grid())
+    gaps = [b - a for a, b in itertools.pairwise([*points, points[0] + 1000])]
+    # 先頭から順番に割り当てるなら 20 点は隣り合うが、空間全体に散らばる
+    assert max(gaps) < 1000 // 20 * 3
+
+
+def test_random_suggest_strategy_reoffers_timed_out_range() -> None:
+    parameter_space = _create_space(8, 8)
+    strategy = RandomSuggestStrategy(SuggestStrategyParam(strict_aligned=False, seed=3), parameter_space)
+    table = TrialTable(trials=[], aggregated_parameter_space=None)
+
+    timed_out = _reserve(strategy, table, 10, "t01")
+    reserved = _reserve(strategy, table, 10, "t02")
+    assert timed_out is not None
+    assert reserved is not None
+    assert list(timed_out.parameter_space.grid()) != list(reserved.parameter_space.grid())
+
+    assert table.check_timeout_trial(DT + timedelta(seconds=10), 10) == ["t01", "t02"]
+    reoffered = _reserve(strategy, table, 10, "t03")
+    assert reoffered is not None
+    assert list(reoffered.parameter_space.grid()) == list(timed_out.parameter_space.grid())
+
+
+def test_random_suggest_strategy_same_seed_same_order() -> None:
+    parameter_space = _create_space(30, 30)
+    strategy = RandomSuggestStrategy(SuggestStrategyParam(strict_aligned=False), parameter_space)
+    model = strategy.to_model()
+    assert model.type == "random"
+    assert model.suggest_strategy_param.seed is not None
+
+    restored = RandomSuggestStrategy(model.suggest_strategy_param, parameter_space)
+    expected = [strategy.flatten_index_at(v) for v in range(900)]
+    assert [restored.flatten_index_at(v) for v in range(900)] == expected
+    assert sorted(expected) == list(range(900))
+
+
+def test_random_suggest_strategy_raise_infinite() -> None:
+    with pytest.raises(LD2InvalidSpaceError, match=r"finite"):
+        _ = RandomSuggestStrategy(SuggestStrategyParam(strict_aligned=False), _create_space(None, 10))
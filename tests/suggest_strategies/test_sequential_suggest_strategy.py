@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import random
 from typing import TYPE_CHECKING
 
 import pytest
@@ -7,10 +8,11 @@ import pytest
 from lite_dist2.curriculum_models.mapping import Mapping
 from lite_dist2.curriculum_models.trial import Trial, TrialStatus
 from lite_dist2.curriculum_models.trial_table import TrialTable
-from lite_dist2.expections import LD2ParameterError
+from lite_dist2.expections import LD2InvalidSpaceError, LD2ParameterError
 from lite_dist2.suggest_strategies.base_suggest_strategy import SuggestStrategyParam
 from lite_dist2.suggest_strategies.sequential_suggest_strategy import SequentialSuggestStrategy
 from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.base_space import FlattenSegment
 from lite_dist2.value_models.jagged_space import ParameterJaggedSpace
 from lite_dist2.value_models.line_segment import DummyLineSegment, LineSegment
 from lite_dist2.value_models.point import ScalarValue
@@ -267,13 +269,15 @@ def test_sequential_suggest_strategy_jagged_suggest(
         ),
     ],
 )
-def test_sequential_suggest_strategy_generate_available_next_finite(
+def test_sequential_suggest_strategy_find_max_available_next_finite(
     strategy: SequentialSuggestStrategy,
     flatten_index: int,
     expected: tuple[int, ...],
 ) -> None:
-    actual = strategy._generate_available_next_finite(flatten_index)
-    assert actual == expected
+    # expected は揃った形で切り出せる終端をすべて並べたもの
+    for max_num in range(1, expected[-1] - flatten_index + 3):
+        actual = strategy._find_max_available_next(flatten_index, max_num)
+        assert actual == max(t for t in expected if t - flatten_index <= max_num)
 
 
 @pytest.mark.parametrize(
@@ -393,36 +397,72 @@ def test_sequential_suggest_strategy_generate_available_next_finite(
         ),
     ],
 )
-def test_sequential_suggest_strategy_generate_available_next_infinite(
+def test_sequential_suggest_strategy_find_max_available_next_infinite(
     strategy: SequentialSuggestStrategy,
     flatten_index: int,
     expected: tuple[tuple[int, ...], bool],
 ) -> None:
-    actual = strategy._generate_available_next_infinite(flatten_index)
-    assert actual == expected
+    # expected は (揃った形で切り出せる終端, 最後の終端から最上位の次元の幅ごとに無限に続くか)
+    ticks, is_infinitely_available = expected
+    if is_infinitely_available:
+        ratio = strategy.parameter_space.lower_element_num_by_dim[0]
+        ticks = (*ticks, *(ticks[-1] + ratio * i for i in range(1, 4)))
+    for max_num in range(1, ticks[-1] - flatten_index + 3):
+        actual = strategy._find_max_available_next(flatten_index, max_num)
+        if not is_infinitely_available or ticks[-1] - flatten_index >= max_num:
+            assert actual == max(t for t in ticks if t - flatten_index <= max_num)
 
 
-@pytest.mark.parametrize(
-    ("init", "ratio", "iter_num", "expected"),
-    [
-        ((1, 2, 3), 3, 5, (1, 2, 3, 6, 9)),
-        ((1, 2, 3, 4), 10, 3, (1, 2, 3)),
-    ],
-)
-def test_sequential_suggest_strategy_infinite_available_generator(
-    init: tuple[int, ...],
-    ratio: int,
-    iter_num: int,
-    expected: tuple[int, ...],
-) -> None:
-    generator = SequentialSuggestStrategy._infinite_available_generator(init, ratio)
-    actual = []
-    for i, v in enumerate(generator):
-        if i >= iter_num:
-            break
-        actual.append(v)
-    actual = tuple(actual)
-    assert actual == expected
+def _is_aligned_range(space: ParameterAlignedSpace, start: int, stop: int) -> bool:
+    # [start, stop) が各次元の区間の直積になっているか
+    lower_dims = space.lower_element_num_by_dim
+    start_loom = space.loom_by_flatten_index(start, lower_dims)
+    end_loom = space.loom_by_flatten_index(stop - 1, lower_dims)
+    num = 1
+    for s, e in zip(start_loom, end_loom, strict=True):
+        if e < s:
+            return False
+        num *= e - s + 1
+    return num == stop - start
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_sequential_suggest_strategy_find_max_available_next_property(seed: int) -> None:
+    rng = random.Random(seed)  # noqa: S311
+    for _ in range(50):
+        sizes: list[int | None] = [rng.randint(2, 6) for _ in range(rng.randint(1, 4))]
+        if rng.random() < 0.3:
+            sizes[0] = None
+        space = ParameterAlignedSpace(
+            axes=[
+                LineSegment(name=f"x{i}", type_="int", size=size, step=1, start=0, ambient_index=0, ambient_size=size)
+                for i, size in enumerate(sizes)
+            ],
+            check_lower_filling=True,
+        )
+        strategy = SequentialSuggestStrategy(SuggestStrategyParam(strict_aligned=True), space)
+        total = space.total or 500
+        start = rng.randrange(total)
+        max_num = rng.randint(1, total - start)
+
+        actual = strategy._find_max_available_next(start, max_num)
+        expected = max(stop for stop in range(start + 1, start + max_num + 1) if _is_aligned_range(space, start, stop))
+        assert actual == expected
+        # 切り出した部分空間は [start, actual) をちょうど覆う
+        suggested = strategy._aligned_suggest(start, max_num)
+        assert suggested.get_flatten_ambient_start_and_size() == FlattenSegment(start, actual - start)
+
+
+def test_sequential_suggest_strategy_find_max_available_next_raise() -> None:
+    strategy = SequentialSuggestStrategy(
+        suggest_parameter=SuggestStrategyParam(strict_aligned=True),
+        parameter_space=ParameterAlignedSpace(
+            axes=[LineSegment(name="x", type_="int", size=10, step=1, start=0, ambient_size=10, ambient_index=0)],
+            check_lower_filling=True,
+        ),
+    )
+    with pytest.raises(LD2InvalidSpaceError, match=r"No\savailable"):
+        _ = strategy._find_max_available_next(3, 0)
 
 
 @pytest.mark.parametrize(
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Literal
+
+import httpx
+import pytest
+
+from lite_dist2.curriculum_models.curriculum import Curriculum, CurriculumProvider
+from lite_dist2.curriculum_models.study_portables import StudyRegistry
+from lite_dist2.study_strategies import StudyStrategyModel
+from lite_dist2.study_strategies.base_study_strategy import StudyStrategyParam
+from lite_dist2.suggest_strategies import SuggestStrategyModel
+from lite_dist2.suggest_strategies.base_suggest_strategy import SuggestStrategyParam
+from lite_dist2.table_node_api.api import app
+from lite_dist2.table_node_api.table_param import StudyRegisterParam
+from lite_dist2.value_models.aligned_space_registry import LineSegmentRegistry, ParameterAlignedSpaceRegistry
+from lite_dist2.value_models.point import ScalarValue
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _create_register_param(suggest_type: Literal["sequential", "random"], size: str | None) -> StudyRegisterParam:
+    return StudyRegisterParam(
+        study=StudyRegistry(
+            name="test_registry",
+            required_capacity=set(),
+            study_strategy=StudyStrategyModel(
+                type="find_exact",
+                study_strategy_param=StudyStrategyParam(
+                    target_value=ScalarValue(type="scalar", value_type="int", value="0x0"),
+                ),
+            ),
+            suggest_strategy=SuggestStrategyModel(
+                type=suggest_type,
+                suggest_strategy_param=SuggestStrategyParam(strict_aligned=False),
+            ),
+            const_param=None,
+            parameter_space=ParameterAlignedSpaceRegistry(
+                type="aligned",
+                axes=[LineSegmentRegistry(name="x", type="int", size=size, step="0x1", start="0x0")],
+            ),
+            result_type="scalar",
+            result_value_type="int",
+        ),
+    )
+
+
+@pytest.mark.parametrize(
+    ("suggest_type", "size", "expected_status"),
+    [
+        pytest.param("random", "0x64", 200, id="random, finite"),
+        pytest.param("random", None, 400, id="random, infinite"),
+        pytest.param("sequential", None, 200, id="sequential, infinite"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_handle_study_register(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    suggest_type: Literal["sequential", "random"],
+    size: str | None,
+    expected_status: int,
+) -> None:
+    curriculum = Curriculum(studies=[], storages=[], trial_file_dir=tmp_path)
+    monkeypatch.setattr(CurriculumProvider, "_CURR", curriculum)
+    param = _create_register_param(suggest_type, size)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.post("/study/register", json=param.model_dump(mode="json"))
+
+    assert response.status_code == expected_status
+    assert len(curriculum.studies) == (1 if expected_status == 200 else 0)
@@ -0,0 +1,212 @@
+import gzip
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from lite_dist2.expections import LD2ParameterError, LD2PayloadTooLargeError
+from lite_dist2.table_node_api import http_compression
+from lite_dist2.table_node_api.http_compression import (
+    CompressionMiddleware,
+    choose_encoding,
+    compress,
+    decompress,
+    parse_encodings,
+)
+
+BIG_TEXT = "0x1234," * 1000
+
+
+async def _echo(request: Request) -> JSONResponse:
+    body = await request.body()
+    return JSONResponse({"size": len(body), "content_length": request.headers.get("content-length")})
+
+
+async def _big(_: Request) -> PlainTextResponse:
+    return PlainTextResponse(BIG_TEXT)
+
+
+async def _small(_: Request) -> PlainTextResponse:
+    return PlainTextResponse("ok")
+
+
+async def _stream(_: Request) -> StreamingResponse:
+    async def gen():  # noqa: ANN202
+        for _ in range(10):
+            yield BIG_TEXT.encode()
+
+    return StreamingResponse(gen(), media_type="text/plain")
+
+
+def _create_client(max_decompressed_size: int = 1 << 20, thread_size: int = 1 << 20) -> httpx.AsyncClient:
+    app = Starlette(
+        routes=[
+            Route("/echo", _echo, methods=["POST"]),
+            Route("/big", _big),
+            Route("/small", _small),
+            Route("/stream", _stream),
+        ],
+    )
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=100,
+        max_decompressed_size=max_decompressed_size,
+        thread_size=thread_size,
+    )
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        pytest.param(None, [], id="none"),
+        pytest.param("gzip, deflate", ["gzip", "deflate"], id="plain"),
+        pytest.param("GZIP;q=0.5, zstd;q=0, br", ["gzip", "br"], id="quality"),
+    ],
+)
+def test_parse_encodings(header: str | None, expected: list[str]) -> None:
+    assert parse_encodings(header) == expected
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        pytest.param(None, None, id="none"),
+        pytest.param("br, deflate", None, id="unsupported"),
+        pytest.param("gzip, deflate", "gzip", id="gzip"),
+        pytest.param("gzip, zstd", "zstd", id="prefer zstd"),
+    ],
+)
+def test_choose_encoding(header: str | None, expected: str | None) -> None:
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_without_zstandard(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(http_compression, "zstandard", None)
+    assert choose_encoding("gzip, zstd") == "gzip"
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_compress_decompress(encoding: str) -> None:
+    data = BIG_TEXT.encode()
+    compressed = compress(data, encoding)  # ty: ignore[invalid-argument-type]
+    assert len(compressed) < len(data)
+    assert decompress(compressed, encoding) == data
+
+
+@pytest.mark.parametrize(
+    ("data", "encoding"),
+    [
+        pytest.param(b"abc", "gzip", id="broken gzip"),
+        pytest.param(b"abc", "zstd", id="broken zstd"),
+        pytest.param(b"abc", "br", id="unsupported"),
+        pytest.param(compress(BIG_TEXT.encode(), "gzip")[:-10], "gzip", id="truncated gzip"),
+    ],
+)
+def test_decompress_raises(data: bytes, encoding: str) -> None:
+    with pytest.raises(LD2ParameterError):
+        decompress(data, encoding)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_decompress_max_size(encoding: str) -> None:
+    data = BIG_TEXT.encode()
+    compressed = compress(data, encoding)  # ty: ignore[invalid-argument-type]
+    assert decompress(compressed, encoding, max_size=len(data)) == data
+    with pytest.raises(LD2PayloadTooLargeError):
+        decompress(compressed, encoding, max_size=len(data) - 1)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+@pytest.mark.parametrize("thread_size", [1 << 20, 1], ids=["on event loop", "in thread"])
+@pytest.mark.asyncio
+async def test_compression_middleware_decompresses_request(encoding: str, thread_size: int) -> None:
+    body = BIG_TEXT.encode()
+    async with _create_client(thread_size=thread_size) as client:
+        response = await client.post(
+            "/echo",
+            content=compress(body, encoding),  # ty: ignore[invalid-argument-type]
+            headers={"Content-Encoding": encoding},
+        )
+    assert response.status_code == 200
+    assert response.json() == {"size": len(body), "content_length": str(len(body))}
+
+
+@pytest.mark.parametrize(
+    ("content_encoding", "expected_status"),
+    [
+        pytest.param("br", 415, id="unsupported"),
+        pytest.param("gzip", 400, id="broken"),
+    ],
+)
+@pytest.mark.parametrize("thread_size", [1 << 20, 1], ids=["on event loop", "in thread"])
+@pytest.mark.asyncio
+async def test_compression_middleware_rejects_request(
+    content_encoding: str,
+    expected_status: int,
+    thread_size: int,
+) -> None:
+    async with _create_client(thread_size=thread_size) as client:
+        response = await client.post("/echo", content=b"abc", headers={"Content-Encoding": content_encoding})
+    assert response.status_code == expected_status
+    assert parse_encodings(response.headers["Accept-Encoding"]) == ["zstd", "gzip"]
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+@pytest.mark.parametrize("thread_size", [1 << 20, 1], ids=["on event loop", "in thread"])
+@pytest.mark.asyncio
+async def test_compression_middleware_rejects_too_large_request(encoding: str, thread_size: int) -> None:
+    body = BIG_TEXT.encode()
+    async with _create_client(max_decompressed_size=len(body) - 1, thread_size=thread_size) as client:
+        response = await client.post(
+            "/echo",
+            content=compress(body, encoding),  # ty: ignore[invalid-argument-type]
+            headers={"Content-Encoding": encoding},
+        )
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize(
+    ("path", "accept_encoding", "expected_encoding"),
+    [
+        pytest.param("/big", "gzip", "gzip", id="gzip"),
+        pytest.param("/big", "gzip, zstd", "zstd", id="zstd"),
+        pytest.param("/big", "identity", None, id="not accepted"),
+        pytest.param("/small", "gzip", None, id="smaller than minimum size"),
+        pytest.param("/stream", "gzip", "gzip", id="streaming gzip"),
+        pytest.param("/stream", "zstd", "zstd", id="streaming zstd"),
+    ],
+)
+@pytest.mark.parametrize("thread_size", [1 << 20, 1], ids=["on event loop", "in thread"])
+@pytest.mark.asyncio
+async def test_compression_middleware_compresses_response(
+    path: str,
+    accept_encoding: str,
+    expected_encoding: str | None,
+    thread_size: int,
+) -> None:
+    async with _create_client(thread_size=thread_size) as client:
+        response = await client.get(path, headers={"Accept-Encoding": accept_encoding})
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == expected_encoding
+    # 受け付ける圧縮形式はどのレスポンスでも通知する
+    assert parse_encodings(response.headers["Accept-Encoding"]) == ["zstd", "gzip"]
+    if path == "/small":
+        assert response.text == "ok"
+    elif path == "/big":
+        assert response.text == BIG_TEXT
+    else:
+        assert response.text == BIG_TEXT * 10
+
+
+@pytest.mark.asyncio
+async def test_compression_middleware_response_is_valid_gzip() -> None:
+    async with (
+        _create_client() as client,
+        client.stream("GET", "/big", headers={"Accept-Encoding": "gzip"}) as response,
+    ):
+        raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    assert gzip.decompress(raw).decode() == BIG_TEXT
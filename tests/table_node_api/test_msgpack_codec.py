@@ -0,0 +1,244 @@
+import json
+from typing import Literal
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from lite_dist2.curriculum_models.mapping import Mapping, MappingsStorage
+from lite_dist2.curriculum_models.trial import Trial, TrialModel, TrialStatus
+from lite_dist2.curriculum_models.trial_result import ResultColumn, TrialResultModel
+from lite_dist2.table_node_api import msgpack_codec
+from lite_dist2.table_node_api.msgpack_codec import accepts_msgpack, is_msgpack, pack_model, packb, unpackb
+from lite_dist2.table_node_api.msgpack_route import MsgpackRoute, NegotiatedResponse
+from lite_dist2.table_node_api.table_param import TrialRegisterParam, TrialResultRegisterParam
+from lite_dist2.table_node_api.table_response import OkResponse
+from lite_dist2.trial_repositories.columnar_trial_codec import encode_column
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+from lite_dist2.value_models.point import ScalarValue, VectorValue
+from tests.const import DT
+
+
+def _create_trial() -> Trial:
+    trial = Trial(
+        study_id="0x1",
+        trial_id="t01",
+        reserved_timestamp=DT,
+        trial_status=TrialStatus.running,
+        const_param=None,
+        parameter_space=ParameterAlignedSpace(
+            axes=[
+                LineSegment(name="x", type_="int", size=4, step=1, start=2**70, ambient_index=0, ambient_size=4),
+                LineSegment(name="y", type_="float", size=2, step=0.1, start=-1.0, ambient_index=0, ambient_size=2),
+            ],
+            check_lower_filling=True,
+        ),
+        result_type="vector",
+        result_value_type="float",
+        worker_node_name="0x2",
+        worker_node_id="w01",
+    )
+    trial.set_result(trial.convert_mappings_from([((x, y), [x / 3, y]) for x, y in trial.parameter_space.grid()]))
+    return trial
+
+
+def _create_storage() -> MappingsStorage:
+    return MappingsStorage(
+        params_info=(
+            ScalarValue(type="scalar", value_type="int", value="0x0", name="x"),
+            ScalarValue(type="scalar", value_type="bool", value=False, name="flag"),
+        ),
+        result_info=VectorValue(type="vector", value_type="int", values=["0x0", "0x0"], name="r"),
+        values=[
+            ("0x1", True, "-0x1", "0x" + "f" * 30),
+            ("-0x" + "1" * 40, False, "0x0", "0x7fffffffffffffff"),
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "model",
+    [
+        pytest.param(TrialRegisterParam(trial=_create_trial().to_model()), id="trial"),
+        pytest.param(TrialResultRegisterParam(result=TrialResultModel.from_trial(_create_trial())), id="trial result"),
+        pytest.param(_create_storage(), id="mappings storage"),
+        pytest.param(OkResponse(ok=True), id="ok"),
+    ],
+)
+def test_pack_model_round_trip(model: BaseModel) -> None:
+    assert type(model).model_validate(unpackb(pack_model(model))) == model
+    assert type(model).model_validate(unpackb(packb(model.model_dump(mode="json")))) == model
+
+
+def test_pack_model_keeps_portable_strings() -> None:
+    import msgpack  # noqa: PLC0415
+
+    model = TrialRegisterParam(trial=_create_trial().to_model())
+    raw = msgpack.unpackb(pack_model(model))
+    results = raw["trial"]["results"]
+    assert results[0]["params"][0]["value"] == hex(2**70)
+    assert results[0]["params"][1]["value"] == (-1.0).hex()
+
+
+@pytest.mark.parametrize(
+    ("values", "value_type", "expected_code"),
+    [
+        pytest.param([True, False], "bool", 1, id="bool"),
+        pytest.param([1, -2], "int", 2, id="int64"),
+        pytest.param([0.5, -1.0], "float", 3, id="float64"),
+        pytest.param([2**70, -1], "int", 4, id="bigint"),
+    ],
+)
+def test_pack_model_tags_result_columns(
+    values: list[bool | int | float],
+    value_type: Literal["bool", "int", "float"],
+    expected_code: int,
+) -> None:
+    import msgpack  # noqa: PLC0415
+
+    encoding, data = encode_column(value_type, values)
+    model = TrialResultModel(
+        study_id="s01",
+        trial_id="t01",
+        worker_node_id="w01",
+        row_num=len(values),
+        columns=[ResultColumn(encoding=encoding, data=data)],
+    )
+    raw = msgpack.unpackb(pack_model(model))
+    # 列は key の名前で見分けず、符号化ごとの拡張型で詰める
+    assert raw["columns"] == [msgpack.ExtType(expected_code, data)]
+    assert TrialResultModel.model_validate(unpackb(pack_model(model))) == model
+
+
+def test_unpackb_keeps_user_dict() -> None:
+    # encoding と data を持つだけの dict は列として扱わない
+    data = {"encoding": "int64", "data": "AQ=="}
+    assert unpackb(packb(data)) == data
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        pytest.param(["0x1.0p+0", "0x1.0000000000000p+0", "-0x0.0p+0"], id="float"),
+        pytest.param(["0x0a", "0xA", "-0x0"], id="int"),
+    ],
+)
+def test_packb_unpackb_byte_identical(values: list[str]) -> None:
+    storage = {
+        "params_info": [{"type": "scalar", "value_type": "int", "value": "0x0", "name": "x"}],
+        "result_info": {"type": "vector", "value_type": "float", "values": values, "name": None},
+        "values": [["0x1", *values]],
+    }
+    assert unpackb(packb(storage)) == storage
+
+
+def test_packb_requires_msgpack(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(msgpack_codec, "msgpack", None)
+    with pytest.raises(ImportError):
+        packb({})
+    assert not accepts_msgpack("application/msgpack")
+
+
+@pytest.mark.parametrize(
+    ("content_type", "expected"),
+    [
+        pytest.param(None, False, id="none"),
+        pytest.param("application/json", False, id="json"),
+        pytest.param("application/msgpack", True, id="msgpack"),
+        pytest.param("Application/MsgPack; charset=binary", True, id="with parameter"),
+    ],
+)
+def test_is_msgpack(content_type: str | None, expected: bool) -> None:
+    assert is_msgpack(content_type) == expected
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        pytest.param(None, False, id="none"),
+        pytest.param("*/*", False, id="any"),
+        pytest.param("application/msgpack, application/json", True, id="msgpack"),
+    ],
+)
+def test_accepts_msgpack(accept: str | None, expected: bool) -> None:
+    assert accepts_msgpack(accept) == expected
+
+
+def _create_app() -> FastAPI:
+    app = FastAPI(default_response_class=NegotiatedResponse)
+    app.router.route_class = MsgpackRoute
+
+    @app.post("/echo")
+    async def echo(param: TrialRegisterParam) -> TrialModel:
+        return param.trial
+
+    return app
+
+
+@pytest.mark.parametrize(
+    ("headers", "expected_content_type"),
+    [
+        pytest.param({"Content-Type": "application/json"}, "application/json", id="json"),
+        pytest.param({"Content-Type": "application/msgpack"}, "application/json", id="msgpack request only"),
+        pytest.param(
+            {"Content-Type": "application/msgpack", "Accept": "application/msgpack"},
+            "application/msgpack",
+            id="msgpack",
+        ),
+    ],
+)
+@pytest.mark.asyncio
+async def test_msgpack_route(headers: dict[str, str], expected_content_type: str) -> None:
+    model = TrialRegisterParam(trial=_create_trial().to_model())
+    content = pack_model(model) if is_msgpack(headers["Content-Type"]) else model.model_dump_json().encode()
+
+    transport = httpx.ASGITransport(app=_create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.post("/echo", content=content, headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == expected_content_type
+    is_msgpack_response = is_msgpack(response.headers["Content-Type"])
+    body = unpackb(response.content) if is_msgpack_response else json.loads(response.content)
+    actual = TrialModel.model_validate(body)
+    assert actual == model.trial
+    assert actual.results is not None
+    assert all(isinstance(mapping, Mapping) for mapping in actual.results)
+
+
+@pytest.mark.asyncio
+async def test_msgpack_route_invalid_body() -> None:
+    transport = httpx.ASGITransport(app=_create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.post(
+            "/echo", content=packb({"trial": None}), headers={"Content-Type": "application/msgpack"}
+        )
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize(
+    ("headers", "expected_status"),
+    [
+        pytest.param({"Content-Type": "application/json", "Accept": "application/msgpack"}, 200, id="json request"),
+        pytest.param({"Content-Type": "application/msgpack"}, 415, id="msgpack request"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_msgpack_route_without_msgpack(
+    monkeypatch: pytest.MonkeyPatch,
+    headers: dict[str, str],
+    expected_status: int,
+) -> None:
+    model = TrialRegisterParam(trial=_create_trial().to_model())
+    content = pack_model(model) if is_msgpack(headers["Content-Type"]) else model.model_dump_json().encode()
+    monkeypatch.setattr(msgpack_codec, "msgpack", None)
+
+    transport = httpx.ASGITransport(app=_create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        response = await client.post("/echo", content=content, headers=headers)
+
+    assert response.status_code == expected_status
+    # msgpack を受け付けるリクエストにも json で返す
+    assert response.headers["Content-Type"] == "application/json"
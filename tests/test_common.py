@@ -93,6 +93,42 @@ def test_portablize(
     assert actual == expected
 
 
+@pytest.mark.parametrize(
+    ("type_name", "values", "expected"),
+    [
+        ("bool", [False, 1], [False, True]),
+        ("int", ["0x2", "-0xa"], [2, -10]),
+        ("float", ["0x1.999999999999ap-4", "-0x1.0000000000000p+1"], [0.1, -2.0]),
+    ],
+)
+def test_numerize_column(
+    type_name: Literal["bool", "int", "float"],
+    values: list[PortableValueType],
+    expected: list[PrimitiveValueType],
+) -> None:
+    actual = common.numerize_column(type_name, values)
+    assert actual == expected
+    assert actual == [common.numerize(type_name, v) for v in values]
+
+
+@pytest.mark.parametrize(
+    ("type_name", "values", "expected"),
+    [
+        ("bool", [False, 1], [False, True]),
+        ("int", [2, -10, True], ["0x2", "-0xa", "0x1"]),
+        ("float", [0.1, -2], ["0x1.999999999999ap-4", "-0x1.0000000000000p+1"]),
+    ],
+)
+def test_portablize_column(
+    type_name: Literal["bool", "int", "float"],
+    values: list[PrimitiveValueType],
+    expected: list[PortableValueType],
+) -> None:
+    actual = common.portablize_column(type_name, values)
+    assert actual == expected
+    assert actual == [common.portablize(type_name, v) for v in values]
+
+
 @pytest.mark.asyncio
 async def test_async_file_io(tmp_path: Path) -> None:
     test_data = b'{"test data": 123}'
@@ -104,3 +140,28 @@ async def test_async_file_io(tmp_path: Path) -> None:
     read_data = await common.async_read_file(test_file)
     json_data = json.loads(read_data)
     assert json_data == {"test data": 123}
+
+
+def test_write_file_atomically(tmp_path: Path) -> None:
+    test_file = tmp_path / "test_file.json"
+    test_file.write_bytes(b"old")
+
+    common.write_file_atomically(test_file, b'{"test data": 123}')
+    assert json.loads(test_file.read_bytes()) == {"test data": 123}
+    # 一時ファイルは残らない
+    assert [path.name for path in tmp_path.iterdir()] == ["test_file.json"]
+
+
+def test_write_file_atomically_keeps_old_file_on_error(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    test_file = tmp_path / "test_file.json"
+    test_file.write_bytes(b"old")
+
+    def broken_replace(self: Path, target: Path) -> Path:
+        msg = "disk full"
+        raise OSError(msg)
+
+    monkeypatch.setattr(Path, "replace", broken_replace)
+    with pytest.raises(OSError, match="disk full"):
+        common.write_file_atomically(test_file, b"new")
+    assert test_file.read_bytes() == b"old"
+    assert [path.name for path in tmp_path.iterdir()] == ["test_file.json"]
@@ -0,0 +1,138 @@
+from pathlib import Path
+from typing import Literal
+
+import pytest
+
+from lite_dist2.curriculum_models.mapping import Mapping
+from lite_dist2.curriculum_models.trial import TrialModel, TrialStatus
+from lite_dist2.expections import LD2NotDoneError
+from lite_dist2.trial_repositories.columnar_trial_repository import ColumnarTrialRepository
+from lite_dist2.trial_repositories.trial_repository_factory import create_trial_repository
+from lite_dist2.trial_repositories.trial_repository_model import TrialRepositoryModel
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpacePortableModel
+from lite_dist2.value_models.line_segment import LineSegmentPortableModel
+from lite_dist2.value_models.point import ScalarValue, VectorValue
+from tests.const import DT
+
+
+def _create_trial_model(
+    trial_id: str, results: list[Mapping] | None, result_type: Literal["scalar", "vector"] = "scalar"
+) -> TrialModel:
+    return TrialModel(
+        study_id="s01",
+        trial_id=trial_id,
+        reserved_timestamp=DT,
+        trial_status=TrialStatus.done,
+        const_param=None,
+        parameter_space=ParameterAlignedSpacePortableModel(
+            type="aligned",
+            axes=[
+                LineSegmentPortableModel(
+                    name="x",
+                    type="int",
+                    size="0x3",
+                    step="0x1",
+                    start="0x0",
+                    ambient_size="0x3",
+                    ambient_index="0x0",
+                ),
+            ],
+            check_lower_filling=True,
+        ),
+        result_type=result_type,
+        result_value_type="float" if result_type == "scalar" else "int",
+        worker_node_id="n01",
+        worker_node_name="n01",
+        results=results,
+        registered_timestamp=DT,
+    )
+
+
+_SCALAR_RESULTS = [
+    Mapping(
+        params=(
+            ScalarValue(type="scalar", value_type="int", value=hex(i), name="x"),
+            ScalarValue(type="scalar", value_type="float", value=(i * 0.1).hex(), name="y"),
+            ScalarValue(type="scalar", value_type="bool", value=i % 2 == 0, name="z"),
+        ),
+        result=ScalarValue(type="scalar", value_type="float", value=(i / 3).hex(), name="r"),
+    )
+    for i in range(3)
+]
+
+_VECTOR_BIGINT_RESULTS = [
+    Mapping(
+        params=(ScalarValue(type="scalar", value_type="int", value=hex(-(2**70) + i), name="x"),),
+        result=VectorValue(type="vector", value_type="int", values=[hex(i), hex(2**100 * i)], name="r"),
+    )
+    for i in range(3)
+]
+
+
+def test_columnar_trial_repository_get_repository_type() -> None:
+    repo = ColumnarTrialRepository(Path("test/s01"))
+    assert repo.get_repository_type() == "columnar"
+
+
+def test_create_trial_repository_columnar() -> None:
+    repo = create_trial_repository(TrialRepositoryModel(type="columnar", save_dir=Path("test/s01")))
+    assert isinstance(repo, ColumnarTrialRepository)
+    assert repo.to_model().type == "columnar"
+
+
+@pytest.mark.parametrize(
+    "trial_model",
+    [
+        pytest.param(_create_trial_model("t01", None), id="no results"),
+        pytest.param(_create_trial_model("t01", []), id="empty results"),
+        pytest.param(_create_trial_model("t01", _SCALAR_RESULTS), id="scalar"),
+        pytest.param(_create_trial_model("t01", _VECTOR_BIGINT_RESULTS, "vector"), id="vector bigint"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_columnar_trial_repository_save_load(tmp_path: str, trial_model: TrialModel) -> None:
+    save_dir = Path(tmp_path) / "s01"
+    repo = ColumnarTrialRepository(save_dir)
+    await repo.clean_save_dir()
+
+    await repo.save(trial_model)
+    assert (save_dir / "t01.ld2c").exists()
+
+    loaded_trial_model = await repo.load("t01")
+    assert loaded_trial_model == trial_model
+
+
+@pytest.mark.asyncio
+async def test_columnar_trial_repository_load_all_and_iter_mapping_values(tmp_path: str) -> None:
+    save_dir = Path(tmp_path) / "s01"
+    trial_models = [
+        _create_trial_model("t01", _SCALAR_RESULTS[:2]),
+        _create_trial_model("t02", _SCALAR_RESULTS[2:]),
+    ]
+    repo = ColumnarTrialRepository(save_dir)
+    await repo.clean_save_dir()
+    for trial_model in trial_models:
+        await repo.save(trial_model)
+
+    assert await repo.load_all() == trial_models
+
+    rows = [row async for row in repo.iter_mapping_values()]
+    assert rows == [mapping.to_tuple() for mapping in _SCALAR_RESULTS]
+
+
+@pytest.mark.asyncio
+async def test_columnar_trial_repository_iter_mapping_values_raise_not_done(tmp_path: str) -> None:
+    repo = ColumnarTrialRepository(Path(tmp_path) / "s01")
+    await repo.clean_save_dir()
+    await repo.save(_create_trial_model("t01", _SCALAR_RESULTS))
+    await repo.save(_create_trial_model("t02", None))
+
+    with pytest.raises(LD2NotDoneError):
+        _ = [row async for row in repo.iter_mapping_values()]
+
+
+@pytest.mark.asyncio
+async def test_columnar_trial_repository_load_all_not_exist(tmp_path: str) -> None:
+    repo = ColumnarTrialRepository(Path(tmp_path) / "s01")
+    with pytest.raises(FileNotFoundError):
+        await repo.load_all()
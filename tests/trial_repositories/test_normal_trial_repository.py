@@ -4,6 +4,7 @@ from pathlib import Path
 import pytest
 
 from lite_dist2.curriculum_models.trial import TrialModel, TrialStatus
+from lite_dist2.expections import LD2NotDoneError
 from lite_dist2.trial_repositories.normal_trial_repository import NormalTrialRepository
 from lite_dist2.value_models.aligned_space import ParameterAlignedSpacePortableModel
 from lite_dist2.value_models.line_segment import LineSegmentPortableModel
@@ -198,6 +199,13 @@ async def test_normal_trial_repository_load_all(tmp_path: str) -> None:
     loaded_trials = await repo.load_all()
     assert loaded_trials == trial_models
 
+    iterated_trials = [trial async for trial in repo.iter_all()]
+    assert iterated_trials == trial_models
+
+    # 結果の無い trial は行にできない
+    with pytest.raises(LD2NotDoneError):
+        _ = [row async for row in repo.iter_mapping_values()]
+
 
 @pytest.mark.asyncio
 async def test_normal_trial_repository_delete_save_dir_not_exist(tmp_path: str) -> None:
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import itertools
 from typing import TYPE_CHECKING
 
 import pytest
@@ -753,3 +754,83 @@ def test_parameter_aligned_space_model_reconstruction(model: ParameterAlignedSpa
     space = ParameterAlignedSpace.from_model(model)
     reconstructed_model = space.to_model()
     assert model == reconstructed_model
+
+
+_GRID_RANGE_SPACES = {
+    "1D": ParameterAlignedSpace(
+        axes=[LineSegment(type_="int", size=5, step=1, ambient_index=0, start=0, name="x", ambient_size=5)],
+        check_lower_filling=True,
+    ),
+    "3D": ParameterAlignedSpace(
+        axes=[
+            LineSegment(type_="int", size=3, step=2, ambient_index=0, start=-1, name="x", ambient_size=3),
+            LineSegment(type_="float", size=4, step=0.5, ambient_index=0, start=0.0, name="y", ambient_size=4),
+            LineSegment(type_="bool", size=2, step=True, ambient_index=0, start=False, name="z", ambient_size=2),
+        ],
+        check_lower_filling=True,
+    ),
+    "sub space": ParameterAlignedSpace(
+        axes=[
+            LineSegment(type_="int", size=1, step=1, ambient_index=3, start=3, name="x", ambient_size=10),
+            LineSegment(type_="int", size=5, step=1, ambient_index=2, start=2, name="y", ambient_size=10),
+        ],
+        check_lower_filling=False,
+    ),
+    "infinite": ParameterAlignedSpace(
+        axes=[
+            LineSegment(type_="int", size=None, step=1, ambient_index=0, start=0, name="x", ambient_size=None),
+            LineSegment(type_="int", size=3, step=1, ambient_index=0, start=0, name="y", ambient_size=3),
+        ],
+        check_lower_filling=True,
+    ),
+}
+
+
+@pytest.mark.parametrize("space_id", list(_GRID_RANGE_SPACES))
+@pytest.mark.parametrize(
+    ("start", "num"),
+    [
+        pytest.param(0, 4, id="head"),
+        pytest.param(3, 7, id="carry"),
+        pytest.param(5, 0, id="empty"),
+        pytest.param(20, 10, id="tail"),
+        pytest.param(100, 3, id="out of range"),
+    ],
+)
+def test_parameter_aligned_space_indexed_grid_range(space_id: str, start: int, num: int) -> None:
+    space = _GRID_RANGE_SPACES[space_id]
+    expected = list(itertools.islice(space.indexed_grid(), start, start + num))
+    actual = list(space.indexed_grid_range(start, num))
+    assert actual == expected
+
+
+def test_parameter_aligned_space_indexed_grid_range_raise() -> None:
+    with pytest.raises(LD2ParameterError, match=r"non-negative"):
+        _ = list(_GRID_RANGE_SPACES["1D"].indexed_grid_range(-1, 3))
+
+
+@pytest.mark.parametrize("space_id", ["3D", "sub space", "infinite"])
+def test_parameter_aligned_space_indexed_point(space_id: str) -> None:
+    space = _GRID_RANGE_SPACES[space_id]
+    expected = list(itertools.islice(space.indexed_grid(), 20))
+    actual = [space.indexed_point(i) for i in range(len(expected))]
+    assert actual == expected
+
+
+@pytest.mark.parametrize("index", [-1, 5])
+def test_parameter_aligned_space_indexed_point_raise(index: int) -> None:
+    with pytest.raises(LD2ParameterError, match=r"Out\sof\sthe\sspace"):
+        _ = _GRID_RANGE_SPACES["sub space"].indexed_point(index)
+
+
+@pytest.mark.parametrize("space_id", ["1D", "3D", "sub space"])
+def test_parameter_aligned_space_grid_value_columns(space_id: str) -> None:
+    space = _GRID_RANGE_SPACES[space_id]
+    expected = list(space.grid())
+    actual = space.grid_value_columns()
+    assert list(zip(*actual, strict=True)) == expected
+
+
+def test_parameter_aligned_space_grid_value_columns_raise() -> None:
+    with pytest.raises(LD2InvalidSpaceError, match=r"infinite"):
+        _ = _GRID_RANGE_SPACES["infinite"].grid_value_columns()
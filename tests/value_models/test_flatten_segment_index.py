@@ -0,0 +1,158 @@
+import pytest
+
+from lite_dist2.value_models.base_space import FlattenSegment
+from lite_dist2.value_models.flatten_segment_index import FlattenSegmentIndex
+
+
+@pytest.mark.parametrize(
+    ("segments", "expected"),
+    [
+        pytest.param([], [], id="empty"),
+        pytest.param(
+            [FlattenSegment(0, 5), FlattenSegment(5, 5), FlattenSegment(10, 5)],
+            [FlattenSegment(0, 15)],
+            id="continuing 3",
+        ),
+        pytest.param(
+            [FlattenSegment(306, 51), FlattenSegment(0, 204), FlattenSegment(255, 51), FlattenSegment(204, 51)],
+            [FlattenSegment(0, 357)],
+            id="continuing 4 unsorted",
+        ),
+        pytest.param(
+            [FlattenSegment(0, 10), FlattenSegment(20, 10)],
+            [FlattenSegment(0, 10), FlattenSegment(20, 10)],
+            id="separated",
+        ),
+        pytest.param(
+            [FlattenSegment(0, 10), FlattenSegment(5, 3), FlattenSegment(8, 10)],
+            [FlattenSegment(0, 18)],
+            id="overlapped",
+        ),
+        pytest.param(
+            [FlattenSegment(10, None), FlattenSegment(0, 10), FlattenSegment(50, 10)],
+            [FlattenSegment(0, None)],
+            id="infinite",
+        ),
+    ],
+)
+def test_flatten_segment_index_init(segments: list[FlattenSegment], expected: list[FlattenSegment]) -> None:
+    index = FlattenSegmentIndex(segments)
+    assert index.to_segments() == expected
+
+
+@pytest.mark.parametrize(
+    ("init_segments", "added", "expected"),
+    [
+        pytest.param([], FlattenSegment(3, 4), [FlattenSegment(3, 4)], id="empty"),
+        pytest.param([FlattenSegment(0, 10)], FlattenSegment(10, 5), [FlattenSegment(0, 15)], id="append touching"),
+        pytest.param(
+            [FlattenSegment(0, 10)],
+            FlattenSegment(11, 5),
+            [FlattenSegment(0, 10), FlattenSegment(11, 5)],
+            id="append separated",
+        ),
+        pytest.param(
+            [FlattenSegment(0, 10), FlattenSegment(20, 10)],
+            FlattenSegment(10, 10),
+            [FlattenSegment(0, 30)],
+            id="fill gap",
+        ),
+        pytest.param(
+            [FlattenSegment(0, 10), FlattenSegment(20, 10), FlattenSegment(40, 10)],
+            FlattenSegment(5, 40),
+            [FlattenSegment(0, 50)],
+            id="bridge several",
+        ),
+        pytest.param(
+            [FlattenSegment(10, 10)],
+            FlattenSegment(0, 5),
+            [FlattenSegment(0, 5), FlattenSegment(10, 10)],
+            id="prepend separated",
+        ),
+        pytest.param([FlattenSegment(0, 10)], FlattenSegment(2, 3), [FlattenSegment(0, 10)], id="contained"),
+        pytest.param(
+            [FlattenSegment(0, 10), FlattenSegment(20, 10)],
+            FlattenSegment(15, None),
+            [FlattenSegment(0, 10), FlattenSegment(15, None)],
+            id="infinite",
+        ),
+        pytest.param([FlattenSegment(0, 10)], FlattenSegment(20, 0), [FlattenSegment(0, 10)], id="zero size"),
+    ],
+)
+def test_flatten_segment_index_add(
+    init_segments: list[FlattenSegment],
+    added: FlattenSegment,
+    expected: list[FlattenSegment],
+) -> None:
+    index = FlattenSegmentIndex(init_segments)
+    index.add(added)
+    assert index.to_segments() == expected
+
+
+@pytest.mark.parametrize(
+    ("init_segments", "removed", "expected"),
+    [
+        pytest.param([], FlattenSegment(3, 4), [], id="empty"),
+        pytest.param([FlattenSegment(0, 10)], FlattenSegment(0, 10), [], id="whole"),
+        pytest.param([FlattenSegment(0, 10)], FlattenSegment(5, 5), [FlattenSegment(0, 5)], id="tail"),
+        pytest.param([FlattenSegment(0, 10)], FlattenSegment(0, 5), [FlattenSegment(5, 5)], id="head"),
+        pytest.param(
+            [FlattenSegment(0, 10)],
+            FlattenSegment(3, 4),
+            [FlattenSegment(0, 3), FlattenSegment(7, 3)],
+            id="split",
+        ),
+        pytest.param(
+            [FlattenSegment(0, 10), FlattenSegment(20, 10)],
+            FlattenSegment(10, 10),
+            [FlattenSegment(0, 10), FlattenSegment(20, 10)],
+            id="not occupied",
+        ),
+        pytest.param(
+            [FlattenSegment(0, 10), FlattenSegment(20, 10), FlattenSegment(40, 10)],
+            FlattenSegment(5, 40),
+            [FlattenSegment(0, 5), FlattenSegment(45, 5)],
+            id="across several",
+        ),
+        pytest.param(
+            [FlattenSegment(0, None)],
+            FlattenSegment(10, 5),
+            [FlattenSegment(0, 10), FlattenSegment(15, None)],
+            id="split infinite",
+        ),
+        pytest.param(
+            [FlattenSegment(0, 10), FlattenSegment(20, 10)],
+            FlattenSegment(5, None),
+            [FlattenSegment(0, 5)],
+            id="infinite",
+        ),
+    ],
+)
+def test_flatten_segment_index_remove(
+    init_segments: list[FlattenSegment],
+    removed: FlattenSegment,
+    expected: list[FlattenSegment],
+) -> None:
+    index = FlattenSegmentIndex(init_segments)
+    index.remove(removed)
+    assert index.to_segments() == expected
+
+
+@pytest.mark.parametrize(
+    ("segments", "total_num", "expected"),
+    [
+        pytest.param([], 100, FlattenSegment(0, None), id="empty"),
+        pytest.param([FlattenSegment(0, 10)], 100, FlattenSegment(10, None), id="single"),
+        pytest.param([FlattenSegment(0, 10)], None, FlattenSegment(10, None), id="single infinite"),
+        pytest.param([FlattenSegment(0, 10)], 10, FlattenSegment(10, 0), id="filled"),
+        pytest.param([FlattenSegment(0, 10), FlattenSegment(50, 10)], 100, FlattenSegment(10, 40), id="segmented"),
+        pytest.param([FlattenSegment(5, 10)], 100, FlattenSegment(0, 5), id="head gap"),
+    ],
+)
+def test_flatten_segment_index_find_first_gap(
+    segments: list[FlattenSegment],
+    total_num: int | None,
+    expected: FlattenSegment,
+) -> None:
+    index = FlattenSegmentIndex(segments)
+    assert index.find_first_gap(total_num) == expected
@@ -0,0 +1,126 @@
+import itertools
+
+import pytest
+
+from lite_dist2.expections import LD2InvalidSpaceError, LD2ParameterError
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+
+np = pytest.importorskip("numpy")
+
+
+_MIXED_SPACE = ParameterAlignedSpace(
+    axes=[
+        LineSegment(name="x", type_="int", size=3, step=2, start=-1, ambient_index=0, ambient_size=3),
+        LineSegment(name="y", type_="float", size=4, step=0.1, start=0.3, ambient_index=0, ambient_size=4),
+        LineSegment(name="z", type_="bool", size=2, step=True, start=False, ambient_index=0, ambient_size=2),
+    ],
+    check_lower_filling=True,
+)
+_SLICED_SPACE = ParameterAlignedSpace(
+    axes=[
+        LineSegment(name="x", type_="int", size=1, step=1, start=5, ambient_index=5, ambient_size=10),
+        LineSegment(name="y", type_="float", size=7, step=0.5, start=1.5, ambient_index=3, ambient_size=10),
+    ],
+    check_lower_filling=True,
+)
+
+
+def _create_int_space(start: int, step: int, size: int) -> ParameterAlignedSpace:
+    return ParameterAlignedSpace(
+        axes=[
+            LineSegment(name="x", type_="int", size=size, step=step, start=start, ambient_index=0, ambient_size=size)
+        ],
+        check_lower_filling=True,
+    )
+
+
+_INFINITE_SPACE = ParameterAlignedSpace(
+    axes=[
+        LineSegment(name="x", type_="int", size=None, step=3, start=0, ambient_index=0, ambient_size=None),
+        LineSegment(name="y", type_="int", size=5, step=1, start=0, ambient_index=0, ambient_size=5),
+    ],
+    check_lower_filling=True,
+)
+
+
+@pytest.mark.parametrize(
+    "space",
+    [
+        pytest.param(_MIXED_SPACE, id="mixed types"),
+        pytest.param(_SLICED_SPACE, id="sliced"),
+        pytest.param(_create_int_space(-(1 << 52), 1 << 50, 7), id="large int"),
+        pytest.param(_create_int_space((1 << 53) - 4, 3, 4), id="int beyond 2^53"),
+        pytest.param(_create_int_space(1 << 63, 1, 3), id="int beyond int64"),
+    ],
+)
+def test_grid_columns_same_as_grid(space: ParameterAlignedSpace) -> None:
+    columns = space.grid_columns()
+    actual = list(zip(*(column.tolist() for column in columns), strict=True))
+    assert actual == list(space.grid())
+    assert [type(v) for v in actual[-1]] == [type(v) for v in next(iter(space.grid()))]
+
+
+def test_grid_array_shape_and_dtype() -> None:
+    array = _MIXED_SPACE.grid_array()
+    assert array.shape == (24, 3)
+    assert array.dtype == np.float64
+    assert array.tolist() == [list(map(float, point)) for point in _MIXED_SPACE.grid()]
+
+
+@pytest.mark.parametrize(
+    ("space", "chunk_size", "point_num"),
+    [
+        pytest.param(_MIXED_SPACE, 5, 24, id="finite, remainder"),
+        pytest.param(_MIXED_SPACE, 24, 24, id="finite, exact"),
+        pytest.param(_MIXED_SPACE, 100, 24, id="finite, larger chunk"),
+        pytest.param(_INFINITE_SPACE, 4, 42, id="infinite"),
+    ],
+)
+def test_grid_chunks_same_as_grid(space: ParameterAlignedSpace, chunk_size: int, point_num: int) -> None:
+    chunks = list(itertools.islice(space.grid_chunks(chunk_size), -(-point_num // chunk_size)))
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+
+    actual = [tuple(row) for chunk in chunks for row in chunk.tolist()][:point_num]
+    expected = list(itertools.islice(space.grid(), point_num))
+    assert actual == [tuple(map(float, point)) if space is _MIXED_SPACE else point for point in expected]
+
+
+def test_grid_columns_infinite_range() -> None:
+    columns = _INFINITE_SPACE.grid_columns(9, 12)
+    assert [column.tolist() for column in columns] == [[3, 6, 6], [4, 0, 1]]
+
+
+@pytest.mark.parametrize(
+    ("space", "start", "stop", "error"),
+    [
+        pytest.param(_INFINITE_SPACE, 0, None, LD2InvalidSpaceError, id="infinite without stop"),
+        pytest.param(_MIXED_SPACE, 5, 4, LD2ParameterError, id="reversed"),
+        pytest.param(_MIXED_SPACE, 0, 25, LD2ParameterError, id="over total"),
+    ],
+)
+def test_grid_columns_raises(
+    space: ParameterAlignedSpace,
+    start: int,
+    stop: int | None,
+    error: type[Exception],
+) -> None:
+    with pytest.raises(error):
+        space.grid_columns(start, stop)
+
+
+def test_grid_chunks_raises() -> None:
+    with pytest.raises(LD2ParameterError):
+        next(_MIXED_SPACE.grid_chunks(0))
+
+
+@pytest.mark.parametrize(
+    ("space", "expected_dtype"),
+    [
+        pytest.param(_create_int_space(-(1 << 52), 1 << 50, 7), np.int64, id="int64"),
+        pytest.param(_create_int_space((1 << 53) - 4, 3, 4), np.int64, id="beyond 2^53"),
+        pytest.param(_create_int_space(1 << 63, 1, 3), np.object_, id="beyond int64"),
+    ],
+)
+def test_grid_columns_int_dtype(space: ParameterAlignedSpace, expected_dtype: type) -> None:
+    assert space.grid_columns()[0].dtype == expected_dtype
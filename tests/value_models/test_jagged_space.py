@@ -2,9 +2,10 @@ import pytest
 
 from lite_dist2.expections import LD2UndefinedError
 from lite_dist2.type_definitions import PortableValueType, PrimitiveValueType
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace, ParameterAlignedSpacePortableModel
 from lite_dist2.value_models.base_space import FlattenSegment
 from lite_dist2.value_models.jagged_space import ParameterJaggedSpace, ParameterJaggedSpacePortableModel
-from lite_dist2.value_models.line_segment import DummyLineSegment, LineSegmentPortableModel
+from lite_dist2.value_models.line_segment import DummyLineSegment, LineSegment, LineSegmentPortableModel
 
 
 def test_parameter_jagged_space_hash() -> None:
@@ -98,6 +99,29 @@ def test_parameter_jagged_space_lower_element_num_by_dim(
             ],
             id="2D",
         ),
+        pytest.param(
+            ParameterJaggedSpace(
+                parameters=[(7,), (2,), (9,)],
+                ambient_indices=[(7,), (2,), (9,)],
+                axes_info=[DummyLineSegment(name="x", type_="int", step=1, ambient_size=10)],
+                source_space=ParameterAlignedSpace(
+                    axes=[
+                        LineSegment(
+                            name=None,
+                            type_="int",
+                            size=3,
+                            step=1,
+                            start=4,
+                            ambient_index=4,
+                            ambient_size=10,
+                        ),
+                    ],
+                    check_lower_filling=True,
+                ),
+            ),
+            [FlattenSegment(start=4, size=3)],
+            id="source space",
+        ),
     ],
 )
 def test_parameter_jagged_space_get_flatten_ambient_start_and_size_list(
@@ -129,6 +153,42 @@ def test_parameter_jagged_space_get_flatten_ambient_start_and_size_list(
                     ),
                 ],
             ),
+            id="no source space",
+        ),
+        pytest.param(
+            ParameterJaggedSpacePortableModel(
+                type="jagged",
+                parameters=[("0x7",), ("0x2",)],
+                ambient_indices=[("0x7",), ("0x2",)],
+                axes_info=[
+                    LineSegmentPortableModel(
+                        name="x",
+                        type="int",
+                        size=None,
+                        step="0x1",
+                        start="0x0",
+                        ambient_index="0x0",
+                        ambient_size="0xa",
+                        is_dummy=True,
+                    ),
+                ],
+                source_space=ParameterAlignedSpacePortableModel(
+                    type="aligned",
+                    axes=[
+                        LineSegmentPortableModel(
+                            name=None,
+                            type="int",
+                            size="0x2",
+                            step="0x1",
+                            start="0x4",
+                            ambient_index="0x4",
+                            ambient_size="0xa",
+                        ),
+                    ],
+                    check_lower_filling=True,
+                ),
+            ),
+            id="source space",
         ),
     ],
 )
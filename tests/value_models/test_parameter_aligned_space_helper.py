@@ -533,6 +533,41 @@ def test_simplify(
             ],
             id="continuing 4 unsorted",
         ),
+        pytest.param(
+            [
+                FlattenSegment(20, 5),
+                FlattenSegment(0, 5),
+                FlattenSegment(5, 5),
+            ],
+            [
+                FlattenSegment(0, 10),
+                FlattenSegment(20, 5),
+            ],
+            id="separated",
+        ),
+        pytest.param(
+            [
+                FlattenSegment(10, 5),
+                FlattenSegment(0, 20),
+                FlattenSegment(18, 4),
+            ],
+            [
+                FlattenSegment(0, 22),
+            ],
+            id="overlapped",
+        ),
+        pytest.param(
+            [
+                FlattenSegment(10, None),
+                FlattenSegment(0, 10),
+                FlattenSegment(30, 5),
+            ],
+            [
+                FlattenSegment(0, None),
+                FlattenSegment(30, 5),
+            ],
+            id="infinite",
+        ),
     ],
 )
 def test_simplify_simple_flatten(segments: list[FlattenSegment], expected: list[FlattenSegment]) -> None:
@@ -540,6 +575,28 @@ def test_simplify_simple_flatten(segments: list[FlattenSegment], expected: list[
     assert actual == expected
 
 
+def test_simplify_interleaved_lines() -> None:
+    def _space(x: int, y: int, y_size: int) -> ParameterAlignedSpace:
+        return ParameterAlignedSpace(
+            axes=[
+                LineSegment(name="x", type_="int", size=1, step=1, start=x, ambient_index=x, ambient_size=4),
+                LineSegment(name="y", type_="int", size=y_size, step=1, start=y, ambient_index=y, ambient_size=1000),
+            ],
+            check_lower_filling=True,
+        )
+
+    # x=0 と x=2 の行の断片を交互に並べ、x=2 の行には穴を開けておく
+    sub_spaces = []
+    for y in reversed(range(0, 1000, 10)):
+        sub_spaces.append(_space(0, y, 10))
+        if y != 500:
+            sub_spaces.append(_space(2, y, 10))
+
+    expected = [_space(0, 0, 1000), _space(2, 0, 500), _space(2, 510, 490)]
+    actual = simplify(sub_spaces, 1)
+    assert [a.to_model() for a in actual] == [e.to_model() for e in expected]
+
+
 @pytest.mark.parametrize(
     ("aps", "dim", "expected"),
     [
@@ -0,0 +1,351 @@
+import httpx
+import pytest
+
+from lite_dist2.curriculum_models.trial import Trial, TrialStatus
+from lite_dist2.table_node_api import msgpack_codec
+from lite_dist2.table_node_api.http_compression import ContentEncoding, decompress
+from lite_dist2.table_node_api.table_param import StudyRegisterParam, TrialReserveParam
+from lite_dist2.table_node_api.table_response import OkResponse, TrialReserveResponse
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+from lite_dist2.worker_node.table_node_client import TableNodeClient
+from tests.const import DT
+
+
+def _create_trial(worker_node_id: str) -> Trial:
+    return Trial(
+        study_id="s01",
+        trial_id="t01",
+        reserved_timestamp=DT,
+        trial_status=TrialStatus.running,
+        const_param=None,
+        parameter_space=ParameterAlignedSpace(
+            axes=[LineSegment(name="x", type_="int", size=2, step=1, start=0, ambient_index=0, ambient_size=2)],
+            check_lower_filling=True,
+        ),
+        result_type="scalar",
+        result_value_type="int",
+        worker_node_name=None,
+        worker_node_id=worker_node_id,
+    )
+
+
+class _CountingClientFactory:
+    def __init__(
+        self,
+        client: TableNodeClient,
+        status_codes: dict[str, int] | None = None,
+        bodies: dict[str, dict[str, object]] | None = None,
+    ) -> None:
+        self.created: list[httpx.AsyncClient] = []
+        self.paths: list[str] = []
+        self.status_codes = status_codes or {}
+        self.bodies = bodies or {}
+        self._create_client = client._create_client
+
+    def __call__(self) -> httpx.AsyncClient:
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.paths.append(request.url.path)
+            path = request.url.path
+            return httpx.Response(self.status_codes.get(path, 200), json=self.bodies.get(path, {"ok": True}))
+
+        created = self._create_client()
+        # 設定はそのままに、通信だけ MockTransport に差し替える
+        client = httpx.AsyncClient(
+            base_url=created.base_url,
+            headers=created.headers,
+            timeout=created.timeout,
+            transport=httpx.MockTransport(handler),
+        )
+        self.created.append(client)
+        return client
+
+
+@pytest.mark.asyncio
+async def test_table_node_client_reuses_client_in_context(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = TableNodeClient("127.0.0.1", 8000)
+    factory = _CountingClientFactory(client)
+    monkeypatch.setattr(client, "_create_client", factory)
+
+    async with client:
+        assert await client.ping()
+        await client.save()
+        assert len(factory.created) == 1
+        assert not factory.created[0].is_closed
+
+    assert factory.paths == ["/ping", "/save"]
+    assert factory.created[0].is_closed
+    assert client._client is None
+
+
+@pytest.mark.asyncio
+async def test_table_node_client_creates_client_per_request_outside_context(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = TableNodeClient("127.0.0.1", 8000)
+    factory = _CountingClientFactory(client)
+    monkeypatch.setattr(client, "_create_client", factory)
+
+    assert await client.ping()
+    await client.save()
+
+    assert factory.paths == ["/ping", "/save"]
+    assert len(factory.created) == 2
+    assert all(c.is_closed for c in factory.created)
+
+
+@pytest.mark.asyncio
+async def test_table_node_client_create_client_config() -> None:
+    client = TableNodeClient("127.0.0.1", 8000, timeout_seconds=12, pool_size=2, keepalive_expiry_seconds=3)
+    async with client._create_client() as http_client:
+        assert str(http_client.base_url) == "http://127.0.0.1:8000"
+        assert http_client.timeout == httpx.Timeout(12)
+        assert http_client.headers["Content-Type"] == "application/json; charset=utf-8"
+
+
+@pytest.mark.parametrize(
+    ("raw_mappings", "expected_path"),
+    [
+        pytest.param([((0,), 0), ((1,), 2)], "/trial/register_result", id="lean"),
+        pytest.param([((0,), 0)], "/trial/register", id="fallback to whole trial"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_table_node_client_register_trial(
+    monkeypatch: pytest.MonkeyPatch,
+    raw_mappings: list[tuple[tuple[int], int]],
+    expected_path: str,
+) -> None:
+    client = TableNodeClient("127.0.0.1", 8000)
+    factory = _CountingClientFactory(client)
+    monkeypatch.setattr(client, "_create_client", factory)
+    trial = _create_trial("w01")
+    trial.set_result(trial.convert_mappings_from(raw_mappings))
+
+    await client.register_trial(trial, 10)
+
+    assert factory.paths == [expected_path]
+
+
+@pytest.mark.parametrize("status_code", [404, 405])
+@pytest.mark.asyncio
+async def test_table_node_client_register_trial_fallback_to_whole_trial(
+    monkeypatch: pytest.MonkeyPatch,
+    status_code: int,
+) -> None:
+    client = TableNodeClient("127.0.0.1", 8000)
+    factory = _CountingClientFactory(
+        client,
+        {"/trial/register_result": status_code},
+        {"/trial/register_result": {"detail": "Not Found"}},
+    )
+    monkeypatch.setattr(client, "_create_client", factory)
+    trial = _create_trial("w01")
+    trial.set_result(trial.convert_mappings_from([((0,), 0), ((1,), 2)]))
+
+    await client.register_trial(trial, 10)
+    await client.register_trial(trial, 10)
+
+    # 一度断られたら、以降は結果だけを送ろうとしない
+    assert factory.paths == ["/trial/register_result", "/trial/register", "/trial/register"]
+
+
+@pytest.mark.parametrize(
+    ("status_code", "detail"),
+    [
+        pytest.param(404, "Study not found: study_id=s01", id="cancelled study"),
+        pytest.param(409, "Invalid trial. Maybe the trial is not reserved or already registered.", id="timed out"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_table_node_client_register_trial_rejected(
+    monkeypatch: pytest.MonkeyPatch,
+    status_code: int,
+    detail: str,
+) -> None:
+    client = TableNodeClient("127.0.0.1", 8000)
+    factory = _CountingClientFactory(
+        client,
+        {"/trial/register_result": status_code},
+        {"/trial/register_result": {"detail": detail}},
+    )
+    monkeypatch.setattr(client, "_create_client", factory)
+    trial = _create_trial("w01")
+    trial.set_result(trial.convert_mappings_from([((0,), 0), ((1,), 2)]))
+
+    await client.register_trial(trial, 10)
+    await client.register_trial(trial, 10)
+
+    # study が無いだけなので、以降も結果だけを送る
+    assert factory.paths == ["/trial/register_result", "/trial/register_result"]
+
+
+@pytest.mark.asyncio
+async def test_table_node_client_register_trial_raise_server_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = TableNodeClient("127.0.0.1", 8000)
+    factory = _CountingClientFactory(client, {"/trial/register_result": 500})
+    monkeypatch.setattr(client, "_create_client", factory)
+    trial = _create_trial("w01")
+    trial.set_result(trial.convert_mappings_from([((0,), 0), ((1,), 2)]))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.register_trial(trial, 10)
+
+
+@pytest.mark.asyncio
+async def test_table_node_client_register_trials(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = TableNodeClient("127.0.0.1", 8000)
+    factory = _CountingClientFactory(
+        client,
+        bodies={
+            "/trial/register_result_batch": {"rejected_trial_ids": ["t01"]},
+            "/trial/register_batch": {"rejected_trial_ids": []},
+        },
+    )
+    monkeypatch.setattr(client, "_create_client", factory)
+    lean_trial = _create_trial("w01")
+    lean_trial.set_result(lean_trial.convert_mappings_from([((0,), 0), ((1,), 2)]))
+    whole_trial = _create_trial("w01")
+    whole_trial.trial_id = "t02"
+    whole_trial.set_result(whole_trial.convert_mappings_from([((0,), 0)]))
+
+    # 結果だけを送れる trial はまとめて結果だけを送り、送れない trial は trial ごと送る
+    assert await client.register_trials([lean_trial, whole_trial], 10) == ["t01"]
+    assert factory.paths == ["/trial/register_result_batch", "/trial/register_batch"]
+
+
+@pytest.mark.asyncio
+async def test_table_node_client_register_trials_fallback_to_one_by_one(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = TableNodeClient("127.0.0.1", 8000)
+    factory = _CountingClientFactory(
+        client,
+        {"/trial/register_result_batch": 404, "/trial/register_result": 409},
+        {"/trial/register_result_batch": {"detail": "Not Found"}, "/trial/register_result": {"detail": "Invalid"}},
+    )
+    monkeypatch.setattr(client, "_create_client", factory)
+    trial = _create_trial("w01")
+    trial.set_result(trial.convert_mappings_from([((0,), 0), ((1,), 2)]))
+
+    # 一括登録の無いテーブルノードには 1 つずつ登録し、断られた trial の id を返す
+    assert await client.register_trials([trial], 10) == ["t01"]
+    assert await client.register_trials([trial], 10) == ["t01"]
+    assert factory.paths == ["/trial/register_result_batch", "/trial/register_result", "/trial/register_result"]
+
+
+@pytest.mark.parametrize(
+    ("compression", "accepted", "expected_encodings"),
+    [
+        pytest.param("gzip", "zstd, gzip", [None, None, "gzip"], id="gzip"),
+        pytest.param("zstd", "zstd, gzip", [None, None, "zstd"], id="zstd"),
+        pytest.param("zstd", "gzip", [None, None, None], id="not accepted"),
+        pytest.param(None, "zstd, gzip", [None, None, None], id="disabled"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_table_node_client_compresses_request(
+    monkeypatch: pytest.MonkeyPatch,
+    compression: ContentEncoding | None,
+    accepted: str,
+    expected_encodings: list[str | None],
+) -> None:
+    client = TableNodeClient("127.0.0.1", 8000, compression=compression, compression_minimum_size=100)
+    encodings = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        encoding = request.headers.get("Content-Encoding")
+        encodings.append(encoding)
+        body = request.content if encoding is None else decompress(request.content, encoding)
+        if body:
+            StudyRegisterParam.model_validate_json(body)
+        return httpx.Response(200, json={"ok": True, "study_id": "s01"}, headers={"Accept-Encoding": accepted})
+
+    def create_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=client.domain, headers=client.HEADERS, transport=httpx.MockTransport(handler)
+        )
+
+    monkeypatch.setattr(client, "_create_client", create_client)
+    param = StudyRegisterParam.model_validate(
+        {
+            "study": {
+                "name": "x" * 200,
+                "required_capacity": [],
+                "study_strategy": {"type": "all_calculation", "study_strategy_param": None},
+                "suggest_strategy": {"type": "sequential", "suggest_strategy_param": {"strict_aligned": True}},
+                "result_type": "scalar",
+                "result_value_type": "int",
+                "const_param": None,
+                "parameter_space": {
+                    "type": "aligned",
+                    "axes": [{"name": "x", "type": "int", "size": "0x4", "step": "0x1", "start": "0x0"}],
+                },
+            },
+        },
+    )
+
+    async with client:
+        # 最初のリクエストでは受け付けられる圧縮形式が分からないので圧縮しない
+        await client.register_study(param)
+        assert await client.ping()
+        await client.register_study(param)
+
+    assert encodings == expected_encodings
+
+
+@pytest.mark.asyncio
+async def test_table_node_client_resends_uncompressed_on_415(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = TableNodeClient("127.0.0.1", 8000, compression="gzip", compression_minimum_size=0)
+    client._accepted_encodings = {"gzip"}
+    encodings = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        encoding = request.headers.get("Content-Encoding")
+        encodings.append(encoding)
+        if encoding is not None:
+            return httpx.Response(415, headers={"Accept-Encoding": "identity"})
+        return httpx.Response(200, json={"ok": True})
+
+    def create_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=client.domain, headers=client.HEADERS, transport=httpx.MockTransport(handler)
+        )
+
+    monkeypatch.setattr(client, "_create_client", create_client)
+    status_code, _ = await client._post("/save", 10, OkResponse(ok=True))
+
+    assert status_code == 200
+    assert encodings == ["gzip", None]
+    assert client._accepted_encodings == {"identity"}
+
+
+@pytest.mark.parametrize(
+    "response_content_type",
+    [
+        pytest.param("application/msgpack", id="msgpack response"),
+        pytest.param("application/json", id="json response"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_table_node_client_msgpack(monkeypatch: pytest.MonkeyPatch, response_content_type: str) -> None:
+    client = TableNodeClient("127.0.0.1", 8000, wire_format="msgpack")
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        param = TrialReserveParam.model_validate(msgpack_codec.unpackb(request.content))
+        trial = _create_trial(param.worker_node_id).to_model()
+        body = TrialReserveResponse(trial=trial).model_dump(mode="json")
+        if msgpack_codec.is_msgpack(response_content_type):
+            return httpx.Response(
+                200, content=msgpack_codec.packb(body), headers={"Content-Type": response_content_type}
+            )
+        return httpx.Response(200, json=body)
+
+    def create_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(base_url=client.domain, transport=httpx.MockTransport(handler))
+
+    monkeypatch.setattr(client, "_create_client", create_client)
+    trial = await client.reserve_trial("w01", None, 2, set(), timeout_seconds=10)
+
+    assert trial is not None
+    assert trial.to_model() == _create_trial("w01").to_model()
+    assert requests[0].headers["Content-Type"] == "application/msgpack"
+    assert msgpack_codec.accepts_msgpack(requests[0].headers["Accept"])
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, override
+
+import pytest
+
+from lite_dist2.config import WorkerConfig
+from lite_dist2.curriculum_models.trial import Trial, TrialStatus
+from lite_dist2.expections import LD2TableNodeServerError
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.line_segment import LineSegment
+from lite_dist2.worker_node import trial_prefetcher
+from lite_dist2.worker_node.trial_prefetcher import TrialPrefetcher
+from lite_dist2.worker_node.trial_runner import SemiAutoMPTrialRunner
+from lite_dist2.worker_node.worker import Worker
+from tests.const import DT
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing.pool import Pool
+    from types import TracebackType
+    from typing import Self
+
+    from lite_dist2.type_definitions import RawParamType, RawResultType
+    from lite_dist2.value_models.space_type import ParameterSpaceType
+
+
+def _create_trial(trial_id: str) -> Trial:
+    index = int(trial_id.removeprefix("t"))
+    return Trial(
+        study_id="s01",
+        trial_id=trial_id,
+        reserved_timestamp=DT,
+        trial_status=TrialStatus.running,
+        const_param=None,
+        parameter_space=ParameterAlignedSpace(
+            axes=[
+                LineSegment(name="x", type_="int", size=2, step=1, start=index * 2, ambient_index=0, ambient_size=100),
+            ],
+            check_lower_filling=True,
+        ),
+        result_type="scalar",
+        result_value_type="int",
+        worker_node_name=None,
+        worker_node_id="w01",
+    )
+
+
+class FakeTableNodeClient:
+    def __init__(self, trial_num: int, fail_at: int | None = None, rejected_ids: set[str] | None = None) -> None:
+        self.trials = [_create_trial(f"t{i}") for i in range(trial_num)]
+        self.fail_at = fail_at
+        self.rejected_ids = rejected_ids or set()
+        self.reserve_count = 0
+        self.request_count = 0
+        self.registered: list[Trial] = []
+        self.register_request_sizes: list[int] = []
+        self.saved = False
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        pass
+
+    async def ping(self) -> bool:
+        return True
+
+    async def reserve_trials(self, *_: object, trial_num: int, **__: object) -> list[Trial]:
+        if self.request_count == self.fail_at:
+            msg = "reserve failed"
+            raise LD2TableNodeServerError(msg)
+        self.request_count += 1
+        reserved, self.trials = self.trials[:trial_num], self.trials[trial_num:]
+        self.reserve_count += len(reserved)
+        return reserved
+
+    async def register_trials(self, trials: list[Trial], _: int) -> list[str]:
+        self.registered.extend(trials)
+        self.register_request_sizes.append(len(trials))
+        return [trial.trial_id for trial in trials if trial.trial_id in self.rejected_ids]
+
+    async def save(self) -> None:
+        self.saved = True
+
+
+class DoubleRunner(SemiAutoMPTrialRunner):
+    @override
+    def func(self, parameters: RawParamType, *args: object, **kwargs: object) -> RawResultType:
+        return parameters[0] * 2
+
+    @override
+    def batch_func(
+        self,
+        raw_params: ParameterSpaceType,
+        config: WorkerConfig,
+        pool: Pool | ProcessPoolExecutor | None = None,
+        *args: object,
+        **kwargs: object,
+    ) -> list[tuple[RawParamType, RawResultType]]:
+        return [(param, self.func(param)) for param in raw_params.grid()]
+
+
+async def _settle() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.parametrize(
+    ("prefetch_trial_num", "trial_timeout_seconds", "last_run_seconds", "expected"),
+    [
+        pytest.param(3, None, None, 3, id="no timeout"),
+        pytest.param(3, 100, None, 3, id="not measured"),
+        pytest.param(3, 100, 10.0, 3, id="enough time"),
+        pytest.param(3, 100, 40.0, 1, id="limited by timeout"),
+        pytest.param(3, 100, 80.0, 0, id="no time to prefetch"),
+    ],
+)
+def test_trial_prefetcher_get_prefetch_limit(
+    prefetch_trial_num: int,
+    trial_timeout_seconds: int | None,
+    last_run_seconds: float | None,
+    expected: int,
+) -> None:
+    config = WorkerConfig(prefetch_trial_num=prefetch_trial_num, trial_timeout_seconds=trial_timeout_seconds)
+    prefetcher = TrialPrefetcher(FakeTableNodeClient(0), "w01", config)  # ty: ignore[invalid-argument-type]
+    prefetcher._last_run_seconds = last_run_seconds
+    assert prefetcher.get_prefetch_limit() == expected
+
+
+@pytest.mark.parametrize(
+    ("prefetch_trial_num", "expected_reserve_count"),
+    [
+        pytest.param(0, 1, id="no prefetch"),
+        pytest.param(2, 3, id="prefetch 2"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_trial_prefetcher_reserves_ahead_while_busy(
+    prefetch_trial_num: int,
+    expected_reserve_count: int,
+) -> None:
+    client = FakeTableNodeClient(10)
+    config = WorkerConfig(prefetch_trial_num=prefetch_trial_num)
+    async with TrialPrefetcher(client, "w01", config) as prefetcher:  # ty: ignore[invalid-argument-type]
+        trial = await prefetcher.get()
+        assert trial is not None
+        assert trial.trial_id == "t0"
+        await _settle()
+        # 計算中の 1 つに加えて prefetch_trial_num 個だけを 1 回のリクエストで予約する
+        assert client.reserve_count == expected_reserve_count
+        assert client.request_count == 1
+
+        await prefetcher.finish(1.0)
+        await _settle()
+        assert client.reserve_count == expected_reserve_count + 1
+        assert client.request_count == 2
+
+
+@pytest.mark.asyncio
+async def test_trial_prefetcher_stop_at_no_trial() -> None:
+    client = FakeTableNodeClient(3)
+    config = WorkerConfig(prefetch_trial_num=2)
+    trial_ids = []
+    async with TrialPrefetcher(client, "w01", config, stop_at_no_trial=True) as prefetcher:  # ty: ignore[invalid-argument-type]
+        while (trial := await prefetcher.get()) is not None:
+            trial_ids.append(trial.trial_id)
+            await prefetcher.finish(1.0)
+    assert trial_ids == ["t0", "t1", "t2"]
+
+
+@pytest.mark.asyncio
+async def test_trial_prefetcher_drops_expired_trial(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [0.0]
+    monkeypatch.setattr(trial_prefetcher.time, "monotonic", lambda: now[0])
+    client = FakeTableNodeClient(3)
+    config = WorkerConfig(prefetch_trial_num=1, trial_timeout_seconds=10)
+    async with TrialPrefetcher(client, "w01", config, stop_at_no_trial=True) as prefetcher:  # ty: ignore[invalid-argument-type]
+        first = await prefetcher.get()
+        await _settle()
+        assert client.reserve_count == 2
+
+        # t1 は予約から 11 秒待たされたのでタイムアウトしている
+        now[0] = 11.0
+        await prefetcher.finish(1.0)
+        second = await prefetcher.get()
+
+    assert first is not None
+    assert first.trial_id == "t0"
+    assert second is not None
+    assert second.trial_id == "t2"
+
+
+@pytest.mark.asyncio
+async def test_trial_prefetcher_raises_reserve_error() -> None:
+    client = FakeTableNodeClient(3, fail_at=1)
+    config = WorkerConfig(prefetch_trial_num=1)
+    async with TrialPrefetcher(client, "w01", config) as prefetcher:  # ty: ignore[invalid-argument-type]
+        # 予約済みの t0, t1 を返してから、2 回目の予約のエラーを送出する
+        assert await prefetcher.get() is not None
+        await prefetcher.finish(1.0)
+        assert await prefetcher.get() is not None
+        await prefetcher.finish(1.0)
+        with pytest.raises(LD2TableNodeServerError):
+            await prefetcher.get()
+
+
+@pytest.mark.asyncio
+async def test_worker_pipelined() -> None:
+    client = FakeTableNodeClient(5)
+    config = WorkerConfig(pipelined=True, prefetch_trial_num=2, disable_function_progress_bar=True)
+    worker = Worker(trial_runner=DoubleRunner(), ip="127.0.0.1", port=8000, config=config)
+    worker.client = client  # ty: ignore[invalid-assignment]
+
+    await worker.start_async(stop_at_no_trial=True)
+
+    assert [trial.trial_id for trial in client.registered] == [f"t{i}" for i in range(5)]
+    assert sum(client.register_request_sizes) == 5
+    assert max(client.register_request_sizes) <= 2
+    assert client.registered[1].result is not None
+    assert all(trial.compute_seconds is not None for trial in client.registered)
+    assert [mapping.to_tuple() for mapping in client.registered[1].result] == [("0x2", "0x4"), ("0x3", "0x6")]
+    assert client.saved
+
+
+@pytest.mark.asyncio
+async def test_worker_pipelined_keeps_rejected_trial_ids() -> None:
+    client = FakeTableNodeClient(5, rejected_ids={"t1", "t3"})
+    config = WorkerConfig(pipelined=True, prefetch_trial_num=2, disable_function_progress_bar=True)
+    worker = Worker(trial_runner=DoubleRunner(), ip="127.0.0.1", port=8000, config=config)
+    worker.client = client  # ty: ignore[invalid-assignment]
+
+    await worker.start_async(stop_at_no_trial=True)
+
+    assert sorted(worker.rejected_trial_ids) == ["t1", "t3"]
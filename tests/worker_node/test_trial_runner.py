@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, override
+
+import pytest
+
+from lite_dist2.config import WorkerConfig
+from lite_dist2.curriculum_models.trial import Trial, TrialStatus
+from lite_dist2.expections import LD2ParameterError
+from lite_dist2.value_models.aligned_space import ParameterAlignedSpace
+from lite_dist2.value_models.jagged_space import ParameterJaggedSpace
+from lite_dist2.value_models.line_segment import DummyLineSegment, LineSegment
+from lite_dist2.worker_node.trial_runner import VectorizedTrialRunner
+from tests.const import DT
+
+if TYPE_CHECKING:
+    from typing import Literal
+
+    from numpy.typing import NDArray
+
+    from lite_dist2.value_models.space_type import ParameterSpaceType
+
+np = pytest.importorskip("numpy")
+
+
+class SumRunner(VectorizedTrialRunner):
+    def __init__(self) -> None:
+        self.chunk_lengths: list[int] = []
+
+    @override
+    def batch_array_func(
+        self,
+        param_columns: list[NDArray],
+        config: WorkerConfig,
+        *args: object,
+        **kwargs: object,
+    ) -> NDArray:
+        self.chunk_lengths.append(len(param_columns[0]))
+        return param_columns[0] + param_columns[1]
+
+
+class VectorResultRunner(VectorizedTrialRunner):
+    @override
+    def batch_array_func(
+        self,
+        param_columns: list[NDArray],
+        config: WorkerConfig,
+        *args: object,
+        **kwargs: object,
+    ) -> NDArray:
+        return np.stack([param_columns[0] * 2, param_columns[1] * 3], axis=1)
+
+
+class BrokenRunner(VectorizedTrialRunner):
+    @override
+    def batch_array_func(
+        self,
+        param_columns: list[NDArray],
+        config: WorkerConfig,
+        *args: object,
+        **kwargs: object,
+    ) -> NDArray:
+        return param_columns[0][:-1]
+
+
+_ALIGNED_SPACE = ParameterAlignedSpace(
+    axes=[
+        LineSegment(name="x", type_="int", size=3, step=1, start=2, ambient_index=2, ambient_size=10),
+        LineSegment(name="y", type_="int", size=4, step=1, start=0, ambient_index=0, ambient_size=4),
+    ],
+    check_lower_filling=True,
+)
+_JAGGED_SPACE = ParameterJaggedSpace(
+    parameters=[(1, 2), (3, 5), (8, 13)],
+    ambient_indices=[(1, 2), (3, 5), (8, 13)],
+    axes_info=[
+        DummyLineSegment(name="x", type_="int", step=1, ambient_size=20),
+        DummyLineSegment(name="y", type_="int", step=1, ambient_size=20),
+    ],
+)
+
+
+def _create_trial(space: ParameterSpaceType, result_type: Literal["scalar", "vector"] = "scalar") -> Trial:
+    return Trial(
+        study_id="s01",
+        trial_id="t01",
+        reserved_timestamp=DT,
+        trial_status=TrialStatus.running,
+        const_param=None,
+        parameter_space=space,
+        result_type=result_type,
+        result_value_type="int",
+        worker_node_name="w01",
+        worker_node_id="w01",
+    )
+
+
+@pytest.mark.parametrize(
+    ("space", "vector_chunk_size", "expected_chunk_lengths"),
+    [
+        pytest.param(_ALIGNED_SPACE, None, [12], id="aligned, whole"),
+        pytest.param(_ALIGNED_SPACE, 5, [5, 5, 2], id="aligned, chunked"),
+        pytest.param(_JAGGED_SPACE, 2, [2, 1], id="jagged, chunked"),
+    ],
+)
+def test_vectorized_trial_runner_run(
+    space: ParameterSpaceType,
+    vector_chunk_size: int | None,
+    expected_chunk_lengths: list[int],
+) -> None:
+    config = WorkerConfig(vector_chunk_size=vector_chunk_size, disable_function_progress_bar=True)
+    runner = SumRunner()
+    trial = runner.run(_create_trial(space), config)
+
+    expected = _create_trial(space)
+    expected.set_result(expected.convert_mappings_from([(p, p[0] + p[1]) for p in space.grid()]))
+    assert trial.result == expected.result
+    assert runner.chunk_lengths == expected_chunk_lengths
+    assert runner.wrap_func(space, config) == [(p, p[0] + p[1]) for p in space.grid()]
+
+
+def test_vectorized_trial_runner_run_vector_result() -> None:
+    config = WorkerConfig(disable_function_progress_bar=True)
+    trial = VectorResultRunner().run(_create_trial(_ALIGNED_SPACE, "vector"), config)
+
+    expected = _create_trial(_ALIGNED_SPACE, "vector")
+    expected.set_result(expected.convert_mappings_from([(p, [p[0] * 2, p[1] * 3]) for p in _ALIGNED_SPACE.grid()]))
+    assert trial.result == expected.result
+
+
+def test_vectorized_trial_runner_raises_on_wrong_result_size() -> None:
+    config = WorkerConfig(disable_function_progress_bar=True)
+    with pytest.raises(LD2ParameterError):
+        BrokenRunner().run(_create_trial(_ALIGNED_SPACE), config)